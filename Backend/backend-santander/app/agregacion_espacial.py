@@ -0,0 +1,64 @@
+"""
+Agregación espacial de eventos en celdas (grilla cuadrada o hexagonal)
+- El tamaño de celda depende del zoom del mapa (PIXELES_POR_CELDA en pantalla)
+- Las celdas se calculan en SQL sobre latitud/longitud, no requiere PostGIS
+- Hexágonos: cada punto se asigna al centro más cercano entre dos grillas
+  rectangulares desplazadas (equivale a una grilla hexagonal "pointy-top")
+"""
+import math
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import func, case
+
+MODOS = ("grilla", "hex")
+
+# Tamaño aproximado de cada celda en pantalla
+PIXELES_POR_CELDA = 40
+
+_RAIZ_3 = math.sqrt(3)
+
+
+def tamano_celda(zoom: int) -> float:
+    """Ancho de celda en grados: PIXELES_POR_CELDA píxeles de una tesela de 256 px a ese zoom"""
+    return 360.0 * PIXELES_POR_CELDA / (256 * 2 ** zoom)
+
+
+def parsear_bbox(bbox: Optional[str]) -> Optional[tuple]:
+    """'min_lon,min_lat,max_lon,max_lat' -> tupla de floats (o None)"""
+    if not bbox:
+        return None
+    try:
+        valores = tuple(float(v) for v in bbox.split(","))
+    except ValueError:
+        valores = ()
+    if len(valores) != 4 or valores[0] >= valores[2] or valores[1] >= valores[3]:
+        raise HTTPException(status_code=400, detail="bbox debe ser 'min_lon,min_lat,max_lon,max_lat'")
+    return valores
+
+
+def expresiones_celda(modo: str, lon, lat, tamano: float) -> tuple:
+    """
+    Expresiones SQL (ix, iy) con el índice de celda de cada punto.
+    En modo hex los índices pares corresponden a una grilla y los impares a la otra.
+    """
+    if modo == "grilla":
+        return func.floor(lon / tamano), func.floor(lat / tamano)
+
+    ancho = tamano
+    alto = tamano * _RAIZ_3
+    ax, ay = func.round(lon / ancho), func.round(lat / alto)
+    bx, by = func.floor(lon / ancho), func.floor(lat / alto)
+    dist_a = func.power(lon - ax * ancho, 2) + func.power(lat - ay * alto, 2)
+    dist_b = func.power(lon - (bx + 0.5) * ancho, 2) + func.power(lat - (by + 0.5) * alto, 2)
+    en_a = dist_a <= dist_b
+    return (
+        case((en_a, ax * 2), else_=bx * 2 + 1),
+        case((en_a, ay * 2), else_=by * 2 + 1),
+    )
+
+
+def centro_celda(modo: str, ix: int, iy: int, tamano: float) -> tuple:
+    """Centro (lon, lat) de la celda"""
+    if modo == "grilla":
+        return (ix + 0.5) * tamano, (iy + 0.5) * tamano
+    return ix * tamano / 2, iy * tamano * _RAIZ_3 / 2
@@ -0,0 +1,127 @@
+"""
+Almacén columnar de predicciones (data/total_delitos_prediccion.csv)
+- Se carga una vez en arreglos NumPy ordenados por municipio
+- Índices: codigo_dane -> rango de filas y (codigo_dane, anio, mes) -> fila
+- Recarga atómica solo si cambian mtime/tamaño y además el hash del contenido
+"""
+import csv
+import hashlib
+import io
+import os
+from typing import Optional
+import numpy as np
+
+PREDICCIONES_CSV = os.path.join(os.path.dirname(__file__), "data", "total_delitos_prediccion.csv")
+
+
+class AlmacenPredicciones:
+    """
+    Columnas codigo_dane, anio, mes y total_delitos (redondeado a 2 decimales).
+    Las filas conservan el orden del CSV agrupadas por municipio (en orden de
+    primera aparición), que es el orden en que se listan en los endpoints.
+    """
+
+    def __init__(self, contenido: bytes = b"", huella: str = ""):
+        self.huella = huella
+        codigos, anios, meses, totales = [], [], [], []
+        if contenido:
+            reader = csv.DictReader(io.StringIO(contenido.decode("utf-8")))
+            for row in reader:
+                codigos.append(int(row["codigo_dane_5d"]))
+                anios.append(int(row["anio"]))
+                meses.append(int(row["mes"]))
+                totales.append(round(float(row["pred_total_delitos"]), 2))
+
+        codigo = np.array(codigos, dtype=np.int64)
+        # Orden estable por posición de primera aparición del municipio
+        _, primera, inversa = np.unique(codigo, return_index=True, return_inverse=True)
+        orden = np.argsort(primera[inversa], kind="stable")
+
+        self.codigo_dane = codigo[orden]
+        self.anio = np.array(anios, dtype=np.int64)[orden]
+        self.mes = np.array(meses, dtype=np.int64)[orden]
+        self.total_delitos = np.array(totales, dtype=np.float64)[orden]
+
+        self.rangos = {}
+        for i, c in enumerate(self.codigo_dane.tolist()):
+            inicio, _ = self.rangos.get(c, (i, i))
+            self.rangos[c] = (inicio, i + 1)
+        self.filas = {
+            (c, a, m): i
+            for i, (c, a, m) in enumerate(zip(
+                self.codigo_dane.tolist(), self.anio.tolist(), self.mes.tolist()
+            ))
+        }
+
+    def __len__(self) -> int:
+        return len(self.codigo_dane)
+
+    def __contains__(self, codigo_dane: int) -> bool:
+        return codigo_dane in self.rangos
+
+    def indices_municipio(self, codigo_dane: int) -> np.ndarray:
+        inicio, fin = self.rangos.get(codigo_dane, (0, 0))
+        return np.arange(inicio, fin)
+
+    def filtrar(self, anio: Optional[int] = None, mes: Optional[int] = None) -> np.ndarray:
+        """Índices de filas que cumplen los filtros (vectorizado)"""
+        mascara = np.ones(len(self), dtype=bool)
+        if anio:
+            mascara &= self.anio == anio
+        if mes:
+            mascara &= self.mes == mes
+        return np.flatnonzero(mascara)
+
+    def registros(self, indices) -> list:
+        """Filas como dicts {anio, mes, total_delitos, es_prediccion}"""
+        return [
+            {"anio": a, "mes": m, "total_delitos": t, "es_prediccion": True}
+            for a, m, t in zip(
+                self.anio[indices].tolist(),
+                self.mes[indices].tolist(),
+                self.total_delitos[indices].tolist(),
+            )
+        ]
+
+    def registros_municipio(self, codigo_dane: int) -> list:
+        return self.registros(self.indices_municipio(codigo_dane))
+
+    def columnas(self, indices) -> dict:
+        """Mismas filas que registros como {anio: [...], mes: [...], total_delitos: [...]}"""
+        return {
+            "anio": self.anio[indices].tolist(),
+            "mes": self.mes[indices].tolist(),
+            "total_delitos": self.total_delitos[indices].tolist(),
+        }
+
+
+_estado = {"almacen": AlmacenPredicciones(), "firma": None}
+
+
+def obtener_almacen(ruta: str = PREDICCIONES_CSV) -> AlmacenPredicciones:
+    """
+    Almacén vigente. Por petición solo se hace un stat() del archivo; si cambia
+    (mtime/tamaño) se relee y, si el hash difiere, se reemplaza el almacén completo.
+    Si el archivo no existe se usa un almacén vacío.
+    """
+    try:
+        stat = os.stat(ruta)
+        firma = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        firma = None
+
+    if firma == _estado["firma"]:
+        return _estado["almacen"]
+
+    if firma is None:
+        _estado.update(almacen=AlmacenPredicciones(), firma=None)
+        return _estado["almacen"]
+
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    huella = hashlib.blake2b(contenido, digest_size=16).hexdigest()
+    if huella != _estado["almacen"].huella:
+        # Se construye completo antes de publicarlo: las peticiones en curso siguen con el anterior
+        _estado["almacen"] = AlmacenPredicciones(contenido, huella)
+    _estado["firma"] = firma
+    return _estado["almacen"]
@@ -0,0 +1,111 @@
+"""
+Índice de bitmaps del motor columnar (app/motor_columnar.py)
+- Un bitmap por valor de cada dimensión categórica, codigo_dane y año, con los bits
+  empaquetados en palabras uint64: n/8 bytes por valor para n filas
+- Un filtro combinado (categoría & género & municipio & año) se resuelve con OR de los
+  valores de cada dimensión y AND entre dimensiones, empezando por la más selectiva y
+  terminando antes si el resultado queda vacío
+- Las dimensiones con más de MOTOR_BITMAP_MAX_VALORES valores no se indexan: se
+  filtran comparando sus códigos
+"""
+from typing import Optional
+import numpy as np
+
+
+def empaquetar(mascara: np.ndarray) -> np.ndarray:
+    """Máscara booleana -> palabras uint64 (la fila i es el bit i % 64 de la palabra i // 64)"""
+    octetos = np.packbits(mascara, bitorder="little")
+    relleno = -len(octetos) % 8
+    if relleno:
+        octetos = np.concatenate([octetos, np.zeros(relleno, dtype=np.uint8)])
+    return octetos.view(np.uint64)
+
+
+def desempaquetar(palabras: np.ndarray, filas: int) -> np.ndarray:
+    """Palabras uint64 -> máscara booleana de `filas` elementos"""
+    return np.unpackbits(palabras.view(np.uint8), count=filas, bitorder="little").view(bool)
+
+
+def contar(palabras: np.ndarray) -> int:
+    """Bits en 1 (filas seleccionadas)"""
+    return int(np.bitwise_count(palabras).sum())
+
+
+class IndiceBitmaps:
+    """
+    Bitmaps por (dimensión, código). Los códigos son los del motor: los del Diccionario
+    en las categóricas y el año mismo en "anio"; el código 0 (NULL) no se indexa porque
+    ningún filtro lo pide.
+    """
+
+    def __init__(self, columnas: dict, filas: int, max_valores: int):
+        """columnas: {dimensión: códigos por fila}"""
+        self.filas = filas
+        self.palabras = -(-filas // 64)
+        self.bitmaps = {}
+        self.cardinalidades = {}
+        self.omitidas = []
+        for dimension, codigos in columnas.items():
+            valores, conteos = np.unique(codigos, return_counts=True)
+            if int((valores != 0).sum()) > max_valores:
+                self.omitidas.append(dimension)
+                continue
+            self.bitmaps[dimension] = {}
+            self.cardinalidades[dimension] = {}
+            for codigo, conteo in zip(valores.tolist(), conteos.tolist()):
+                if codigo == 0:
+                    continue
+                self.bitmaps[dimension][codigo] = empaquetar(codigos == codigo)
+                self.cardinalidades[dimension][codigo] = conteo
+
+    def __contains__(self, dimension: str) -> bool:
+        return dimension in self.bitmaps
+
+    def _union(self, dimension: str, codigos: list) -> Optional[np.ndarray]:
+        """OR de los bitmaps de `codigos` (None si ninguno tiene filas)"""
+        presentes = [self.bitmaps[dimension][c] for c in codigos if c in self.bitmaps[dimension]]
+        if not presentes:
+            return None
+        if len(presentes) == 1:
+            return presentes[0]
+        return np.bitwise_or.reduce(presentes)
+
+    def seleccionar(self, condiciones: dict) -> np.ndarray:
+        """
+        Palabras de las filas que cumplen todas las condiciones {dimensión: [códigos]}
+        (IN dentro de cada dimensión). Sin condiciones selecciona todas las filas.
+        """
+        if not condiciones:
+            return empaquetar(np.ones(self.filas, dtype=bool))
+        # Más selectiva primero: si el resultado se vacía no se recorren las demás
+        orden = sorted(
+            condiciones.items(),
+            key=lambda c: sum(self.cardinalidades[c[0]].get(v, 0) for v in c[1])
+        )
+        resultado = None
+        for dimension, codigos in orden:
+            union = self._union(dimension, codigos)
+            if union is None:
+                return np.zeros(self.palabras, dtype=np.uint64)
+            resultado = union.copy() if resultado is None else np.bitwise_and(resultado, union, out=resultado)
+            if not resultado.any():
+                break
+        return resultado
+
+    @property
+    def bytes(self) -> int:
+        return sum(b.nbytes for valores in self.bitmaps.values() for b in valores.values())
+
+    def resumen(self) -> dict:
+        """Memoria por dimensión para /metricas/motor"""
+        return {
+            "bytes": self.bytes,
+            "dimensiones": {
+                dimension: {
+                    "valores": len(valores),
+                    "bytes": sum(b.nbytes for b in valores.values()),
+                }
+                for dimension, valores in self.bitmaps.items()
+            },
+            "omitidas": self.omitidas,
+        }
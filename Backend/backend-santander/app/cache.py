@@ -0,0 +1,353 @@
+"""
+Cache de respuestas para los endpoints agregados
+- Backend en memoria: LRU con límite en bytes y TTL por entrada
+- Backend compartido opcional: Redis (requiere el paquete `redis`)
+- Clave: ruta + parámetros normalizados + versión de datos (version_datos)
+- Middleware ASGI que sirve/guarda las respuestas GET de las rutas en CACHE_RUTAS
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from .config import settings
+from .database import engine, async_engine
+from .models import VersionDatos
+from .negociacion import variante
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras que no se guardan con la respuesta
+_CABECERAS_EXCLUIDAS = {b"set-cookie", b"x-cache", b"x-coalescida"}
+
+
+# ============================================
+# ESTADÍSTICAS
+# ============================================
+
+class EstadisticasCache:
+    """Contadores de aciertos, fallos y desalojos (por proceso)"""
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expiradas = 0
+        self.guardadas = 0
+        self.por_ruta = {}
+
+    def registrar(self, ruta: str, acierto: bool):
+        contador = self.por_ruta.setdefault(ruta, {"hits": 0, "misses": 0})
+        if acierto:
+            self.hits += 1
+            contador["hits"] += 1
+        else:
+            self.misses += 1
+            contador["misses"] += 1
+
+    def resumen(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total > 0 else 0,
+            "evictions": self.evictions,
+            "expiradas": self.expiradas,
+            "guardadas": self.guardadas,
+            "por_ruta": self.por_ruta,
+        }
+
+
+estadisticas = EstadisticasCache()
+
+
+# ============================================
+# BACKENDS
+# ============================================
+
+class CacheMemoria:
+    """
+    LRU en proceso. Cada entrada es (expira_en, tamaño, valor).
+    Desaloja las menos usadas cuando se supera max_bytes.
+    """
+    nombre = "memoria"
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entradas = OrderedDict()
+
+    async def obtener(self, clave: str):
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        expira_en, tamano, valor = entrada
+        if expira_en < time.monotonic():
+            self._eliminar(clave)
+            estadisticas.expiradas += 1
+            return None
+        self._entradas.move_to_end(clave)
+        return valor
+
+    async def guardar(self, clave: str, valor: dict, ttl: int):
+        tamano = len(clave) + len(valor["body"]) + sum(len(k) + len(v) for k, v in valor["headers"])
+        if tamano > self.max_bytes:
+            return
+        if clave in self._entradas:
+            self._eliminar(clave)
+        self._entradas[clave] = (time.monotonic() + ttl, tamano, valor)
+        self.bytes += tamano
+        while self.bytes > self.max_bytes:
+            antigua = next(iter(self._entradas))
+            self._eliminar(antigua)
+            estadisticas.evictions += 1
+
+    async def limpiar(self):
+        self.vaciar()
+
+    def vaciar(self):
+        self._entradas.clear()
+        self.bytes = 0
+
+    def _eliminar(self, clave: str):
+        _, tamano, _ = self._entradas.pop(clave)
+        self.bytes -= tamano
+
+    def resumen(self) -> dict:
+        return {
+            "backend": self.nombre,
+            "entradas": len(self._entradas),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class CacheRedis:
+    """
+    Backend compartido entre workers/instancias. El TTL lo aplica Redis;
+    los desalojos dependen de su maxmemory-policy (no se contabilizan aquí).
+    """
+    nombre = "redis"
+    prefijo = "atlas:cache:"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self.url = url
+        self._cliente = redis.from_url(url)
+
+    async def obtener(self, clave: str):
+        try:
+            datos = await self._cliente.get(self.prefijo + clave)
+        except Exception as e:
+            logger.warning(f"Cache Redis no disponible: {e}")
+            return None
+        if datos is None:
+            return None
+        meta, body = datos.split(b"\n", 1)
+        meta = json.loads(meta)
+        return {
+            "status": meta["status"],
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in meta["headers"]],
+            "body": body,
+        }
+
+    async def guardar(self, clave: str, valor: dict, ttl: int):
+        meta = json.dumps({
+            "status": valor["status"],
+            "headers": [(k.decode("latin-1"), v.decode("latin-1")) for k, v in valor["headers"]],
+        }).encode()
+        try:
+            await self._cliente.set(self.prefijo + clave, meta + b"\n" + valor["body"], ex=ttl)
+        except Exception as e:
+            logger.warning(f"Cache Redis no disponible: {e}")
+
+    async def limpiar(self):
+        async for clave in self._cliente.scan_iter(match=self.prefijo + "*"):
+            await self._cliente.delete(clave)
+
+    def resumen(self) -> dict:
+        return {"backend": self.nombre, "url": self.url}
+
+
+def crear_backend():
+    """Instancia el backend configurado; si Redis no está instalado usa memoria"""
+    if settings.CACHE_BACKEND == "redis":
+        try:
+            return CacheRedis(settings.CACHE_REDIS_URL)
+        except ImportError:
+            logger.warning("Paquete 'redis' no instalado: se usa el cache en memoria")
+    return CacheMemoria(settings.CACHE_MAX_BYTES)
+
+
+backend = crear_backend()
+
+
+# ============================================
+# VERSIÓN DE DATOS
+# ============================================
+
+_version = {"valor": 0, "verificado_en": 0.0}
+
+_CONSULTA_VERSION = text("SELECT version FROM version_datos WHERE nombre = 'global'")
+
+
+def _version_vigente(ahora: float) -> bool:
+    return ahora - _version["verificado_en"] < settings.CACHE_VERSION_SEGUNDOS
+
+
+def _actualizar_version(valor: int, ahora: float):
+    if valor != _version["valor"] and isinstance(backend, CacheMemoria):
+        # Las claves incluyen la versión; se libera la memoria de las anteriores
+        backend.vaciar()
+    _version["valor"] = valor
+    _version["verificado_en"] = ahora
+
+
+async def version_datos() -> int:
+    """
+    Versión actual de los datos (tabla version_datos), consultada como
+    máximo cada CACHE_VERSION_SEGUNDOS. Si la tabla no existe se usa 0
+    y las entradas caducan solo por TTL.
+    """
+    ahora = time.monotonic()
+    if _version_vigente(ahora):
+        return _version["valor"]
+
+    try:
+        async with async_engine.connect() as conn:
+            valor = (await conn.execute(_CONSULTA_VERSION)).scalar() or 0
+    except Exception:
+        valor = _version["valor"]
+
+    _actualizar_version(valor, ahora)
+    return valor
+
+
+def version_datos_sync() -> int:
+    """Variante síncrona de version_datos() para código con Session (chatbot)"""
+    ahora = time.monotonic()
+    if _version_vigente(ahora):
+        return _version["valor"]
+
+    try:
+        with engine.connect() as conn:
+            valor = conn.execute(_CONSULTA_VERSION).scalar() or 0
+    except Exception:
+        valor = _version["valor"]
+
+    _actualizar_version(valor, ahora)
+    return valor
+
+
+def incrementar_version_datos(conn: Connection) -> int:
+    """
+    Incrementa version_datos (llamar al final de cada carga o refresco).
+    Crea la tabla si no existe. Retorna la nueva versión.
+    """
+    VersionDatos.__table__.create(bind=conn, checkfirst=True)
+    return conn.execute(text("""
+        INSERT INTO version_datos (nombre, version, actualizado_en)
+        VALUES ('global', 1, :ahora)
+        ON CONFLICT (nombre) DO UPDATE
+        SET version = version_datos.version + 1,
+            actualizado_en = EXCLUDED.actualizado_en
+        RETURNING version
+    """), {"ahora": datetime.now()}).scalar()
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+def ttl_ruta(path: str):
+    """TTL configurado para la ruta (coincidencia exacta o prefijo de sección) o None"""
+    if not path.startswith(settings.API_PREFIX):
+        return None
+    ruta = path[len(settings.API_PREFIX):]
+    if ruta in settings.CACHE_RUTAS:
+        return settings.CACHE_RUTAS[ruta]
+    prefijos = [p for p in settings.CACHE_RUTAS if p.endswith("/") and ruta.startswith(p)]
+    if prefijos:
+        return settings.CACHE_RUTAS[max(prefijos, key=len)]
+    return None
+
+
+def normalizar_consulta(path: str, query_string: bytes) -> str:
+    """Ruta + parámetros ordenados (sin vacíos): dos peticiones equivalentes dan el mismo texto"""
+    parametros = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=False))
+    return f"{path}?{urlencode(parametros)}"
+
+
+def construir_clave(path: str, query_string: bytes, version: int, variante: str = "") -> str:
+    """Consulta normalizada + versión de datos (+ formato negociado por Accept, ver negociacion.py)"""
+    return f"v{version}:{normalizar_consulta(path, query_string)}{variante}"
+
+
+class CacheMiddleware:
+    """
+    Middleware ASGI: para GET en rutas con TTL responde desde el cache
+    (cabecera X-Cache: HIT) o ejecuta el endpoint y guarda la respuesta 200.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.CACHE_HABILITADO:
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        ttl = ttl_ruta(path)
+        if not ttl:
+            return await self.app(scope, receive, send)
+
+        clave = construir_clave(path, scope.get("query_string", b""), await version_datos(), variante(scope))
+        entrada = await backend.obtener(clave)
+        estadisticas.registrar(path, entrada is not None)
+
+        if entrada is not None:
+            await send({
+                "type": "http.response.start",
+                "status": entrada["status"],
+                "headers": entrada["headers"] + [(b"x-cache", b"HIT")],
+            })
+            await send({"type": "http.response.body", "body": entrada["body"]})
+            return
+
+        respuesta = {"status": None, "headers": [], "partes": []}
+
+        async def send_y_guardar(message):
+            if message["type"] == "http.response.start":
+                respuesta["status"] = message["status"]
+                respuesta["headers"] = [
+                    (k, v) for k, v in message.get("headers", []) if k.lower() not in _CABECERAS_EXCLUIDAS
+                ]
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-cache", b"MISS")]
+            elif message["type"] == "http.response.body":
+                respuesta["partes"].append(message.get("body", b""))
+                if not message.get("more_body", False) and respuesta["status"] == 200:
+                    await backend.guardar(clave, {
+                        "status": 200,
+                        "headers": respuesta["headers"],
+                        "body": b"".join(respuesta["partes"]),
+                    }, ttl)
+                    estadisticas.guardadas += 1
+            await send(message)
+
+        await self.app(scope, receive, send_y_guardar)
+
+
+def resumen_cache() -> dict:
+    """Estado del backend y contadores para /metricas/cache"""
+    return {
+        **backend.resumen(),
+        "version_datos": _version["valor"],
+        **estadisticas.resumen(),
+    }
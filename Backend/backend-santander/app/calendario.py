@@ -0,0 +1,206 @@
+"""
+Dimensión calendario dim_fecha
+- Claves enteras precalculadas por día (año, mes, trimestre, semana ISO, día de semana)
+- Festivos nacionales de Colombia (fijos, Ley Emiliani y los que dependen de Pascua)
+- Los endpoints agrupan por estas claves uniendo por fecha en lugar de evaluar EXTRACT por fila
+"""
+import time
+from datetime import date, timedelta
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from .config import settings
+from .database import engine, async_engine
+from .models import DimFecha
+
+# Festivos de fecha fija
+FESTIVOS_FIJOS = {
+    (1, 1): "Año Nuevo",
+    (5, 1): "Día del Trabajo",
+    (7, 20): "Día de la Independencia",
+    (8, 7): "Batalla de Boyacá",
+    (12, 8): "Inmaculada Concepción",
+    (12, 25): "Navidad",
+}
+
+# Festivos que se trasladan al lunes siguiente (Ley 51 de 1983)
+FESTIVOS_TRASLADABLES = {
+    (1, 6): "Reyes Magos",
+    (3, 19): "San José",
+    (6, 29): "San Pedro y San Pablo",
+    (8, 15): "Asunción de la Virgen",
+    (10, 12): "Día de la Raza",
+    (11, 1): "Todos los Santos",
+    (11, 11): "Independencia de Cartagena",
+}
+
+# Festivos relativos al domingo de Pascua (en días; los positivos ya caen en lunes)
+FESTIVOS_PASCUA = {
+    -3: "Jueves Santo",
+    -2: "Viernes Santo",
+    43: "Ascensión del Señor",
+    64: "Corpus Christi",
+    71: "Sagrado Corazón",
+}
+
+_estado = {"disponible": False, "verificado_en": 0.0}
+
+_CONSULTA_COBERTURA = text("""
+    SELECT (SELECT MIN(fecha) FROM dim_fecha) <= (SELECT MIN(fecha_hecho) FROM fact_seguridad)
+       AND (SELECT MAX(fecha) FROM dim_fecha) >= (SELECT MAX(fecha_hecho) FROM fact_seguridad)
+""")
+
+
+# ============================================
+# FESTIVOS
+# ============================================
+
+def domingo_pascua(anio: int) -> date:
+    """Domingo de Pascua (algoritmo de Meeus/Jones/Butcher, calendario gregoriano)"""
+    a = anio % 19
+    b, c = divmod(anio, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(anio, mes, dia + 1)
+
+
+def festivos_colombia(anio: int) -> dict:
+    """{fecha: nombre} de los festivos nacionales del año"""
+    festivos = {}
+
+    def agregar(fecha: date, nombre: str):
+        festivos[fecha] = f"{festivos[fecha]} / {nombre}" if fecha in festivos else nombre
+
+    for (mes, dia), nombre in FESTIVOS_FIJOS.items():
+        agregar(date(anio, mes, dia), nombre)
+    for (mes, dia), nombre in FESTIVOS_TRASLADABLES.items():
+        fecha = date(anio, mes, dia)
+        agregar(fecha + timedelta(days=(7 - fecha.weekday()) % 7), nombre)
+    pascua = domingo_pascua(anio)
+    for dias, nombre in FESTIVOS_PASCUA.items():
+        agregar(pascua + timedelta(days=dias), nombre)
+    return festivos
+
+
+# ============================================
+# CONSTRUCCIÓN (SÍNCRONO)
+# ============================================
+
+def filas_calendario(desde: date, hasta: date) -> list:
+    """Registros de dim_fecha para [desde, hasta]"""
+    festivos = {}
+    for anio in range(desde.year, hasta.year + 1):
+        festivos.update(festivos_colombia(anio))
+
+    filas = []
+    fecha = desde
+    while fecha <= hasta:
+        anio_iso, semana_iso, dia_iso = fecha.isocalendar()
+        filas.append({
+            "fecha": fecha,
+            "anio": fecha.year,
+            "mes": fecha.month,
+            "dia": fecha.day,
+            "trimestre": (fecha.month - 1) // 3 + 1,
+            "anio_iso": anio_iso,
+            "semana_iso": semana_iso,
+            "dia_semana": dia_iso % 7,
+            "es_fin_semana": dia_iso >= 6,
+            "es_festivo": fecha in festivos,
+            "nombre_festivo": festivos.get(fecha),
+        })
+        fecha += timedelta(days=1)
+    return filas
+
+
+def construir_dim_fecha(conn: Connection, desde: Optional[date] = None, hasta: Optional[date] = None) -> dict:
+    """
+    Crea dim_fecha si no existe y la completa (upsert) para el rango pedido.
+    Por defecto cubre desde el 1 de enero del primer año de fact_seguridad
+    hasta el 31 de diciembre del año siguiente al último.
+    """
+    DimFecha.__table__.create(bind=conn, checkfirst=True)
+
+    if desde is None or hasta is None:
+        minimo, maximo = conn.execute(
+            text("SELECT MIN(fecha_hecho), MAX(fecha_hecho) FROM fact_seguridad")
+        ).one()
+        if minimo is None:
+            return {"dias": 0}
+        desde = desde or date(minimo.year, 1, 1)
+        hasta = hasta or date(maximo.year + 1, 12, 31)
+
+    filas = filas_calendario(desde, hasta)
+    stmt = insert(DimFecha).values(filas)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[DimFecha.fecha],
+        set_={c: stmt.excluded[c] for c in filas[0] if c != "fecha"},
+    ))
+    invalidar_estado_calendario()
+    return {
+        "dias": len(filas),
+        "festivos": sum(1 for f in filas if f["es_festivo"]),
+        "desde": str(desde),
+        "hasta": str(hasta),
+    }
+
+
+# ============================================
+# DISPONIBILIDAD
+# ============================================
+
+def _vigente(ahora: float) -> bool:
+    return ahora - _estado["verificado_en"] < settings.CUBO_VERIFICACION_SEGUNDOS
+
+
+async def calendario_disponible(db=None) -> bool:
+    """
+    Indica si dim_fecha existe y cubre todo el rango de fact_seguridad en la base
+    que consulta `db`. Si no, se usa EXTRACT.
+    Las sesiones DuckDB (app/motor_duckdb.py) responden por su snapshot; en PostgreSQL
+    se verifica cada CUBO_VERIFICACION_SEGUNDOS.
+    """
+    en_sesion = getattr(db, "calendario", None)
+    if en_sesion is not None:
+        return en_sesion
+
+    ahora = time.monotonic()
+    if _vigente(ahora):
+        return _estado["disponible"]
+
+    try:
+        async with async_engine.connect() as conn:
+            disponible = bool((await conn.execute(_CONSULTA_COBERTURA)).scalar())
+    except Exception:
+        disponible = False
+
+    _estado.update(disponible=disponible, verificado_en=ahora)
+    return disponible
+
+
+def calendario_disponible_sync() -> bool:
+    """Variante síncrona de calendario_disponible() para código con Session (chatbot)"""
+    ahora = time.monotonic()
+    if _vigente(ahora):
+        return _estado["disponible"]
+
+    try:
+        with engine.connect() as conn:
+            disponible = bool(conn.execute(_CONSULTA_COBERTURA).scalar())
+    except Exception:
+        disponible = False
+
+    _estado.update(disponible=disponible, verificado_en=ahora)
+    return disponible
+
+
+def invalidar_estado_calendario():
+    """Fuerza la verificación de dim_fecha en la próxima consulta"""
+    _estado["verificado_en"] = 0.0
@@ -0,0 +1,152 @@
+"""
+Coalescencia de peticiones idénticas en vuelo (single-flight)
+- Clave: ruta + parámetros normalizados (la misma normalización del cache de respuestas)
+  + formato negociado por Accept
+- Mientras una petición GET se está ejecutando, las idénticas que llegan esperan su
+  respuesta en lugar de repetir la consulta; todas reciben el mismo status, cabeceras y cuerpo
+- Se aplica a las rutas con TTL en CACHE_RUTAS (endpoints de solo lectura). Va por dentro
+  del cache: cubre los misses simultáneos, p. ej. al expirar una entrada muy pedida
+- Por proceso: con varios workers cada uno ejecuta la consulta como máximo una vez
+"""
+import asyncio
+import time
+from .config import settings
+from .cache import ttl_ruta, normalizar_consulta
+from .negociacion import variante
+
+
+# ============================================
+# ESTADÍSTICAS
+# ============================================
+
+class EstadisticasCoalescencia:
+    """Peticiones ejecutadas y colapsadas (por proceso)"""
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.ejecutadas = 0
+        self.colapsadas = 0
+        self.reintentadas = 0
+        self.max_esperando = 0
+        self.por_ruta = {}
+
+    def registrar(self, ruta: str, colapsada: bool):
+        contador = self.por_ruta.setdefault(ruta, {"ejecutadas": 0, "colapsadas": 0})
+        if colapsada:
+            self.colapsadas += 1
+            contador["colapsadas"] += 1
+        else:
+            self.ejecutadas += 1
+            contador["ejecutadas"] += 1
+
+    def resumen(self) -> dict:
+        total = self.ejecutadas + self.colapsadas
+        return {
+            "ejecutadas": self.ejecutadas,
+            "colapsadas": self.colapsadas,
+            "ratio_colapsadas": round(self.colapsadas / total, 4) if total > 0 else 0,
+            "reintentadas": self.reintentadas,
+            "max_esperando": self.max_esperando,
+            "por_ruta": self.por_ruta,
+        }
+
+
+estadisticas = EstadisticasCoalescencia()
+
+
+# ============================================
+# PETICIONES EN VUELO
+# ============================================
+
+class EnVuelo:
+    """Ejecución en curso de una clave: las peticiones idénticas esperan su resultado"""
+
+    def __init__(self):
+        self.resultado = asyncio.get_running_loop().create_future()
+        self.esperando = 0
+        self.inicio = time.monotonic()
+
+
+_en_vuelo = {}
+
+
+def en_vuelo() -> dict:
+    """Claves en ejecución y cuántas peticiones esperan cada una"""
+    ahora = time.monotonic()
+    return {
+        clave: {"esperando": v.esperando, "segundos": round(ahora - v.inicio, 3)}
+        for clave, v in _en_vuelo.items()
+    }
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+class CoalescenciaMiddleware:
+    """
+    Middleware ASGI: la primera petición GET de una clave ejecuta el endpoint y guarda
+    la respuesta completa; las idénticas que llegan mientras tanto la reenvían
+    (cabecera X-Coalescida: 1). Si la primera falla o se cancela, las que esperaban
+    se ejecutan por su cuenta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http" or scope["method"] != "GET"
+            or not settings.COALESCENCIA_HABILITADA or not ttl_ruta(scope["path"])
+        ):
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        clave = normalizar_consulta(path, scope.get("query_string", b"")) + variante(scope)
+        vuelo = _en_vuelo.get(clave)
+
+        if vuelo is not None:
+            vuelo.esperando += 1
+            estadisticas.max_esperando = max(estadisticas.max_esperando, vuelo.esperando)
+            try:
+                mensajes = await asyncio.shield(vuelo.resultado)
+            finally:
+                vuelo.esperando -= 1
+            if mensajes is None:
+                estadisticas.reintentadas += 1
+                return await self.app(scope, receive, send)
+
+            estadisticas.registrar(path, colapsada=True)
+            inicio, *cuerpo = mensajes
+            await send({**inicio, "headers": list(inicio["headers"]) + [(b"x-coalescida", b"1")]})
+            for mensaje in cuerpo:
+                await send(mensaje)
+            return
+
+        vuelo = _en_vuelo[clave] = EnVuelo()
+        estadisticas.registrar(path, colapsada=False)
+        mensajes = []
+
+        async def send_y_registrar(message):
+            if message["type"] in ("http.response.start", "http.response.body"):
+                mensajes.append(message)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_y_registrar)
+        finally:
+            del _en_vuelo[clave]
+            completa = len(mensajes) > 1 and not mensajes[-1].get("more_body", False)
+            # None: las peticiones en espera se ejecutan por su cuenta
+            vuelo.resultado.set_result(mensajes if completa else None)
+
+
+def resumen_coalescencia() -> dict:
+    """Contadores y peticiones en vuelo para /metricas/coalescencia"""
+    return {
+        "habilitada": settings.COALESCENCIA_HABILITADA,
+        **estadisticas.resumen(),
+        "en_vuelo": en_vuelo(),
+    }
@@ -0,0 +1,228 @@
+"""
+Compresión de respuestas (brotli y gzip) negociada por Accept-Encoding
+- Va por fuera del cache de respuestas. En las rutas de CACHE_RUTAS la variante comprimida
+  se guarda en el mismo backend, con la clave de la respuesta (incluye version_datos) más
+  la codificación: cada respuesta se comprime una vez por versión de datos y las peticiones
+  siguientes reciben los bytes ya comprimidos
+- En el resto de rutas (p. ej. POST /batch) se comprime cada respuesta
+- Solo respuestas 200 sin Content-Encoding, de los tipos de COMPRESION_TIPOS y de al menos
+  COMPRESION_MIN_BYTES; el cuerpo se acumula completo antes de comprimirlo
+- brotli requiere el paquete `brotli`; sin él se negocia solo gzip
+"""
+import asyncio
+import gzip
+import time
+from typing import Optional
+from .config import settings
+from .cache import backend, construir_clave, estadisticas as estadisticas_cache, ttl_ruta, version_datos, _CABECERAS_EXCLUIDAS
+from .negociacion import variante
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Tamaño sin comprimir, guardado con la variante comprimida (no se envía al cliente)
+_CABECERA_ORIGINAL = b"x-tamano-original"
+
+
+# ============================================
+# ESTADÍSTICAS
+# ============================================
+
+class EstadisticasCompresion:
+    """Respuestas comprimidas y bytes ahorrados por codificación (por proceso)"""
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.compresiones = 0
+        self.segundos = 0.0
+        self.desde_cache = 0
+        self.omitidas_tamano = 0
+        self.por_codificacion = {}
+
+    def registrar(self, codificacion: str, original: int, enviado: int):
+        contador = self.por_codificacion.setdefault(
+            codificacion, {"respuestas": 0, "bytes_originales": 0, "bytes_enviados": 0}
+        )
+        contador["respuestas"] += 1
+        contador["bytes_originales"] += original
+        contador["bytes_enviados"] += enviado
+
+    def resumen(self) -> dict:
+        originales = sum(c["bytes_originales"] for c in self.por_codificacion.values())
+        enviados = sum(c["bytes_enviados"] for c in self.por_codificacion.values())
+        return {
+            "respuestas": sum(c["respuestas"] for c in self.por_codificacion.values()),
+            "compresiones": self.compresiones,
+            "desde_cache": self.desde_cache,
+            "omitidas_por_tamano": self.omitidas_tamano,
+            "segundos_comprimiendo": round(self.segundos, 3),
+            "bytes_originales": originales,
+            "bytes_enviados": enviados,
+            "bytes_ahorrados": originales - enviados,
+            "ratio": round(enviados / originales, 4) if originales else None,
+            "por_codificacion": self.por_codificacion,
+        }
+
+
+estadisticas = EstadisticasCompresion()
+
+
+# ============================================
+# NEGOCIACIÓN
+# ============================================
+
+def codificaciones() -> tuple:
+    """Codificaciones disponibles, en orden de preferencia a igual q"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def codificacion_aceptada(accept_encoding: Optional[str]) -> Optional[str]:
+    """Codificación a usar según Accept-Encoding (mayor q), o None para enviar sin comprimir"""
+    if not accept_encoding:
+        return None
+    disponibles = codificaciones()
+    calidades = {}
+    for parte in accept_encoding.split(","):
+        nombre, *parametros = [p.strip() for p in parte.split(";")]
+        q = 1.0
+        for parametro in parametros:
+            if parametro.startswith("q="):
+                try:
+                    q = float(parametro[2:])
+                except ValueError:
+                    q = 0.0
+        calidades[nombre.lower()] = q
+    comodin = calidades.get("*", 0.0)
+    mejor = max(disponibles, key=lambda c: calidades.get(c, comodin))
+    return mejor if calidades.get(mejor, comodin) > 0 else None
+
+
+def comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    if codificacion == "br":
+        return brotli.compress(cuerpo, quality=settings.COMPRESION_NIVEL_BROTLI)
+    return gzip.compress(cuerpo, compresslevel=settings.COMPRESION_NIVEL_GZIP, mtime=0)
+
+
+def _cabecera(cabeceras, nombre: bytes) -> Optional[bytes]:
+    for k, v in cabeceras:
+        if k.lower() == nombre:
+            return v
+    return None
+
+
+def _comprimible(cabeceras) -> bool:
+    if _cabecera(cabeceras, b"content-encoding") is not None:
+        return False
+    tipo = (_cabecera(cabeceras, b"content-type") or b"").decode("latin-1").split(";")[0].strip()
+    return any(tipo.startswith(t) for t in settings.COMPRESION_TIPOS)
+
+
+def _cabeceras_comprimidas(cabeceras, codificacion: str, tamano: int) -> list:
+    """Cabeceras de la respuesta con Content-Encoding, Content-Length nuevo y Vary ampliado"""
+    vary = [v for k, v in cabeceras if k.lower() == b"vary"]
+    resto = [(k, v) for k, v in cabeceras if k.lower() not in (b"content-length", b"vary")]
+    return resto + [
+        (b"content-encoding", codificacion.encode()),
+        (b"content-length", str(tamano).encode()),
+        (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+    ]
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI: responde con la variante comprimida cacheada (X-Cache: HIT) o
+    comprime la respuesta del endpoint/cache y la guarda para las siguientes
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESION_HABILITADA:
+            return await self.app(scope, receive, send)
+        accept_encoding = _cabecera(scope.get("headers", []), b"accept-encoding")
+        codificacion = codificacion_aceptada(accept_encoding.decode("latin-1") if accept_encoding else None)
+        if codificacion is None:
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        ttl = ttl_ruta(path) if scope["method"] == "GET" and settings.CACHE_HABILITADO else None
+        clave = None
+        if ttl:
+            clave = construir_clave(
+                path, scope.get("query_string", b""), await version_datos(), variante(scope)
+            ) + f"|{codificacion}"
+            entrada = await backend.obtener(clave)
+            if entrada is not None:
+                estadisticas_cache.registrar(path, True)
+                estadisticas.desde_cache += 1
+                original = int(_cabecera(entrada["headers"], _CABECERA_ORIGINAL) or len(entrada["body"]))
+                estadisticas.registrar(codificacion, original, len(entrada["body"]))
+                cabeceras = [(k, v) for k, v in entrada["headers"] if k != _CABECERA_ORIGINAL]
+                await send({
+                    "type": "http.response.start",
+                    "status": entrada["status"],
+                    "headers": cabeceras + [(b"x-cache", b"HIT")],
+                })
+                await send({"type": "http.response.body", "body": entrada["body"]})
+                return
+
+        respuesta = {"inicio": None, "partes": []}
+
+        async def send_y_comprimir(message):
+            if message["type"] == "http.response.start":
+                if message["status"] == 200 and _comprimible(message.get("headers", [])):
+                    # Se envía al terminar el cuerpo, con las cabeceras de la versión comprimida
+                    respuesta["inicio"] = message
+                    return
+            elif message["type"] == "http.response.body" and respuesta["inicio"] is not None:
+                respuesta["partes"].append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                await self._enviar(send, respuesta["inicio"], b"".join(respuesta["partes"]), codificacion, clave, ttl)
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_y_comprimir)
+
+    async def _enviar(self, send, inicio: dict, cuerpo: bytes, codificacion: str, clave: Optional[str], ttl):
+        if len(cuerpo) < settings.COMPRESION_MIN_BYTES:
+            estadisticas.omitidas_tamano += 1
+            await send(inicio)
+            await send({"type": "http.response.body", "body": cuerpo})
+            return
+
+        t0 = time.perf_counter()
+        comprimido = await asyncio.to_thread(comprimir, cuerpo, codificacion)
+        estadisticas.compresiones += 1
+        estadisticas.segundos += time.perf_counter() - t0
+        estadisticas.registrar(codificacion, len(cuerpo), len(comprimido))
+
+        cabeceras = _cabeceras_comprimidas(inicio.get("headers", []), codificacion, len(comprimido))
+        if clave is not None:
+            await backend.guardar(clave, {
+                "status": 200,
+                "headers": [(k, v) for k, v in cabeceras if k.lower() not in _CABECERAS_EXCLUIDAS]
+                + [(_CABECERA_ORIGINAL, str(len(cuerpo)).encode())],
+                "body": comprimido,
+            }, ttl)
+        await send({**inicio, "headers": cabeceras})
+        await send({"type": "http.response.body", "body": comprimido})
+
+
+def resumen_compresion() -> dict:
+    """Estado y contadores para /metricas/compresion"""
+    return {
+        "habilitada": settings.COMPRESION_HABILITADA,
+        "codificaciones": list(codificaciones()),
+        "min_bytes": settings.COMPRESION_MIN_BYTES,
+        **estadisticas.resumen(),
+    }
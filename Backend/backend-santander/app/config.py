@@ -26,6 +26,7 @@ class Settings(BaseSettings):
     
     # Base de datos
     DB_DRIVER: str = "postgresql+psycopg2"
+    DB_ASYNC_DRIVER: str = "postgresql+asyncpg"
     DB_HOST: str = "localhost"
     DB_PORT: int = 5432
     DB_NAME: str = "santander"
@@ -40,10 +41,80 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: list = ["*"]
     
+    # Cubo diario pre-agregado (agg_seguridad_diaria)
+    CUBO_HABILITADO: bool = True
+    CUBO_VERIFICACION_SEGUNDOS: int = 60
+    
+    # Motor de las consultas analíticas:
+    # "postgres", "columnar" (arreglos NumPy en memoria por proceso, app/motor_columnar.py:
+    # temporal, víctimas, dashboard y chatbot) o "duckdb" (DuckDB sobre los snapshots Parquet,
+    # app/motor_duckdb.py: temporal, víctimas, clima y filtros)
+    MOTOR_CONSULTAS: str = "postgres"
+    DUCKDB_HILOS: int = 4
+    # Tras una carga fallida del motor (columnar o DuckDB) no se reintenta con la misma
+    # version_datos hasta pasados estos segundos; mientras tanto se consulta PostgreSQL
+    MOTOR_REINTENTO_SEGUNDOS: int = 60
+    # Índice de bitmaps por valor de las dimensiones del motor columnar (app/bitmaps.py);
+    # las dimensiones con más valores que el máximo se filtran por comparación
+    MOTOR_BITMAPS: bool = True
+    MOTOR_BITMAP_MAX_VALORES: int = 256
+    
+    # Snapshots Parquet/Arrow de las tablas base (app/snapshots.py, requiere pyarrow).
+    # Al arrancar se abren con memory-map los de la versión vigente de los datos
+    SNAPSHOTS_HABILITADOS: bool = True
+    SNAPSHOTS_DIR: str = os.path.join(os.path.dirname(__file__), "data", "snapshots")
+    SNAPSHOTS_CONSERVAR: int = 2  # Versiones que deja scripts/exportar_snapshots
+    
+    # Cache de respuestas GET (app/cache.py)
+    CACHE_HABILITADO: bool = True
+    CACHE_BACKEND: str = "memoria"  # "memoria" (LRU por proceso) o "redis" (compartido)
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_VERSION_SEGUNDOS: int = 30  # Cada cuánto se consulta version_datos
+    # TTL (segundos) por ruta relativa a API_PREFIX. Solo se cachean las rutas listadas;
+    # una clave terminada en "/" cubre todos los endpoints de la sección.
+    CACHE_RUTAS: dict = {
+        "/geografia/": 3600,
+        "/temporal/": 3600,
+        "/victimas/": 3600,
+        "/clima/": 3600,
+        "/filtros/": 3600,
+        "/predicciones/": 600,
+        "/tiles/": 3600,
+        "/dashboard/": 3600,
+    }
+    
+    # Compresión de respuestas por Accept-Encoding (app/compresion.py, brotli requiere el paquete).
+    # En las rutas de CACHE_RUTAS la variante comprimida se guarda en el cache de respuestas
+    COMPRESION_HABILITADA: bool = True
+    COMPRESION_MIN_BYTES: int = 1024
+    COMPRESION_NIVEL_GZIP: int = 6
+    COMPRESION_NIVEL_BROTLI: int = 5
+    COMPRESION_TIPOS: tuple = (
+        "application/json", "application/geo+json", "text/", "application/msgpack",
+        "application/vnd.apache.arrow.stream", "application/vnd.mapbox-vector-tile",
+    )
+    
+    # Coalescencia de peticiones GET idénticas en vuelo (app/coalescencia.py), rutas de CACHE_RUTAS
+    COALESCENCIA_HABILITADA: bool = True
+    
+    # POST /batch: entradas por petición y cuántas se ejecutan a la vez (por debajo de pool_size)
+    BATCH_MAX_ENTRADAS: int = 20
+    BATCH_CONCURRENCIA: int = 8
+    
+    # Teselas vectoriales (/tiles), capa "puntos": por debajo de TILES_ZOOM_PUNTOS celdas hexagonales
+    # agregadas; desde ese zoom eventos individuales, máximo TILES_MAX_PUNTOS por tesela
+    TILES_ZOOM_PUNTOS: int = 13
+    TILES_MAX_PUNTOS: int = 50000
+    
     @property
     def DATABASE_URL(self) -> str:
         return f"{self.DB_DRIVER}://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
     
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"{self.DB_ASYNC_DRIVER}://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+    
     class Config:
         env_file = ".env"
 
@@ -52,14 +123,18 @@ def get_settings() -> Settings:
     """Obtiene la configuración, priorizando el archivo YAML"""
     yaml_config = load_yaml_config()
     db_config = yaml_config.get("database", {})
+    cache_config = yaml_config.get("cache", {})
     
     return Settings(
         DB_DRIVER=db_config.get("driver", "postgresql+psycopg2"),
+        DB_ASYNC_DRIVER=db_config.get("async_driver", "postgresql+asyncpg"),
         DB_HOST=db_config.get("host", "localhost"),
         DB_PORT=db_config.get("port", 5432),
         DB_NAME=db_config.get("db_name", "santander"),
         DB_USER=db_config.get("user", "admin-santander"),
         DB_PASSWORD=db_config.get("password", "admin-gob"),
+        CACHE_BACKEND=cache_config.get("backend", "memoria"),
+        CACHE_REDIS_URL=cache_config.get("redis_url", "redis://localhost:6379/0"),
     )
 
 
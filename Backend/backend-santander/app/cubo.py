@@ -0,0 +1,185 @@
+"""
+Cubo diario pre-agregado de fact_seguridad (agg_seguridad_diaria)
+- Construcción completa e incremental (usada por scripts/refrescar_cubo.py)
+- Enrutamiento transparente: los endpoints piden sus columnas y reciben la tabla a consultar
+"""
+import time
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from .config import settings
+from .database import async_engine
+from .models import FactSeguridad, AggSeguridadDiaria, AggEstado
+
+TABLA_CUBO = AggSeguridadDiaria.__tablename__
+
+# Columnas de fact_seguridad que el cubo conserva (la fecha se guarda como "fecha")
+DIMENSIONES_CUBO = (
+    "codigo_dane",
+    "fecha_hecho",
+    "categoria_delito",
+    "genero",
+    "grupo_etario",
+    "zona_hecho",
+    "arma_medio",
+    "clase_sitio",
+    "modalidad_especifica",
+)
+
+# Medidas agregadas disponibles en el cubo
+MEDIDAS_CUBO = ("cantidad",)
+
+_COLUMNAS_DESTINO = ", ".join(
+    "fecha" if d == "fecha_hecho" else d for d in DIMENSIONES_CUBO
+)
+_COLUMNAS_ORIGEN = ", ".join(DIMENSIONES_CUBO)
+
+# Estado de disponibilidad (se verifica cada CUBO_VERIFICACION_SEGUNDOS)
+_estado = {"disponible": False, "verificado_en": 0.0}
+
+
+# ============================================
+# ENRUTAMIENTO DE CONSULTAS
+# ============================================
+
+async def cubo_disponible() -> bool:
+    """
+    Indica si el cubo está construido y al día con fact_seguridad.
+    Compara la marca de agua con MAX(id_evento) (lectura del índice de la PK).
+    """
+    if not settings.CUBO_HABILITADO:
+        return False
+
+    ahora = time.monotonic()
+    if ahora - _estado["verificado_en"] < settings.CUBO_VERIFICACION_SEGUNDOS:
+        return _estado["disponible"]
+
+    try:
+        async with async_engine.connect() as conn:
+            marca = (await conn.execute(
+                text("SELECT ultimo_id_evento FROM agg_estado WHERE tabla = :tabla"),
+                {"tabla": TABLA_CUBO}
+            )).scalar()
+            maximo = (await conn.execute(
+                text("SELECT COALESCE(MAX(id_evento), 0) FROM fact_seguridad")
+            )).scalar()
+        disponible = marca is not None and marca >= maximo
+    except Exception:
+        # Tabla inexistente o error de conexión: se usa fact_seguridad
+        disponible = False
+
+    _estado["disponible"] = disponible
+    _estado["verificado_en"] = ahora
+    return disponible
+
+
+async def fuente_seguridad(*columnas: str):
+    """
+    Retorna el modelo desde el que servir una agregación SUM(cantidad).
+    Usa AggSeguridadDiaria si cubre todas las columnas pedidas y está al día;
+    en otro caso FactSeguridad. Ambos exponen los mismos atributos.
+    """
+    cubiertas = all(c in DIMENSIONES_CUBO or c in MEDIDAS_CUBO for c in columnas)
+    if cubiertas and await cubo_disponible():
+        return AggSeguridadDiaria
+    return FactSeguridad
+
+
+def invalidar_estado_cubo():
+    """Fuerza la verificación del cubo en la próxima consulta"""
+    _estado["verificado_en"] = 0.0
+
+
+# ============================================
+# CONSTRUCCIÓN Y REFRESCO (SÍNCRONO)
+# ============================================
+
+def _guardar_marca(conn: Connection, ultimo_id: int):
+    conn.execute(text("""
+        INSERT INTO agg_estado (tabla, ultimo_id_evento, actualizado_en)
+        VALUES (:tabla, :ultimo_id, :ahora)
+        ON CONFLICT (tabla) DO UPDATE
+        SET ultimo_id_evento = EXCLUDED.ultimo_id_evento,
+            actualizado_en = EXCLUDED.actualizado_en
+    """), {"tabla": TABLA_CUBO, "ultimo_id": ultimo_id, "ahora": datetime.now()})
+
+
+def construir_cubo(conn: Connection) -> dict:
+    """
+    Reconstruye el cubo completo desde fact_seguridad.
+    Necesario tras borrados o actualizaciones de filas existentes.
+    """
+    ultimo_id = conn.execute(text("SELECT COALESCE(MAX(id_evento), 0) FROM fact_seguridad")).scalar()
+
+    conn.execute(text(f"TRUNCATE {TABLA_CUBO}"))
+    insertadas = conn.execute(text(f"""
+        INSERT INTO {TABLA_CUBO} ({_COLUMNAS_DESTINO}, cantidad, eventos)
+        SELECT {_COLUMNAS_ORIGEN}, SUM(cantidad), COUNT(*)
+        FROM fact_seguridad
+        WHERE id_evento <= :ultimo_id
+        GROUP BY {_COLUMNAS_ORIGEN}
+    """), {"ultimo_id": ultimo_id}).rowcount
+
+    _guardar_marca(conn, ultimo_id)
+    return {"modo": "completo", "filas_cubo": insertadas, "ultimo_id_evento": ultimo_id}
+
+
+def refrescar_cubo(conn: Connection) -> dict:
+    """
+    Refresco incremental: recalcula solo los días que recibieron eventos
+    nuevos (id_evento mayor a la marca de agua). Si no hay marca, construye completo.
+    """
+    marca = conn.execute(
+        text("SELECT ultimo_id_evento FROM agg_estado WHERE tabla = :tabla"),
+        {"tabla": TABLA_CUBO}
+    ).scalar()
+    if marca is None:
+        return construir_cubo(conn)
+
+    ultimo_id = conn.execute(text("SELECT COALESCE(MAX(id_evento), 0) FROM fact_seguridad")).scalar()
+    if ultimo_id <= marca:
+        return {"modo": "incremental", "dias_recalculados": 0, "ultimo_id_evento": marca}
+
+    # Días afectados por los eventos nuevos (incluye fecha NULL como un "día" más)
+    conn.execute(text("""
+        CREATE TEMP TABLE cubo_dias_afectados ON COMMIT DROP AS
+        SELECT DISTINCT fecha_hecho AS fecha
+        FROM fact_seguridad
+        WHERE id_evento > :marca AND id_evento <= :ultimo_id
+    """), {"marca": marca, "ultimo_id": ultimo_id})
+    dias = conn.execute(text("SELECT COUNT(*) FROM cubo_dias_afectados")).scalar()
+
+    conn.execute(text(f"""
+        DELETE FROM {TABLA_CUBO}
+        WHERE fecha IN (SELECT fecha FROM cubo_dias_afectados)
+           OR (fecha IS NULL AND EXISTS (SELECT 1 FROM cubo_dias_afectados WHERE fecha IS NULL))
+    """))
+    insertadas = conn.execute(text(f"""
+        INSERT INTO {TABLA_CUBO} ({_COLUMNAS_DESTINO}, cantidad, eventos)
+        SELECT {_COLUMNAS_ORIGEN}, SUM(cantidad), COUNT(*)
+        FROM (
+            SELECT * FROM fact_seguridad
+            WHERE fecha_hecho IN (SELECT fecha FROM cubo_dias_afectados)
+              AND id_evento <= :ultimo_id
+            UNION ALL
+            SELECT * FROM fact_seguridad
+            WHERE fecha_hecho IS NULL
+              AND id_evento <= :ultimo_id
+              AND EXISTS (SELECT 1 FROM cubo_dias_afectados WHERE fecha IS NULL)
+        ) fs
+        GROUP BY {_COLUMNAS_ORIGEN}
+    """), {"ultimo_id": ultimo_id}).rowcount
+
+    _guardar_marca(conn, ultimo_id)
+    return {
+        "modo": "incremental",
+        "dias_recalculados": dias,
+        "filas_insertadas": insertadas,
+        "ultimo_id_evento": ultimo_id,
+    }
+
+
+def crear_tablas_cubo(conn: Connection):
+    """Crea agg_seguridad_diaria y agg_estado si no existen"""
+    AggSeguridadDiaria.__table__.create(bind=conn, checkfirst=True)
+    AggEstado.__table__.create(bind=conn, checkfirst=True)
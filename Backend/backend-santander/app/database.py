@@ -3,6 +3,7 @@ Configuración de la conexión a la base de datos PostgreSQL/PostGIS
 """
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from .config import settings
 
 # Motor de base de datos
@@ -17,6 +18,22 @@ engine = create_engine(
 # Sesión de base de datos
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono (asyncpg) para los routers async: no bloquea el event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20,
+    echo=False
+)
+
+# Sesión asíncrona de base de datos
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base para modelos
 Base = declarative_base()
 
@@ -28,3 +45,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency para obtener sesión asíncrona de base de datos"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,104 @@
+"""
+Geometrías simplificadas de master_municipios por nivel de zoom
+- ST_SimplifyPreserveTopology a varias tolerancias, calculadas una vez por versión de datos
+- Se guardan como bytes GeoJSON (UTF-8) y se insertan tal cual en la respuesta (sin json.loads)
+- El FeatureCollection se envía por partes con StreamingResponse: solo se serializan las
+  propiedades de cada municipio; la geometría no se decodifica ni se vuelve a codificar
+"""
+import json
+from typing import Iterator, Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from .cache import version_datos
+from .database import async_engine
+
+# (zoom máximo, tolerancia en grados). Aproximadamente el tamaño de un píxel
+# en Web Mercator a ese zoom: 360 / (256 * 2^z). Por encima del último: geometría original.
+TOLERANCIAS_POR_ZOOM = (
+    (6, 0.01),
+    (8, 0.0025),
+    (10, 0.0006),
+    (12, 0.00015),
+)
+
+NIVELES = tuple(t for _, t in TOLERANCIAS_POR_ZOOM) + (0.0,)
+
+# Decimales de las coordenadas: 6 (~0.1 m) basta para cualquier zoom de mapa
+DECIMALES_GEOJSON = 6
+
+# Tamaño aproximado de cada parte del cuerpo de la respuesta en streaming
+BYTES_POR_PARTE = 64 * 1024
+
+_estado = {"version": None, "geometrias": {}}
+
+
+def tolerancia_para(zoom: Optional[int] = None, tolerancia: Optional[float] = None) -> float:
+    """
+    Nivel de simplificación a usar. `tolerancia` explícita se ajusta al nivel
+    precalculado más cercano; sin parámetros se usa la geometría original.
+    """
+    if tolerancia is not None:
+        return min(NIVELES, key=lambda n: abs(n - tolerancia))
+    if zoom is not None:
+        for zoom_max, nivel in TOLERANCIAS_POR_ZOOM:
+            if zoom <= zoom_max:
+                return nivel
+    return 0.0
+
+
+async def geometrias_municipios(tolerancia: float) -> dict:
+    """
+    {codigo_dane: geojson (bytes UTF-8)} para el nivel pedido. Cada nivel se
+    consulta una sola vez y se invalida al cambiar version_datos.
+    """
+    version = await version_datos()
+    if _estado["version"] != version:
+        _estado["version"] = version
+        _estado["geometrias"] = {}
+
+    geometrias = _estado["geometrias"].get(tolerancia)
+    if geometrias is None:
+        if tolerancia > 0:
+            geom = "ST_SimplifyPreserveTopology(geom, :tolerancia)"
+        else:
+            geom = "geom"
+        query = text(f"""
+            SELECT codigo_dane, ST_AsGeoJSON({geom}, {DECIMALES_GEOJSON}) AS geojson
+            FROM master_municipios
+        """)
+        async with async_engine.connect() as conn:
+            filas = (await conn.execute(query, {"tolerancia": tolerancia})).all()
+        geometrias = {r.codigo_dane: r.geojson.encode() for r in filas if r.geojson}
+        _estado["geometrias"][tolerancia] = geometrias
+    return geometrias
+
+
+def _json(valor) -> bytes:
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def partes_feature_collection(propiedades: list, geometrias: dict, **extra) -> Iterator[bytes]:
+    """
+    Cuerpo del FeatureCollection en partes de ~BYTES_POR_PARTE: las propiedades
+    serializadas con el GeoJSON cacheado de cada municipio (clave codigo_dane en cada dict)
+    """
+    buffer = [b'{"type":"FeatureCollection","features":[']
+    tamano = len(buffer[0])
+    for i, props in enumerate(propiedades):
+        geom = geometrias.get(props["codigo_dane"], b"null")
+        feature = (b"," if i else b"", b'{"type":"Feature","properties":', _json(props), b',"geometry":', geom, b"}")
+        buffer.extend(feature)
+        tamano += sum(len(p) for p in feature)
+        if tamano >= BYTES_POR_PARTE:
+            yield b"".join(buffer)
+            buffer, tamano = [], 0
+    buffer.append(b"]")
+    for clave, valor in extra.items():
+        buffer.extend((b',"', clave.encode(), b'":', _json(valor)))
+    buffer.append(b"}")
+    yield b"".join(buffer)
+
+
+def respuesta_feature_collection(propiedades: list, geometrias: dict, **extra) -> StreamingResponse:
+    """FeatureCollection en streaming (ver partes_feature_collection)"""
+    return StreamingResponse(partes_feature_collection(propiedades, geometrias, **extra), media_type="application/json")
@@ -0,0 +1,188 @@
+"""
+Índices de las tablas de hechos ajustados a las consultas de los routers
+- Compuestos B-tree para los filtros combinados (municipio + categoría + fecha)
+- De expresión para UPPER(categoria_delito) (víctimas, teselas, chatbot)
+- Parciales para mapa-puntos (solo eventos con coordenadas)
+- BRIN para rangos amplios de fecha en tablas cargadas en orden cronológico
+- GiST sobre geom (requiere PostGIS)
+Se crean con CREATE INDEX CONCURRENTLY desde scripts/migrar_indices.py. En tablas
+particionadas el índice se crea vacío en la tabla padre (ON ONLY), luego en cada
+partición con CONCURRENTLY y se adjunta.
+"""
+import json
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from .particiones import tabla_base, particiones_leidas
+
+# Tablas en las que un Seq Scan se considera una regresión
+TABLAS_GRANDES = ("fact_seguridad", "fact_clima", "agg_seguridad_diaria")
+
+# (nombre, tabla, definición a partir de USING, consultas que lo aprovechan)
+INDICES = (
+    ("ix_fact_seguridad_dane_cat_fecha", "fact_seguridad",
+     "USING btree (codigo_dane, categoria_delito, fecha_hecho)",
+     "temporal/geografía con municipio, categoría y año"),
+    ("ix_fact_seguridad_dane_fecha", "fact_seguridad",
+     "USING btree (codigo_dane, fecha_hecho)",
+     "chatbot por municipio y periodo, alertas de predicciones, clima"),
+    ("ix_fact_seguridad_ucat_fecha", "fact_seguridad",
+     "USING btree (upper(categoria_delito), fecha_hecho)",
+     "víctimas, mapa-puntos, teselas y chatbot (UPPER(categoria_delito) = ...)"),
+    ("ix_fact_seguridad_coords_fecha", "fact_seguridad",
+     "USING btree (fecha_hecho) WHERE latitud IS NOT NULL AND longitud IS NOT NULL",
+     "mapa-puntos (solo eventos georreferenciados)"),
+    ("ix_fact_seguridad_fecha_brin", "fact_seguridad",
+     "USING brin (fecha_hecho) WITH (pages_per_range = 32)",
+     "rangos de uno o más años completos"),
+    ("ix_fact_seguridad_geom", "fact_seguridad",
+     "USING gist (geom)",
+     "teselas de puntos (geom && envolvente)"),
+    ("ix_agg_seguridad_diaria_ucat_fecha", "agg_seguridad_diaria",
+     "USING btree (upper(categoria_delito), fecha)",
+     "víctimas servidas desde el cubo"),
+    ("ix_fact_clima_dane_fecha", "fact_clima",
+     "USING btree (codigo_dane, fecha)",
+     "clima por municipio y año"),
+    ("ix_fact_clima_fecha_brin", "fact_clima",
+     "USING brin (fecha) WITH (pages_per_range = 32)",
+     "clima de todos los municipios por año"),
+    ("ix_master_municipios_geom", "master_municipios",
+     "USING gist (geom)",
+     "teselas de municipios"),
+)
+
+# Índices equivalentes: mismo método, columnas, expresiones y predicado
+_CONSULTA_EQUIVALENTE = text("""
+    SELECT otro.relname
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_index j ON j.indrelid = i.indrelid AND j.indexrelid <> i.indexrelid
+    JOIN pg_class otro ON otro.oid = j.indexrelid
+    WHERE c.relname = :nombre
+      AND j.indisvalid
+      AND otro.relam = c.relam
+      AND j.indkey::text = i.indkey::text
+      AND j.indclass::text = i.indclass::text
+      AND COALESCE(pg_get_expr(j.indexprs, j.indrelid), '') = COALESCE(pg_get_expr(i.indexprs, i.indrelid), '')
+      AND COALESCE(pg_get_expr(j.indpred, j.indrelid), '') = COALESCE(pg_get_expr(i.indpred, i.indrelid), '')
+    LIMIT 1
+""")
+
+
+def sql_indice(nombre: str, tabla: str, definicion: str) -> str:
+    return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla} {definicion}"
+
+
+def _es_valido(conn: Connection, nombre: str):
+    """True/False según pg_index.indisvalid; None si el índice no existe"""
+    return conn.execute(text("""
+        SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :nombre
+    """), {"nombre": nombre}).scalar()
+
+
+def _crear_en_particiones(conn: Connection, nombre: str, tabla: str, definicion: str):
+    """Índice particionado sin bloquear escrituras: padre ON ONLY + CONCURRENTLY por partición"""
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON ONLY {tabla} {definicion}"))
+    particiones = conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:t) ORDER BY c.relname
+    """), {"t": tabla}).scalars().all()
+    adjuntas = set(conn.execute(text("""
+        SELECT t.relname FROM pg_inherits i
+        JOIN pg_index x ON x.indexrelid = i.inhrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        WHERE i.inhparent = to_regclass(:nombre)
+    """), {"nombre": nombre}).scalars())
+
+    for particion in particiones:
+        if particion in adjuntas:
+            continue
+        indice = nombre + particion[len(tabla):]
+        if _es_valido(conn, indice) is False:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {indice}"))
+        conn.execute(text(sql_indice(indice, particion, definicion)))
+        conn.execute(text(f"ALTER INDEX {nombre} ATTACH PARTITION {indice}"))
+
+
+def aplicar_indices(conn: Connection) -> list:
+    """
+    Crea los índices faltantes. `conn` debe estar en AUTOCOMMIT (CONCURRENTLY
+    no admite transacciones). Los índices inválidos de un intento anterior se
+    recrean y los que duplican uno existente se eliminan.
+    Retorna [{indice, tabla, estado}].
+    """
+    resultado = []
+    for nombre, tabla, definicion, _ in INDICES:
+        tipo = conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": tabla}
+        ).scalar()
+        if tipo is None:
+            resultado.append({"indice": nombre, "tabla": tabla, "estado": "tabla inexistente"})
+            continue
+        particionada = tipo == "p"
+
+        valido = _es_valido(conn, nombre)
+        if valido is True:
+            resultado.append({"indice": nombre, "tabla": tabla, "estado": "existente"})
+            continue
+        if valido is False and not particionada:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}"))
+
+        try:
+            if particionada:
+                # Un índice padre inválido se completa adjuntando las particiones faltantes
+                _crear_en_particiones(conn, nombre, tabla, definicion)
+            else:
+                conn.execute(text(sql_indice(nombre, tabla, definicion)))
+        except Exception as e:
+            resultado.append({
+                "indice": nombre, "tabla": tabla,
+                "estado": f"error: {str(e).splitlines()[0]}",
+            })
+            continue
+
+        duplicado = conn.execute(_CONSULTA_EQUIVALENTE, {"nombre": nombre}).scalar()
+        if duplicado:
+            # DROP INDEX CONCURRENTLY no admite índices particionados
+            conn.execute(text(f"DROP INDEX {'' if particionada else 'CONCURRENTLY '}IF EXISTS {nombre}"))
+            resultado.append({"indice": nombre, "tabla": tabla, "estado": f"cubierto por {duplicado}"})
+        else:
+            resultado.append({"indice": nombre, "tabla": tabla, "estado": "creado"})
+
+    for tabla in sorted({r["tabla"] for r in resultado if r["estado"] == "creado"}):
+        conn.execute(text(f"ANALYZE {tabla}"))
+    return resultado
+
+
+def _seq_scans(plan) -> list:
+    if isinstance(plan, list):
+        return [t for p in plan for t in _seq_scans(p)]
+    if "Plan" in plan:
+        return _seq_scans(plan["Plan"])
+
+    tablas = []
+    relacion = tabla_base(plan.get("Relation Name"))
+    if plan.get("Node Type") == "Seq Scan" and relacion in TABLAS_GRANDES:
+        tablas.append(relacion)
+    for hijo in plan.get("Plans", []):
+        tablas += _seq_scans(hijo)
+    return tablas
+
+
+def recorridos_secuenciales(plan, particiones: Optional[dict] = None) -> list:
+    """
+    Tablas de TABLAS_GRANDES leídas con Seq Scan en un plan de EXPLAIN (FORMAT JSON).
+    Las particiones se reportan con el nombre de la tabla padre y solo si el plan
+    lee todas las de la tabla (`particiones`: {tabla: cantidad}): recorrer completa
+    una partición ya seleccionada por fecha no es una regresión.
+    """
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    leidas = particiones_leidas(plan)
+    particiones = particiones or {}
+    return [
+        t for t in _seq_scans(plan)
+        if t not in leidas or len(leidas[t]) >= particiones.get(t, 0)
+    ]
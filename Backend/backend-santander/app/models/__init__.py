@@ -6,6 +6,9 @@ from .infraestructura import MasterInfraestructuraPoi
 from .conectividad import MasterConectividad
 from .frentes_seguridad import MasterFrentesSeguridad
 from .incautaciones import FactIncautaciones
+from .agregados import AggSeguridadDiaria, AggEstado
+from .version_datos import VersionDatos
+from .calendario import DimFecha
 
 __all__ = [
     "MasterMunicipios",
@@ -16,4 +19,8 @@ __all__ = [
     "MasterConectividad",
     "MasterFrentesSeguridad",
     "FactIncautaciones",
+    "AggSeguridadDiaria",
+    "AggEstado",
+    "VersionDatos",
+    "DimFecha",
 ]
@@ -0,0 +1,52 @@
+"""
+Modelo: agg_seguridad_diaria - Cubo diario pre-agregado de fact_seguridad
+"""
+from sqlalchemy import Column, BigInteger, Integer, String, Date, DateTime, Index, func
+from ..database import Base
+
+
+class AggSeguridadDiaria(Base):
+    """
+    Rollup diario de fact_seguridad por todas las dimensiones categóricas.
+    Los atributos se llaman igual que en FactSeguridad para poder servir
+    las agregaciones desde cualquiera de las dos tablas.
+    """
+    __tablename__ = "agg_seguridad_diaria"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    fecha_hecho = Column("fecha", Date,
+                         comment="Fecha del suceso (día)")
+    codigo_dane = Column(Integer,
+                         comment="FK -> master_municipios")
+    categoria_delito = Column(String)
+    genero = Column(String)
+    grupo_etario = Column(String)
+    zona_hecho = Column(String)
+    arma_medio = Column(String)
+    clase_sitio = Column(String)
+    modalidad_especifica = Column(String)
+    cantidad = Column(BigInteger,
+                      comment="SUM(cantidad) del grupo")
+    eventos = Column(Integer,
+                     comment="COUNT(*) de eventos del grupo")
+    
+    __table_args__ = (
+        Index("ix_agg_seguridad_diaria_fecha", "fecha"),
+        Index("ix_agg_seguridad_diaria_dane_fecha", "codigo_dane", "fecha"),
+        Index("ix_agg_seguridad_diaria_categoria_fecha", "categoria_delito", "fecha"),
+        Index("ix_agg_seguridad_diaria_ucat_fecha", func.upper(categoria_delito), "fecha"),
+    )
+
+
+class AggEstado(Base):
+    """
+    Marca de agua de cada tabla agregada: último id_evento incorporado.
+    """
+    __tablename__ = "agg_estado"
+    
+    tabla = Column(String, primary_key=True,
+                   comment="Nombre de la tabla agregada")
+    ultimo_id_evento = Column(BigInteger, nullable=False, default=0,
+                              comment="Máximo id_evento de fact_seguridad incluido")
+    actualizado_en = Column(DateTime,
+                            comment="Fecha de la última actualización")
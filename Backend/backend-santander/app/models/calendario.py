@@ -0,0 +1,30 @@
+"""
+Modelo: dim_fecha - Dimensión calendario
+"""
+from sqlalchemy import Column, SmallInteger, String, Boolean, Date
+from ..database import Base
+
+
+class DimFecha(Base):
+    """
+    Un registro por día con las claves de calendario precalculadas, para
+    agrupar por año/mes/semana/día de semana sin evaluar EXTRACT por fila.
+    """
+    __tablename__ = "dim_fecha"
+    
+    fecha = Column(Date, primary_key=True,
+                   comment="Día (une con fact_seguridad.fecha_hecho)")
+    anio = Column(SmallInteger, nullable=False, index=True)
+    mes = Column(SmallInteger, nullable=False)
+    dia = Column(SmallInteger, nullable=False)
+    trimestre = Column(SmallInteger, nullable=False)
+    anio_iso = Column(SmallInteger, nullable=False,
+                      comment="Año ISO 8601 al que pertenece la semana")
+    semana_iso = Column(SmallInteger, nullable=False,
+                        comment="Semana ISO 8601 (1-53), igual a EXTRACT(WEEK)")
+    dia_semana = Column(SmallInteger, nullable=False,
+                        comment="0=Domingo ... 6=Sábado, igual a EXTRACT(DOW)")
+    es_fin_semana = Column(Boolean, nullable=False)
+    es_festivo = Column(Boolean, nullable=False, default=False,
+                        comment="Festivo nacional en Colombia")
+    nombre_festivo = Column(String)
@@ -0,0 +1,20 @@
+"""
+Modelo: version_datos - Sello de versión de los datos cargados
+"""
+from sqlalchemy import Column, BigInteger, String, DateTime
+from ..database import Base
+
+
+class VersionDatos(Base):
+    """
+    Contador que los procesos de carga incrementan al terminar.
+    La API lo usa para invalidar el cache de respuestas.
+    """
+    __tablename__ = "version_datos"
+    
+    nombre = Column(String, primary_key=True, default="global",
+                    comment="Ámbito de la versión (por ahora solo 'global')")
+    version = Column(BigInteger, nullable=False, default=0,
+                     comment="Se incrementa en cada carga de datos")
+    actualizado_en = Column(DateTime,
+                            comment="Fecha de la última carga")
@@ -0,0 +1,510 @@
+"""
+Motor analítico columnar en memoria sobre fact_seguridad (opcional)
+- Carga la tabla en arreglos NumPy: categóricas codificadas con diccionario (código 0 = NULL,
+  códigos en orden de valor), fecha como días desde 1970 y sus claves de calendario
+- Responde filtros + GROUP BY + SUM(cantidad)/COUNT(*) con máscaras y np.bincount,
+  sin ir a PostgreSQL. Los filtros por dimensión usan el índice de bitmaps (app/bitmaps.py)
+- Se activa con MOTOR_CONSULTAS = "columnar" (config.py). Se recarga en segundo plano
+  cuando cambia version_datos; mientras no está al día los endpoints consultan PostgreSQL
+- Si una carga falla no se reintenta con la misma versión hasta pasados
+  MOTOR_REINTENTO_SEGUNDOS (un snapshot roto no provoca una recarga por petición)
+- Si hay snapshot de la versión (app/snapshots.py) se construye desde el .arrow abierto
+  con memory-map en lugar de leer la tabla
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import Optional
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from .config import settings
+from .database import engine
+from .cache import version_datos, version_datos_sync
+from .bitmaps import IndiceBitmaps, desempaquetar
+from . import snapshots
+from .snapshots import pa
+
+logger = logging.getLogger(__name__)
+
+# Columnas de texto codificadas con diccionario
+DIMENSIONES_CATEGORICAS = (
+    "categoria_delito",
+    "genero",
+    "grupo_etario",
+    "zona_hecho",
+    "arma_medio",
+    "clase_sitio",
+    "modalidad_especifica",
+)
+
+# Claves derivadas de fecha_hecho, con la semántica de EXTRACT en PostgreSQL
+# (dia_semana: 0=domingo; semana: semana ISO) y la fecha misma
+DIMENSIONES_FECHA = ("anio", "mes", "dia_semana", "semana", "fecha")
+
+DIMENSIONES = ("codigo_dane", *DIMENSIONES_CATEGORICAS, *DIMENSIONES_FECHA)
+
+# Dimensiones con un bitmap por valor (MOTOR_BITMAPS)
+DIMENSIONES_BITMAP = ("codigo_dane", *DIMENSIONES_CATEGORICAS, "anio")
+
+_EPOCA = date(1970, 1, 1)
+_SIN_FECHA = np.iinfo(np.int32).min
+
+_CONSULTA_CARGA = text(f"""
+    SELECT codigo_dane, fecha_hecho, {", ".join(DIMENSIONES_CATEGORICAS)}, cantidad
+    FROM fact_seguridad
+""")
+
+
+def _ordinal(fecha: date) -> int:
+    return (fecha - _EPOCA).days
+
+
+class Diccionario:
+    """Columna codificada: codigos[i] indexa valores (valores[0] es None)"""
+
+    def __init__(self, valores: list, codigos: np.ndarray):
+        self.valores = valores
+        self.codigos = codigos
+        self.indice = {v: i for i, v in enumerate(self.valores) if v is not None}
+        self._mayusculas = {}
+        for v, i in self.indice.items():
+            self._mayusculas.setdefault(str(v).upper(), []).append(i)
+
+    @classmethod
+    def desde_datos(cls, datos: list) -> "Diccionario":
+        indice = {}
+        codigos = np.fromiter(
+            (indice.setdefault(v, len(indice)) for v in datos), dtype=np.int32, count=len(datos)
+        )
+        distintos = list(indice)
+        no_nulos = sorted(v for v in distintos if v is not None)
+        # Recodificación: 0 = NULL y luego los valores en orden (como ORDER BY sin NULLS)
+        nuevo = {v: i + 1 for i, v in enumerate(no_nulos)}
+        nuevo[None] = 0
+        remapeo = np.array([nuevo[v] for v in distintos], dtype=np.int32)
+        return cls([None, *no_nulos], remapeo[codigos] if len(datos) else codigos)
+
+    @classmethod
+    def desde_arrow(cls, columna) -> "Diccionario":
+        """
+        Columna dictionary<int32> de un snapshot (app/snapshots.py), ya con la codificación
+        del motor: los códigos son una vista del archivo, sin copia
+        """
+        columna = columna.chunk(0) if columna.num_chunks == 1 else columna.combine_chunks()
+        valores = columna.dictionary.to_pylist()
+        if valores[:1] != [None] or valores[1:] != sorted(valores[1:]):
+            raise ValueError("La columna no tiene la codificación del motor columnar")
+        return cls(valores, columna.indices.to_numpy(zero_copy_only=True))
+
+    def codigos_de(self, valores, ignorar_mayusculas: bool = False) -> list:
+        """Códigos de uno o varios valores (sin distinguir mayúsculas si se pide)"""
+        if not isinstance(valores, (list, tuple, set)):
+            valores = [valores]
+        if ignorar_mayusculas:
+            return [c for v in valores for c in self._mayusculas.get(str(v).upper(), [])]
+        return [self.indice[v] for v in valores if v in self.indice]
+
+    def __len__(self) -> int:
+        return len(self.valores)
+
+
+class MotorColumnar:
+    """
+    fact_seguridad en columnas. Las consultas son:
+        mascara = motor.filtrar(categoria_delito="HURTO", anio=2024, codigo_dane=68001)
+        filas = motor.agrupar(("anio", "mes"), mascara)
+    """
+
+    def __init__(self, dimensiones: dict, fecha: np.ndarray, cantidad: np.ndarray, version: int = 0):
+        """
+        dimensiones: {"codigo_dane" y DIMENSIONES_CATEGORICAS: Diccionario};
+        fecha: días desde 1970 (int32, _SIN_FECHA = NULL); cantidad: int64
+        """
+        self.version = version
+        self.cargado_en = time.time()
+        self.dimensiones = dimensiones
+        self.fecha = fecha
+        self.cantidad = cantidad
+        self._calendario()
+        self.bitmaps = self._indexar() if settings.MOTOR_BITMAPS else None
+
+    @classmethod
+    def desde_filas(cls, filas: list, version: int = 0) -> "MotorColumnar":
+        """Filas de _CONSULTA_CARGA"""
+        n = len(filas)
+        columnas = list(zip(*filas)) if n else [()] * (3 + len(DIMENSIONES_CATEGORICAS))
+        dimensiones = {"codigo_dane": Diccionario.desde_datos(list(columnas[0]))}
+        for i, nombre in enumerate(DIMENSIONES_CATEGORICAS):
+            dimensiones[nombre] = Diccionario.desde_datos(list(columnas[2 + i]))
+        cantidad = np.fromiter((c or 0 for c in columnas[-1]), dtype=np.int64, count=n)
+        fecha = np.fromiter(
+            (_ordinal(f) if f is not None else _SIN_FECHA for f in columnas[1]), dtype=np.int32, count=n
+        )
+        return cls(dimensiones, fecha, cantidad, version)
+
+    @classmethod
+    def desde_arrow(cls, tabla, version: int = 0) -> "MotorColumnar":
+        """
+        fact_seguridad de un snapshot abierto con memory-map: códigos, fecha y cantidad
+        apuntan al archivo si no tienen NULL (las claves de calendario y los bitmaps
+        se calculan en cada proceso)
+        """
+        dimensiones = {
+            nombre: Diccionario.desde_arrow(tabla.column(nombre))
+            for nombre in ("codigo_dane", *DIMENSIONES_CATEGORICAS)
+        }
+        fecha = tabla.column("fecha_hecho").combine_chunks().view(pa.int32())
+        cantidad = tabla.column("cantidad").combine_chunks()
+        return cls(
+            dimensiones,
+            fecha.fill_null(_SIN_FECHA).to_numpy() if fecha.null_count else fecha.to_numpy(),
+            cantidad.fill_null(0).to_numpy() if cantidad.null_count else cantidad.to_numpy(),
+            version,
+        )
+
+    def _indexar(self) -> IndiceBitmaps:
+        columnas = {nombre: self._columna(nombre) for nombre in DIMENSIONES_BITMAP}
+        return IndiceBitmaps(columnas, len(self), settings.MOTOR_BITMAP_MAX_VALORES)
+
+    def _calendario(self):
+        """Claves de calendario por fila (0 donde fecha_hecho es NULL)"""
+        con_fecha = self.fecha != _SIN_FECHA
+        dias = np.where(con_fecha, self.fecha, 0).astype("datetime64[D]")
+        anio = dias.astype("datetime64[Y]").astype(np.int32) + 1970
+        mes = dias.astype("datetime64[M]").astype(np.int32) % 12 + 1
+        ordinal = self.fecha.astype(np.int64)
+        # 1970-01-01 fue jueves: DOW de PostgreSQL (0 = domingo)
+        dia_semana = (ordinal + 4) % 7
+        # Semana ISO: la del jueves de la misma semana
+        iso = (ordinal + 3) % 7  # 0 = lunes
+        jueves = (ordinal - iso + 3).astype("datetime64[D]")
+        inicio_anio = jueves.astype("datetime64[Y]").astype("datetime64[D]")
+        semana = (jueves - inicio_anio).astype(np.int64) // 7 + 1
+
+        self.con_fecha = con_fecha
+        self.claves_fecha = {
+            "anio": np.where(con_fecha, anio, 0).astype(np.int32),
+            "mes": np.where(con_fecha, mes, 0).astype(np.int32),
+            "dia_semana": np.where(con_fecha, dia_semana, 0).astype(np.int32),
+            "semana": np.where(con_fecha, semana, 0).astype(np.int32),
+        }
+
+    def __len__(self) -> int:
+        return len(self.cantidad)
+
+    @property
+    def bytes(self) -> int:
+        """Memoria de los arreglos"""
+        total = self.cantidad.nbytes + self.fecha.nbytes + self.con_fecha.nbytes
+        total += sum(a.nbytes for a in self.claves_fecha.values())
+        total += sum(d.codigos.nbytes for d in self.dimensiones.values())
+        if self.bitmaps is not None:
+            total += self.bitmaps.bytes
+        return total
+
+    # ============================================
+    # FILTROS
+    # ============================================
+
+    def _columna(self, dimension: str) -> np.ndarray:
+        """Códigos por fila de una dimensión filtrable (en "anio", el año; 0 = NULL)"""
+        if dimension == "anio":
+            return self.claves_fecha["anio"]
+        return self.dimensiones[dimension].codigos
+
+    def _en(self, dimension: str, codigos: list) -> np.ndarray:
+        columna = self._columna(dimension)
+        if len(codigos) == 1:
+            return columna == codigos[0]
+        return np.isin(columna, codigos)
+
+    def filtrar(
+        self,
+        categoria_delito=None,
+        anio: Optional[int] = None,
+        mes: Optional[int] = None,
+        fecha_inicio: Optional[date] = None,
+        fecha_fin: Optional[date] = None,
+        codigo_dane=None,
+        genero=None,
+        grupo_etario=None,
+        zona_hecho=None,
+        ignorar_mayusculas: bool = True,
+    ) -> np.ndarray:
+        """
+        Máscara de filas con la semántica de condiciones_fecha/condiciones_eventos:
+        año (y mes) como rango semiabierto, fecha_fin inclusiva y, con ignorar_mayusculas,
+        UPPER(col) = UPPER(valor). categoria_delito y codigo_dane aceptan listas (IN).
+        Las condiciones por dimensión se resuelven con el índice de bitmaps si existe.
+        """
+        condiciones = {}
+        if anio:
+            condiciones["anio"] = [anio]
+        if codigo_dane:
+            condiciones["codigo_dane"] = self.dimensiones["codigo_dane"].codigos_de(codigo_dane)
+        for dimension, valor in (
+            ("categoria_delito", categoria_delito), ("genero", genero),
+            ("grupo_etario", grupo_etario), ("zona_hecho", zona_hecho),
+        ):
+            if valor:
+                condiciones[dimension] = self.dimensiones[dimension].codigos_de(valor, ignorar_mayusculas)
+
+        indexadas = {}
+        if self.bitmaps is not None:
+            indexadas = {d: c for d, c in condiciones.items() if d in self.bitmaps}
+        if indexadas:
+            mascara = desempaquetar(self.bitmaps.seleccionar(indexadas), len(self))
+        else:
+            mascara = np.ones(len(self), dtype=bool)
+        for dimension, codigos in condiciones.items():
+            if dimension not in indexadas:
+                mascara &= self._en(dimension, codigos)
+
+        # Año + mes = rango del mes; el año ya está en las condiciones
+        if mes:
+            mascara &= self.con_fecha & (self.claves_fecha["mes"] == mes)
+        if fecha_inicio:
+            mascara &= self.fecha >= _ordinal(fecha_inicio)
+        if fecha_fin:
+            mascara &= self.con_fecha & (self.fecha < _ordinal(fecha_fin + timedelta(days=1)))
+        return mascara
+
+    # ============================================
+    # AGRUPACIÓN
+    # ============================================
+
+    def _codigos(self, dimension: str) -> tuple:
+        """(códigos por fila con 0 = NULL, cardinalidad, decodificador de códigos)"""
+        if dimension in self.dimensiones:
+            d = self.dimensiones[dimension]
+            return d.codigos, len(d), lambda c: d.valores[c]
+        if dimension == "fecha":
+            base = int(self.fecha[self.con_fecha].min()) - 1 if self.con_fecha.any() else 0
+            codigos = np.where(self.con_fecha, self.fecha.astype(np.int64) - base, 0)
+            return codigos, int(codigos.max()) + 1 if len(codigos) else 1, \
+                lambda c: _EPOCA + timedelta(days=base + c) if c else None
+        claves = self.claves_fecha[dimension]
+        base = -1 if dimension == "dia_semana" else 0
+        codigos = np.where(self.con_fecha, claves.astype(np.int64) - base, 0)
+        return codigos, int(codigos.max()) + 1 if len(codigos) else 1, lambda c: c + base if c else None
+
+    def _grupos(self, dimensiones: dict, mascara, medida: str, incluir_nulos: bool) -> tuple:
+        """(códigos de grupo por dimensión, decodificadores, totales, eventos) en orden de claves"""
+        indices = np.flatnonzero(mascara) if mascara is not None else np.arange(len(self))
+
+        clave = np.zeros(len(indices), dtype=np.int64)
+        cardinalidades, decodificadores = [], []
+        for d in dimensiones.values():
+            codigos, cardinalidad, decodificar = self._codigos(d)
+            clave = clave * cardinalidad + codigos[indices]
+            cardinalidades.append(cardinalidad)
+            decodificadores.append(decodificar)
+
+        grupos = int(np.prod(cardinalidades, dtype=np.int64)) if cardinalidades else 1
+        if grupos <= max(4 * len(indices), 1 << 16):
+            eventos = np.bincount(clave, minlength=grupos)
+            sumas = np.bincount(clave, weights=self.cantidad[indices], minlength=grupos)
+            presentes = np.flatnonzero(eventos)
+            eventos, sumas = eventos[presentes], sumas[presentes]
+        else:
+            presentes, inversa = np.unique(clave, return_inverse=True)
+            eventos = np.bincount(inversa)
+            sumas = np.bincount(inversa, weights=self.cantidad[indices])
+
+        if not cardinalidades and not len(presentes):
+            # Total general sin filas: una fila en 0 (como el conjunto vacío de GROUPING SETS)
+            presentes, eventos, sumas = np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64), np.zeros(1)
+        codigos_grupo = np.unravel_index(presentes, cardinalidades) if cardinalidades else ()
+        if not incluir_nulos and cardinalidades:
+            validos = np.all([c != 0 for c in codigos_grupo], axis=0)
+            codigos_grupo = tuple(c[validos] for c in codigos_grupo)
+            eventos, sumas = eventos[validos], sumas[validos]
+
+        totales = eventos if medida == "eventos" else sumas
+        return codigos_grupo, decodificadores, totales, eventos
+
+    def agrupar(
+        self,
+        dimensiones,
+        mascara: Optional[np.ndarray] = None,
+        medida: str = "cantidad",
+        incluir_nulos: bool = False,
+        orden: str = "claves",
+    ) -> list:
+        """
+        GROUP BY `dimensiones` sobre las filas de `mascara`.
+        dimensiones: tupla de nombres de DIMENSIONES o {alias: dimensión}.
+        Cada fila tiene las dimensiones (por alias), `total` (SUM(cantidad), o COUNT(*)
+        con medida="eventos") y `eventos`. Sin incluir_nulos se descartan los grupos con
+        alguna dimensión NULL (equivale a WHERE dim IS NOT NULL).
+        orden: "claves" (ascendente) o "total" (descendente, empates por claves).
+        """
+        if not isinstance(dimensiones, dict):
+            dimensiones = {d: d for d in dimensiones}
+        Fila = _tipo_fila(tuple(dimensiones))
+        codigos_grupo, decodificadores, totales, eventos = self._grupos(dimensiones, mascara, medida, incluir_nulos)
+        filas = [
+            Fila(*(dec(c) for dec, c in zip(decodificadores, claves)), int(t), int(e))
+            for *claves, t, e in zip(*(c.tolist() for c in codigos_grupo), totales.tolist(), eventos.tolist())
+        ]
+        if orden == "total":
+            # Las filas ya están en orden de claves: el sort estable deja los empates así
+            filas.sort(key=lambda f: f.total, reverse=True)
+        return filas
+
+    def agrupar_columnas(
+        self,
+        dimensiones,
+        mascara: Optional[np.ndarray] = None,
+        medida: str = "cantidad",
+        incluir_nulos: bool = False,
+        orden: str = "claves",
+    ) -> dict:
+        """
+        Mismo GROUP BY que agrupar, como {alias: [valores], "total": [...], "eventos": [...]}:
+        una lista por columna, sin crear una fila por grupo (formato columnar de los endpoints)
+        """
+        if not isinstance(dimensiones, dict):
+            dimensiones = {d: d for d in dimensiones}
+        codigos_grupo, decodificadores, totales, eventos = self._grupos(dimensiones, mascara, medida, incluir_nulos)
+        if orden == "total":
+            permutacion = np.argsort(-totales, kind="stable")
+            codigos_grupo = tuple(c[permutacion] for c in codigos_grupo)
+            totales, eventos = totales[permutacion], eventos[permutacion]
+        columnas = {
+            alias: list(map(decodificar, codigos.tolist()))
+            for alias, decodificar, codigos in zip(dimensiones, decodificadores, codigos_grupo)
+        }
+        columnas["total"] = totales.astype(np.int64).tolist()
+        columnas["eventos"] = eventos.astype(np.int64).tolist()
+        return columnas
+
+    def rango_fechas(self, mascara: Optional[np.ndarray] = None) -> tuple:
+        """(MIN(fecha_hecho), MAX(fecha_hecho)) de las filas de la máscara"""
+        con_fecha = self.con_fecha if mascara is None else (self.con_fecha & mascara)
+        if not con_fecha.any():
+            return None, None
+        fechas = self.fecha[con_fecha]
+        return _EPOCA + timedelta(days=int(fechas.min())), _EPOCA + timedelta(days=int(fechas.max()))
+
+
+_tipos_fila = {}
+
+
+def _tipo_fila(nombres: tuple):
+    """namedtuple por combinación de dimensiones: acceso por atributo como las filas de SQLAlchemy"""
+    if nombres not in _tipos_fila:
+        _tipos_fila[nombres] = namedtuple("Fila", (*nombres, "total", "eventos"))
+    return _tipos_fila[nombres]
+
+
+# ============================================
+# CARGA Y VIGENCIA
+# ============================================
+
+# fallo: (versión, time.monotonic()) de la última carga fallida
+_estado = {"motor": None, "cargando": None, "error": None, "fallo": None, "duracion_s": None, "origen": None}
+_bloqueo = threading.Lock()
+
+
+def cargar_motor(conn: Connection, version: int = 0) -> MotorColumnar:
+    """Lee fact_seguridad completa y construye el motor"""
+    filas = conn.execute(_CONSULTA_CARGA).all()
+    return MotorColumnar.desde_filas(filas, version)
+
+
+def _cargar(version: int):
+    inicio = time.perf_counter()
+    try:
+        tabla = snapshots.tabla("fact_seguridad", version)
+        if tabla is not None:
+            motor = MotorColumnar.desde_arrow(tabla, version)
+            _estado["origen"] = "snapshot"
+        else:
+            with engine.connect() as conn:
+                motor = cargar_motor(conn, version)
+            _estado["origen"] = "postgres"
+        _estado["motor"] = motor
+        _estado["error"] = None
+        _estado["fallo"] = None
+        _estado["duracion_s"] = round(time.perf_counter() - inicio, 2)
+        logger.info("Motor columnar cargado desde %s: %s filas (versión %s)", _estado["origen"], len(motor), version)
+    except Exception as e:
+        _estado["error"] = str(e)
+        _estado["fallo"] = (version, time.monotonic())
+        logger.exception("No se pudo cargar el motor columnar")
+    finally:
+        with _bloqueo:
+            _estado["cargando"] = None
+
+
+def _en_espera(version: int) -> bool:
+    """La última carga de esta versión falló hace menos de MOTOR_REINTENTO_SEGUNDOS"""
+    fallo = _estado["fallo"]
+    return fallo is not None and fallo[0] == version \
+        and time.monotonic() - fallo[1] < settings.MOTOR_REINTENTO_SEGUNDOS
+
+
+def _solicitar_carga(version: int):
+    """
+    Carga en un hilo aparte (una a la vez) para no bloquear las peticiones.
+    Tras un fallo espera MOTOR_REINTENTO_SEGUNDOS, salvo que cambie la versión
+    """
+    with _bloqueo:
+        if _estado["cargando"] is not None or _en_espera(version):
+            return
+        _estado["cargando"] = version
+    threading.Thread(target=_cargar, args=(version,), name="motor-columnar", daemon=True).start()
+
+
+def _vigente(version: int) -> Optional[MotorColumnar]:
+    motor = _estado["motor"]
+    if motor is not None and motor.version == version:
+        return motor
+    _solicitar_carga(version)
+    return None
+
+
+async def motor_columnar() -> Optional[MotorColumnar]:
+    """
+    Motor al día con version_datos, o None si no está habilitado o se está
+    (re)cargando: en ese caso se consulta PostgreSQL.
+    """
+    if settings.MOTOR_CONSULTAS != "columnar":
+        return None
+    return _vigente(await version_datos())
+
+
+def motor_columnar_sync() -> Optional[MotorColumnar]:
+    """Variante síncrona de motor_columnar() para código con Session (chatbot)"""
+    if settings.MOTOR_CONSULTAS != "columnar":
+        return None
+    return _vigente(version_datos_sync())
+
+
+def precargar_motor() -> MotorColumnar:
+    """Carga el motor de forma síncrona con la versión actual (scripts y arranque)"""
+    _cargar(version_datos_sync())
+    if _estado["motor"] is None:
+        raise RuntimeError(f"No se pudo cargar el motor columnar: {_estado['error']}")
+    return _estado["motor"]
+
+
+def resumen_motor() -> dict:
+    """Estado del motor para /metricas/motor"""
+    motor = _estado["motor"]
+    return {
+        "motor_consultas": settings.MOTOR_CONSULTAS,
+        "cargado": motor is not None,
+        "filas": len(motor) if motor is not None else 0,
+        "bytes": motor.bytes if motor is not None else 0,
+        "version_datos": motor.version if motor is not None else None,
+        "duracion_carga_s": _estado["duracion_s"],
+        "origen": _estado["origen"],
+        "bitmaps": motor.bitmaps.resumen() if motor is not None and motor.bitmaps is not None else None,
+        "cargando": _estado["cargando"] is not None,
+        "error": _estado["error"],
+    }
@@ -0,0 +1,245 @@
+"""
+Backend analítico DuckDB sobre los snapshots Parquet (opcional, requiere el paquete `duckdb`)
+- Con MOTOR_CONSULTAS = "duckdb" los endpoints de temporal, víctimas, clima y filtros
+  reciben una sesión DuckDB en lugar de la AsyncSession de PostgreSQL (get_db_analitica)
+- La sesión compila las mismas consultas SQLAlchemy de los routers (dialecto PostgreSQL,
+  valores en línea) y las ejecuta en DuckDB, embebido en el proceso, sobre vistas de los
+  Parquet de app/snapshots.py: mismos filtros y misma semántica, sin escanear en PostgreSQL
+- agg_seguridad_diaria se construye en DuckDB desde el Parquet de fact_seguridad, así que
+  fuente_seguridad() sirve igual para los dos backends
+- dim_fecha solo existe si el snapshot la incluye: la sesión indica si se puede usar
+  (SesionDuckDB.calendario, ver calendario_disponible(db)), sin consultar PostgreSQL
+- Si la apertura falla no se reintenta con la misma versión hasta pasados
+  MOTOR_REINTENTO_SEGUNDOS; mientras tanto se usa PostgreSQL
+- Si no hay snapshot de la versión vigente de los datos se usa PostgreSQL. Las geometrías
+  (geografía, teselas) siguen en PostGIS
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+from sqlalchemy.dialects.postgresql.base import PGCompiler
+from .config import settings
+from .cache import version_datos
+from .calendario import _CONSULTA_COBERTURA
+from .cubo import DIMENSIONES_CUBO, TABLA_CUBO
+from .database import AsyncSessionLocal, engine
+from .snapshots import TABLAS, directorio_version, MANIFIESTO
+
+logger = logging.getLogger(__name__)
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+# ============================================
+# COMPILACIÓN
+# ============================================
+
+class _CompiladorDuckDB(PGCompiler):
+    """SQL de PostgreSQL con los ajustes para que DuckDB retorne los mismos tipos"""
+
+    def visit_date_trunc_func(self, fn, **kw):
+        # En PostgreSQL date_trunc(date) retorna timestamptz (zona de la sesión); en DuckDB, date
+        return f"CAST(date_trunc{self.function_argspec(fn, **kw)} AS TIMESTAMPTZ)"
+
+
+class _DialectoDuckDB(PGDialect_psycopg2):
+    statement_compiler = _CompiladorDuckDB
+
+
+_dialecto = _DialectoDuckDB()
+
+
+def compilar(sentencia) -> str:
+    """Consulta SQLAlchemy -> SQL con los parámetros en línea"""
+    return str(sentencia.compile(dialect=_dialecto, compile_kwargs={"literal_binds": True}))
+
+
+# ============================================
+# SESIÓN
+# ============================================
+
+_tipos_fila = {}
+
+
+def _tipo_fila(columnas: tuple):
+    if columnas not in _tipos_fila:
+        _tipos_fila[columnas] = namedtuple("Fila", columnas, rename=True)
+    return _tipos_fila[columnas]
+
+
+class ResultadoDuckDB:
+    """Subconjunto de Result de SQLAlchemy que usan los routers"""
+
+    def __init__(self, columnas: tuple, filas: list):
+        Fila = _tipo_fila(columnas)
+        self._filas = [Fila(*f) for f in filas]
+
+    def all(self) -> list:
+        return self._filas
+
+    def first(self):
+        return self._filas[0] if self._filas else None
+
+    def scalar(self):
+        return self._filas[0][0] if self._filas else None
+
+    def mappings(self) -> list:
+        return [f._asdict() for f in self._filas]
+
+
+class SesionDuckDB:
+    """
+    Reemplazo de AsyncSession para consultas de solo lectura: cada execute corre en
+    un hilo con su propio cursor de la base DuckDB
+    """
+
+    def __init__(self, base: "BaseDuckDB"):
+        self.base = base
+
+    @property
+    def calendario(self) -> bool:
+        """dim_fecha está en el snapshot y cubre fact_seguridad"""
+        return self.base.calendario
+
+    def _ejecutar(self, sql: str) -> ResultadoDuckDB:
+        # Vía Arrow: más rápido que fetchall y convierte timestamptz sin pytz
+        with self.base.conexion.cursor() as cursor:
+            tabla = cursor.execute(sql).to_arrow_table()
+        filas = zip(*(columna.to_pylist() for columna in tabla.columns)) if tabla.num_columns else []
+        return ResultadoDuckDB(tuple(tabla.column_names), filas)
+
+    async def execute(self, sentencia) -> ResultadoDuckDB:
+        inicio = time.perf_counter()
+        resultado = await asyncio.to_thread(self._ejecutar, compilar(sentencia))
+        estadisticas["consultas"] += 1
+        estadisticas["segundos"] += time.perf_counter() - inicio
+        return resultado
+
+
+# ============================================
+# BASE EN MEMORIA POR VERSIÓN
+# ============================================
+
+class BaseDuckDB:
+    """
+    Vistas sobre los Parquet de una versión y el cubo diario materializado.
+    `tablas` son las vistas/tablas creadas: las opcionales (dim_fecha) pueden faltar
+    """
+
+    def __init__(self, version: int):
+        inicio = time.perf_counter()
+        self.version = version
+        self.tablas = set()
+        self.conexion = duckdb.connect(":memory:", config={"threads": settings.DUCKDB_HILOS})
+        # Orden de NULL de PostgreSQL: al final en ASC, al inicio en DESC
+        self.conexion.execute("SET default_null_order = 'nulls_last_on_asc_first_on_desc'")
+        self.conexion.execute("SET TimeZone = ?", [_zona_horaria()])
+        directorio = directorio_version(version)
+        for nombre in TABLAS:
+            ruta = os.path.join(directorio, f"{nombre}.parquet")
+            if os.path.exists(ruta):
+                ruta = ruta.replace("'", "''")
+                self.conexion.execute(f"CREATE VIEW {nombre} AS SELECT * FROM read_parquet('{ruta}')")
+                self.tablas.add(nombre)
+
+        columnas = ", ".join(DIMENSIONES_CUBO)
+        self.conexion.execute(f"""
+            CREATE TABLE {TABLA_CUBO} AS
+            SELECT {columnas.replace("fecha_hecho", "fecha_hecho AS fecha")},
+                   SUM(cantidad) AS cantidad, COUNT(*) AS eventos
+            FROM fact_seguridad
+            GROUP BY {columnas}
+        """)
+        self.tablas.add(TABLA_CUBO)
+        # Mismo criterio que calendario_disponible() en PostgreSQL
+        self.calendario = "dim_fecha" in self.tablas and bool(
+            self.conexion.execute(_CONSULTA_COBERTURA.text).fetchone()[0]
+        )
+        self.duracion_s = round(time.perf_counter() - inicio, 2)
+        logger.info("DuckDB: snapshots v%s en %.2fs", version, self.duracion_s)
+
+
+def _zona_horaria() -> str:
+    """Zona horaria de las sesiones de PostgreSQL, para que timestamptz coincida"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SHOW TimeZone")).scalar()
+    except Exception:
+        return "UTC"
+
+
+# fallo: (versión, time.monotonic()) de la última apertura fallida
+_estado = {"base": None, "error": None, "fallo": None}
+_bloqueo = threading.Lock()
+estadisticas = {"consultas": 0, "segundos": 0.0}
+
+
+def _base(version: int) -> Optional[BaseDuckDB]:
+    base = _estado["base"]
+    if base is not None and base.version == version:
+        return base
+    if not os.path.exists(os.path.join(directorio_version(version), MANIFIESTO)):
+        return None
+    with _bloqueo:
+        base = _estado["base"]
+        if base is None or base.version != version:
+            fallo = _estado["fallo"]
+            if fallo is not None and fallo[0] == version \
+                    and time.monotonic() - fallo[1] < settings.MOTOR_REINTENTO_SEGUNDOS:
+                return None
+            try:
+                base = _estado["base"] = BaseDuckDB(version)
+                _estado["error"] = None
+                _estado["fallo"] = None
+            except Exception as e:
+                _estado["error"] = str(e)
+                _estado["fallo"] = (version, time.monotonic())
+                logger.exception("No se pudo abrir DuckDB sobre los snapshots v%s", version)
+                return None
+    return base
+
+
+async def sesion_duckdb() -> Optional[SesionDuckDB]:
+    """Sesión sobre el snapshot de la versión vigente, o None si no existe"""
+    if duckdb is None:
+        return None
+    base = await asyncio.to_thread(_base, await version_datos())
+    return SesionDuckDB(base) if base is not None else None
+
+
+async def get_db_analitica():
+    """
+    Dependency de los endpoints analíticos: sesión DuckDB con MOTOR_CONSULTAS = "duckdb"
+    y snapshot de la versión vigente; en otro caso sesión asíncrona de PostgreSQL
+    """
+    if settings.MOTOR_CONSULTAS == "duckdb":
+        sesion = await sesion_duckdb()
+        if sesion is not None:
+            yield sesion
+            return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def resumen_duckdb() -> dict:
+    """Estado del backend DuckDB para /metricas/motor"""
+    base = _estado["base"]
+    return {
+        "disponible": duckdb is not None,
+        "version_datos": base.version if base is not None else None,
+        "duracion_apertura_s": base.duracion_s if base is not None else None,
+        "tablas": sorted(base.tablas) if base is not None else [],
+        "calendario": base.calendario if base is not None else None,
+        "consultas": estadisticas["consultas"],
+        "segundos_consultas": round(estadisticas["segundos"], 3),
+        "error": _estado["error"],
+    }
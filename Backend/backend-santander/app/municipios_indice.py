@@ -0,0 +1,175 @@
+"""
+Índice en memoria de master_municipios para resolver nombres a codigo_dane
+- Mapa exacto insensible a tildes y mayúsculas
+- Índice de prefijos (lista ordenada + bisect) y de trigramas para coincidencias aproximadas
+- Filtros y rutas solo resuelven coincidencias exactas o el prefijo de un único municipio;
+  las aproximadas se ofrecen como sugerencias (detalle del 404) y las usa el chatbot,
+  que nombra el municipio resuelto en la respuesta
+- Se recarga cuando cambia version_datos (ver app/cache.py)
+"""
+import unicodedata
+from bisect import bisect_left
+from itertools import islice
+from typing import Optional
+from sqlalchemy import text
+from .cache import version_datos, version_datos_sync
+from .database import engine, async_engine
+
+# Similitud mínima de trigramas para sugerir un municipio (mismo valor por defecto que pg_trgm)
+UMBRAL_SIMILITUD = 0.3
+
+# Puntaje mínimo para resolver de forma aproximada (chatbot): nombre que contiene el texto
+# o similitud de trigramas de al menos 0.6 (puntaje = 0.7 * similitud)
+PUNTAJE_APROXIMADO = 0.42
+
+_CONSULTA_MUNICIPIOS = text("SELECT codigo_dane, nombre_municipio FROM master_municipios")
+
+
+def normalizar(texto: str) -> str:
+    """Mayúsculas, sin tildes y con espacios simples: 'Girón ' -> 'GIRON'"""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_tildes.upper().split())
+
+
+def _trigramas(texto: str) -> set:
+    relleno = f"  {texto} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceMunicipios:
+    """
+    Estructuras de búsqueda construidas a partir de filas (codigo_dane, nombre_municipio).
+    Orden de preferencia: exacto > prefijo > contiene > similitud de trigramas.
+    """
+
+    def __init__(self, filas):
+        self.nombres = {}
+        self.exacto = {}
+        self._normalizados = {}
+        self._trigramas = {}
+        self._posting = {}
+
+        for codigo_dane, nombre in filas:
+            if not nombre:
+                continue
+            clave = normalizar(nombre)
+            self.nombres[codigo_dane] = nombre
+            self.exacto.setdefault(clave, codigo_dane)
+            self._normalizados[codigo_dane] = clave
+            self._trigramas[codigo_dane] = _trigramas(clave)
+            for t in self._trigramas[codigo_dane]:
+                self._posting.setdefault(t, set()).add(codigo_dane)
+
+        self._ordenados = sorted((clave, codigo) for codigo, clave in self._normalizados.items())
+
+    def _prefijo(self, clave: str):
+        """(nombre normalizado, codigo_dane) de los municipios cuyo nombre empieza por la clave"""
+        # Quedan contiguos en la lista ordenada
+        i = bisect_left(self._ordenados, (clave,))
+        while i < len(self._ordenados) and self._ordenados[i][0].startswith(clave):
+            yield self._ordenados[i]
+            i += 1
+
+    def candidatos(self, texto: Optional[str], limite: int = 5) -> list:
+        """
+        Retorna hasta `limite` candidatos [{codigo_dane, nombre_municipio, puntaje}]
+        ordenados por puntaje (1.0 = coincidencia exacta).
+        """
+        if not texto:
+            return []
+        clave = normalizar(texto)
+        if not clave:
+            return []
+
+        puntajes = {}
+        codigo = self.exacto.get(clave)
+        if codigo is not None:
+            puntajes[codigo] = 1.0
+
+        for nombre, codigo in self._prefijo(clave):
+            puntajes.setdefault(codigo, 0.9 + 0.09 * len(clave) / len(nombre))
+
+        # Contiene y similitud: solo municipios que comparten algún trigrama
+        trigramas = _trigramas(clave)
+        if len(clave) < 3:
+            posibles = self._normalizados.keys()
+        else:
+            posibles = set().union(*(self._posting.get(t, ()) for t in trigramas))
+        for codigo in posibles:
+            if codigo in puntajes:
+                continue
+            nombre = self._normalizados[codigo]
+            if clave in nombre:
+                puntajes[codigo] = 0.8 + 0.09 * len(clave) / len(nombre)
+                continue
+            propios = self._trigramas[codigo]
+            similitud = len(trigramas & propios) / len(trigramas | propios)
+            if similitud >= UMBRAL_SIMILITUD:
+                puntajes[codigo] = 0.7 * similitud
+
+        ordenados = sorted(puntajes.items(), key=lambda x: (-x[1], self._normalizados[x[0]]))
+        return [
+            {
+                "codigo_dane": codigo,
+                "nombre_municipio": self.nombres[codigo],
+                "puntaje": round(puntaje, 4),
+            }
+            for codigo, puntaje in ordenados[:limite]
+        ]
+
+    def resolver(self, texto: Optional[str], aproximado: bool = False) -> Optional[int]:
+        """
+        codigo_dane del municipio o None.
+        Coincidencia exacta o prefijo de un único municipio ('floridab' -> FLORIDABLANCA);
+        un prefijo ambiguo ('san') no resuelve. Con aproximado=True (chatbot) también el
+        mejor candidato con puntaje de al menos PUNTAJE_APROXIMADO.
+        """
+        clave = normalizar(texto) if texto else ""
+        if not clave:
+            return None
+        codigo = self.exacto.get(clave)
+        if codigo is not None:
+            return codigo
+        prefijo = list(islice(self._prefijo(clave), 2))
+        if len(prefijo) == 1:
+            return prefijo[0][1]
+        if aproximado:
+            mejores = self.candidatos(texto, limite=1)
+            if mejores and mejores[0]["puntaje"] >= PUNTAJE_APROXIMADO:
+                return mejores[0]["codigo_dane"]
+        return None
+
+    def no_encontrado(self, texto: str) -> str:
+        """Detalle del 404 para un municipio que no resuelve, con los candidatos como sugerencia"""
+        sugerencias = [c["nombre_municipio"] for c in self.candidatos(texto)]
+        detalle = f"Municipio '{texto}' no encontrado"
+        return f"{detalle}. ¿Quiso decir: {', '.join(sugerencias)}?" if sugerencias else detalle
+
+    def nombre(self, codigo_dane: int) -> Optional[str]:
+        return self.nombres.get(codigo_dane)
+
+
+_estado = {"indice": None, "version": None}
+
+
+async def indice_municipios() -> IndiceMunicipios:
+    """Índice vigente; lo (re)carga si no existe o cambió version_datos"""
+    version = await version_datos()
+    if _estado["indice"] is None or _estado["version"] != version:
+        async with async_engine.connect() as conn:
+            filas = (await conn.execute(_CONSULTA_MUNICIPIOS)).all()
+        _estado["indice"] = IndiceMunicipios(filas)
+        _estado["version"] = version
+    return _estado["indice"]
+
+
+def indice_municipios_sync() -> IndiceMunicipios:
+    """Variante síncrona de indice_municipios() para código con Session (chatbot)"""
+    version = version_datos_sync()
+    if _estado["indice"] is None or _estado["version"] != version:
+        with engine.connect() as conn:
+            filas = conn.execute(_CONSULTA_MUNICIPIOS).all()
+        _estado["indice"] = IndiceMunicipios(filas)
+        _estado["version"] = version
+    return _estado["indice"]
@@ -0,0 +1,115 @@
+"""
+Negociación de contenido por cabecera Accept para extracciones grandes
+- application/vnd.apache.arrow.stream: Arrow IPC (stream) con una columna por campo;
+  los metadatos de la respuesta (totales, filtros) van en los metadatos del esquema.
+  Requiere el paquete `pyarrow` (pandas/polars lo leen sin conversión)
+- application/msgpack: {**metadatos, "datos": {columna: [valores]}}. Requiere `msgpack`
+- Sin Accept, con application/json o */*, o si el formato pedido no está instalado: JSON
+  (la respuesta de siempre). Las respuestas binarias llevan Vary: Accept; el cache de
+  respuestas y la coalescencia separan sus claves por formato (variante)
+- Los endpoints arman las columnas directamente del resultado de la consulta o de los
+  arreglos NumPy, sin el dict por fila de la respuesta JSON
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+from starlette.responses import Response
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MEDIO_ARROW = "application/vnd.apache.arrow.stream"
+MEDIO_MSGPACK = "application/msgpack"
+
+_JSON = ("application/json", "application/*", "*/*")
+
+# Variante de la clave de cache por formato (JSON: sin sufijo)
+_VARIANTES = {MEDIO_ARROW: "arrow", MEDIO_MSGPACK: "msgpack"}
+
+VARY = {"Vary": "Accept"}
+
+
+def disponibles() -> tuple:
+    """Formatos binarios que se pueden producir con los paquetes instalados"""
+    return tuple(m for m, modulo in ((MEDIO_ARROW, pa), (MEDIO_MSGPACK, msgpack)) if modulo is not None)
+
+
+def medio_aceptado(accept: Optional[str]) -> Optional[str]:
+    """
+    Formato binario preferido según Accept (mayor q; a igual q, el primero listado),
+    o None para responder JSON
+    """
+    if not accept:
+        return None
+    binarios = disponibles()
+    mejor, q_mejor = None, 0.0
+    for parte in accept.split(","):
+        medio, *parametros = [p.strip() for p in parte.split(";")]
+        medio = medio.lower()
+        q = 1.0
+        for parametro in parametros:
+            if parametro.startswith("q="):
+                try:
+                    q = float(parametro[2:])
+                except ValueError:
+                    q = 0.0
+        if (medio in binarios or medio in _JSON) and q > q_mejor:
+            mejor, q_mejor = (medio if medio in binarios else None), q
+    return mejor
+
+
+def variante(scope) -> str:
+    """Sufijo de la clave de cache/coalescencia para el formato que pide la petición"""
+    for nombre, valor in scope.get("headers", []):
+        if nombre == b"accept":
+            medio = medio_aceptado(valor.decode("latin-1"))
+            return f"|{_VARIANTES[medio]}" if medio else ""
+    return ""
+
+
+# ============================================
+# RESPUESTAS
+# ============================================
+
+def _msgpack_por_defecto(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if hasattr(valor, "tolist"):
+        return valor.tolist()
+    raise TypeError(f"Tipo no serializable en MessagePack: {type(valor).__name__}")
+
+
+def _arrow(columnas: dict, metadatos: dict) -> bytes:
+    tabla = pa.table(columnas)
+    tabla = tabla.replace_schema_metadata({
+        clave: json.dumps(valor, ensure_ascii=False, default=str) for clave, valor in metadatos.items()
+    })
+    sumidero = pa.BufferOutputStream()
+    with ipc.new_stream(sumidero, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return sumidero.getvalue().to_pybytes()
+
+
+def _msgpack(columnas: dict, metadatos: dict) -> bytes:
+    datos = {c: v.tolist() if hasattr(v, "tolist") else v for c, v in columnas.items()}
+    return msgpack.packb({**metadatos, "datos": datos}, default=_msgpack_por_defecto, use_bin_type=True)
+
+
+def respuesta_tabla(medio: str, columnas: dict, **metadatos) -> Response:
+    """
+    Respuesta binaria de una tabla {columna: lista o arreglo NumPy} en el formato `medio`
+    (resultado de medio_aceptado)
+    """
+    cuerpo = _arrow(columnas, metadatos) if medio == MEDIO_ARROW else _msgpack(columnas, metadatos)
+    return Response(content=cuerpo, media_type=medio, headers=VARY)
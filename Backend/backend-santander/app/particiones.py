@@ -0,0 +1,300 @@
+"""
+Particionamiento por año de las tablas de hechos (PARTITION BY RANGE sobre la fecha)
+- Una partición por año: fact_seguridad_2024 contiene [2024-01-01, 2025-01-01)
+- La partición DEFAULT (fact_seguridad_default) recibe las filas sin fecha y las de
+  años sin partición, así una carga nunca falla por falta de partición
+- Con los filtros de fecha en rango (condiciones_fecha) el planificador solo lee
+  las particiones de los años pedidos (partition pruning)
+- La tabla padre conserva nombre, columnas, secuencia e índices: los modelos ORM no cambian
+La migración se ejecuta con scripts/particionar_tablas.py. Antes de insertar, los procesos
+de carga llaman a preparar_carga con las fechas del lote: crea las particiones de sus años
+para que las filas no queden en DEFAULT (refrescar_cubo además mantiene creadas las del
+año siguiente).
+"""
+import json
+import re
+from datetime import date
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from .models import FactSeguridad, FactClima
+
+# tabla -> (columna de partición, columna de la clave primaria)
+TABLAS_PARTICIONADAS = {
+    FactSeguridad.__tablename__: ("fecha_hecho", "id_evento"),
+    FactClima.__tablename__: ("fecha", "id"),
+}
+
+# Años a futuro que se mantienen creados (crear una partición bloquea la tabla padre)
+PARTICIONES_ADELANTE = 1
+
+# Sufijo de la partición DEFAULT; particiones_leidas la reporta con este valor en lugar del año
+PARTICION_DEFECTO = "default"
+
+_RE_PARTICION = re.compile(rf"^(?P<tabla>.+)_(?P<anio>\d{{4}}|{PARTICION_DEFECTO})$")
+
+
+def nombre_particion(tabla: str, anio: int) -> str:
+    return f"{tabla}_{anio}"
+
+
+def nombre_defecto(tabla: str) -> str:
+    return f"{tabla}_{PARTICION_DEFECTO}"
+
+
+def tabla_base(relacion: str) -> str:
+    """fact_seguridad_2024 / fact_seguridad_default -> fact_seguridad (otras relaciones sin cambios)"""
+    m = _RE_PARTICION.match(relacion or "")
+    if m and m.group("tabla") in TABLAS_PARTICIONADAS:
+        return m.group("tabla")
+    return relacion
+
+
+def esta_particionada(conn: Connection, tabla: str) -> bool:
+    return conn.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:t)"), {"t": tabla}
+    ).scalar() is True
+
+
+def anios_particionados(conn: Connection, tabla: str) -> list:
+    """Años con partición creada (sin la partición DEFAULT)"""
+    filas = conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:t)
+    """), {"t": tabla}).scalars()
+    anios = []
+    for relname in filas:
+        m = _RE_PARTICION.match(relname)
+        if m and m.group("tabla") == tabla and m.group("anio") != PARTICION_DEFECTO:
+            anios.append(int(m.group("anio")))
+    return sorted(anios)
+
+
+def _rango(anio: int) -> str:
+    return f"FROM ('{anio}-01-01') TO ('{anio + 1}-01-01')"
+
+
+def _crear_particion(conn: Connection, padre: str, tabla: str, anio: int) -> str:
+    nombre = nombre_particion(tabla, anio)
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {nombre} PARTITION OF {padre} FOR VALUES {_rango(anio)}"))
+    return nombre
+
+
+def _crear_defecto(conn: Connection, padre: str, tabla: str) -> str:
+    nombre = nombre_defecto(tabla)
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {nombre} PARTITION OF {padre} DEFAULT"))
+    return nombre
+
+
+def _crear_desde_defecto(conn: Connection, tabla: str, anio: int) -> str:
+    """
+    Partición de un año que ya tiene filas en DEFAULT (PostgreSQL no permite crearla así):
+    las filas se mueven a una tabla nueva que luego se adjunta como partición.
+    ATTACH crea en ella los índices de la tabla padre
+    """
+    columna, _ = TABLAS_PARTICIONADAS[tabla]
+    nombre = nombre_particion(tabla, anio)
+    conn.execute(text(f"CREATE TABLE {nombre} (LIKE {tabla} INCLUDING DEFAULTS INCLUDING STORAGE)"))
+    conn.execute(text(f"""
+        WITH movidas AS (
+            DELETE FROM {nombre_defecto(tabla)}
+            WHERE {columna} >= '{anio}-01-01' AND {columna} < '{anio + 1}-01-01'
+            RETURNING *
+        )
+        INSERT INTO {nombre} SELECT * FROM movidas
+    """))
+    conn.execute(text(f"ALTER TABLE {tabla} ATTACH PARTITION {nombre} FOR VALUES {_rango(anio)}"))
+    return nombre
+
+
+def _anios_en_defecto(conn: Connection, tabla: str) -> set:
+    columna, _ = TABLAS_PARTICIONADAS[tabla]
+    if conn.execute(text("SELECT to_regclass(:t)"), {"t": nombre_defecto(tabla)}).scalar() is None:
+        return set()
+    return set(conn.execute(text(
+        f"SELECT DISTINCT EXTRACT(YEAR FROM {columna})::int FROM {nombre_defecto(tabla)} WHERE {columna} IS NOT NULL"
+    )).scalars())
+
+
+def asegurar_particiones(
+    conn: Connection,
+    tabla: str,
+    desde: Optional[int] = None,
+    hasta: Optional[int] = None,
+) -> list:
+    """
+    Crea las particiones faltantes de los años desde..hasta (por defecto, del año
+    actual a PARTICIONES_ADELANTE años después) y la DEFAULT si falta. Las filas de
+    esos años que estaban en DEFAULT pasan a su partición. Las particiones nuevas
+    heredan los índices de la tabla padre. Si la tabla no está particionada no hace nada.
+    Retorna los nombres de las particiones creadas.
+    """
+    if not esta_particionada(conn, tabla):
+        return []
+    actual = date.today().year
+    desde = desde or actual
+    hasta = hasta or max(desde, actual + PARTICIONES_ADELANTE)
+
+    creadas = []
+    if conn.execute(text("SELECT to_regclass(:t)"), {"t": nombre_defecto(tabla)}).scalar() is None:
+        creadas.append(_crear_defecto(conn, tabla, tabla))
+    existentes = set(anios_particionados(conn, tabla))
+    en_defecto = _anios_en_defecto(conn, tabla)
+    for anio in range(desde, hasta + 1):
+        if anio in existentes:
+            continue
+        if anio in en_defecto:
+            creadas.append(_crear_desde_defecto(conn, tabla, anio))
+        else:
+            creadas.append(_crear_particion(conn, tabla, tabla, anio))
+    return creadas
+
+
+def preparar_carga(conn: Connection, tabla: str, fechas) -> list:
+    """
+    Paso previo a insertar un lote en una tabla particionada: crea las particiones de los
+    años entre la menor y la mayor de `fechas` (las del lote a cargar; se ignoran las None).
+    Sin este paso las filas igual se insertan, pero en la partición DEFAULT.
+    Retorna los nombres de las particiones creadas.
+    """
+    anios = [f.year for f in fechas if f is not None]
+    if not anios:
+        return []
+    return asegurar_particiones(conn, tabla, desde=min(anios), hasta=max(anios))
+
+
+def _nombre_unica(tabla: str) -> str:
+    columna, pk = TABLAS_PARTICIONADAS[tabla]
+    return f"{tabla}_{pk}_{columna}_key"
+
+
+def _admitir_sin_fecha(conn: Connection, tabla: str) -> list:
+    """
+    Tabla particionada con PRIMARY KEY (id, fecha): la cambia por UNIQUE (id, fecha), quita
+    el NOT NULL de la fecha y crea la partición DEFAULT. Retorna los cambios hechos
+    """
+    columna, pk = TABLAS_PARTICIONADAS[tabla]
+    cambios = []
+    primaria = conn.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:t) AND contype = 'p'"
+    ), {"t": tabla}).scalar()
+    if primaria:
+        conn.execute(text(f"ALTER TABLE {tabla} DROP CONSTRAINT {primaria}"))
+        conn.execute(text(f"ALTER TABLE {tabla} ADD CONSTRAINT {_nombre_unica(tabla)} UNIQUE ({pk}, {columna})"))
+        conn.execute(text(f"ALTER TABLE {tabla} ALTER COLUMN {columna} DROP NOT NULL"))
+        cambios.append(f"{primaria} -> {_nombre_unica(tabla)}")
+    if conn.execute(text("SELECT to_regclass(:t)"), {"t": nombre_defecto(tabla)}).scalar() is None:
+        cambios.append(_crear_defecto(conn, tabla, tabla))
+    return cambios
+
+
+def particionar_tabla(conn: Connection, tabla: str) -> dict:
+    """
+    Convierte `tabla` en una tabla particionada por año dentro de la transacción de `conn`:
+    copia las filas, recrea índices y llaves foráneas y conserva la secuencia del id.
+    Las filas sin fecha quedan en la partición DEFAULT.
+    La clave primaria pasa a ser UNIQUE (id, fecha): debe incluir la columna de partición
+    y, como PRIMARY KEY, obligaría a que la fecha no sea NULL.
+    En una tabla ya particionada sin DEFAULT (migrada antes) la agrega y hace lo mismo con la clave.
+    Las lecturas siguen funcionando durante la copia; las escrituras esperan al commit.
+    """
+    columna, pk = TABLAS_PARTICIONADAS[tabla]
+    if esta_particionada(conn, tabla):
+        return {
+            "tabla": tabla, "estado": "ya particionada", "anios": anios_particionados(conn, tabla),
+            "ajustes": _admitir_sin_fecha(conn, tabla),
+        }
+
+    referencias = conn.execute(text(
+        "SELECT conname FROM pg_constraint WHERE confrelid = to_regclass(:t)"
+    ), {"t": tabla}).scalars().all()
+    if referencias:
+        raise ValueError(f"{tabla} es referenciada por {', '.join(referencias)}; elimínelas antes de migrar")
+
+    conn.execute(text(f"LOCK TABLE {tabla} IN EXCLUSIVE MODE"))
+
+    anio_min, anio_max = conn.execute(text(
+        f"SELECT EXTRACT(YEAR FROM MIN({columna}))::int, EXTRACT(YEAR FROM MAX({columna}))::int FROM {tabla}"
+    )).one()
+    actual = date.today().year
+    desde = anio_min or actual
+    hasta = max(anio_max or actual, actual) + PARTICIONES_ADELANTE
+
+    indices = conn.execute(text("""
+        SELECT pg_get_indexdef(indexrelid) FROM pg_index
+        WHERE indrelid = to_regclass(:t) AND NOT indisprimary
+    """), {"t": tabla}).scalars().all()
+    llaves = conn.execute(text("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = to_regclass(:t) AND contype = 'f'
+    """), {"t": tabla}).all()
+    secuencia = conn.execute(text("SELECT pg_get_serial_sequence(:t, :c)"), {"t": tabla, "c": pk}).scalar()
+    identidad = conn.execute(text("""
+        SELECT attidentity FROM pg_attribute WHERE attrelid = to_regclass(:t) AND attname = :c
+    """), {"t": tabla, "c": pk}).scalar()
+
+    nueva = f"{tabla}_particionada"
+    conn.execute(text(
+        f"CREATE TABLE {nueva} (LIKE {tabla} INCLUDING DEFAULTS INCLUDING IDENTITY "
+        f"INCLUDING GENERATED INCLUDING COMMENTS INCLUDING STORAGE) PARTITION BY RANGE ({columna})"
+    ))
+    for anio in range(desde, hasta + 1):
+        _crear_particion(conn, nueva, tabla, anio)
+    _crear_defecto(conn, nueva, tabla)
+
+    filas = conn.execute(text(
+        f"INSERT INTO {nueva} OVERRIDING SYSTEM VALUE SELECT * FROM {tabla}"
+    )).rowcount
+
+    if secuencia and not identidad:
+        # Secuencia de un serial: pasa a pertenecer a la tabla nueva para sobrevivir al DROP
+        conn.execute(text(f"ALTER SEQUENCE {secuencia} OWNED BY {nueva}.{pk}"))
+    conn.execute(text(f"DROP TABLE {tabla}"))
+    conn.execute(text(f"ALTER TABLE {nueva} RENAME TO {tabla}"))
+    conn.execute(text(f"ALTER TABLE {tabla} ADD CONSTRAINT {_nombre_unica(tabla)} UNIQUE ({pk}, {columna})"))
+    for nombre, definicion in llaves:
+        conn.execute(text(f"ALTER TABLE {tabla} ADD CONSTRAINT {nombre} {definicion}"))
+    for definicion in indices:
+        # Sobre la tabla padre el índice se crea en todas las particiones
+        conn.execute(text(definicion))
+    if identidad:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence(:t, :c), COALESCE(MAX({pk}), 0) + 1, false) FROM {tabla}"
+        ), {"t": tabla, "c": pk})
+    conn.execute(text(f"ANALYZE {tabla}"))
+
+    return {
+        "tabla": tabla,
+        "estado": "particionada",
+        "filas": filas,
+        "anios": [desde, hasta],
+        "indices": len(indices),
+    }
+
+
+def particiones_leidas(plan) -> dict:
+    """
+    {tabla: {años}} de las particiones que lee un plan de EXPLAIN (FORMAT JSON);
+    la partición DEFAULT aparece como PARTICION_DEFECTO
+    """
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    leidas = {}
+
+    def recorrer(nodo):
+        if isinstance(nodo, list):
+            for n in nodo:
+                recorrer(n)
+            return
+        if "Plan" in nodo:
+            recorrer(nodo["Plan"])
+            return
+        m = _RE_PARTICION.match(nodo.get("Relation Name", ""))
+        if m and m.group("tabla") in TABLAS_PARTICIONADAS:
+            anio = m.group("anio")
+            leidas.setdefault(m.group("tabla"), set()).add(anio if anio == PARTICION_DEFECTO else int(anio))
+        for hijo in nodo.get("Plans", []):
+            recorrer(hijo)
+
+    recorrer(plan)
+    return leidas
@@ -0,0 +1,83 @@
+"""
+Serialización JSON de las respuestas con orjson
+- RespuestaJSON: clase de respuesta por defecto de la app (main.py). Serializa de forma
+  nativa date/datetime, UUID, escalares y arreglos de NumPy; Decimal se convierte como lo
+  hace FastAPI (entero si no tiene decimales, float en otro caso)
+- RutaJSON: route_class de los routers. Si el endpoint no declara response_model, el dict/list
+  que retorna va directo a RespuestaJSON sin pasar por jsonable_encoder, que recorre y copia
+  todo el payload en Python antes de serializarlo
+- Los endpoints con response_model (chatbot, batch) siguen la validación normal de FastAPI
+"""
+import functools
+import inspect
+from decimal import Decimal
+from typing import Any
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from fastapi.dependencies.utils import get_typed_return_annotation
+from starlette.responses import Response
+
+OPCIONES_ORJSON = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _por_defecto(valor: Any):
+    """Tipos que orjson no serializa de forma nativa"""
+    if isinstance(valor, Decimal):
+        return int(valor) if valor.as_tuple().exponent >= 0 else float(valor)
+    # Modelos Pydantic, Row de SQLAlchemy, sets, timedelta...: como lo haría FastAPI
+    return jsonable_encoder(valor)
+
+
+def serializar(contenido: Any) -> bytes:
+    """JSON en UTF-8 (sin espacios); NaN e infinito se serializan como null"""
+    return orjson.dumps(contenido, default=_por_defecto, option=OPCIONES_ORJSON)
+
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse serializada con orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return serializar(content)
+
+
+def _sin_modelo(endpoint, response_model) -> bool:
+    """Mismo criterio de APIRoute: sin response_model explícito se infiere de la anotación de retorno"""
+    if isinstance(response_model, DefaultPlaceholder):
+        anotacion = get_typed_return_annotation(endpoint)
+        return anotacion is None or (inspect.isclass(anotacion) and issubclass(anotacion, Response))
+    return response_model is None
+
+
+def _directo(endpoint, status_code: int):
+    """Envuelve el endpoint para que su resultado se serialice con RespuestaJSON tal cual"""
+
+    def responder(valor):
+        if isinstance(valor, Response):
+            return valor
+        return RespuestaJSON(valor, status_code=status_code or 200)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def envuelto(*args, **kwargs):
+            return responder(await endpoint(*args, **kwargs))
+    else:
+        @functools.wraps(endpoint)
+        def envuelto(*args, **kwargs):
+            return responder(endpoint(*args, **kwargs))
+    return envuelto
+
+
+class RutaJSON(APIRoute):
+    """APIRoute que omite jsonable_encoder en los endpoints sin response_model"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        directo = (
+            _sin_modelo(endpoint, kwargs.get("response_model", DefaultPlaceholder(None)))
+            and isinstance(kwargs.get("response_class", DefaultPlaceholder(None)), DefaultPlaceholder)
+        )
+        super().__init__(path, _directo(endpoint, kwargs.get("status_code")) if directo else endpoint, **kwargs)
+        # include_router vuelve a crear la ruta a partir de endpoint: debe ser el original
+        self.endpoint = endpoint
@@ -0,0 +1,111 @@
+"""
+Batch - varias consultas GET en una sola petición POST
+- Cada entrada {id, route, params} se ejecuta como petición interna contra el endpoint
+  GET correspondiente, pasando por el cache de respuestas
+- Las entradas se ejecutan en paralelo, cada una con su propia conexión del pool
+  (limitadas a BATCH_CONCURRENCIA para no agotarlo)
+- Solo rutas con respuesta JSON: una entrada que responde teselas u otro formato binario
+  se marca como error 400
+- Entradas equivalentes (misma ruta y parámetros normalizados) se ejecutan una sola vez
+"""
+import asyncio
+from typing import List, Optional, Union
+from urllib.parse import parse_qsl, urlencode
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+from ..cache import normalizar_consulta
+from ..config import settings
+from ..subpeticiones import buscar_ruta, get_interno
+from ..respuestas import RutaJSON
+
+router = APIRouter(prefix="/batch", tags=["Batch"], route_class=RutaJSON)
+
+
+# ============================================
+# MODELOS PYDANTIC
+# ============================================
+
+class EntradaBatch(BaseModel):
+    id: str
+    route: str
+    params: Optional[dict[str, Union[str, int, float, bool, None]]] = None
+
+
+class ResultadoBatch(BaseModel):
+    status: int
+    datos: Optional[Union[dict, list]] = None
+    error: Optional[Union[str, list]] = None
+    cache: Optional[str] = None
+
+
+class RespuestaBatch(BaseModel):
+    resultados: dict[str, ResultadoBatch]
+    ejecutadas: int
+
+
+def _valor(v) -> str:
+    return ("true" if v else "false") if isinstance(v, bool) else str(v)
+
+
+def _consulta(entrada: EntradaBatch) -> tuple:
+    """(path completo, parámetros) de una entrada; `route` puede traer su propio query string"""
+    ruta, _, propios = entrada.route.strip().partition("?")
+    path = f"{settings.API_PREFIX}/{ruta.strip('/')}"
+    params = dict(parse_qsl(propios))
+    params.update({k: _valor(v) for k, v in (entrada.params or {}).items() if v is not None and v != ""})
+    return path, params
+
+
+async def _ejecutar(request: Request, path: str, params: dict, limite: asyncio.Semaphore) -> dict:
+    async with limite:
+        status, datos, cabeceras = await get_interno(request.app, path, params)
+    cache = dict(cabeceras).get(b"x-cache")
+    if status != 200:
+        detalle = datos.get("detail") if isinstance(datos, dict) else None
+        return {"status": status, "error": detalle or "error"}
+    if datos is None:
+        # Teselas y formatos binarios no caben en el JSON del batch
+        return {"status": 400, "error": "La respuesta no es JSON y no se puede incluir en el batch"}
+    return {"status": status, "datos": datos, "cache": cache.decode() if cache else None}
+
+
+@router.post("", response_model=RespuestaBatch, response_model_exclude_none=True)
+async def post_batch(request: Request, entradas: List[EntradaBatch]):
+    """
+    Ejecuta varias consultas GET de la API y retorna sus resultados por `id`:
+    {"resultados": {id: {"status", "datos" | "error", "cache"}}, "ejecutadas": n}.
+
+    `route` es relativa a la API (ej: "temporal/por-zona" o
+    "predicciones/comparativa/bucaramanga"). Un error en una entrada no afecta a las demás.
+    """
+    if not entradas:
+        raise HTTPException(status_code=400, detail="El batch no tiene entradas")
+    if len(entradas) > settings.BATCH_MAX_ENTRADAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.BATCH_MAX_ENTRADAS} entradas por batch (recibidas {len(entradas)})"
+        )
+    ids = [e.id for e in entradas]
+    repetidos = sorted({i for i in ids if ids.count(i) > 1})
+    if repetidos:
+        raise HTTPException(status_code=400, detail=f"Ids repetidos: {', '.join(repetidos)}")
+
+    resultados = {}
+    consultas = {}  # consulta normalizada -> (path, params, [ids])
+    for entrada in entradas:
+        path, params = _consulta(entrada)
+        if buscar_ruta(request.app, path) is None:
+            resultados[entrada.id] = {"status": 404, "error": f"Ruta GET no disponible: {entrada.route}"}
+            continue
+        clave = normalizar_consulta(path, urlencode(params).encode())
+        consultas.setdefault(clave, (path, params, []))[2].append(entrada.id)
+
+    limite = asyncio.Semaphore(settings.BATCH_CONCURRENCIA)
+    ejecutadas = await asyncio.gather(
+        *(_ejecutar(request, path, params, limite) for path, params, _ in consultas.values())
+    )
+    for (_, _, ids_consulta), resultado in zip(consultas.values(), ejecutadas):
+        for i in ids_consulta:
+            resultados[i] = resultado
+
+    return {"resultados": {i: resultados[i] for i in ids}, "ejecutadas": len(consultas)}
@@ -4,11 +4,14 @@ Configuración de Gemini, conexión a DB y funciones auxiliares
 """
 
 import os
+from decimal import Decimal, ROUND_HALF_UP
 import google.generativeai as genai
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models.municipios import MasterMunicipios
+from app.motor_columnar import motor_columnar_sync, DIMENSIONES as DIMENSIONES_MOTOR
+from app.municipios_indice import indice_municipios_sync
+from app.utils import rango_anio
 
 # ============================================
 # CONFIGURACIÓN DE GEMINI
@@ -26,34 +29,26 @@ modelo_gemini = genai.GenerativeModel('gemini-2.0-flash')
 
 def resolver_municipio(db: Session, nombre_municipio: str) -> int | None:
     """
-    Resuelve un nombre de municipio (parcial o completo) a su codigo_dane.
-    Retorna None si no encuentra coincidencia.
+    Resuelve un nombre de municipio (parcial, sin tildes o con errores menores)
+    a su codigo_dane usando el índice en memoria. Retorna None si no encuentra coincidencia.
+    Acepta coincidencias aproximadas: las respuestas nombran el municipio resuelto.
     """
-    # Búsqueda exacta (case insensitive)
-    municipio = db.query(MasterMunicipios).filter(
-        MasterMunicipios.nombre_municipio.ilike(nombre_municipio)
-    ).first()
-    
-    if municipio:
-        return municipio.codigo_dane
-    
-    # Búsqueda parcial
-    municipio = db.query(MasterMunicipios).filter(
-        MasterMunicipios.nombre_municipio.ilike(f"%{nombre_municipio}%")
-    ).first()
-    
-    if municipio:
-        return municipio.codigo_dane
-    
-    return None
+    return indice_municipios_sync().resolver(nombre_municipio, aproximado=True)
 
 
 def obtener_nombre_municipio(db: Session, codigo_dane: int) -> str:
     """Obtiene el nombre del municipio dado su codigo_dane"""
-    municipio = db.query(MasterMunicipios).filter(
-        MasterMunicipios.codigo_dane == codigo_dane
-    ).first()
-    return municipio.nombre_municipio if municipio else str(codigo_dane)
+    nombre = indice_municipios_sync().nombre(codigo_dane)
+    return nombre if nombre else str(codigo_dane)
+
+
+def filtro_anio(params: dict, anio: int, columna: str = "fecha_hecho", nombre: str = "anio") -> str:
+    """
+    Filtro sargable por año: rango semiabierto sobre la fecha (usa el índice)
+    en lugar de EXTRACT(YEAR FROM ...) = :anio. Agrega los límites a params.
+    """
+    params[f"{nombre}_desde"], params[f"{nombre}_hasta"] = rango_anio(anio)
+    return f"{columna} >= :{nombre}_desde AND {columna} < :{nombre}_hasta"
 
 
 def limpiar_valor(valor: str | None) -> str | None:
@@ -71,6 +66,16 @@ def obtener_estadisticas_generales(db: Session) -> dict:
     Obtiene estadísticas generales de toda la base de datos.
     Útil para responder preguntas generales.
     """
+    motor = motor_columnar_sync()
+    if motor:
+        fecha_inicio, fecha_fin = motor.rango_fechas()
+        return {
+            "total_eventos": len(motor),
+            "total_municipios": len(motor.dimensiones["codigo_dane"].indice),
+            "total_categorias": len(motor.dimensiones["categoria_delito"].indice),
+            "periodo": f"{fecha_inicio} a {fecha_fin}"
+        }
+    
     query = text("""
         SELECT 
             COUNT(*) as total_eventos,
@@ -153,6 +158,116 @@ def obtener_opciones_disponibles(db: Session) -> dict:
     }
 
 
+# ============================================
+# DESGLOSES EN UNA SOLA PASADA (GROUPING SETS)
+# ============================================
+
+# Dimensiones de fact_seguridad disponibles para desglosar (alias -> expresión SQL)
+DIMENSIONES = {
+    "codigo_dane": "codigo_dane",
+    "categoria_delito": "categoria_delito",
+    "modalidad_especifica": "modalidad_especifica",
+    "arma_medio": "arma_medio",
+    "clase_sitio": "clase_sitio",
+    "genero": "genero",
+    "grupo_etario": "grupo_etario",
+    "zona_hecho": "zona_hecho",
+    "anio": "EXTRACT(YEAR FROM fecha_hecho)::int",
+    "mes": "EXTRACT(MONTH FROM fecha_hecho)::int",
+    "hora": "EXTRACT(HOUR FROM fecha_hecho::timestamp)::int",
+    "fecha": "fecha_hecho::date",
+}
+
+
+def consultar_desgloses(
+    db: Session,
+    where_sql: str,
+    params: dict,
+    desgloses: dict,
+    agregados: dict = None,
+    filtros: dict = None
+) -> dict:
+    """
+    Calcula varios desgloses de fact_seguridad con un único recorrido
+    (GROUP BY GROUPING SETS) en lugar de una consulta por desglose.
+
+    desgloses: {nombre: (dimension, ...)} con dimensiones de DIMENSIONES;
+               una tupla vacía corresponde al total general.
+    agregados: {alias: expresión SQL}, por defecto {"total": "COUNT(*)"}.
+    filtros:   los mismos filtros de where_sql como argumentos de MotorColumnar.filtrar;
+               si se indican y el motor columnar está activo, se calcula en memoria.
+
+    Retorna {nombre: [fila, ...]} con cada fila como dict de dimensiones y
+    agregados. Los valores NULL de una dimensión aparecen como su propio grupo;
+    ordenar, limitar y descartar nulos queda a cargo de quien llama.
+    """
+    motor = motor_columnar_sync() if filtros is not None and agregados is None else None
+    if motor and all(d in DIMENSIONES_MOTOR for dims in desgloses.values() for d in dims):
+        mascara = motor.filtrar(**filtros)
+        return {
+            nombre: [
+                {**{d: getattr(f, d) for d in dims}, "total": f.total}
+                for f in motor.agrupar(dims, mascara, medida="eventos", incluir_nulos=True)
+            ]
+            for nombre, dims in desgloses.items()
+        }
+
+    agregados = agregados or {"total": "COUNT(*)"}
+    dimensiones = list(dict.fromkeys(d for dims in desgloses.values() for d in dims))
+    n = len(dimensiones)
+
+    # GROUPING(d1, ..., dn) devuelve un bit en 1 por cada dimensión no agrupada
+    nombres_por_mascara = {}
+    conjuntos = {}
+    for nombre, dims in desgloses.items():
+        mascara = sum(1 << (n - 1 - i) for i, d in enumerate(dimensiones) if d not in dims)
+        nombres_por_mascara.setdefault(mascara, []).append(nombre)
+        conjuntos[mascara] = "(" + ", ".join(DIMENSIONES[d] for d in dims) + ")"
+
+    columnas = [f"{DIMENSIONES[d]} AS {d}" for d in dimensiones]
+    columnas += [f"{expr} AS {alias}" for alias, expr in agregados.items()]
+    if dimensiones:
+        columnas.append("GROUPING(" + ", ".join(DIMENSIONES[d] for d in dimensiones) + ") AS conjunto")
+    else:
+        columnas.append("0 AS conjunto")
+
+    query = text(f"""
+        SELECT {", ".join(columnas)}
+        FROM fact_seguridad
+        WHERE {where_sql}
+        GROUP BY GROUPING SETS ({", ".join(conjuntos.values())})
+    """)
+
+    resultado = {nombre: [] for nombre in desgloses}
+    for r in db.execute(query, params).mappings():
+        for nombre in nombres_por_mascara[r["conjunto"]]:
+            fila = {d: r[d] for d in desgloses[nombre]}
+            fila.update({alias: r[alias] for alias in agregados})
+            resultado[nombre].append(fila)
+    return resultado
+
+
+def ordenar(filas: list, clave: str = "total", descendente: bool = True, limite: int = None) -> list:
+    """ORDER BY `clave` (los NULL al final en orden ascendente, como PostgreSQL) y LIMIT"""
+    if descendente:
+        filas = sorted(filas, key=lambda f: f[clave], reverse=True)
+    else:
+        filas = sorted(filas, key=lambda f: (f[clave] is None, f[clave] or 0))
+    return filas[:limite] if limite else filas
+
+
+def porcentaje(parte: int, total: int) -> float:
+    """ROUND(parte::numeric * 100.0 / total, 2) de PostgreSQL (redondeo hacia afuera en .5)"""
+    if not total:
+        return 0.0
+    return float((Decimal(parte) * 100 / Decimal(total)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+def contar(filas: list, dimension: str, valor: str) -> int:
+    """Suma de `total` donde UPPER(dimension) = valor (equivale a COUNT(*) FILTER)"""
+    return sum(r["total"] for r in filas if (r[dimension] or "").upper() == valor)
+
+
 # ============================================
 # PROMPT DE SISTEMA PARA GEMINI
 # ============================================
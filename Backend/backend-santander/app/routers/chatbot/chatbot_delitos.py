@@ -5,7 +5,9 @@ Consultas por categoría de delito, modalidad específica, arma/medio utilizado,
 
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from .chatbot_base import resolver_municipio, obtener_nombre_municipio
+from .chatbot_base import (
+    resolver_municipio, obtener_nombre_municipio, consultar_desgloses, ordenar, contar, filtro_anio
+)
 
 
 def obtener_datos_por_categoria(
@@ -27,58 +29,26 @@ def obtener_datos_por_categoria(
             params["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     where_sql = " AND ".join(where_clauses)
     
-    # Estadísticas generales
-    query_stats = text(f"""
-        SELECT 
-            COUNT(*) as total,
-            COUNT(DISTINCT codigo_dane) as municipios_afectados,
-            MIN(fecha_hecho) as primer_evento,
-            MAX(fecha_hecho) as ultimo_evento
-        FROM fact_seguridad
-        WHERE {where_sql}
-    """)
-    
-    stats = db.execute(query_stats, params).fetchone()
-    
-    # Modalidades más comunes
-    query_modalidad = text(f"""
-        SELECT modalidad_especifica, COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql} AND modalidad_especifica IS NOT NULL
-        GROUP BY modalidad_especifica
-        ORDER BY total DESC
-        LIMIT 10
-    """)
-    
-    modalidades = db.execute(query_modalidad, params).fetchall()
-    
-    # Armas más usadas
-    query_armas = text(f"""
-        SELECT arma_medio, COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql} AND arma_medio IS NOT NULL
-        GROUP BY arma_medio
-        ORDER BY total DESC
-        LIMIT 10
-    """)
-    
-    armas = db.execute(query_armas, params).fetchall()
-    
-    # Tendencia anual
-    query_tendencia = text(f"""
-        SELECT EXTRACT(YEAR FROM fecha_hecho)::int as anio, COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY anio
-        ORDER BY anio
-    """)
-    
-    tendencia = db.execute(query_tendencia, params).fetchall()
+    # Estadísticas, modalidades, armas y tendencia anual en una pasada
+    datos = consultar_desgloses(db, where_sql, params, {
+        "general": (),
+        "modalidades": ("modalidad_especifica",),
+        "armas": ("arma_medio",),
+        "tendencia": ("anio",),
+    }, {
+        "total": "COUNT(*)",
+        "municipios_afectados": "COUNT(DISTINCT codigo_dane)",
+        "primer_evento": "MIN(fecha_hecho)",
+        "ultimo_evento": "MAX(fecha_hecho)",
+    })
+    stats = datos["general"][0]
+    modalidades = ordenar([r for r in datos["modalidades"] if r["modalidad_especifica"] is not None], limite=10)
+    armas = ordenar([r for r in datos["armas"] if r["arma_medio"] is not None], limite=10)
+    tendencia = ordenar(datos["tendencia"], "anio", descendente=False)
     
     return {
         "categoria": categoria,
@@ -87,18 +57,18 @@ def obtener_datos_por_categoria(
             "anio": anio
         },
         "estadisticas": {
-            "total_eventos": stats.total,
-            "municipios_afectados": stats.municipios_afectados,
-            "periodo": f"{stats.primer_evento} a {stats.ultimo_evento}" if stats.primer_evento else "Sin datos"
+            "total_eventos": stats["total"],
+            "municipios_afectados": stats["municipios_afectados"],
+            "periodo": f"{stats['primer_evento']} a {stats['ultimo_evento']}" if stats["primer_evento"] else "Sin datos"
         },
         "modalidades_frecuentes": [
-            {"modalidad": r[0], "total": r[1]} for r in modalidades
+            {"modalidad": r["modalidad_especifica"], "total": r["total"]} for r in modalidades
         ],
         "armas_medios_frecuentes": [
-            {"arma_medio": r[0], "total": r[1]} for r in armas
+            {"arma_medio": r["arma_medio"], "total": r["total"]} for r in armas
         ],
         "tendencia_anual": [
-            {"anio": r[0], "total": r[1]} for r in tendencia
+            {"anio": r["anio"], "total": r["total"]} for r in tendencia
         ]
     }
 
@@ -122,37 +92,17 @@ def obtener_datos_por_modalidad(
             params["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     where_sql = " AND ".join(where_clauses)
     
-    # Estadísticas
-    query = text(f"""
-        SELECT 
-            modalidad_especifica,
-            categoria_delito,
-            COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY modalidad_especifica, categoria_delito
-        ORDER BY total DESC
-    """)
-    
-    results = db.execute(query, params).fetchall()
-    
-    # Municipios más afectados
-    query_mun = text(f"""
-        SELECT mm.nombre_municipio, COUNT(*) as total
-        FROM fact_seguridad fs
-        JOIN master_municipios mm ON fs.codigo_dane = mm.codigo_dane
-        WHERE {where_sql.replace('codigo_dane', 'fs.codigo_dane')}
-        GROUP BY mm.nombre_municipio
-        ORDER BY total DESC
-        LIMIT 10
-    """)
-    
-    municipios = db.execute(query_mun, params).fetchall()
+    # Por modalidad/categoría y municipios más afectados en una pasada
+    datos = consultar_desgloses(db, where_sql, params, {
+        "resultados": ("modalidad_especifica", "categoria_delito"),
+        "municipios": ("codigo_dane",),
+    })
+    results = ordenar(datos["resultados"])
+    municipios = ordenar([r for r in datos["municipios"] if r["codigo_dane"] is not None], limite=10)
     
     return {
         "modalidad_buscada": modalidad,
@@ -162,15 +112,15 @@ def obtener_datos_por_modalidad(
         },
         "resultados": [
             {
-                "modalidad": r[0],
-                "categoria": r[1],
-                "total": r[2]
+                "modalidad": r["modalidad_especifica"],
+                "categoria": r["categoria_delito"],
+                "total": r["total"]
             } for r in results
         ],
         "municipios_afectados": [
-            {"municipio": r[0], "total": r[1]} for r in municipios
+            {"municipio": obtener_nombre_municipio(db, r["codigo_dane"]), "total": r["total"]} for r in municipios
         ],
-        "total_general": sum(r[2] for r in results)
+        "total_general": sum(r["total"] for r in results)
     }
 
 
@@ -193,44 +143,19 @@ def obtener_datos_por_arma(
             params["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     where_sql = " AND ".join(where_clauses)
     
-    # Por categoría de delito
-    query_cat = text(f"""
-        SELECT categoria_delito, COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY categoria_delito
-        ORDER BY total DESC
-    """)
-    
-    categorias = db.execute(query_cat, params).fetchall()
-    
-    # Tendencia
-    query_tendencia = text(f"""
-        SELECT EXTRACT(YEAR FROM fecha_hecho)::int as anio, COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY anio
-        ORDER BY anio
-    """)
-    
-    tendencia = db.execute(query_tendencia, params).fetchall()
-    
-    # Perfil víctimas
-    query_perfil = text(f"""
-        SELECT genero, grupo_etario, COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql} AND genero IS NOT NULL
-        GROUP BY genero, grupo_etario
-        ORDER BY total DESC
-        LIMIT 5
-    """)
-    
-    perfil = db.execute(query_perfil, params).fetchall()
+    # Por categoría, tendencia anual y perfil de víctimas en una pasada
+    datos = consultar_desgloses(db, where_sql, params, {
+        "categorias": ("categoria_delito",),
+        "tendencia": ("anio",),
+        "perfil": ("genero", "grupo_etario"),
+    })
+    categorias = ordenar(datos["categorias"])
+    tendencia = ordenar(datos["tendencia"], "anio", descendente=False)
+    perfil = ordenar([r for r in datos["perfil"] if r["genero"] is not None], limite=5)
     
     return {
         "arma_buscada": arma,
@@ -239,15 +164,15 @@ def obtener_datos_por_arma(
             "anio": anio
         },
         "por_categoria": [
-            {"categoria": r[0], "total": r[1]} for r in categorias
+            {"categoria": r["categoria_delito"], "total": r["total"]} for r in categorias
         ],
         "tendencia_anual": [
-            {"anio": r[0], "total": r[1]} for r in tendencia
+            {"anio": r["anio"], "total": r["total"]} for r in tendencia
         ],
         "perfil_victimas": [
-            {"genero": r[0], "grupo_etario": r[1], "total": r[2]} for r in perfil
+            {"genero": r["genero"], "grupo_etario": r["grupo_etario"], "total": r["total"]} for r in perfil
         ],
-        "total_general": sum(r[1] for r in categorias)
+        "total_general": sum(r["total"] for r in categorias)
     }
 
 
@@ -270,38 +195,17 @@ def obtener_datos_por_sitio(
             params["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     where_sql = " AND ".join(where_clauses)
     
-    # Por categoría
-    query = text(f"""
-        SELECT 
-            clase_sitio,
-            categoria_delito,
-            COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY clase_sitio, categoria_delito
-        ORDER BY total DESC
-    """)
-    
-    results = db.execute(query, params).fetchall()
-    
-    # Horarios si aplica
-    query_hora = text(f"""
-        SELECT 
-            EXTRACT(HOUR FROM fecha_hecho)::int as hora,
-            COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY hora
-        ORDER BY total DESC
-        LIMIT 5
-    """)
-    
-    horas = db.execute(query_hora, params).fetchall()
+    # Por sitio/categoría y horas pico en una pasada
+    datos = consultar_desgloses(db, where_sql, params, {
+        "resultados": ("clase_sitio", "categoria_delito"),
+        "horas": ("hora",),
+    })
+    results = ordenar(datos["resultados"])
+    horas = ordenar(datos["horas"], limite=5)
     
     return {
         "sitio_buscado": clase_sitio,
@@ -311,15 +215,15 @@ def obtener_datos_por_sitio(
         },
         "resultados": [
             {
-                "clase_sitio": r[0],
-                "categoria": r[1],
-                "total": r[2]
+                "clase_sitio": r["clase_sitio"],
+                "categoria": r["categoria_delito"],
+                "total": r["total"]
             } for r in results
         ],
         "horas_pico": [
-            {"hora": r[0], "total": r[1]} for r in horas
+            {"hora": r["hora"], "total": r["total"]} for r in horas
         ],
-        "total_general": sum(r[2] for r in results)
+        "total_general": sum(r["total"] for r in results)
     }
 
 
@@ -341,8 +245,7 @@ def obtener_ranking_categorias(
             params["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     where_sql = " AND ".join(where_clauses)
     
@@ -400,8 +303,7 @@ def obtener_ranking_modalidades(
             params["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     where_sql = " AND ".join(where_clauses)
     
@@ -458,8 +360,7 @@ def obtener_ranking_armas(
             params["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     where_sql = " AND ".join(where_clauses)
     
@@ -518,8 +419,7 @@ def obtener_ranking_sitios(
             params["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     where_sql = " AND ".join(where_clauses)
     
@@ -562,43 +462,44 @@ def comparar_categorias(
 ) -> dict:
     """
     Compara múltiples categorías de delito.
+    Todas las categorías se calculan en una sola consulta.
     """
-    resultados = []
+    where_clauses = ["UPPER(categoria_delito) IN :categorias"]
+    params = {"categorias": tuple(c.upper() for c in categorias) or ("",)}
+    filtros = {"categoria_delito": list(params["categorias"])}
+    
+    if municipio:
+        codigo_dane = resolver_municipio(db, municipio)
+        if codigo_dane:
+            where_clauses.append("codigo_dane = :codigo_dane")
+            params["codigo_dane"] = filtros["codigo_dane"] = codigo_dane
     
+    if anio:
+        where_clauses.append(filtro_anio(params, anio))
+        filtros["anio"] = anio
+    
+    where_sql = " AND ".join(where_clauses)
+    
+    datos = consultar_desgloses(db, where_sql, params, {
+        "generos": ("categoria_delito", "genero"),
+        "zonas": ("categoria_delito", "zona_hecho"),
+    }, filtros=filtros)
+    
+    resultados = []
     for categoria in categorias:
-        where_clauses = ["UPPER(categoria_delito) = UPPER(:categoria)"]
-        params = {"categoria": categoria}
-        
-        if municipio:
-            codigo_dane = resolver_municipio(db, municipio)
-            if codigo_dane:
-                where_clauses.append("codigo_dane = :codigo_dane")
-                params["codigo_dane"] = codigo_dane
-        
-        if anio:
-            where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-            params["anio"] = anio
-        
-        where_sql = " AND ".join(where_clauses)
-        
-        query = text(f"""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(*) FILTER (WHERE UPPER(genero) = 'FEMENINO') as femenino,
-                COUNT(*) FILTER (WHERE UPPER(genero) = 'MASCULINO') as masculino,
-                COUNT(*) FILTER (WHERE UPPER(zona) = 'URBANA') as urbano
-            FROM fact_seguridad
-            WHERE {where_sql}
-        """)
-        
-        stats = db.execute(query, params).fetchone()
+        generos = [r for r in datos["generos"] if r["categoria_delito"].upper() == categoria.upper()]
+        zonas = [r for r in datos["zonas"] if r["categoria_delito"].upper() == categoria.upper()]
+        total = sum(r["total"] for r in generos)
+        femenino = contar(generos, "genero", "FEMENINO")
+        masculino = contar(generos, "genero", "MASCULINO")
+        urbano = contar(zonas, "zona_hecho", "URBANA")
         
         resultados.append({
             "categoria": categoria,
-            "total": stats.total,
-            "porcentaje_femenino": round(stats.femenino * 100 / stats.total, 2) if stats.total > 0 else 0,
-            "porcentaje_masculino": round(stats.masculino * 100 / stats.total, 2) if stats.total > 0 else 0,
-            "porcentaje_urbano": round(stats.urbano * 100 / stats.total, 2) if stats.total > 0 else 0
+            "total": total,
+            "porcentaje_femenino": round(femenino * 100 / total, 2) if total > 0 else 0,
+            "porcentaje_masculino": round(masculino * 100 / total, 2) if total > 0 else 0,
+            "porcentaje_urbano": round(urbano * 100 / total, 2) if total > 0 else 0
         })
     
     return {
@@ -5,7 +5,9 @@ Consultas por municipio, rankings, comparaciones entre municipios
 
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from .chatbot_base import resolver_municipio, obtener_nombre_municipio
+from .chatbot_base import (
+    resolver_municipio, obtener_nombre_municipio, consultar_desgloses, ordenar, filtro_anio
+)
 
 
 def obtener_datos_municipio(
@@ -29,8 +31,7 @@ def obtener_datos_municipio(
     params = {"codigo_dane": codigo_dane}
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     if categoria:
         where_clauses.append("UPPER(categoria_delito) = UPPER(:categoria)")
@@ -38,45 +39,18 @@ def obtener_datos_municipio(
     
     where_sql = " AND ".join(where_clauses)
     
-    # Estadísticas generales
-    query = text(f"""
-        SELECT 
-            COUNT(*) as total_eventos,
-            COUNT(DISTINCT categoria_delito) as categorias_afectadas,
-            MIN(fecha_hecho) as primer_evento,
-            MAX(fecha_hecho) as ultimo_evento
-        FROM fact_seguridad
-        WHERE {where_sql}
-    """)
-    
-    stats = db.execute(query, params).fetchone()
-    
-    # Distribución por categoría
-    query_categorias = text(f"""
-        SELECT 
-            categoria_delito,
-            COUNT(*) as cantidad
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY categoria_delito
-        ORDER BY cantidad DESC
-    """)
-    
-    categorias = db.execute(query_categorias, params).fetchall()
-    
-    # Distribución por año (si no hay filtro de año)
-    tendencia = []
+    # Estadísticas, distribución por categoría y por año (si no hay filtro de año) en una pasada
+    desgloses = {"general": (), "categorias": ("categoria_delito",)}
     if not anio:
-        query_tendencia = text(f"""
-            SELECT 
-                EXTRACT(YEAR FROM fecha_hecho)::int as anio,
-                COUNT(*) as cantidad
-            FROM fact_seguridad
-            WHERE {where_sql}
-            GROUP BY anio
-            ORDER BY anio
-        """)
-        tendencia = db.execute(query_tendencia, params).fetchall()
+        desgloses["tendencia"] = ("anio",)
+    datos = consultar_desgloses(db, where_sql, params, desgloses, {
+        "total": "COUNT(*)",
+        "primer_evento": "MIN(fecha_hecho)",
+        "ultimo_evento": "MAX(fecha_hecho)",
+    })
+    stats = datos["general"][0]
+    categorias = ordenar(datos["categorias"])
+    tendencia = ordenar(datos.get("tendencia", []), "anio", descendente=False)
     
     return {
         "municipio": nombre_municipio,
@@ -86,15 +60,15 @@ def obtener_datos_municipio(
             "categoria": categoria
         },
         "estadisticas": {
-            "total_eventos": stats.total_eventos,
-            "categorias_afectadas": stats.categorias_afectadas,
-            "periodo": f"{stats.primer_evento} a {stats.ultimo_evento}" if stats.primer_evento else "Sin datos"
+            "total_eventos": stats["total"],
+            "categorias_afectadas": sum(1 for r in categorias if r["categoria_delito"] is not None),
+            "periodo": f"{stats['primer_evento']} a {stats['ultimo_evento']}" if stats["primer_evento"] else "Sin datos"
         },
         "distribucion_categorias": [
-            {"categoria": r[0], "cantidad": r[1]} for r in categorias
+            {"categoria": r["categoria_delito"], "cantidad": r["total"]} for r in categorias
         ],
         "tendencia_anual": [
-            {"anio": r[0], "cantidad": r[1]} for r in tendencia
+            {"anio": r["anio"], "cantidad": r["total"]} for r in tendencia
         ] if tendencia else None
     }
 
@@ -117,8 +91,7 @@ def obtener_ranking_municipios(
         params["categoria"] = categoria
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fs.fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio, "fs.fecha_hecho"))
     
     where_sql = " AND ".join(where_clauses)
     order_dir = "DESC" if orden.lower() == "desc" else "ASC"
@@ -175,8 +148,7 @@ def obtener_ranking_por_tasa(
         params["categoria"] = categoria
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fs.fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio, "fs.fecha_hecho"))
     
     where_sql = " AND ".join(where_clauses)
     order_dir = "DESC" if orden.lower() == "desc" else "ASC"
@@ -233,67 +205,65 @@ def comparar_municipios(
 ) -> dict:
     """
     Compara estadísticas entre múltiples municipios.
+    Totales y distribución por categoría de todos los municipios en una sola consulta.
     """
-    resultados = []
+    codigos = [(municipio, resolver_municipio(db, municipio)) for municipio in municipios]
+    encontrados = list({c for _, c in codigos if c})
     
-    for municipio in municipios:
-        codigo_dane = resolver_municipio(db, municipio)
-        if not codigo_dane:
-            resultados.append({
-                "municipio": municipio,
-                "error": "No encontrado"
-            })
-            continue
-        
-        nombre = obtener_nombre_municipio(db, codigo_dane)
-        
-        where_clauses = ["fs.codigo_dane = :codigo_dane"]
-        params = {"codigo_dane": codigo_dane}
+    datos = {"totales": [], "categorias": []}
+    poblaciones = {}
+    if encontrados:
+        where_clauses = ["codigo_dane IN :codigos"]
+        params = {"codigos": tuple(encontrados)}
+        filtros = {"codigo_dane": encontrados}
         
         if anio:
-            where_clauses.append("EXTRACT(YEAR FROM fs.fecha_hecho) = :anio")
-            params["anio"] = anio
+            where_clauses.append(filtro_anio(params, anio))
+            filtros["anio"] = anio
         
         if categoria:
-            where_clauses.append("UPPER(fs.categoria_delito) = UPPER(:categoria)")
-            params["categoria"] = categoria
+            where_clauses.append("UPPER(categoria_delito) = UPPER(:categoria)")
+            params["categoria"] = filtros["categoria_delito"] = categoria
         
         where_sql = " AND ".join(where_clauses)
         
-        query = text(f"""
-            SELECT 
-                COUNT(*) as total_eventos,
-                md.poblacion_total,
-                CASE 
-                    WHEN md.poblacion_total > 0 
-                    THEN ROUND((COUNT(*)::numeric / md.poblacion_total * 100000), 2)
-                    ELSE 0 
-                END as tasa_por_100k
-            FROM fact_seguridad fs
-            LEFT JOIN master_demografia md ON fs.codigo_dane = md.codigo_dane
-            WHERE {where_sql}
-            GROUP BY md.poblacion_total
-        """)
-        
-        stats = db.execute(query, params).fetchone()
+        datos = consultar_desgloses(db, where_sql, params, {
+            "totales": ("codigo_dane",),
+            "categorias": ("codigo_dane", "categoria_delito"),
+        }, filtros=filtros)
         
-        # Distribución por categoría
-        query_cat = text(f"""
-            SELECT categoria_delito, COUNT(*) as cantidad
-            FROM fact_seguridad fs
-            WHERE {where_sql}
-            GROUP BY categoria_delito
-            ORDER BY cantidad DESC
+        # Población del año consultado o, sin año, la proyección más reciente
+        query_poblacion = text(f"""
+            SELECT DISTINCT ON (codigo_dane) codigo_dane, poblacion_total
+            FROM master_demografia
+            WHERE codigo_dane IN :codigos {"AND anio = :anio" if anio else ""}
+            ORDER BY codigo_dane, anio DESC
         """)
-        categorias = db.execute(query_cat, params).fetchall()
+        poblaciones = dict(db.execute(query_poblacion, {"codigos": params["codigos"], "anio": anio}).fetchall())
+    
+    totales = {r["codigo_dane"]: r["total"] for r in datos["totales"]}
+    distribuciones = {}
+    for r in ordenar(datos["categorias"]):
+        distribuciones.setdefault(r["codigo_dane"], {})[r["categoria_delito"]] = r["total"]
+    
+    resultados = []
+    for municipio, codigo_dane in codigos:
+        if not codigo_dane:
+            resultados.append({
+                "municipio": municipio,
+                "error": "No encontrado"
+            })
+            continue
         
+        total_eventos = totales.get(codigo_dane, 0)
+        poblacion = poblaciones.get(codigo_dane) if total_eventos else None
         resultados.append({
-            "municipio": nombre,
+            "municipio": obtener_nombre_municipio(db, codigo_dane),
             "codigo_dane": codigo_dane,
-            "total_eventos": stats.total_eventos if stats else 0,
-            "poblacion": stats.poblacion_total if stats else None,
-            "tasa_por_100k": float(stats.tasa_por_100k) if stats and stats.tasa_por_100k else 0,
-            "distribucion": {r[0]: r[1] for r in categorias}
+            "total_eventos": total_eventos,
+            "poblacion": poblacion,
+            "tasa_por_100k": round(total_eventos / poblacion * 100000, 2) if poblacion else 0,
+            "distribucion": distribuciones.get(codigo_dane, {})
         })
     
     return {
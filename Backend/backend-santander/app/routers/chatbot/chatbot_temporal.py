@@ -3,9 +3,13 @@ Módulo de Consultas Temporales del Chatbot
 Consultas por año, mes, día de semana, rangos de fechas, tendencias
 """
 
+from datetime import date, timedelta
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from .chatbot_base import resolver_municipio, obtener_nombre_municipio
+from app.calendario import calendario_disponible_sync
+from .chatbot_base import (
+    resolver_municipio, obtener_nombre_municipio, consultar_desgloses, ordenar, filtro_anio
+)
 
 
 # Mapeo de nombres de días y meses en español
@@ -59,12 +63,12 @@ def obtener_tendencia_anual(
         params["categoria"] = categoria
     
     if anio_inicio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) >= :anio_inicio")
-        params["anio_inicio"] = anio_inicio
+        where_clauses.append("fecha_hecho >= :fecha_desde")
+        params["fecha_desde"] = date(anio_inicio, 1, 1)
     
     if anio_fin:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) <= :anio_fin")
-        params["anio_fin"] = anio_fin
+        where_clauses.append("fecha_hecho < :fecha_hasta")
+        params["fecha_hasta"] = date(anio_fin + 1, 1, 1)
     
     where_sql = " AND ".join(where_clauses)
     
@@ -122,8 +126,7 @@ def obtener_datos_por_mes(
     params = {}
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     if municipio:
         codigo_dane = resolver_municipio(db, municipio)
@@ -182,8 +185,7 @@ def obtener_datos_por_dia_semana(
     params = {}
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     if municipio:
         codigo_dane = resolver_municipio(db, municipio)
@@ -197,16 +199,28 @@ def obtener_datos_por_dia_semana(
     
     where_sql = " AND ".join(where_clauses)
     
-    # EXTRACT(DOW) en PostgreSQL: 0=Domingo, 1=Lunes, ..., 6=Sábado
-    query = text(f"""
-        SELECT 
-            EXTRACT(DOW FROM fecha_hecho)::int as dia_semana,
-            COUNT(*) as total_eventos
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY dia_semana
-        ORDER BY dia_semana
-    """)
+    # dim_fecha.dia_semana y EXTRACT(DOW) en PostgreSQL: 0=Domingo, 1=Lunes, ..., 6=Sábado
+    if calendario_disponible_sync():
+        query = text(f"""
+            SELECT 
+                d.dia_semana,
+                COUNT(*) as total_eventos
+            FROM fact_seguridad
+            JOIN dim_fecha d ON d.fecha = fecha_hecho
+            WHERE {where_sql}
+            GROUP BY d.dia_semana
+            ORDER BY d.dia_semana
+        """)
+    else:
+        query = text(f"""
+            SELECT 
+                EXTRACT(DOW FROM fecha_hecho)::int as dia_semana,
+                COUNT(*) as total_eventos
+            FROM fact_seguridad
+            WHERE {where_sql}
+            GROUP BY dia_semana
+            ORDER BY dia_semana
+        """)
     
     results = db.execute(query, params).fetchall()
     
@@ -272,41 +286,18 @@ def obtener_datos_rango_fechas(
     
     where_sql = " AND ".join(where_clauses)
     
-    # Estadísticas generales
-    query_stats = text(f"""
-        SELECT 
-            COUNT(*) as total_eventos,
-            COUNT(DISTINCT codigo_dane) as municipios_afectados,
-            COUNT(DISTINCT categoria_delito) as categorias
-        FROM fact_seguridad
-        WHERE {where_sql}
-    """)
-    
-    stats = db.execute(query_stats, params).fetchone()
-    
-    # Distribución por categoría
-    query_cat = text(f"""
-        SELECT categoria_delito, COUNT(*) as cantidad
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY categoria_delito
-        ORDER BY cantidad DESC
-    """)
-    
-    categorias = db.execute(query_cat, params).fetchall()
-    
-    # Distribución diaria
-    query_diario = text(f"""
-        SELECT 
-            fecha_hecho::date as fecha,
-            COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY fecha_hecho::date
-        ORDER BY fecha
-    """)
-    
-    diario = db.execute(query_diario, params).fetchall()
+    # Estadísticas, distribución por categoría y serie diaria en una pasada
+    datos = consultar_desgloses(db, where_sql, params, {
+        "general": (),
+        "categorias": ("categoria_delito",),
+        "diario": ("fecha",),
+    }, {
+        "total": "COUNT(*)",
+        "municipios_afectados": "COUNT(DISTINCT codigo_dane)",
+    })
+    stats = datos["general"][0]
+    categorias = ordenar(datos["categorias"])
+    diario = ordenar(datos["diario"], "fecha", descendente=False)
     
     return {
         "rango": {
@@ -318,15 +309,15 @@ def obtener_datos_rango_fechas(
             "categoria": categoria
         },
         "estadisticas": {
-            "total_eventos": stats.total_eventos,
-            "municipios_afectados": stats.municipios_afectados,
-            "categorias_registradas": stats.categorias
+            "total_eventos": stats["total"],
+            "municipios_afectados": stats["municipios_afectados"],
+            "categorias_registradas": sum(1 for r in categorias if r["categoria_delito"] is not None)
         },
         "distribucion_categorias": [
-            {"categoria": r[0], "cantidad": r[1]} for r in categorias
+            {"categoria": r["categoria_delito"], "cantidad": r["total"]} for r in categorias
         ],
         "serie_diaria": [
-            {"fecha": str(r[0]), "total": r[1]} for r in diario
+            {"fecha": str(r["fecha"]), "total": r["total"]} for r in diario
         ]
     }
 
@@ -340,8 +331,8 @@ def obtener_datos_fecha_especifica(
     Obtiene todos los eventos de una fecha específica.
     Formato: YYYY-MM-DD
     """
-    where_clauses = ["fecha_hecho::date = :fecha"]
-    params = {"fecha": fecha}
+    where_clauses = ["fecha_hecho >= :fecha", "fecha_hecho < :fecha_siguiente"]
+    params = {"fecha": fecha, "fecha_siguiente": date.fromisoformat(fecha) + timedelta(days=1)}
     
     if municipio:
         codigo_dane = resolver_municipio(db, municipio)
@@ -351,36 +342,15 @@ def obtener_datos_fecha_especifica(
     
     where_sql = " AND ".join(where_clauses)
     
-    # Total y distribución
-    query = text(f"""
-        SELECT 
-            COUNT(*) as total,
-            categoria_delito,
-            COUNT(*) as por_categoria
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY categoria_delito
-        ORDER BY por_categoria DESC
-    """)
+    # Distribución por categoría y municipios más afectados en una pasada
+    datos = consultar_desgloses(db, where_sql, params, {
+        "categorias": ("categoria_delito",),
+        "municipios": ("codigo_dane",),
+    })
+    categorias = ordenar(datos["categorias"])
+    municipios = ordenar([r for r in datos["municipios"] if r["codigo_dane"] is not None], limite=10)
     
-    results = db.execute(query, params).fetchall()
-    
-    # Municipios afectados
-    query_mun = text(f"""
-        SELECT 
-            mm.nombre_municipio,
-            COUNT(*) as total
-        FROM fact_seguridad fs
-        JOIN master_municipios mm ON fs.codigo_dane = mm.codigo_dane
-        WHERE {where_sql.replace('codigo_dane', 'fs.codigo_dane')}
-        GROUP BY mm.nombre_municipio
-        ORDER BY total DESC
-        LIMIT 10
-    """)
-    
-    municipios = db.execute(query_mun, params).fetchall()
-    
-    total = sum(r[2] for r in results) if results else 0
+    total = sum(r["total"] for r in categorias)
     
     return {
         "fecha": fecha,
@@ -389,10 +359,10 @@ def obtener_datos_fecha_especifica(
         },
         "total_eventos": total,
         "distribucion_categorias": [
-            {"categoria": r[1], "cantidad": r[2]} for r in results
+            {"categoria": r["categoria_delito"], "cantidad": r["total"]} for r in categorias
         ],
         "municipios_mas_afectados": [
-            {"municipio": r[0], "total": r[1]} for r in municipios
+            {"municipio": obtener_nombre_municipio(db, r["codigo_dane"]), "total": r["total"]} for r in municipios
         ]
     }
 
@@ -407,48 +377,40 @@ def obtener_comparativa_periodos(
     """
     Compara dos años o períodos.
     """
-    resultados = {}
+    params = {}
+    where_clauses = [
+        f"(({filtro_anio(params, anio_1, nombre='anio_1')}) OR ({filtro_anio(params, anio_2, nombre='anio_2')}))"
+    ]
+    
+    if municipio:
+        codigo_dane = resolver_municipio(db, municipio)
+        if codigo_dane:
+            where_clauses.append("codigo_dane = :codigo_dane")
+            params["codigo_dane"] = codigo_dane
+    
+    if categoria:
+        where_clauses.append("UPPER(categoria_delito) = UPPER(:categoria)")
+        params["categoria"] = categoria
+    
+    where_sql = " AND ".join(where_clauses)
+    
+    # Ambos años, en total y por categoría, en una sola consulta
+    datos = consultar_desgloses(db, where_sql, params, {
+        "totales": ("anio",),
+        "categorias": ("anio", "categoria_delito"),
+    }, {
+        "total": "COUNT(*)",
+        "municipios": "COUNT(DISTINCT codigo_dane)",
+    })
+    totales = {r["anio"]: r for r in datos["totales"]}
     
+    resultados = {}
     for anio in [anio_1, anio_2]:
-        where_clauses = ["EXTRACT(YEAR FROM fecha_hecho) = :anio"]
-        params = {"anio": anio}
-        
-        if municipio:
-            codigo_dane = resolver_municipio(db, municipio)
-            if codigo_dane:
-                where_clauses.append("codigo_dane = :codigo_dane")
-                params["codigo_dane"] = codigo_dane
-        
-        if categoria:
-            where_clauses.append("UPPER(categoria_delito) = UPPER(:categoria)")
-            params["categoria"] = categoria
-        
-        where_sql = " AND ".join(where_clauses)
-        
-        query = text(f"""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(DISTINCT codigo_dane) as municipios
-            FROM fact_seguridad
-            WHERE {where_sql}
-        """)
-        
-        stats = db.execute(query, params).fetchone()
-        
-        # Por categoría
-        query_cat = text(f"""
-            SELECT categoria_delito, COUNT(*) as cantidad
-            FROM fact_seguridad
-            WHERE {where_sql}
-            GROUP BY categoria_delito
-        """)
-        
-        categorias = db.execute(query_cat, params).fetchall()
-        
+        stats = totales.get(anio, {"total": 0, "municipios": 0})
         resultados[str(anio)] = {
-            "total_eventos": stats.total,
-            "municipios_afectados": stats.municipios,
-            "por_categoria": {r[0]: r[1] for r in categorias}
+            "total_eventos": stats["total"],
+            "municipios_afectados": stats["municipios"],
+            "por_categoria": {r["categoria_delito"]: r["total"] for r in datos["categorias"] if r["anio"] == anio}
         }
     
     # Calcular variación
@@ -487,8 +449,7 @@ def obtener_horario_eventos(
     params = {}
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     if municipio:
         codigo_dane = resolver_municipio(db, municipio)
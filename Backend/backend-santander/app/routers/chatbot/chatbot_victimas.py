@@ -5,7 +5,9 @@ Consultas por género, grupo etario, zona_hecho (urbana/rural)
 
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from .chatbot_base import resolver_municipio, obtener_nombre_municipio
+from .chatbot_base import (
+    resolver_municipio, obtener_nombre_municipio, consultar_desgloses, ordenar, contar, filtro_anio, porcentaje
+)
 
 
 def obtener_distribucion_genero(
@@ -19,35 +21,27 @@ def obtener_distribucion_genero(
     """
     where_clauses = ["genero IS NOT NULL"]
     params = {}
+    filtros = {}
     
     if municipio:
         codigo_dane = resolver_municipio(db, municipio)
         if codigo_dane:
             where_clauses.append("codigo_dane = :codigo_dane")
-            params["codigo_dane"] = codigo_dane
+            params["codigo_dane"] = filtros["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
+        filtros["anio"] = anio
     
     if categoria:
         where_clauses.append("UPPER(categoria_delito) = UPPER(:categoria)")
-        params["categoria"] = categoria
+        params["categoria"] = filtros["categoria_delito"] = categoria
     
     where_sql = " AND ".join(where_clauses)
     
-    query = text(f"""
-        SELECT 
-            genero,
-            COUNT(*) as total,
-            ROUND(COUNT(*)::numeric * 100.0 / SUM(COUNT(*)) OVER(), 2) as porcentaje
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY genero
-        ORDER BY total DESC
-    """)
-    
-    results = db.execute(query, params).fetchall()
+    datos = consultar_desgloses(db, where_sql, params, {"distribucion": ("genero",)}, filtros=filtros)
+    results = ordenar([r for r in datos["distribucion"] if r["genero"] is not None])
+    total_general = sum(r["total"] for r in results)
     
     return {
         "filtros": {
@@ -57,13 +51,13 @@ def obtener_distribucion_genero(
         },
         "distribucion": [
             {
-                "genero": r[0],
-                "total": r[1],
-                "porcentaje": float(r[2])
+                "genero": r["genero"],
+                "total": r["total"],
+                "porcentaje": porcentaje(r["total"], total_general)
             } for r in results
         ],
-        "total_general": sum(r[1] for r in results),
-        "genero_mas_afectado": results[0][0] if results else None
+        "total_general": total_general,
+        "genero_mas_afectado": results[0]["genero"] if results else None
     }
 
 
@@ -79,39 +73,31 @@ def obtener_distribucion_grupo_etario(
     """
     where_clauses = ["grupo_etario IS NOT NULL"]
     params = {}
+    filtros = {}
     
     if municipio:
         codigo_dane = resolver_municipio(db, municipio)
         if codigo_dane:
             where_clauses.append("codigo_dane = :codigo_dane")
-            params["codigo_dane"] = codigo_dane
+            params["codigo_dane"] = filtros["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
+        filtros["anio"] = anio
     
     if categoria:
         where_clauses.append("UPPER(categoria_delito) = UPPER(:categoria)")
-        params["categoria"] = categoria
+        params["categoria"] = filtros["categoria_delito"] = categoria
     
     if genero:
         where_clauses.append("UPPER(genero) = UPPER(:genero)")
-        params["genero"] = genero
+        params["genero"] = filtros["genero"] = genero
     
     where_sql = " AND ".join(where_clauses)
     
-    query = text(f"""
-        SELECT 
-            grupo_etario,
-            COUNT(*) as total,
-            ROUND(COUNT(*)::numeric * 100.0 / SUM(COUNT(*)) OVER(), 2) as porcentaje
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY grupo_etario
-        ORDER BY total DESC
-    """)
-    
-    results = db.execute(query, params).fetchall()
+    datos = consultar_desgloses(db, where_sql, params, {"distribucion": ("grupo_etario",)}, filtros=filtros)
+    results = ordenar([r for r in datos["distribucion"] if r["grupo_etario"] is not None])
+    total_general = sum(r["total"] for r in results)
     
     return {
         "filtros": {
@@ -122,13 +108,13 @@ def obtener_distribucion_grupo_etario(
         },
         "distribucion": [
             {
-                "grupo_etario": r[0],
-                "total": r[1],
-                "porcentaje": float(r[2])
+                "grupo_etario": r["grupo_etario"],
+                "total": r["total"],
+                "porcentaje": porcentaje(r["total"], total_general)
             } for r in results
         ],
-        "total_general": sum(r[1] for r in results),
-        "grupo_mas_afectado": results[0][0] if results else None
+        "total_general": total_general,
+        "grupo_mas_afectado": results[0]["grupo_etario"] if results else None
     }
 
 
@@ -143,35 +129,27 @@ def obtener_distribucion_zona(
     """
     where_clauses = ["zona_hecho IS NOT NULL"]
     params = {}
+    filtros = {}
     
     if municipio:
         codigo_dane = resolver_municipio(db, municipio)
         if codigo_dane:
             where_clauses.append("codigo_dane = :codigo_dane")
-            params["codigo_dane"] = codigo_dane
+            params["codigo_dane"] = filtros["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
+        filtros["anio"] = anio
     
     if categoria:
         where_clauses.append("UPPER(categoria_delito) = UPPER(:categoria)")
-        params["categoria"] = categoria
+        params["categoria"] = filtros["categoria_delito"] = categoria
     
     where_sql = " AND ".join(where_clauses)
     
-    query = text(f"""
-        SELECT 
-            zona_hecho,
-            COUNT(*) as total,
-            ROUND(COUNT(*)::numeric * 100.0 / SUM(COUNT(*)) OVER(), 2) as porcentaje
-        FROM fact_seguridad
-        WHERE {where_sql}
-        GROUP BY zona_hecho
-        ORDER BY total DESC
-    """)
-    
-    results = db.execute(query, params).fetchall()
+    datos = consultar_desgloses(db, where_sql, params, {"distribucion": ("zona_hecho",)}, filtros=filtros)
+    results = ordenar([r for r in datos["distribucion"] if r["zona_hecho"] is not None])
+    total_general = sum(r["total"] for r in results)
     
     return {
         "filtros": {
@@ -181,12 +159,12 @@ def obtener_distribucion_zona(
         },
         "distribucion": [
             {
-                "zona_hecho": r[0],
-                "total": r[1],
-                "porcentaje": float(r[2])
+                "zona_hecho": r["zona_hecho"],
+                "total": r["total"],
+                "porcentaje": porcentaje(r["total"], total_general)
             } for r in results
         ],
-        "total_general": sum(r[1] for r in results)
+        "total_general": total_general
     }
 
 
@@ -202,53 +180,41 @@ def obtener_perfil_victima(
     """
     where_clauses = ["1=1"]
     params = {}
+    filtros = {}
     
     if municipio:
         codigo_dane = resolver_municipio(db, municipio)
         if codigo_dane:
             where_clauses.append("codigo_dane = :codigo_dane")
-            params["codigo_dane"] = codigo_dane
+            params["codigo_dane"] = filtros["codigo_dane"] = codigo_dane
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
+        filtros["anio"] = anio
     
     if categoria:
         where_clauses.append("UPPER(categoria_delito) = UPPER(:categoria)")
-        params["categoria"] = categoria
+        params["categoria"] = filtros["categoria_delito"] = categoria
     
     where_sql = " AND ".join(where_clauses)
     
-    # Combinación género + grupo etario
-    query_perfil = text(f"""
-        SELECT 
-            genero,
-            grupo_etario,
-            COUNT(*) as total
-        FROM fact_seguridad
-        WHERE {where_sql}
-        AND genero IS NOT NULL
-        AND grupo_etario IS NOT NULL
-        GROUP BY genero, grupo_etario
-        ORDER BY total DESC
-        LIMIT 10
-    """)
+    # Combinación género + grupo etario, totales por género y por zona en una pasada
+    datos = consultar_desgloses(db, where_sql, params, {
+        "general": (),
+        "perfiles": ("genero", "grupo_etario"),
+        "generos": ("genero",),
+        "zonas": ("zona_hecho",),
+    }, filtros=filtros)
     
-    perfiles = db.execute(query_perfil, params).fetchall()
-    
-    # Estadísticas generales
-    query_stats = text(f"""
-        SELECT 
-            COUNT(*) as total,
-            COUNT(*) FILTER (WHERE UPPER(genero) = 'MASCULINO') as masculino,
-            COUNT(*) FILTER (WHERE UPPER(genero) = 'FEMENINO') as femenino,
-            COUNT(*) FILTER (WHERE UPPER(zona_hecho) = 'URBANA') as urbano,
-            COUNT(*) FILTER (WHERE UPPER(zona_hecho) = 'RURAL') as rural
-        FROM fact_seguridad
-        WHERE {where_sql}
-    """)
+    perfiles = ordenar([
+        r for r in datos["perfiles"] if r["genero"] is not None and r["grupo_etario"] is not None
+    ], limite=10)
     
-    stats = db.execute(query_stats, params).fetchone()
+    total = datos["general"][0]["total"]
+    masculino = contar(datos["generos"], "genero", "MASCULINO")
+    femenino = contar(datos["generos"], "genero", "FEMENINO")
+    urbano = contar(datos["zonas"], "zona_hecho", "URBANA")
+    rural = contar(datos["zonas"], "zona_hecho", "RURAL")
     
     return {
         "filtros": {
@@ -258,24 +224,24 @@ def obtener_perfil_victima(
         },
         "perfiles_mas_afectados": [
             {
-                "genero": r[0],
-                "grupo_etario": r[1],
-                "total": r[2]
+                "genero": r["genero"],
+                "grupo_etario": r["grupo_etario"],
+                "total": r["total"]
             } for r in perfiles
         ],
         "resumen": {
-            "total_eventos": stats.total,
+            "total_eventos": total,
             "distribucion_genero": {
-                "masculino": stats.masculino,
-                "femenino": stats.femenino,
-                "porcentaje_masculino": round(stats.masculino * 100 / stats.total, 2) if stats.total > 0 else 0,
-                "porcentaje_femenino": round(stats.femenino * 100 / stats.total, 2) if stats.total > 0 else 0
+                "masculino": masculino,
+                "femenino": femenino,
+                "porcentaje_masculino": round(masculino * 100 / total, 2) if total > 0 else 0,
+                "porcentaje_femenino": round(femenino * 100 / total, 2) if total > 0 else 0
             },
             "distribucion_zona": {
-                "urbano": stats.urbano,
-                "rural": stats.rural,
-                "porcentaje_urbano": round(stats.urbano * 100 / stats.total, 2) if stats.total > 0 else 0,
-                "porcentaje_rural": round(stats.rural * 100 / stats.total, 2) if stats.total > 0 else 0
+                "urbano": urbano,
+                "rural": rural,
+                "porcentaje_urbano": round(urbano * 100 / total, 2) if total > 0 else 0,
+                "porcentaje_rural": round(rural * 100 / total, 2) if total > 0 else 0
             }
         }
     }
@@ -293,8 +259,7 @@ def obtener_vulnerabilidad_por_delito(
     params = {}
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio))
     
     if municipio:
         codigo_dane = resolver_municipio(db, municipio)
@@ -432,8 +397,7 @@ def obtener_ranking_municipios_por_genero(
     params = {"genero": genero, "limite": limite}
     
     if anio:
-        where_clauses.append("EXTRACT(YEAR FROM fs.fecha_hecho) = :anio")
-        params["anio"] = anio
+        where_clauses.append(filtro_anio(params, anio, "fs.fecha_hecho"))
     
     if categoria:
         where_clauses.append("UPPER(fs.categoria_delito) = UPPER(:categoria)")
@@ -11,6 +11,7 @@ import json
 import re
 
 from app.database import get_db
+from app.respuestas import RutaJSON
 from .chatbot_base import modelo_gemini, obtener_estadisticas_generales
 from .chatbot_geografia import (
     obtener_datos_municipio,
@@ -51,7 +52,8 @@ from .chatbot_clima import (
 
 router = APIRouter(
     prefix="/chatbot",
-    tags=["Chatbot"]
+    tags=["Chatbot"],
+    route_class=RutaJSON,
 )
 
 
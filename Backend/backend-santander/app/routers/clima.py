@@ -4,19 +4,23 @@ Sección 4 — Clima
 - Barras lluvia por categorías
 - Línea de tiempo: lluvia y delitos superpuestos
 """
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, case
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, select, literal_column
 from typing import Optional, List
-from ..database import get_db
+from ..motor_duckdb import get_db_analitica
 from ..models import FactClima, FactSeguridad
+from ..utils import condiciones_fecha, columnas, FORMATOS
+from ..respuestas import RutaJSON
+from ..negociacion import medio_aceptado, respuesta_tabla
 
-router = APIRouter(prefix="/clima", tags=["Clima"])
+router = APIRouter(prefix="/clima", tags=["Clima"], route_class=RutaJSON)
 
 
 @router.get("/scatter-lluvia-delitos")
 async def get_scatter_lluvia_delitos(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query("HURTO", description="Tipo de delito a correlacionar"),
     anio: Optional[int] = Query(None, description="Filtrar por año"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
@@ -24,9 +28,11 @@ async def get_scatter_lluvia_delitos(
     """
     Obtiene datos para scatter plot: precipitación diaria vs cantidad de delitos.
     Cada punto es un día con su precipitación y conteo de delitos.
+    Con Accept: application/vnd.apache.arrow.stream o application/msgpack retorna
+    las columnas fecha, precipitacion_mm y total_delitos en ese formato.
     """
     # Subquery para delitos por día
-    delitos_subq = db.query(
+    delitos_subq = select(
         FactSeguridad.fecha_hecho.label("fecha"),
         func.coalesce(func.sum(FactSeguridad.cantidad), 0).label("total_delitos")
     ).filter(FactSeguridad.fecha_hecho.isnot(None))
@@ -34,25 +40,26 @@ async def get_scatter_lluvia_delitos(
     if categoria_delito:
         delitos_subq = delitos_subq.filter(FactSeguridad.categoria_delito == categoria_delito)
     if anio:
-        delitos_subq = delitos_subq.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
+        delitos_subq = delitos_subq.filter(*condiciones_fecha(FactSeguridad.fecha_hecho, anio))
     if codigo_dane:
         delitos_subq = delitos_subq.filter(FactSeguridad.codigo_dane == codigo_dane)
     
     delitos_subq = delitos_subq.group_by(FactSeguridad.fecha_hecho).subquery()
     
     # Query clima
-    clima_query = db.query(
+    clima_query = select(
         FactClima.fecha,
         FactClima.precipitacion_mm
     )
     
     if anio:
-        clima_query = clima_query.filter(extract("year", FactClima.fecha) == anio)
+    
+        clima_query = clima_query.filter(*condiciones_fecha(FactClima.fecha, anio))
     if codigo_dane:
         clima_query = clima_query.filter(FactClima.codigo_dane == codigo_dane)
     
     # JOIN con delitos
-    query = db.query(
+    query = select(
         FactClima.fecha,
         FactClima.precipitacion_mm,
         func.coalesce(delitos_subq.c.total_delitos, 0).label("total_delitos")
@@ -62,11 +69,20 @@ async def get_scatter_lluvia_delitos(
     )
     
     if anio:
-        query = query.filter(extract("year", FactClima.fecha) == anio)
+    
+        query = query.filter(*condiciones_fecha(FactClima.fecha, anio))
     if codigo_dane:
         query = query.filter(FactClima.codigo_dane == codigo_dane)
     
-    results = query.order_by(FactClima.fecha).all()
+    query = query.order_by(FactClima.fecha)
+    results = (await db.execute(query)).all()
+    
+    medio = medio_aceptado(request.headers.get("accept"))
+    if medio:
+        return respuesta_tabla(medio, columnas(
+            results, ("fecha", "precipitacion_mm", "total_delitos"),
+            {"precipitacion_mm": lambda v: float(v) if v else 0.0, "total_delitos": int},
+        ), total_dias=len(results))
     
     return [
         {
@@ -80,7 +96,7 @@ async def get_scatter_lluvia_delitos(
 
 @router.get("/barras-categorias-lluvia")
 async def get_barras_categorias_lluvia(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query("HURTO", description="Tipo de delito"),
     anio: Optional[int] = Query(None, description="Filtrar por año"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
@@ -93,7 +109,7 @@ async def get_barras_categorias_lluvia(
     - Lluvia fuerte (>20 mm)
     """
     # Subquery para delitos por día
-    delitos_subq = db.query(
+    delitos_subq = select(
         FactSeguridad.fecha_hecho.label("fecha"),
         func.coalesce(func.sum(FactSeguridad.cantidad), 0).label("total_delitos")
     ).filter(FactSeguridad.fecha_hecho.isnot(None))
@@ -101,7 +117,7 @@ async def get_barras_categorias_lluvia(
     if categoria_delito:
         delitos_subq = delitos_subq.filter(FactSeguridad.categoria_delito == categoria_delito)
     if anio:
-        delitos_subq = delitos_subq.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
+        delitos_subq = delitos_subq.filter(*condiciones_fecha(FactSeguridad.fecha_hecho, anio))
     if codigo_dane:
         delitos_subq = delitos_subq.filter(FactSeguridad.codigo_dane == codigo_dane)
     
@@ -115,7 +131,7 @@ async def get_barras_categorias_lluvia(
         else_="Lluvia fuerte"
     ).label("categoria_lluvia")
     
-    query = db.query(
+    query = select(
         categoria_lluvia,
         func.count().label("dias"),
         func.sum(func.coalesce(delitos_subq.c.total_delitos, 0)).label("total_delitos"),
@@ -126,11 +142,13 @@ async def get_barras_categorias_lluvia(
     )
     
     if anio:
-        query = query.filter(extract("year", FactClima.fecha) == anio)
+    
+        query = query.filter(*condiciones_fecha(FactClima.fecha, anio))
     if codigo_dane:
         query = query.filter(FactClima.codigo_dane == codigo_dane)
     
-    results = query.group_by(categoria_lluvia).all()
+    query = query.group_by(categoria_lluvia)
+    results = (await db.execute(query)).all()
     
     # Ordenar categorías
     orden = ["Sin lluvia", "Lluvia ligera", "Lluvia moderada", "Lluvia fuerte"]
@@ -148,48 +166,61 @@ async def get_barras_categorias_lluvia(
     return resultado
 
 
+def _milimetros(valor) -> float:
+    return round(float(valor), 2) if valor else 0
+
+
 @router.get("/linea-tiempo-superpuesta")
 async def get_linea_tiempo_superpuesta(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query("HURTO", description="Tipo de delito"),
     anio: Optional[int] = Query(None, description="Filtrar por año"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
     agrupacion: str = Query("mensual", description="Agrupación: 'diaria', 'semanal', 'mensual'"),
+    formato: str = Query("filas", alias="format", description="filas (lista de objetos) o columnar (data como {columna: [valores]})"),
 ):
     """
     Obtiene serie temporal de lluvia y delitos para visualización superpuesta.
     Permite ver correlación temporal entre precipitación y delincuencia.
+    Con format=columnar, data es {"periodo": [...], "precipitacion_promedio": [...], ...}.
     """
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de: {', '.join(FORMATOS)}")
+
     # Determinar agrupación
+    # La unidad de date_trunc va como literal: con asyncpg cada parámetro ligado es un $n
+    # distinto y PostgreSQL no reconoce el SELECT y el GROUP BY como la misma expresión
     if agrupacion == "diaria":
         grupo_clima = FactClima.fecha
         grupo_delitos = FactSeguridad.fecha_hecho
         orden = FactClima.fecha
     elif agrupacion == "semanal":
-        grupo_clima = func.date_trunc("week", FactClima.fecha)
-        grupo_delitos = func.date_trunc("week", FactSeguridad.fecha_hecho)
-        orden = func.date_trunc("week", FactClima.fecha)
+        grupo_clima = func.date_trunc(literal_column("'week'"), FactClima.fecha)
+        grupo_delitos = func.date_trunc(literal_column("'week'"), FactSeguridad.fecha_hecho)
+        orden = func.date_trunc(literal_column("'week'"), FactClima.fecha)
     else:  # mensual
-        grupo_clima = func.date_trunc("month", FactClima.fecha)
-        grupo_delitos = func.date_trunc("month", FactSeguridad.fecha_hecho)
-        orden = func.date_trunc("month", FactClima.fecha)
+        grupo_clima = func.date_trunc(literal_column("'month'"), FactClima.fecha)
+        grupo_delitos = func.date_trunc(literal_column("'month'"), FactSeguridad.fecha_hecho)
+        orden = func.date_trunc(literal_column("'month'"), FactClima.fecha)
     
     # Query para clima
-    clima_query = db.query(
+    clima_query = select(
         grupo_clima.label("periodo"),
         func.avg(FactClima.precipitacion_mm).label("precipitacion_promedio"),
         func.sum(FactClima.precipitacion_mm).label("precipitacion_total")
     )
     
     if anio:
-        clima_query = clima_query.filter(extract("year", FactClima.fecha) == anio)
+    
+        clima_query = clima_query.filter(*condiciones_fecha(FactClima.fecha, anio))
     if codigo_dane:
         clima_query = clima_query.filter(FactClima.codigo_dane == codigo_dane)
     
-    clima_results = clima_query.group_by(grupo_clima).order_by(orden).all()
+    clima_query = clima_query.group_by(grupo_clima).order_by(orden)
+    clima_results = (await db.execute(clima_query)).all()
     
     # Query para delitos
-    delitos_query = db.query(
+    delitos_query = select(
         grupo_delitos.label("periodo"),
         func.sum(FactSeguridad.cantidad).label("total_delitos")
     ).filter(FactSeguridad.fecha_hecho.isnot(None))
@@ -197,13 +228,23 @@ async def get_linea_tiempo_superpuesta(
     if categoria_delito:
         delitos_query = delitos_query.filter(FactSeguridad.categoria_delito == categoria_delito)
     if anio:
-        delitos_query = delitos_query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
+        delitos_query = delitos_query.filter(*condiciones_fecha(FactSeguridad.fecha_hecho, anio))
     if codigo_dane:
         delitos_query = delitos_query.filter(FactSeguridad.codigo_dane == codigo_dane)
     
-    delitos_results = delitos_query.group_by(grupo_delitos).all()
+    delitos_query = delitos_query.group_by(grupo_delitos)
+    delitos_results = (await db.execute(delitos_query)).all()
     delitos_dict = {r.periodo: int(r.total_delitos) for r in delitos_results}
     
+    if formato == "columnar":
+        data = columnas(
+            clima_results, ("periodo", "precipitacion_promedio", "precipitacion_total"),
+            {"precipitacion_promedio": _milimetros, "precipitacion_total": _milimetros},
+        )
+        data["total_delitos"] = [delitos_dict.get(periodo, 0) for periodo in data["periodo"]]
+        data["periodo"] = [p.isoformat() if hasattr(p, "isoformat") else str(p) for p in data["periodo"]]
+        return {"agrupacion": agrupacion, "categoria_delito": categoria_delito, "data": data}
+    
     # Combinar resultados
     data = []
     for r in clima_results:
@@ -224,7 +265,7 @@ async def get_linea_tiempo_superpuesta(
 
 @router.get("/correlacion")
 async def get_correlacion_lluvia_delitos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query("HURTO", description="Tipo de delito"),
     anio: Optional[int] = Query(None, description="Filtrar por año"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
@@ -285,14 +326,14 @@ async def get_correlacion_lluvia_delitos(
 
 @router.get("/resumen-precipitacion")
 async def get_resumen_precipitacion(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     anio: Optional[int] = Query(None, description="Filtrar por año"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
 ):
     """
     Obtiene estadísticas resumidas de precipitación.
     """
-    query = db.query(
+    query = select(
         func.count().label("dias_con_registro"),
         func.sum(case((FactClima.precipitacion_mm == 0, 1), else_=0)).label("dias_secos"),
         func.sum(case((FactClima.precipitacion_mm > 0, 1), else_=0)).label("dias_con_lluvia"),
@@ -302,11 +343,12 @@ async def get_resumen_precipitacion(
     )
     
     if anio:
-        query = query.filter(extract("year", FactClima.fecha) == anio)
+    
+        query = query.filter(*condiciones_fecha(FactClima.fecha, anio))
     if codigo_dane:
         query = query.filter(FactClima.codigo_dane == codigo_dane)
     
-    result = query.first()
+    result = (await db.execute(query)).first()
     
     return {
         "dias_con_registro": int(result.dias_con_registro) if result.dias_con_registro else 0,
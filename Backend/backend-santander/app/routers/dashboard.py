@@ -0,0 +1,391 @@
+"""
+Dashboard - varios widgets en una sola petición
+- Los widgets agregados (temporal, víctimas, estadísticas y filtros) que reciben los
+  mismos filtros se calculan con un único recorrido del cubo o de fact_seguridad
+  (GROUP BY GROUPING SETS); cada combinación de filtros es un recorrido en paralelo
+- Cualquier otro endpoint GET (clima, geografía, predicciones...) se resuelve con una
+  petición interna que pasa por el cache de respuestas, en paralelo con lo anterior
+La respuesta completa se cachea en CACHE_RUTAS["/dashboard/"].
+"""
+import asyncio
+from typing import Optional
+from urllib.parse import parse_qsl
+from fastapi import APIRouter, Query, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, extract, select, tuple_
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models import MasterMunicipios, AggSeguridadDiaria
+from ..cubo import fuente_seguridad
+from ..motor_columnar import motor_columnar
+from ..municipios_indice import indice_municipios
+from ..subpeticiones import buscar_ruta, parametros_query, get_interno
+from ..utils import condiciones_fecha
+from ..respuestas import RutaJSON
+from .temporal import DIAS_NOMBRE, ORDEN_LUNES_PRIMERO
+from .victimas import orden_grupo_etario
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"], route_class=RutaJSON)
+
+# Widgets de DashboardPage
+WIDGETS_DASHBOARD = (
+    "filtros/resumen",
+    "estadisticas",
+    "temporal/linea-anual",
+    "temporal/por-dia-semana",
+    "victimas/por-genero",
+    "temporal/por-zona",
+)
+
+def _porcentajes(filas: list, campo: str) -> list:
+    """[{campo, total, porcentaje}] ordenado por total descendente"""
+    filas = sorted((f for f in filas if f[campo] is not None), key=lambda f: f["total"], reverse=True)
+    total_general = sum(f["total"] for f in filas)
+    return [
+        {
+            campo: f[campo],
+            "total": f["total"],
+            "porcentaje": round((f["total"] / total_general * 100), 2) if total_general > 0 else 0
+        }
+        for f in filas
+    ]
+
+
+def _linea_mensual(c):
+    filas = sorted((f for f in c["filas"] if f["anio"] is not None), key=lambda f: (f["anio"], f["mes"]))
+    return [
+        {"anio": f["anio"], "mes": f["mes"], "periodo": f"{f['anio']}-{f['mes']:02d}", "total": f["total"]}
+        for f in filas
+    ]
+
+
+def _linea_anual(c):
+    filas = sorted((f for f in c["filas"] if f["anio"] is not None), key=lambda f: f["anio"])
+    return [{"anio": f["anio"], "total": f["total"]} for f in filas]
+
+
+def _por_dia_semana(c):
+    resultado = [
+        {"dia": DIAS_NOMBRE.get(f["dia_semana"], f"DIA_{f['dia_semana']}"), "dia_num": f["dia_semana"], "total": f["total"]}
+        for f in c["filas"] if f["dia_semana"] is not None
+    ]
+    resultado.sort(key=lambda x: ORDEN_LUNES_PRIMERO.index(x["dia_num"]) if x["dia_num"] in ORDEN_LUNES_PRIMERO else 7)
+    return resultado
+
+
+def _tendencia_semanal(c):
+    filas = sorted((f for f in c["filas"] if f["anio"] is not None), key=lambda f: (f["anio"], f["semana"]))
+    return [
+        {"anio": f["anio"], "semana": f["semana"], "periodo": f"{f['anio']}-W{f['semana']:02d}", "total": f["total"]}
+        for f in filas
+    ]
+
+
+def _renombrar(filas: list, origen: str, destino: str) -> list:
+    return [{destino: f[origen], "total": f["total"]} for f in filas]
+
+
+def _por_grupo_etario(c):
+    filas = sorted((f for f in c["filas"] if f["grupo_etario"] is not None), key=lambda f: f["total"], reverse=True)
+    resultado = [{"grupo_etario": f["grupo_etario"], "total": f["total"]} for f in filas]
+    resultado.sort(key=orden_grupo_etario)
+    total_general = sum(r["total"] for r in resultado)
+    for r in resultado:
+        r["porcentaje"] = round((r["total"] / total_general * 100), 2) if total_general > 0 else 0
+    return resultado
+
+
+def _por_delito(c, campo: str, clave: str):
+    filas = [f for f in c["filas"] if f["categoria_delito"] is not None and f[campo] is not None]
+    filas.sort(key=lambda f: (f["categoria_delito"], -f["total"]))
+    delitos = {}
+    for f in filas:
+        delitos.setdefault(f["categoria_delito"], {})[f[campo]] = f["total"]
+    return [
+        {"categoria_delito": delito, clave: valores, "total": sum(valores.values())}
+        for delito, valores in delitos.items()
+    ]
+
+
+def _estadisticas(c):
+    total = c["total"][0] if c["total"] else {}
+    return {
+        "total_eventos": total.get("eventos", 0),
+        "municipios_cubiertos": sum(1 for f in c["municipios"] if f["codigo_dane"] is not None),
+        "categorias_disponibles": sorted(f["categoria_delito"] for f in c["categorias"] if f["categoria_delito"] is not None),
+        "fecha_inicio": total["fecha_min"].isoformat() if total.get("fecha_min") else None,
+        "fecha_fin": total["fecha_max"].isoformat() if total.get("fecha_max") else None,
+    }
+
+
+def _filtros_resumen(c):
+    total = c["total"][0] if c["total"] else {}
+    distintos = lambda conjunto, campo: sorted(f[campo] for f in c[conjunto] if f[campo] is not None)
+    return {
+        "municipios": c["municipios"],
+        "categorias_delito": distintos("categorias", "categoria_delito"),
+        "generos": distintos("generos", "genero"),
+        "grupos_etarios": distintos("grupos", "grupo_etario"),
+        "anios": sorted((f["anio"] for f in c["anios"] if f["anio"] is not None), reverse=True),
+        "rango_fechas": {
+            "minima": total["fecha_min"].isoformat() if total.get("fecha_min") else None,
+            "maxima": total["fecha_max"].isoformat() if total.get("fecha_max") else None,
+        },
+    }
+
+
+# widget -> ({conjunto: dimensiones}, filtros del bundle que aplica, formato)
+# Reproducen la respuesta del endpoint GET del mismo nombre.
+WIDGETS_AGREGADOS = {
+    "temporal/linea-mensual": ({"filas": ("anio", "mes")}, ("anio", "categoria", "municipio"), _linea_mensual),
+    "temporal/linea-anual": ({"filas": ("anio",)}, ("categoria", "municipio"), _linea_anual),
+    "temporal/por-dia-semana": ({"filas": ("dia_semana",)}, ("anio", "categoria", "municipio"), _por_dia_semana),
+    "temporal/tendencia-semanal": ({"filas": ("anio", "semana")}, ("anio", "categoria", "municipio"), _tendencia_semanal),
+    "temporal/por-modalidad": (
+        {"filas": ("modalidad_especifica",)}, ("anio", "categoria", "municipio"),
+        lambda c: _porcentajes(_renombrar(c["filas"], "modalidad_especifica", "modalidad"), "modalidad"),
+    ),
+    "temporal/por-zona": (
+        {"filas": ("zona_hecho",)}, ("anio", "categoria", "municipio"),
+        lambda c: _porcentajes(_renombrar(c["filas"], "zona_hecho", "zona"), "zona"),
+    ),
+    "victimas/por-genero": (
+        {"filas": ("genero",)}, ("anio", "categoria", "municipio"), lambda c: _porcentajes(c["filas"], "genero"),
+    ),
+    "victimas/por-grupo-etario": ({"filas": ("grupo_etario",)}, ("anio", "categoria", "municipio"), _por_grupo_etario),
+    "victimas/por-arma-medio": (
+        {"filas": ("arma_medio",)}, ("anio", "categoria", "municipio"), lambda c: _porcentajes(c["filas"], "arma_medio"),
+    ),
+    "victimas/por-clase-sitio": (
+        {"filas": ("clase_sitio",)}, ("anio", "categoria", "municipio"), lambda c: _porcentajes(c["filas"], "clase_sitio"),
+    ),
+    "victimas/genero-por-delito": (
+        {"filas": ("categoria_delito", "genero")}, ("anio", "municipio"),
+        lambda c: _por_delito(c, "genero", "generos"),
+    ),
+    "victimas/grupo-etario-por-delito": (
+        {"filas": ("categoria_delito", "grupo_etario")}, ("anio", "municipio"),
+        lambda c: _por_delito(c, "grupo_etario", "grupos_etarios"),
+    ),
+    "estadisticas": (
+        {"total": (), "municipios": ("codigo_dane",), "categorias": ("categoria_delito",)}, (), _estadisticas,
+    ),
+    "filtros/resumen": (
+        {
+            "total": (), "categorias": ("categoria_delito",), "generos": ("genero",),
+            "grupos": ("grupo_etario",), "anios": ("anio",),
+        },
+        (), _filtros_resumen,
+    ),
+}
+
+
+def _expresiones(F) -> dict:
+    return {
+        "anio": extract("year", F.fecha_hecho),
+        "mes": extract("month", F.fecha_hecho),
+        "dia_semana": extract("dow", F.fecha_hecho),
+        "semana": extract("week", F.fecha_hecho),
+        "codigo_dane": F.codigo_dane,
+        "categoria_delito": F.categoria_delito,
+        "modalidad_especifica": F.modalidad_especifica,
+        "zona_hecho": F.zona_hecho,
+        "clase_sitio": F.clase_sitio,
+        "genero": F.genero,
+        "grupo_etario": F.grupo_etario,
+        "arma_medio": F.arma_medio,
+    }
+
+
+def _valor(dimension: str, v):
+    # EXTRACT retorna numeric
+    return int(v) if v is not None and dimension in ("anio", "mes", "dia_semana", "semana") else v
+
+
+def _agregados_columnar(motor, widgets, pedidos, anio, categoria_delito, codigo_dane) -> dict:
+    """calcular_agregados sobre el motor columnar: un bincount por conjunto sobre la misma máscara"""
+    mascara = motor.filtrar(categoria_delito=categoria_delito, anio=anio, codigo_dane=codigo_dane)
+    por_widget = {w: {} for w in widgets}
+    for (w, nombre), dims in pedidos.items():
+        filas = [f._asdict() for f in motor.agrupar(dims, mascara, incluir_nulos=True)]
+        if not dims:
+            fecha_min, fecha_max = motor.rango_fechas(mascara)
+            for f in filas:
+                f.update(fecha_min=fecha_min, fecha_max=fecha_max)
+        por_widget[w][nombre] = filas
+    return por_widget
+
+
+async def calcular_agregados(
+    db: AsyncSession,
+    widgets: list,
+    anio: Optional[int] = None,
+    categoria_delito: Optional[str] = None,
+    codigo_dane: Optional[int] = None,
+) -> dict:
+    """
+    Calcula los widgets de WIDGETS_AGREGADOS con un único GROUP BY GROUPING SETS
+    sobre las filas que cumplen los filtros dados (todos los widgets reciben los mismos).
+    Retorna {widget: {conjunto: [fila, ...]}} con las filas NULL incluidas.
+    """
+    pedidos = {(w, nombre): dims for w in widgets for nombre, dims in WIDGETS_AGREGADOS[w][0].items()}
+    motor = await motor_columnar()
+    if motor:
+        return _agregados_columnar(motor, widgets, pedidos, anio, categoria_delito, codigo_dane)
+
+    dimensiones = list(dict.fromkeys(d for dims in pedidos.values() for d in dims))
+    F = await fuente_seguridad(
+        "fecha_hecho", "cantidad", "categoria_delito", "codigo_dane",
+        *(d for d in dimensiones if d not in ("anio", "mes", "dia_semana", "semana"))
+    )
+    expr = _expresiones(F)
+    n = len(dimensiones)
+
+    # GROUPING(d1, ..., dn): un bit en 1 por cada dimensión no agrupada
+    def mascara(dims):
+        return sum(1 << (n - 1 - i) for i, d in enumerate(dimensiones) if d not in dims)
+
+    conjuntos = {mascara(dims): tuple_(*(expr[d] for d in dims)) for dims in pedidos.values()}
+
+    eventos = func.sum(F.eventos) if F is AggSeguridadDiaria else func.count()
+    columnas = [expr[d].label(d) for d in dimensiones] + [
+        func.sum(F.cantidad).label("total"),
+        eventos.label("eventos"),
+        func.min(F.fecha_hecho).label("fecha_min"),
+        func.max(F.fecha_hecho).label("fecha_max"),
+    ]
+    if dimensiones:
+        columnas.append(func.grouping(*(expr[d] for d in dimensiones)).label("conjunto"))
+    query = select(*columnas).group_by(func.grouping_sets(*conjuntos.values()))
+
+    if anio:
+        query = query.filter(*condiciones_fecha(F.fecha_hecho, anio))
+    if categoria_delito:
+        query = query.filter(func.upper(F.categoria_delito) == categoria_delito.upper())
+    if codigo_dane:
+        query = query.filter(F.codigo_dane == codigo_dane)
+
+    filas = {}
+    for r in (await db.execute(query)).mappings():
+        fila = {d: _valor(d, r[d]) for d in dimensiones}
+        fila.update(
+            total=int(r["total"] or 0), eventos=int(r["eventos"] or 0),
+            fecha_min=r["fecha_min"], fecha_max=r["fecha_max"],
+        )
+        filas.setdefault(r["conjunto"] if dimensiones else 0, []).append(fila)
+
+    por_widget = {w: {} for w in widgets}
+    for (w, nombre), dims in pedidos.items():
+        por_widget[w][nombre] = filas.get(mascara(dims), [])
+    return por_widget
+
+
+async def nombres_municipios(db: AsyncSession) -> list:
+    query = select(MasterMunicipios.nombre_municipio).order_by(MasterMunicipios.nombre_municipio)
+    return [r.nombre_municipio for r in (await db.execute(query)).all()]
+
+
+async def _widget_interno(request: Request, widget: str, filtros: dict):
+    """
+    Widget servido por su endpoint GET (con cache de respuestas).
+    Solo endpoints con respuesta JSON: teselas o formatos binarios se rechazan con 400
+    """
+    path, _, propios = widget.partition("?")
+    path = f"{settings.API_PREFIX}/{path}"
+    ruta = buscar_ruta(request.app, path)
+    aceptados = parametros_query(ruta)
+
+    params = {k: v for k, v in filtros.items() if k in aceptados}
+    if "municipio" in aceptados and "codigo_dane" not in aceptados and filtros.get("codigo_dane") and not filtros.get("municipio"):
+        params["municipio"] = (await indice_municipios()).nombre(filtros["codigo_dane"])
+    params.update(parse_qsl(propios))
+
+    status, datos, _ = await get_interno(request.app, path, params)
+    if status != 200:
+        detalle = datos.get("detail") if isinstance(datos, dict) else None
+        raise HTTPException(status_code=status, detail=f"{widget}: {detalle or 'error'}")
+    if datos is None:
+        raise HTTPException(status_code=400, detail=f"{widget}: la respuesta no es JSON y no se puede incluir en el bundle")
+    return datos
+
+
+@router.get("/bundle")
+async def get_bundle(
+    request: Request,
+    widgets: Optional[str] = Query(
+        None,
+        description="Widgets separados por coma: rutas GET relativas a la API (ej: temporal/linea-anual, "
+                    "clima/correlacion, clima/linea-tiempo-superpuesta?agrupacion=mensual), "
+                    "'estadisticas' o 'filtros/resumen'. Por defecto los de la página principal",
+    ),
+    anio: Optional[int] = Query(None, description="Año (ej: 2024)"),
+    categoria_delito: Optional[str] = Query(None, description="Tipo de delito (sin distinguir mayúsculas)"),
+    codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
+    municipio: Optional[str] = Query(None, description="Nombre del municipio (alternativa a codigo_dane)"),
+):
+    """
+    Retorna varios widgets en una sola respuesta: {"filtros": {...}, "widgets": {widget: datos}}.
+    Cada widget recibe solo los filtros que acepta su endpoint (p. ej. temporal/linea-anual
+    ignora `anio` y victimas/genero-por-delito ignora `categoria_delito`), igual que
+    las páginas del frontend.
+    """
+    lista = [w.strip().strip("/") for w in widgets.split(",")] if widgets else list(WIDGETS_DASHBOARD)
+    lista = list(dict.fromkeys(w for w in lista if w))
+
+    desconocidos = [
+        w for w in lista
+        if w not in WIDGETS_AGREGADOS and (
+            w.startswith("dashboard/")
+            or buscar_ruta(request.app, f"{settings.API_PREFIX}/{w.partition('?')[0]}") is None
+        )
+    ]
+    if desconocidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Widgets no disponibles: {', '.join(desconocidos)}. "
+                   f"Agregados en una sola consulta: {', '.join(WIDGETS_AGREGADOS)}; "
+                   f"además cualquier endpoint GET de la API"
+        )
+
+    if municipio and not codigo_dane:
+        indice = await indice_municipios()
+        codigo_dane = indice.resolver(municipio)
+        if codigo_dane is None:
+            raise HTTPException(status_code=404, detail=indice.no_encontrado(municipio))
+    filtros = {"anio": anio, "categoria_delito": categoria_delito, "codigo_dane": codigo_dane, "municipio": municipio}
+
+    # Un recorrido por cada combinación de filtros: p. ej. en la página principal uno
+    # sobre el año elegido y otro sin filtros (linea-anual, estadísticas, filtros)
+    dados = {"anio": anio, "categoria": categoria_delito, "municipio": codigo_dane}
+    recorridos = {}
+    for w in lista:
+        if w in WIDGETS_AGREGADOS:
+            alcance = tuple(k for k, v in dados.items() if v and k in WIDGETS_AGREGADOS[w][1])
+            recorridos.setdefault(alcance, []).append(w)
+    internos = [w for w in lista if w not in WIDGETS_AGREGADOS]
+
+    async def _recorrido(alcance, widgets):
+        filtros_recorrido = {k: dados[k] for k in alcance}
+        # Sesión propia: los recorridos se ejecutan en paralelo en conexiones distintas del pool
+        async with AsyncSessionLocal() as sesion:
+            conjuntos = await calcular_agregados(
+                sesion, widgets, filtros_recorrido.get("anio"),
+                filtros_recorrido.get("categoria"), filtros_recorrido.get("municipio"),
+            )
+            if "filtros/resumen" in conjuntos:
+                conjuntos["filtros/resumen"]["municipios"] = await nombres_municipios(sesion)
+        return {w: WIDGETS_AGREGADOS[w][2](conjuntos[w]) for w in widgets}
+
+    partes = await asyncio.gather(
+        *(_recorrido(alcance, ws) for alcance, ws in recorridos.items()),
+        *(_widget_interno(request, w, filtros) for w in internos),
+    )
+    resultado = {}
+    for parte in partes[:len(recorridos)]:
+        resultado.update(parte)
+    resultado.update(zip(internos, partes[len(recorridos):]))
+
+    return {
+        "filtros": {k: v for k, v in filtros.items() if v is not None},
+        "widgets": {w: resultado[w] for w in lista},
+    }
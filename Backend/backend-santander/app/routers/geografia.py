@@ -4,31 +4,36 @@ Sección 1 — Geografía
 - Mapa coroplético: tasa por 100.000 habitantes
 """
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from typing import Optional, List
-from ..database import get_db
+from ..database import get_async_db
 from ..models import FactSeguridad, MasterMunicipios, MasterDemografia
+from ..utils import condiciones_fecha
+from ..geometrias import tolerancia_para, geometrias_municipios, respuesta_feature_collection
+from ..respuestas import RutaJSON
 
-router = APIRouter(prefix="/geografia", tags=["Geografía"])
+router = APIRouter(prefix="/geografia", tags=["Geografía"], route_class=RutaJSON)
 
 
 @router.get("/delitos-por-municipio")
 async def get_delitos_por_municipio(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     anio: Optional[int] = Query(None, description="Filtrar por año"),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por tipo de delito"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Zoom del mapa: elige la geometría simplificada"),
+    tolerancia: Optional[float] = Query(None, ge=0, description="Tolerancia de simplificación en grados (prioridad sobre zoom)"),
 ):
     """
     Obtiene el total de delitos por municipio con geometría GeoJSON
     para visualización en mapa coroplético.
+    Sin zoom ni tolerancia se retorna la geometría original.
     """
-    # Base query
-    query = db.query(
+    # Base query (solo atributos; la geometría sale del cache de geometrias.py)
+    query = select(
         MasterMunicipios.codigo_dane,
         MasterMunicipios.nombre_municipio,
         MasterMunicipios.categoria_rural_urbana,
-        func.ST_AsGeoJSON(MasterMunicipios.geom).label("geojson"),
         func.coalesce(func.sum(FactSeguridad.cantidad), 0).label("total_delitos")
     ).outerjoin(
         FactSeguridad,
@@ -37,60 +42,55 @@ async def get_delitos_por_municipio(
     
     # Aplicar filtros
     if anio:
-        query = query.filter(func.extract("year", FactSeguridad.fecha_hecho) == anio)
+        query = query.filter(*condiciones_fecha(FactSeguridad.fecha_hecho, anio))
     if categoria_delito:
         query = query.filter(FactSeguridad.categoria_delito == categoria_delito)
     
     # Agrupar y ejecutar
-    results = query.group_by(
+    query = query.group_by(
         MasterMunicipios.codigo_dane,
         MasterMunicipios.nombre_municipio,
-        MasterMunicipios.categoria_rural_urbana,
-        MasterMunicipios.geom
-    ).all()
+        MasterMunicipios.categoria_rural_urbana
+    )
+    results = (await db.execute(query)).all()
+    
+    nivel = tolerancia_para(zoom, tolerancia)
+    geometrias = await geometrias_municipios(nivel)
     
     # Formatear respuesta GeoJSON
-    features = []
-    for row in results:
-        import json
-        geom = json.loads(row.geojson) if row.geojson else None
-        features.append({
-            "type": "Feature",
-            "properties": {
-                "codigo_dane": row.codigo_dane,
-                "nombre_municipio": row.nombre_municipio,
-                "categoria_rural_urbana": row.categoria_rural_urbana,
-                "total_delitos": int(row.total_delitos)
-            },
-            "geometry": geom
-        })
+    propiedades = [
+        {
+            "codigo_dane": row.codigo_dane,
+            "nombre_municipio": row.nombre_municipio,
+            "categoria_rural_urbana": row.categoria_rural_urbana,
+            "total_delitos": int(row.total_delitos)
+        }
+        for row in results
+    ]
     
-    return {
-        "type": "FeatureCollection",
-        "features": features
-    }
+    return respuesta_feature_collection(propiedades, geometrias, tolerancia=nivel)
 
 
 @router.get("/tasa-por-municipio")
 async def get_tasa_por_municipio(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     anio: Optional[int] = Query(None, description="Año para población y delitos"),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por tipo de delito"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Zoom del mapa: elige la geometría simplificada"),
+    tolerancia: Optional[float] = Query(None, ge=0, description="Tolerancia de simplificación en grados (prioridad sobre zoom)"),
 ):
     """
     Obtiene la tasa de delitos por 100.000 habitantes por municipio.
     Tasa = (delitos / población) * 100.000
     """
     # Subquery para contar delitos por municipio
-    delitos_subq = db.query(
+    delitos_subq = select(
         FactSeguridad.codigo_dane,
         func.coalesce(func.sum(FactSeguridad.cantidad), 0).label("total_delitos")
     )
     
     if anio:
-        delitos_subq = delitos_subq.filter(
-            func.extract("year", FactSeguridad.fecha_hecho) == anio
-        )
+        delitos_subq = delitos_subq.filter(*condiciones_fecha(FactSeguridad.fecha_hecho, anio))
     if categoria_delito:
         delitos_subq = delitos_subq.filter(
             FactSeguridad.categoria_delito == categoria_delito
@@ -99,11 +99,10 @@ async def get_tasa_por_municipio(
     delitos_subq = delitos_subq.group_by(FactSeguridad.codigo_dane).subquery()
     
     # Query principal con demografía
-    query = db.query(
+    query = select(
         MasterMunicipios.codigo_dane,
         MasterMunicipios.nombre_municipio,
         MasterMunicipios.categoria_rural_urbana,
-        func.ST_AsGeoJSON(MasterMunicipios.geom).label("geojson"),
         MasterDemografia.poblacion_total,
         func.coalesce(delitos_subq.c.total_delitos, 0).label("total_delitos")
     ).outerjoin(
@@ -117,46 +116,41 @@ async def get_tasa_por_municipio(
     if anio:
         query = query.filter(MasterDemografia.anio == anio)
     
-    results = query.all()
+    results = (await db.execute(query)).all()
+    
+    nivel = tolerancia_para(zoom, tolerancia)
+    geometrias = await geometrias_municipios(nivel)
     
     # Calcular tasa y formatear GeoJSON
-    features = []
+    propiedades = []
     for row in results:
-        import json
-        geom = json.loads(row.geojson) if row.geojson else None
         poblacion = row.poblacion_total or 1  # Evitar división por cero
         total_delitos = int(row.total_delitos) if row.total_delitos else 0
         tasa = (total_delitos / poblacion) * 100000 if poblacion > 0 else 0
         
-        features.append({
-            "type": "Feature",
-            "properties": {
-                "codigo_dane": row.codigo_dane,
-                "nombre_municipio": row.nombre_municipio,
-                "categoria_rural_urbana": row.categoria_rural_urbana,
-                "total_delitos": total_delitos,
-                "poblacion_total": poblacion,
-                "tasa_por_100k": round(tasa, 2)
-            },
-            "geometry": geom
+        propiedades.append({
+            "codigo_dane": row.codigo_dane,
+            "nombre_municipio": row.nombre_municipio,
+            "categoria_rural_urbana": row.categoria_rural_urbana,
+            "total_delitos": total_delitos,
+            "poblacion_total": poblacion,
+            "tasa_por_100k": round(tasa, 2)
         })
     
-    return {
-        "type": "FeatureCollection",
-        "features": features
-    }
+    return respuesta_feature_collection(propiedades, geometrias, tolerancia=nivel)
 
 
 @router.get("/municipios")
-async def get_municipios(db: Session = Depends(get_db)):
+async def get_municipios(db: AsyncSession = Depends(get_async_db)):
     """
     Lista todos los municipios disponibles (sin geometría, para selectores).
     """
-    results = db.query(
+    query = select(
         MasterMunicipios.codigo_dane,
         MasterMunicipios.nombre_municipio,
         MasterMunicipios.categoria_rural_urbana
-    ).order_by(MasterMunicipios.nombre_municipio).all()
+    ).order_by(MasterMunicipios.nombre_municipio)
+    results = (await db.execute(query)).all()
     
     return [
         {
@@ -169,14 +163,15 @@ async def get_municipios(db: Session = Depends(get_db)):
 
 
 @router.get("/categorias-delito")
-async def get_categorias_delito(db: Session = Depends(get_db)):
+async def get_categorias_delito(db: AsyncSession = Depends(get_async_db)):
     """
     Lista todas las categorías de delito disponibles.
     """
-    results = db.query(
+    query = select(
         FactSeguridad.categoria_delito
     ).distinct().filter(
         FactSeguridad.categoria_delito.isnot(None)
-    ).order_by(FactSeguridad.categoria_delito).all()
+    ).order_by(FactSeguridad.categoria_delito)
+    results = (await db.execute(query)).all()
     
     return [r.categoria_delito for r in results]
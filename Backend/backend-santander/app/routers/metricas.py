@@ -0,0 +1,64 @@
+"""
+Metricas internas de la API
+- Estado y contadores del cache de respuestas
+- Peticiones colapsadas por la coalescencia de consultas en vuelo
+- Estado del motor columnar
+- Snapshots Parquet/Arrow exportados y abiertos con memory-map
+- Respuestas comprimidas y bytes ahorrados
+"""
+from fastapi import APIRouter
+from ..cache import resumen_cache
+from ..coalescencia import resumen_coalescencia
+from ..compresion import resumen_compresion
+from ..motor_columnar import resumen_motor
+from ..motor_duckdb import resumen_duckdb
+from ..snapshots import resumen_snapshots
+from ..respuestas import RutaJSON
+
+router = APIRouter(prefix="/metricas", tags=["Metricas"], route_class=RutaJSON)
+
+
+@router.get("/cache")
+async def get_metricas_cache():
+    """
+    Retorna hits, misses, evictions y ocupacion del cache de respuestas
+    (contadores del proceso que atiende la peticion).
+    """
+    return resumen_cache()
+
+
+@router.get("/coalescencia")
+async def get_metricas_coalescencia():
+    """
+    Retorna cuántas peticiones GET se ejecutaron y cuántas se colapsaron sobre
+    una idéntica en vuelo (total y por ruta), y las que están en vuelo ahora.
+    """
+    return resumen_coalescencia()
+
+
+@router.get("/motor")
+async def get_metricas_motor():
+    """
+    Retorna el motor de consultas configurado y, con el motor columnar, filas,
+    memoria de los arreglos, versión de datos cargada y duración de la última carga;
+    en "duckdb", la versión de snapshot abierta y las consultas atendidas.
+    """
+    return {**resumen_motor(), "duckdb": resumen_duckdb()}
+
+
+@router.get("/snapshots")
+async def get_metricas_snapshots():
+    """
+    Retorna las versiones de snapshot exportadas y las tablas abiertas con
+    memory-map en este proceso (filas y bytes mapeados).
+    """
+    return resumen_snapshots()
+
+
+@router.get("/compresion")
+async def get_metricas_compresion():
+    """
+    Retorna las respuestas comprimidas por codificación (br, gzip), bytes originales,
+    enviados y ahorrados, y cuántas se sirvieron ya comprimidas desde el cache.
+    """
+    return resumen_compresion()
@@ -3,68 +3,64 @@ Router para predicciones de delitos.
 Combina datos históricos con predicciones de ML.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from typing import Optional
-import csv
-import os
+from datetime import date
+import numpy as np
 
-from ..database import get_db
+from ..almacen_predicciones import obtener_almacen
+from ..cache import version_datos
+from ..database import get_async_db
+from ..municipios_indice import indice_municipios
+from ..respuestas import RutaJSON
+from ..utils import columnas, FORMATOS
+from ..negociacion import medio_aceptado, respuesta_tabla
 
 router = APIRouter(
     prefix="/predicciones",
-    tags=["Predicciones"]
+    tags=["Predicciones"],
+    route_class=RutaJSON,
 )
 
-# Ruta al archivo CSV de predicciones
-PREDICCIONES_CSV = os.path.join(os.path.dirname(__file__), "..", "data", "total_delitos_prediccion.csv")
 
-
-def cargar_predicciones() -> dict:
+def serie_columnar(historicos: list, codigo_dane: Optional[int]) -> dict:
     """
-    Carga las predicciones del CSV en un diccionario.
-    Estructura: {codigo_dane: [{anio, mes, prediccion}, ...]}
+    Serie de /municipio/{municipio} en formato columnar: filas históricas (anio, mes,
+    total_delitos) más las predicciones de codigo_dane (None: sin predicciones) de meses
+    sin dato histórico, ordenadas por (anio, mes) como en el formato por filas
     """
-    predicciones = {}
-    
-    try:
-        with open(PREDICCIONES_CSV, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                codigo_dane = int(row['codigo_dane_5d'])
-                if codigo_dane not in predicciones:
-                    predicciones[codigo_dane] = []
-                
-                predicciones[codigo_dane].append({
-                    "anio": int(row['anio']),
-                    "mes": int(row['mes']),
-                    "total_delitos": round(float(row['pred_total_delitos']), 2),
-                    "es_prediccion": True
-                })
-    except FileNotFoundError:
-        return {}
-    
-    return predicciones
+    datos = columnas(historicos, ("anio", "mes", "total_delitos"))
+    datos["es_prediccion"] = [False] * len(historicos)
+    total_predicciones = 0
 
+    almacen = obtener_almacen()
+    if codigo_dane is not None and codigo_dane in almacen:
+        indices = almacen.indices_municipio(codigo_dane)
+        existentes = np.array(datos["anio"], dtype=np.int64) * 100 + np.array(datos["mes"], dtype=np.int64)
+        indices = indices[~np.isin(almacen.anio[indices] * 100 + almacen.mes[indices], existentes)]
+        for campo, valores in almacen.columnas(indices).items():
+            datos[campo] += valores
+        datos["es_prediccion"] += [True] * len(indices)
+        total_predicciones = len(indices)
 
-def resolver_municipio(db: Session, nombre: str) -> Optional[int]:
-    """Resuelve el nombre de municipio a código DANE."""
-    query = text("""
-        SELECT codigo_dane FROM master_municipios 
-        WHERE UPPER(nombre_municipio) LIKE UPPER(:nombre)
-        LIMIT 1
-    """)
-    result = db.execute(query, {"nombre": f"%{nombre}%"}).fetchone()
-    return result[0] if result else None
+    # Orden estable por (anio, mes), igual que datos.sort en el formato por filas
+    orden = np.lexsort((datos["mes"], datos["anio"])).tolist()
+    return {
+        "total_registros_historicos": len(historicos),
+        "total_predicciones": total_predicciones,
+        "datos": {campo: [valores[i] for i in orden] for campo, valores in datos.items()},
+    }
 
 
 @router.get("/municipio/{municipio}")
-def obtener_serie_temporal_municipio(
+async def obtener_serie_temporal_municipio(
     municipio: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por categoría de delito"),
-    incluir_prediccion: bool = Query(True, description="Incluir datos de predicción")
+    incluir_prediccion: bool = Query(True, description="Incluir datos de predicción"),
+    formato: str = Query("filas", alias="format", description="filas (lista de objetos) o columnar (datos como {columna: [valores]})"),
 ):
     """
     Obtiene la serie temporal completa de delitos por mes para un municipio,
@@ -75,16 +71,19 @@ def obtener_serie_temporal_municipio(
         - codigo_dane: Código DANE
         - categoria_filtrada: Categoría de delito si se aplicó filtro
         - datos: Lista de {anio, mes, total_delitos, es_prediccion}
+          (con format=columnar: {anio: [...], mes: [...], total_delitos: [...], es_prediccion: [...]})
     """
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de: {', '.join(FORMATOS)}")
+
     # Resolver municipio
-    codigo_dane = resolver_municipio(db, municipio)
+    indice = await indice_municipios()
+    codigo_dane = indice.resolver(municipio)
     if not codigo_dane:
-        raise HTTPException(status_code=404, detail=f"Municipio '{municipio}' no encontrado")
+        raise HTTPException(status_code=404, detail=indice.no_encontrado(municipio))
     
     # Obtener nombre oficial
-    nombre_query = text("SELECT nombre_municipio FROM master_municipios WHERE codigo_dane = :codigo")
-    nombre_result = db.execute(nombre_query, {"codigo": codigo_dane}).fetchone()
-    nombre_municipio = nombre_result[0] if nombre_result else municipio.upper()
+    nombre_municipio = indice.nombre(codigo_dane) or municipio.upper()
     
     # Construir query para datos históricos
     where_clauses = ["codigo_dane = :codigo_dane"]
@@ -107,7 +106,15 @@ def obtener_serie_temporal_municipio(
         ORDER BY anio, mes
     """)
     
-    results = db.execute(query, params).fetchall()
+    results = (await db.execute(query, params)).fetchall()
+    
+    if formato == "columnar":
+        return {
+            "municipio": nombre_municipio,
+            "codigo_dane": codigo_dane,
+            "categoria_filtrada": categoria_delito.upper() if categoria_delito else None,
+            **serie_columnar(results, codigo_dane if incluir_prediccion else None),
+        }
     
     # Construir lista de datos históricos
     datos = []
@@ -121,12 +128,12 @@ def obtener_serie_temporal_municipio(
     
     # Añadir predicciones si se solicita
     if incluir_prediccion:
-        predicciones = cargar_predicciones()
-        if codigo_dane in predicciones:
+        almacen = obtener_almacen()
+        if codigo_dane in almacen:
             # Filtrar predicciones que no estén ya en los datos históricos
             fechas_existentes = {(d["anio"], d["mes"]) for d in datos}
             
-            for pred in predicciones[codigo_dane]:
+            for pred in almacen.registros_municipio(codigo_dane):
                 if (pred["anio"], pred["mes"]) not in fechas_existentes:
                     datos.append(pred)
     
@@ -144,40 +151,54 @@ def obtener_serie_temporal_municipio(
 
 
 @router.get("/resumen")
-def obtener_resumen_predicciones(
-    db: Session = Depends(get_db),
+async def obtener_resumen_predicciones(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     anio: Optional[int] = Query(None, description="Filtrar por año"),
     mes: Optional[int] = Query(None, description="Filtrar por mes (1-12)")
 ):
     """
     Obtiene un resumen de todas las predicciones disponibles.
+    Con Accept: application/vnd.apache.arrow.stream o application/msgpack retorna
+    las predicciones como columnas (arreglos del almacén) en ese formato.
     """
-    predicciones = cargar_predicciones()
+    almacen = obtener_almacen()
+    indice = await indice_municipios()
     
-    # Obtener nombres de municipios
-    nombres_query = text("SELECT codigo_dane, nombre_municipio FROM master_municipios")
-    nombres_result = db.execute(nombres_query).fetchall()
-    nombres_map = {r[0]: r[1] for r in nombres_result}
+    # Filtro y orden por predicción descendente (estable) sobre las columnas
+    filas = almacen.filtrar(anio, mes)
+    filas = filas[np.argsort(-almacen.total_delitos[filas], kind="stable")]
     
-    resumen = []
-    for codigo_dane, preds in predicciones.items():
-        for pred in preds:
-            # Aplicar filtros si existen
-            if anio and pred["anio"] != anio:
-                continue
-            if mes and pred["mes"] != mes:
-                continue
-            
-            resumen.append({
-                "municipio": nombres_map.get(codigo_dane, f"CÓDIGO {codigo_dane}"),
-                "codigo_dane": codigo_dane,
-                "anio": pred["anio"],
-                "mes": pred["mes"],
-                "prediccion_delitos": pred["total_delitos"]
-            })
+    medio = medio_aceptado(request.headers.get("accept"))
+    if medio:
+        codigos = almacen.codigo_dane[filas]
+        distintos, inversa = np.unique(codigos, return_inverse=True)
+        nombres = np.array(
+            [indice.nombre(c) or f"CÓDIGO {c}" for c in distintos.tolist()], dtype=object
+        )
+        return respuesta_tabla(medio, {
+            "municipio": nombres[inversa].tolist(),
+            "codigo_dane": codigos,
+            "anio": almacen.anio[filas],
+            "mes": almacen.mes[filas],
+            "prediccion_delitos": almacen.total_delitos[filas],
+        }, total_predicciones=len(filas), filtros={"anio": anio, "mes": mes})
     
-    # Ordenar por predicción descendente
-    resumen.sort(key=lambda x: x["prediccion_delitos"], reverse=True)
+    resumen = [
+        {
+            "municipio": indice.nombre(codigo_dane) or f"CÓDIGO {codigo_dane}",
+            "codigo_dane": codigo_dane,
+            "anio": a,
+            "mes": m,
+            "prediccion_delitos": t
+        }
+        for codigo_dane, a, m, t in zip(
+            almacen.codigo_dane[filas].tolist(),
+            almacen.anio[filas].tolist(),
+            almacen.mes[filas].tolist(),
+            almacen.total_delitos[filas].tolist(),
+        )
+    ]
     
     return {
         "total_predicciones": len(resumen),
@@ -190,23 +211,22 @@ def obtener_resumen_predicciones(
 
 
 @router.get("/comparativa/{municipio}")
-def obtener_comparativa_prediccion(
+async def obtener_comparativa_prediccion(
     municipio: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Compara los datos históricos recientes con las predicciones
     para evaluar tendencias.
     """
     # Resolver municipio
-    codigo_dane = resolver_municipio(db, municipio)
+    indice = await indice_municipios()
+    codigo_dane = indice.resolver(municipio)
     if not codigo_dane:
-        raise HTTPException(status_code=404, detail=f"Municipio '{municipio}' no encontrado")
+        raise HTTPException(status_code=404, detail=indice.no_encontrado(municipio))
     
     # Obtener nombre oficial
-    nombre_query = text("SELECT nombre_municipio FROM master_municipios WHERE codigo_dane = :codigo")
-    nombre_result = db.execute(nombre_query, {"codigo": codigo_dane}).fetchone()
-    nombre_municipio = nombre_result[0] if nombre_result else municipio.upper()
+    nombre_municipio = indice.nombre(codigo_dane) or municipio.upper()
     
     # Promedio mensual histórico (últimos 3 años)
     query_promedio = text("""
@@ -221,15 +241,14 @@ def obtener_comparativa_prediccion(
         ORDER BY mes
     """)
     
-    results = db.execute(query_promedio, {"codigo_dane": codigo_dane}).fetchall()
+    results = (await db.execute(query_promedio, {"codigo_dane": codigo_dane})).fetchall()
     promedios_historicos = {
         r[0]: round(r[1] / r[2], 2) if r[2] > 0 else 0 
         for r in results
     }
     
     # Obtener predicciones
-    predicciones = cargar_predicciones()
-    preds_municipio = predicciones.get(codigo_dane, [])
+    preds_municipio = obtener_almacen().registros_municipio(codigo_dane)
     
     comparativa = []
     for pred in preds_municipio:
@@ -257,58 +276,93 @@ def obtener_comparativa_prediccion(
     }
 
 
+# Línea base histórica de /alertas: una sola consulta agrupada para todos los municipios
+_BASE_ALERTAS = text("""
+    SELECT 
+        codigo_dane,
+        EXTRACT(MONTH FROM fecha_hecho)::integer as mes,
+        COALESCE(SUM(cantidad), COUNT(*)) as total,
+        COUNT(DISTINCT EXTRACT(YEAR FROM fecha_hecho)) as num_anios
+    FROM fact_seguridad
+    WHERE fecha_hecho >= CURRENT_DATE - INTERVAL '3 years'
+      AND codigo_dane IS NOT NULL
+    GROUP BY codigo_dane, EXTRACT(MONTH FROM fecha_hecho)
+""")
+
+# Cambios predicción vs. promedio (ordenados de mayor a menor); se recalculan al
+# cambiar version_datos, el día (ventana de 3 años) o el archivo de predicciones
+_estado_alertas = {"clave": None, "cambios": None, "filas": None}
+
+
+async def calcular_cambios_alertas(db: AsyncSession) -> tuple:
+    """
+    Retorna (cambios, filas): porcentaje de cambio de cada predicción respecto al
+    promedio mensual de los últimos 3 años (np.ndarray) y los datos de cada
+    predicción en el mismo orden, ya ordenados como los retorna /alertas. Una consulta a la base de datos, o ninguna si está en cache.
+    """
+    almacen = obtener_almacen()
+    clave = (await version_datos(), date.today(), almacen.huella)
+    if _estado_alertas["clave"] == clave:
+        return _estado_alertas["cambios"], _estado_alertas["filas"]
+    
+    results = (await db.execute(_BASE_ALERTAS)).fetchall()
+    promedios = {
+        (r[0], r[1]): round(r[2] / r[3], 2) if r[3] > 0 else 0
+        for r in results
+    }
+    
+    filas = [
+        (codigo_dane, anio, mes, total, promedios.get((codigo_dane, mes), 0))
+        for codigo_dane, anio, mes, total in zip(
+            almacen.codigo_dane.tolist(),
+            almacen.anio.tolist(),
+            almacen.mes.tolist(),
+            almacen.total_delitos.tolist(),
+        )
+    ]
+    valores = almacen.total_delitos
+    base = np.array([f[4] for f in filas], dtype=float)
+    
+    # Solo municipio-mes con histórico (promedio > 0)
+    con_base = base > 0
+    cambios = (valores[con_base] - base[con_base]) / base[con_base] * 100
+    filas = [f for f, ok in zip(filas, con_base) if ok]
+    
+    # Mismo orden que retorna el endpoint: porcentaje redondeado descendente (orden estable)
+    redondeados = [round(c, 2) for c in cambios.tolist()]
+    orden = sorted(range(len(filas)), key=lambda i: -redondeados[i])
+    cambios = cambios[orden]
+    filas = [filas[i] for i in orden]
+    
+    _estado_alertas.update(clave=clave, cambios=cambios, filas=filas)
+    return cambios, filas
+
+
 @router.get("/alertas")
-def obtener_alertas_prediccion(
-    db: Session = Depends(get_db),
+async def obtener_alertas_prediccion(
+    db: AsyncSession = Depends(get_async_db),
     umbral_aumento: float = Query(20.0, description="Porcentaje de aumento para generar alerta")
 ):
     """
     Identifica municipios con predicciones de aumento significativo de delitos.
     """
-    predicciones = cargar_predicciones()
-    
-    # Obtener nombres de municipios
-    nombres_query = text("SELECT codigo_dane, nombre_municipio FROM master_municipios")
-    nombres_result = db.execute(nombres_query).fetchall()
-    nombres_map = {r[0]: r[1] for r in nombres_result}
+    cambios, filas = await calcular_cambios_alertas(db)
+    indice = await indice_municipios()
     
     alertas = []
-    
-    for codigo_dane, preds in predicciones.items():
-        # Obtener promedio histórico del municipio
-        query = text("""
-            SELECT 
-                EXTRACT(MONTH FROM fecha_hecho)::integer as mes,
-                COALESCE(SUM(cantidad), COUNT(*)) as total,
-                COUNT(DISTINCT EXTRACT(YEAR FROM fecha_hecho)) as num_anios
-            FROM fact_seguridad
-            WHERE codigo_dane = :codigo_dane
-              AND fecha_hecho >= CURRENT_DATE - INTERVAL '3 years'
-            GROUP BY EXTRACT(MONTH FROM fecha_hecho)
-        """)
-        
-        results = db.execute(query, {"codigo_dane": codigo_dane}).fetchall()
-        promedios = {r[0]: round(r[1] / r[2], 2) if r[2] > 0 else 0 for r in results}
-        
-        for pred in preds:
-            promedio = promedios.get(pred["mes"], 0)
-            if promedio > 0:
-                porcentaje_cambio = ((pred["total_delitos"] - promedio) / promedio) * 100
-                
-                if porcentaje_cambio >= umbral_aumento:
-                    alertas.append({
-                        "municipio": nombres_map.get(codigo_dane, f"CÓDIGO {codigo_dane}"),
-                        "codigo_dane": codigo_dane,
-                        "anio": pred["anio"],
-                        "mes": pred["mes"],
-                        "prediccion": pred["total_delitos"],
-                        "promedio_historico": promedio,
-                        "porcentaje_aumento": round(porcentaje_cambio, 2),
-                        "nivel_alerta": "CRÍTICO" if porcentaje_cambio >= 50 else "ALTO" if porcentaje_cambio >= 30 else "MODERADO"
-                    })
-    
-    # Ordenar por porcentaje de aumento descendente
-    alertas.sort(key=lambda x: x["porcentaje_aumento"], reverse=True)
+    for i in np.flatnonzero(cambios >= umbral_aumento).tolist():
+        porcentaje_cambio = float(cambios[i])
+        codigo_dane, anio, mes, prediccion, promedio = filas[i]
+        alertas.append({
+            "municipio": indice.nombre(codigo_dane) or f"CÓDIGO {codigo_dane}",
+            "codigo_dane": codigo_dane,
+            "anio": anio,
+            "mes": mes,
+            "prediccion": prediccion,
+            "promedio_historico": promedio,
+            "porcentaje_aumento": round(porcentaje_cambio, 2),
+            "nivel_alerta": "CRÍTICO" if porcentaje_cambio >= 50 else "ALTO" if porcentaje_cambio >= 30 else "MODERADO"
+        })
     
     return {
         "umbral_configurado": umbral_aumento,
@@ -2,49 +2,80 @@
 Seccion 2 - Temporal
 - Linea mensual de hurtos
 - Linea anual
-- Barras por dia de semana (calculado desde fecha_hecho)
+- Barras por dia de semana (claves de calendario de dim_fecha)
 """
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from fastapi import APIRouter, Depends, Query, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, extract, select
 from typing import Optional, List
-from ..database import get_db
-from ..models import FactSeguridad
+from ..motor_duckdb import get_db_analitica
+from ..models import DimFecha
+from ..cubo import fuente_seguridad
+from ..motor_columnar import motor_columnar
+from ..calendario import calendario_disponible
+from ..utils import condiciones_fecha, columnas, FORMATOS
+from ..respuestas import RutaJSON
 
-router = APIRouter(prefix="/temporal", tags=["Temporal"])
+router = APIRouter(prefix="/temporal", tags=["Temporal"], route_class=RutaJSON)
+
+# PostgreSQL DOW: 0=Domingo ... 6=Sabado
+DIAS_NOMBRE = {
+    0: "DOMINGO", 1: "LUNES", 2: "MARTES", 3: "MIERCOLES",
+    4: "JUEVES", 5: "VIERNES", 6: "SABADO"
+}
+ORDEN_LUNES_PRIMERO = [1, 2, 3, 4, 5, 6, 0]
 
 
 @router.get("/linea-mensual")
 async def get_linea_mensual(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por tipo de delito (ej: HURTO)"),
     anio: Optional[int] = Query(None, description="Filtrar por anio especifico"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
+    formato: str = Query("filas", alias="format", description="filas (lista de objetos) o columnar ({anio, mes, total} como listas)"),
 ):
     """
     Obtiene la serie temporal mensual de delitos.
     Ideal para graficos de linea.
+    Con format=columnar retorna {"anio": [...], "mes": [...], "total": [...]}.
     """
-    query = db.query(
-        extract("year", FactSeguridad.fecha_hecho).label("anio"),
-        extract("month", FactSeguridad.fecha_hecho).label("mes"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(FactSeguridad.fecha_hecho.isnot(None))
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de: {', '.join(FORMATOS)}")
+
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, anio=anio, codigo_dane=codigo_dane, ignorar_mayusculas=False
+        )
+        if formato == "columnar":
+            serie = motor.agrupar_columnas(("anio", "mes"), mascara)
+            return {"anio": serie["anio"], "mes": serie["mes"], "total": serie["total"]}
+        results = motor.agrupar(("anio", "mes"), mascara)
+    else:
+        F = await fuente_seguridad("fecha_hecho", "cantidad", "categoria_delito", "codigo_dane")
+        query = select(
+            extract("year", F.fecha_hecho).label("anio"),
+            extract("month", F.fecha_hecho).label("mes"),
+            func.sum(F.cantidad).label("total")
+        ).filter(F.fecha_hecho.isnot(None))
     
-    if categoria_delito:
-        query = query.filter(FactSeguridad.categoria_delito == categoria_delito)
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
+        if categoria_delito:
+            query = query.filter(F.categoria_delito == categoria_delito)
+        if anio:
+            query = query.filter(*condiciones_fecha(F.fecha_hecho, anio))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
     
-    results = query.group_by(
-        extract("year", FactSeguridad.fecha_hecho),
-        extract("month", FactSeguridad.fecha_hecho)
-    ).order_by(
-        extract("year", FactSeguridad.fecha_hecho),
-        extract("month", FactSeguridad.fecha_hecho)
-    ).all()
+        query = query.group_by(
+            extract("year", F.fecha_hecho),
+            extract("month", F.fecha_hecho)
+        ).order_by(
+            extract("year", F.fecha_hecho),
+            extract("month", F.fecha_hecho)
+        )
+        results = (await db.execute(query)).all()
+        if formato == "columnar":
+            return columnas(results, ("anio", "mes", "total"), {"anio": int, "mes": int, "total": int})
     
     return [
         {
@@ -59,28 +90,37 @@ async def get_linea_mensual(
 
 @router.get("/linea-anual")
 async def get_linea_anual(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por tipo de delito"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
 ):
     """
     Obtiene la serie temporal anual de delitos.
     """
-    query = db.query(
-        extract("year", FactSeguridad.fecha_hecho).label("anio"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(FactSeguridad.fecha_hecho.isnot(None))
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, codigo_dane=codigo_dane, ignorar_mayusculas=False
+        )
+        results = motor.agrupar(("anio",), mascara)
+    else:
+        F = await fuente_seguridad("fecha_hecho", "cantidad", "categoria_delito", "codigo_dane")
+        query = select(
+            extract("year", F.fecha_hecho).label("anio"),
+            func.sum(F.cantidad).label("total")
+        ).filter(F.fecha_hecho.isnot(None))
     
-    if categoria_delito:
-        query = query.filter(FactSeguridad.categoria_delito == categoria_delito)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
+        if categoria_delito:
+            query = query.filter(F.categoria_delito == categoria_delito)
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
     
-    results = query.group_by(
-        extract("year", FactSeguridad.fecha_hecho)
-    ).order_by(
-        extract("year", FactSeguridad.fecha_hecho)
-    ).all()
+        query = query.group_by(
+            extract("year", F.fecha_hecho)
+        ).order_by(
+            extract("year", F.fecha_hecho)
+        )
+        results = (await db.execute(query)).all()
     
     return [
         {
@@ -93,57 +133,60 @@ async def get_linea_anual(
 
 @router.get("/por-dia-semana")
 async def get_por_dia_semana(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por tipo de delito"),
     anio: Optional[int] = Query(None, description="Filtrar por anio"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
 ):
     """
     Obtiene la distribucion de delitos por dia de la semana.
-    Se calcula desde fecha_hecho usando EXTRACT(DOW).
+    Agrupa por dim_fecha.dia_semana (o EXTRACT(DOW) si el calendario no está construido).
     PostgreSQL: DOW returns 0=Sunday to 6=Saturday
     """
-    dias_nombre = {
-        0: "DOMINGO", 1: "LUNES", 2: "MARTES", 3: "MIERCOLES",
-        4: "JUEVES", 5: "VIERNES", 6: "SABADO"
-    }
-    
-    query = db.query(
-        extract("dow", FactSeguridad.fecha_hecho).label("dia_num"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(FactSeguridad.fecha_hecho.isnot(None))
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, anio=anio, codigo_dane=codigo_dane, ignorar_mayusculas=False
+        )
+        results = motor.agrupar({"dia_num": "dia_semana"}, mascara)
+    else:
+        F = await fuente_seguridad("fecha_hecho", "cantidad", "categoria_delito", "codigo_dane")
+        usar_calendario = await calendario_disponible(db)
+        dia_num = DimFecha.dia_semana if usar_calendario else extract("dow", F.fecha_hecho)
+        query = select(
+            dia_num.label("dia_num"),
+            func.sum(F.cantidad).label("total")
+        ).filter(F.fecha_hecho.isnot(None))
+        if usar_calendario:
+            query = query.join(DimFecha, DimFecha.fecha == F.fecha_hecho)
     
-    if categoria_delito:
-        query = query.filter(FactSeguridad.categoria_delito == categoria_delito)
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
+        if categoria_delito:
+            query = query.filter(F.categoria_delito == categoria_delito)
+        if anio:
+            query = query.filter(*condiciones_fecha(F.fecha_hecho, anio))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
     
-    results = query.group_by(
-        extract("dow", FactSeguridad.fecha_hecho)
-    ).order_by(
-        extract("dow", FactSeguridad.fecha_hecho)
-    ).all()
+        query = query.group_by(dia_num).order_by(dia_num)
+        results = (await db.execute(query)).all()
     
     resultado = [
         {
-            "dia": dias_nombre.get(int(r.dia_num), f"DIA_{int(r.dia_num)}"),
+            "dia": DIAS_NOMBRE.get(int(r.dia_num), f"DIA_{int(r.dia_num)}"),
             "dia_num": int(r.dia_num),
             "total": int(r.total)
         }
         for r in results
     ]
     
-    orden_lunes_primero = [1, 2, 3, 4, 5, 6, 0]
-    resultado.sort(key=lambda x: orden_lunes_primero.index(x["dia_num"]) if x["dia_num"] in orden_lunes_primero else 7)
+    resultado.sort(key=lambda x: ORDEN_LUNES_PRIMERO.index(x["dia_num"]) if x["dia_num"] in ORDEN_LUNES_PRIMERO else 7)
     
     return resultado
 
 
 @router.get("/tendencia-semanal")
 async def get_tendencia_semanal(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por tipo de delito"),
     anio: Optional[int] = Query(None, description="Filtrar por anio"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
@@ -151,26 +194,36 @@ async def get_tendencia_semanal(
     """
     Obtiene la serie temporal semanal de delitos.
     """
-    query = db.query(
-        extract("year", FactSeguridad.fecha_hecho).label("anio"),
-        extract("week", FactSeguridad.fecha_hecho).label("semana"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(FactSeguridad.fecha_hecho.isnot(None))
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, anio=anio, codigo_dane=codigo_dane, ignorar_mayusculas=False
+        )
+        results = motor.agrupar(("anio", "semana"), mascara)
+    else:
+        F = await fuente_seguridad("fecha_hecho", "cantidad", "categoria_delito", "codigo_dane")
+        usar_calendario = await calendario_disponible(db)
+        if usar_calendario:
+            anio_col, semana = DimFecha.anio, DimFecha.semana_iso
+        else:
+            anio_col, semana = extract("year", F.fecha_hecho), extract("week", F.fecha_hecho)
+        query = select(
+            anio_col.label("anio"),
+            semana.label("semana"),
+            func.sum(F.cantidad).label("total")
+        ).filter(F.fecha_hecho.isnot(None))
+        if usar_calendario:
+            query = query.join(DimFecha, DimFecha.fecha == F.fecha_hecho)
     
-    if categoria_delito:
-        query = query.filter(FactSeguridad.categoria_delito == categoria_delito)
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
+        if categoria_delito:
+            query = query.filter(F.categoria_delito == categoria_delito)
+        if anio:
+            query = query.filter(*condiciones_fecha(F.fecha_hecho, anio))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
     
-    results = query.group_by(
-        extract("year", FactSeguridad.fecha_hecho),
-        extract("week", FactSeguridad.fecha_hecho)
-    ).order_by(
-        extract("year", FactSeguridad.fecha_hecho),
-        extract("week", FactSeguridad.fecha_hecho)
-    ).all()
+        query = query.group_by(anio_col, semana).order_by(anio_col, semana)
+        results = (await db.execute(query)).all()
     
     return [
         {
@@ -185,7 +238,7 @@ async def get_tendencia_semanal(
 
 @router.get("/comparativa-anual")
 async def get_comparativa_anual(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por tipo de delito"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
 ):
@@ -193,24 +246,33 @@ async def get_comparativa_anual(
     Compara la evolucion mensual entre anios.
     Util para ver estacionalidad y tendencias interanuales.
     """
-    query = db.query(
-        extract("year", FactSeguridad.fecha_hecho).label("anio"),
-        extract("month", FactSeguridad.fecha_hecho).label("mes"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(FactSeguridad.fecha_hecho.isnot(None))
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, codigo_dane=codigo_dane, ignorar_mayusculas=False
+        )
+        results = motor.agrupar(("anio", "mes"), mascara)
+    else:
+        F = await fuente_seguridad("fecha_hecho", "cantidad", "categoria_delito", "codigo_dane")
+        query = select(
+            extract("year", F.fecha_hecho).label("anio"),
+            extract("month", F.fecha_hecho).label("mes"),
+            func.sum(F.cantidad).label("total")
+        ).filter(F.fecha_hecho.isnot(None))
     
-    if categoria_delito:
-        query = query.filter(FactSeguridad.categoria_delito == categoria_delito)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
+        if categoria_delito:
+            query = query.filter(F.categoria_delito == categoria_delito)
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
     
-    results = query.group_by(
-        extract("year", FactSeguridad.fecha_hecho),
-        extract("month", FactSeguridad.fecha_hecho)
-    ).order_by(
-        extract("year", FactSeguridad.fecha_hecho),
-        extract("month", FactSeguridad.fecha_hecho)
-    ).all()
+        query = query.group_by(
+            extract("year", F.fecha_hecho),
+            extract("month", F.fecha_hecho)
+        ).order_by(
+            extract("year", F.fecha_hecho),
+            extract("month", F.fecha_hecho)
+        )
+        results = (await db.execute(query)).all()
     
     datos_por_anio = {}
     for r in results:
@@ -227,7 +289,7 @@ async def get_comparativa_anual(
 
 @router.get("/por-modalidad")
 async def get_por_modalidad(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por tipo de delito"),
     anio: Optional[int] = Query(None, description="Filtrar por anio"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
@@ -235,25 +297,34 @@ async def get_por_modalidad(
     """
     Obtiene la distribucion de delitos por modalidad especifica.
     """
-    query = db.query(
-        FactSeguridad.modalidad_especifica.label("modalidad"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(
-        FactSeguridad.modalidad_especifica.isnot(None)
-    )
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, anio=anio, codigo_dane=codigo_dane, ignorar_mayusculas=False
+        )
+        results = motor.agrupar({"modalidad": "modalidad_especifica"}, mascara, orden="total")
+    else:
+        F = await fuente_seguridad("modalidad_especifica", "cantidad", "categoria_delito", "fecha_hecho", "codigo_dane")
+        query = select(
+            F.modalidad_especifica.label("modalidad"),
+            func.sum(F.cantidad).label("total")
+        ).filter(
+            F.modalidad_especifica.isnot(None)
+        )
     
-    if categoria_delito:
-        query = query.filter(FactSeguridad.categoria_delito == categoria_delito)
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
+        if categoria_delito:
+            query = query.filter(F.categoria_delito == categoria_delito)
+        if anio:
+            query = query.filter(*condiciones_fecha(F.fecha_hecho, anio))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
     
-    results = query.group_by(
-        FactSeguridad.modalidad_especifica
-    ).order_by(
-        func.sum(FactSeguridad.cantidad).desc()
-    ).all()
+        query = query.group_by(
+            F.modalidad_especifica
+        ).order_by(
+            func.sum(F.cantidad).desc()
+        )
+        results = (await db.execute(query)).all()
     
     total_general = sum(int(r.total) for r in results)
     
@@ -269,7 +340,7 @@ async def get_por_modalidad(
 
 @router.get("/por-zona")
 async def get_por_zona(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Filtrar por tipo de delito"),
     anio: Optional[int] = Query(None, description="Filtrar por anio"),
     codigo_dane: Optional[int] = Query(None, description="Filtrar por municipio"),
@@ -277,25 +348,34 @@ async def get_por_zona(
     """
     Obtiene la distribucion de delitos por zona (URBANA/RURAL).
     """
-    query = db.query(
-        FactSeguridad.zona_hecho.label("zona"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(
-        FactSeguridad.zona_hecho.isnot(None)
-    )
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, anio=anio, codigo_dane=codigo_dane, ignorar_mayusculas=False
+        )
+        results = motor.agrupar({"zona": "zona_hecho"}, mascara, orden="total")
+    else:
+        F = await fuente_seguridad("zona_hecho", "cantidad", "categoria_delito", "fecha_hecho", "codigo_dane")
+        query = select(
+            F.zona_hecho.label("zona"),
+            func.sum(F.cantidad).label("total")
+        ).filter(
+            F.zona_hecho.isnot(None)
+        )
     
-    if categoria_delito:
-        query = query.filter(FactSeguridad.categoria_delito == categoria_delito)
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
+        if categoria_delito:
+            query = query.filter(F.categoria_delito == categoria_delito)
+        if anio:
+            query = query.filter(*condiciones_fecha(F.fecha_hecho, anio))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
     
-    results = query.group_by(
-        FactSeguridad.zona_hecho
-    ).order_by(
-        func.sum(FactSeguridad.cantidad).desc()
-    ).all()
+        query = query.group_by(
+            F.zona_hecho
+        ).order_by(
+            func.sum(F.cantidad).desc()
+        )
+        results = (await db.execute(query)).all()
     
     total_general = sum(int(r.total) for r in results)
     
@@ -310,16 +390,22 @@ async def get_por_zona(
 
 
 @router.get("/anios-disponibles")
-async def get_anios_disponibles(db: Session = Depends(get_db)):
+async def get_anios_disponibles(db: AsyncSession = Depends(get_db_analitica)):
     """
     Lista todos los anios disponibles en los datos.
     """
-    results = db.query(
-        extract("year", FactSeguridad.fecha_hecho).label("anio")
-    ).distinct().filter(
-        FactSeguridad.fecha_hecho.isnot(None)
-    ).order_by(
-        extract("year", FactSeguridad.fecha_hecho)
-    ).all()
+    motor = await motor_columnar()
+    if motor:
+        results = motor.agrupar(("anio",))
+    else:
+        F = await fuente_seguridad("fecha_hecho")
+        query = select(
+            extract("year", F.fecha_hecho).label("anio")
+        ).distinct().filter(
+            F.fecha_hecho.isnot(None)
+        ).order_by(
+            extract("year", F.fecha_hecho)
+        )
+        results = (await db.execute(query)).all()
     
     return [int(r.anio) for r in results]
@@ -0,0 +1,162 @@
+"""
+Teselas vectoriales (Mapbox Vector Tiles) para los mapas
+- Capa "puntos": eventos de fact_seguridad con los mismos filtros de /victimas/mapa-puntos.
+  Por debajo de TILES_ZOOM_PUNTOS cada feature es una celda hexagonal (app/agregacion_espacial.py)
+  con el total de la celda, así la tesela representa todos los eventos a cualquier zoom.
+  Desde ese zoom, eventos individuales (los más recientes primero) hasta TILES_MAX_PUNTOS;
+  si la tesela se recorta lleva la cabecera X-Tesela-Truncada
+- Capa "municipios": polígonos de master_municipios
+Se generan con ST_AsMVT/ST_AsMVTGeom; el cache de respuestas guarda cada tesela (CACHE_RUTAS["/tiles/"]).
+"""
+import logging
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, cast, literal_column, String
+from typing import Optional
+from datetime import date
+from ..config import settings
+from ..database import get_async_db
+from ..models import FactSeguridad, MasterMunicipios
+from ..utils import resolver_municipio, condiciones_eventos
+from ..agregacion_espacial import tamano_celda, expresiones_celda, centro_celda
+from ..respuestas import RutaJSON
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/tiles", tags=["Teselas"], route_class=RutaJSON)
+
+# Parámetros estándar de MVT: resolución interna y margen (en unidades de tesela)
+EXTENSION = 4096
+MARGEN = 64
+
+CAPAS = ("puntos", "municipios")
+
+MEDIA_TYPE_MVT = "application/vnd.mapbox-vector-tile"
+
+
+def _geom_tesela(geom, envolvente):
+    """Geometría reproyectada a 3857 y recortada/cuantizada a la tesela"""
+    return func.ST_AsMVTGeom(
+        func.ST_Transform(geom, 3857), envolvente, EXTENSION, MARGEN, True
+    ).label("geom")
+
+
+def _celdas_tesela(envolvente, z: int, condiciones: list):
+    """
+    Celdas hexagonales del zoom z cuyo centro cae en la tesela: (geom, ix, iy, total, eventos).
+    Los eventos se toman de la tesela ampliada en dos celdas, de modo que cada celda
+    queda completa en una sola tesela aunque sus eventos crucen el borde.
+    """
+    tamano = tamano_celda(z)
+    envolvente_4326 = func.ST_Transform(envolvente, 4326)
+    ix, iy = expresiones_celda("hex", FactSeguridad.longitud, FactSeguridad.latitud, tamano)
+    # Subconsulta + agrupación afuera: asyncpg envía cada literal como parámetro distinto
+    eventos = select(
+        ix.label("ix"), iy.label("iy"), FactSeguridad.cantidad
+    ).filter(
+        FactSeguridad.geom.op("&&")(func.ST_Expand(envolvente_4326, 2 * tamano)),
+        FactSeguridad.latitud.isnot(None),
+        FactSeguridad.longitud.isnot(None),
+        *condiciones
+    ).subquery()
+    celdas = select(
+        eventos.c.ix,
+        eventos.c.iy,
+        func.sum(eventos.c.cantidad).label("total"),
+        func.count().label("eventos"),
+    ).group_by(eventos.c.ix, eventos.c.iy).subquery()
+    lon, lat = centro_celda("hex", celdas.c.ix, celdas.c.iy, tamano)
+    centro = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
+    return select(
+        _geom_tesela(centro, envolvente),
+        celdas.c.ix,
+        celdas.c.iy,
+        celdas.c.total,
+        celdas.c.eventos,
+    ).filter(func.ST_Intersects(centro, envolvente_4326))
+
+
+@router.get("/{capa}/{z}/{x}/{y}.pbf")
+async def get_tesela(
+    capa: str,
+    z: int,
+    x: int,
+    y: int,
+    db: AsyncSession = Depends(get_async_db),
+    categoria_delito: Optional[str] = Query(None, description="Tipo de delito: HURTO, VIF, SEXUAL, LESIONES, INFANCIA"),
+    anio: Optional[int] = Query(None, description="Año (ej: 2024)"),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha inicio (YYYY-MM-DD)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha fin (YYYY-MM-DD)"),
+    municipio: Optional[str] = Query(None, description="Nombre del municipio (ej: BUCARAMANGA)"),
+    genero: Optional[str] = Query(None, description="Genero: MASCULINO, FEMENINO"),
+    grupo_etario: Optional[str] = Query(None, description="Grupo etario: MENORES, ADOLESCENTES, ADULTOS"),
+):
+    """
+    Retorna la tesela {z}/{x}/{y} (esquema XYZ) de la capa en formato MVT.
+    Para "puntos" se aplican los filtros de /victimas/mapa-puntos. Con z < TILES_ZOOM_PUNTOS
+    cada feature es una celda hexagonal (ix, iy, total, eventos); desde ese zoom, eventos
+    individuales ordenados por fecha descendente, con un máximo de TILES_MAX_PUNTOS por
+    tesela (X-Tesela-Truncada: 1 si hay más).
+    """
+    if capa not in CAPAS:
+        raise HTTPException(status_code=404, detail=f"Capa '{capa}' no existe. Opciones: {', '.join(CAPAS)}")
+    if not (0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail=f"Tesela fuera de rango: {z}/{x}/{y}")
+
+    codigo_dane = await resolver_municipio(municipio)
+    envolvente = func.ST_TileEnvelope(z, x, y)
+    condiciones = condiciones_eventos(
+        FactSeguridad, categoria_delito, anio, fecha_inicio, fecha_fin,
+        codigo_dane, genero, grupo_etario
+    )
+    truncada = None
+
+    if capa == "puntos" and z < settings.TILES_ZOOM_PUNTOS:
+        subq = _celdas_tesela(envolvente, z, condiciones)
+    elif capa == "puntos":
+        filtros = [FactSeguridad.geom.op("&&")(func.ST_Transform(envolvente, 4326)), *condiciones]
+        subq = select(
+            _geom_tesela(FactSeguridad.geom, envolvente),
+            FactSeguridad.id_evento,
+            cast(FactSeguridad.fecha_hecho, String).label("fecha_hecho"),
+            FactSeguridad.categoria_delito,
+            FactSeguridad.modalidad_especifica,
+            FactSeguridad.zona_hecho,
+            FactSeguridad.clase_sitio,
+            FactSeguridad.genero,
+            FactSeguridad.grupo_etario,
+            FactSeguridad.arma_medio,
+            FactSeguridad.cantidad,
+        ).filter(*filtros).order_by(
+            FactSeguridad.fecha_hecho.desc(), FactSeguridad.id_evento.desc()
+        ).limit(settings.TILES_MAX_PUNTOS)
+        # Hay más eventos que el límite si existe una fila después de TILES_MAX_PUNTOS
+        truncada = select(FactSeguridad.id_evento).filter(*filtros).offset(settings.TILES_MAX_PUNTOS).limit(1).exists()
+    else:
+        subq = select(
+            _geom_tesela(MasterMunicipios.geom, envolvente),
+            MasterMunicipios.codigo_dane,
+            MasterMunicipios.nombre_municipio,
+            MasterMunicipios.categoria_rural_urbana,
+        ).filter(
+            MasterMunicipios.geom.op("&&")(func.ST_Transform(envolvente, 4326))
+        )
+        if codigo_dane:
+            subq = subq.filter(MasterMunicipios.codigo_dane == codigo_dane)
+
+    subq = subq.subquery("capa")
+    query = select(
+        func.ST_AsMVT(literal_column("capa"), capa, EXTENSION, "geom"),
+        truncada if truncada is not None else literal_column("false"),
+    ).select_from(subq)
+    tesela, recortada = (await db.execute(query)).one()
+
+    headers = {"Cache-Control": f"public, max-age={settings.CACHE_RUTAS.get('/tiles/', 0)}"}
+    if recortada:
+        logger.warning(f"Tesela {capa}/{z}/{x}/{y} recortada a {settings.TILES_MAX_PUNTOS} eventos")
+        headers["X-Tesela-Truncada"] = "1"
+    return Response(
+        content=bytes(tesela) if tesela else b"",
+        media_type=MEDIA_TYPE_MVT,
+        headers=headers,
+    )
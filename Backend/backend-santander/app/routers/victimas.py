@@ -4,21 +4,38 @@ Seccion 3 - Victimas
 - Barras por grupo etario
 - Mapa de puntos con victimas (lat/lon)
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from typing import Optional, List
 from datetime import date
-from ..database import get_db
+import numpy as np
+from ..motor_duckdb import get_db_analitica
 from ..models import FactSeguridad
-from ..utils import resolver_municipio
+from ..cubo import fuente_seguridad
+from ..motor_columnar import motor_columnar
+from ..utils import resolver_municipio, condiciones_eventos, condiciones_fecha, columnas
+from ..agregacion_espacial import MODOS, tamano_celda, parsear_bbox, expresiones_celda, centro_celda
+from ..respuestas import RutaJSON
+from ..negociacion import medio_aceptado, respuesta_tabla
 
-router = APIRouter(prefix="/victimas", tags=["Victimas"])
+router = APIRouter(prefix="/victimas", tags=["Victimas"], route_class=RutaJSON)
+
+ORDEN_GRUPOS_ETARIOS = ["MENOR", "ADOLESCENTE", "ADULTO"]
+
+
+def orden_grupo_etario(fila: dict) -> int:
+    """Posición del grupo etario (menores primero); los no reconocidos al final"""
+    g = fila["grupo_etario"].upper() if fila["grupo_etario"] else ""
+    for i, og in enumerate(ORDEN_GRUPOS_ETARIOS):
+        if og in g:
+            return i
+    return len(ORDEN_GRUPOS_ETARIOS)
 
 
 @router.get("/por-genero")
 async def get_por_genero(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Tipo de delito: HURTO, VIF, SEXUAL, LESIONES, INFANCIA"),
     anio: Optional[int] = Query(None, description="Año (ej: 2024)"),
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicio (YYYY-MM-DD)"),
@@ -28,31 +45,36 @@ async def get_por_genero(
     """
     Obtiene la distribucion de victimas por genero.
     """
-    codigo_dane = resolver_municipio(db, municipio)
-    
-    query = db.query(
-        FactSeguridad.genero.label("genero"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(
-        FactSeguridad.genero.isnot(None)
-    )
-    
-    if categoria_delito:
-        query = query.filter(func.upper(FactSeguridad.categoria_delito) == categoria_delito.upper())
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if fecha_inicio:
-        query = query.filter(FactSeguridad.fecha_hecho >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(FactSeguridad.fecha_hecho <= fecha_fin)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
-    
-    results = query.group_by(
-        FactSeguridad.genero
-    ).order_by(
-        func.sum(FactSeguridad.cantidad).desc()
-    ).all()
+    codigo_dane = await resolver_municipio(municipio)
+    
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, anio=anio, fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin, codigo_dane=codigo_dane,
+        )
+        results = motor.agrupar(("genero",), mascara, orden="total")
+    else:
+        F = await fuente_seguridad("genero", "cantidad", "categoria_delito", "fecha_hecho", "codigo_dane")
+        query = select(
+            F.genero.label("genero"),
+            func.sum(F.cantidad).label("total")
+        ).filter(
+            F.genero.isnot(None)
+        )
+    
+        if categoria_delito:
+            query = query.filter(func.upper(F.categoria_delito) == categoria_delito.upper())
+        query = query.filter(*condiciones_fecha(F.fecha_hecho, anio, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
+    
+        query = query.group_by(
+            F.genero
+        ).order_by(
+            func.sum(F.cantidad).desc()
+        )
+        results = (await db.execute(query)).all()
     
     total_general = sum(int(r.total) for r in results)
     
@@ -68,7 +90,7 @@ async def get_por_genero(
 
 @router.get("/por-grupo-etario")
 async def get_por_grupo_etario(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Tipo de delito: HURTO, VIF, SEXUAL, LESIONES, INFANCIA"),
     anio: Optional[int] = Query(None, description="Año (ej: 2024)"),
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicio (YYYY-MM-DD)"),
@@ -78,33 +100,37 @@ async def get_por_grupo_etario(
     """
     Obtiene la distribucion de victimas por grupo etario.
     """
-    codigo_dane = resolver_municipio(db, municipio)
-    
-    query = db.query(
-        FactSeguridad.grupo_etario.label("grupo"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(
-        FactSeguridad.grupo_etario.isnot(None)
-    )
+    codigo_dane = await resolver_municipio(municipio)
+    
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, anio=anio, fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin, codigo_dane=codigo_dane,
+        )
+        results = motor.agrupar({"grupo": "grupo_etario"}, mascara, orden="total")
+    else:
+        F = await fuente_seguridad("grupo_etario", "cantidad", "categoria_delito", "fecha_hecho", "codigo_dane")
+        query = select(
+            F.grupo_etario.label("grupo"),
+            func.sum(F.cantidad).label("total")
+        ).filter(
+            F.grupo_etario.isnot(None)
+        )
+    
+        if categoria_delito:
+            query = query.filter(func.upper(F.categoria_delito) == categoria_delito.upper())
+        query = query.filter(*condiciones_fecha(F.fecha_hecho, anio, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
+    
+        query = query.group_by(
+            F.grupo_etario
+        ).order_by(
+            func.sum(F.cantidad).desc()
+        )
+        results = (await db.execute(query)).all()
     
-    if categoria_delito:
-        query = query.filter(func.upper(FactSeguridad.categoria_delito) == categoria_delito.upper())
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if fecha_inicio:
-        query = query.filter(FactSeguridad.fecha_hecho >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(FactSeguridad.fecha_hecho <= fecha_fin)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
-    
-    results = query.group_by(
-        FactSeguridad.grupo_etario
-    ).order_by(
-        func.sum(FactSeguridad.cantidad).desc()
-    ).all()
-    
-    orden_grupos = ["MENOR", "ADOLESCENTE", "ADULTO"]
     resultado = [
         {
             "grupo_etario": r.grupo,
@@ -113,14 +139,7 @@ async def get_por_grupo_etario(
         for r in results
     ]
     
-    def orden_key(x):
-        g = x["grupo_etario"].upper() if x["grupo_etario"] else ""
-        for i, og in enumerate(orden_grupos):
-            if og in g:
-                return i
-        return len(orden_grupos)
-    
-    resultado.sort(key=orden_key)
+    resultado.sort(key=orden_grupo_etario)
     
     total_general = sum(r["total"] for r in resultado)
     for r in resultado:
@@ -129,9 +148,17 @@ async def get_por_grupo_etario(
     return resultado
 
 
+# Columnas de /mapa-puntos en formato binario, en el orden de la consulta
+CAMPOS_PUNTOS = (
+    "id_evento", "fecha_hecho", "categoria_delito", "modalidad_especifica", "zona_hecho", "clase_sitio",
+    "genero", "grupo_etario", "arma_medio", "cantidad", "latitud", "longitud",
+)
+
+
 @router.get("/mapa-puntos")
 async def get_mapa_puntos_victimas(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Tipo de delito: HURTO, VIF, SEXUAL, LESIONES, INFANCIA"),
     anio: Optional[int] = Query(None, description="Año (ej: 2024)"),
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicio (YYYY-MM-DD)"),
@@ -140,14 +167,43 @@ async def get_mapa_puntos_victimas(
     genero: Optional[str] = Query(None, description="Genero: MASCULINO, FEMENINO"),
     grupo_etario: Optional[str] = Query(None, description="Grupo etario: MENORES, ADOLESCENTES, ADULTOS"),
     limit: int = Query(5000, description="Limite de puntos a retornar"),
+    agregacion: Optional[str] = Query(None, description="Agrupar en celdas: grilla, hex (sin valor: puntos individuales)"),
+    zoom: int = Query(9, ge=0, le=20, description="Zoom del mapa: define el tamaño de celda al agregar"),
+    bbox: Optional[str] = Query(None, description="Area visible: min_lon,min_lat,max_lon,max_lat"),
 ):
     """
     Obtiene puntos georreferenciados de victimas para visualizacion en mapa.
     Retorna GeoJSON con propiedades de cada evento.
+    Con `agregacion` retorna una celda por feature (centro, totales y desglose por
+    categoria); el tamaño de la respuesta depende del area y el zoom, no del numero de eventos.
+    Con Accept: application/vnd.apache.arrow.stream o application/msgpack retorna una
+    tabla (una fila por evento, o por celda y categoria al agregar) en ese formato.
     """
-    codigo_dane = resolver_municipio(db, municipio)
+    if agregacion and agregacion not in MODOS:
+        raise HTTPException(status_code=400, detail=f"agregacion debe ser una de: {', '.join(MODOS)}")
+    medio = medio_aceptado(request.headers.get("accept"))
+    
+    codigo_dane = await resolver_municipio(municipio)
+    limites = parsear_bbox(bbox)
+    
+    condiciones = [
+        FactSeguridad.latitud.isnot(None),
+        FactSeguridad.longitud.isnot(None),
+        *condiciones_eventos(
+            FactSeguridad, categoria_delito, anio, fecha_inicio, fecha_fin,
+            codigo_dane, genero, grupo_etario
+        )
+    ]
+    if limites:
+        condiciones += [
+            FactSeguridad.longitud.between(limites[0], limites[2]),
+            FactSeguridad.latitud.between(limites[1], limites[3]),
+        ]
+    
+    if agregacion:
+        return await _mapa_puntos_agregado(db, condiciones, agregacion, zoom, medio)
     
-    query = db.query(
+    query = select(
         FactSeguridad.id_evento,
         FactSeguridad.fecha_hecho,
         FactSeguridad.categoria_delito,
@@ -160,27 +216,13 @@ async def get_mapa_puntos_victimas(
         FactSeguridad.cantidad,
         FactSeguridad.latitud,
         FactSeguridad.longitud,
-    ).filter(
-        FactSeguridad.latitud.isnot(None),
-        FactSeguridad.longitud.isnot(None)
-    )
+    ).filter(*condiciones)
     
-    if categoria_delito:
-        query = query.filter(func.upper(FactSeguridad.categoria_delito) == categoria_delito.upper())
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if fecha_inicio:
-        query = query.filter(FactSeguridad.fecha_hecho >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(FactSeguridad.fecha_hecho <= fecha_fin)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
-    if genero:
-        query = query.filter(func.upper(FactSeguridad.genero) == genero.upper())
-    if grupo_etario:
-        query = query.filter(func.upper(FactSeguridad.grupo_etario) == grupo_etario.upper())
-    
-    results = query.limit(limit).all()
+    query = query.limit(limit)
+    results = (await db.execute(query)).all()
+    
+    if medio:
+        return respuesta_tabla(medio, columnas(results, CAMPOS_PUNTOS), total_puntos=len(results))
     
     features = []
     for r in results:
@@ -211,9 +253,87 @@ async def get_mapa_puntos_victimas(
     }
 
 
+async def _mapa_puntos_agregado(db: AsyncSession, condiciones: list, modo: str, zoom: int, medio: Optional[str]):
+    """
+    Agrupa los eventos en celdas (ver app/agregacion_espacial.py).
+    Con `medio` (formato binario) retorna la tabla celda x categoria tal como sale de la consulta.
+    Las celdas se calculan en una subconsulta y se agrupan afuera: asyncpg envia
+    cada literal como parametro distinto y no se pueden repetir en GROUP BY.
+    """
+    tamano = tamano_celda(zoom)
+    ix, iy = expresiones_celda(modo, FactSeguridad.longitud, FactSeguridad.latitud, tamano)
+    
+    celdas = select(
+        ix.label("ix"),
+        iy.label("iy"),
+        FactSeguridad.categoria_delito,
+        FactSeguridad.cantidad
+    ).filter(*condiciones).subquery()
+    
+    query = select(
+        celdas.c.ix,
+        celdas.c.iy,
+        celdas.c.categoria_delito,
+        func.sum(celdas.c.cantidad).label("total"),
+        func.count().label("eventos")
+    ).group_by(
+        celdas.c.ix,
+        celdas.c.iy,
+        celdas.c.categoria_delito
+    )
+    results = (await db.execute(query)).all()
+    
+    if medio:
+        tabla = columnas(
+            results, ("ix", "iy", "categoria_delito", "total", "eventos"),
+            {"ix": int, "iy": int, "total": lambda v: int(v or 0), "eventos": int},
+        )
+        lon, lat = centro_celda(modo, np.array(tabla["ix"], dtype=np.int64), np.array(tabla["iy"], dtype=np.int64), tamano)
+        tabla["lon"], tabla["lat"] = np.round(lon, 6), np.round(lat, 6)
+        tabla["categoria_delito"] = [c or "NO REPORTADO" for c in tabla["categoria_delito"]]
+        return respuesta_tabla(
+            medio, tabla, agregacion=modo, zoom=zoom, tamano_celda=tamano, total_filas=len(results),
+            total_eventos=sum(tabla["eventos"]),
+        )
+    
+    por_celda = {}
+    for r in results:
+        celda = por_celda.setdefault((int(r.ix), int(r.iy)), {"total": 0, "eventos": 0, "categorias": {}})
+        total = int(r.total or 0)
+        celda["total"] += total
+        celda["eventos"] += int(r.eventos)
+        categoria = r.categoria_delito or "NO REPORTADO"
+        celda["categorias"][categoria] = celda["categorias"].get(categoria, 0) + total
+    
+    features = []
+    for (cx, cy), celda in sorted(por_celda.items(), key=lambda x: -x[1]["total"]):
+        lon, lat = centro_celda(modo, cx, cy, tamano)
+        features.append({
+            "type": "Feature",
+            "properties": {
+                "celda": f"{cx}:{cy}",
+                **celda
+            },
+            "geometry": {
+                "type": "Point",
+                "coordinates": [round(lon, 6), round(lat, 6)]
+            }
+        })
+    
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "agregacion": modo,
+        "zoom": zoom,
+        "tamano_celda": tamano,
+        "total_celdas": len(features),
+        "total_eventos": sum(c["eventos"] for c in por_celda.values())
+    }
+
+
 @router.get("/por-arma-medio")
 async def get_por_arma_medio(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Tipo de delito"),
     anio: Optional[int] = Query(None, description="Año"),
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicio"),
@@ -223,31 +343,36 @@ async def get_por_arma_medio(
     """
     Obtiene la distribucion de eventos por arma/medio utilizado.
     """
-    codigo_dane = resolver_municipio(db, municipio)
-    
-    query = db.query(
-        FactSeguridad.arma_medio.label("arma_medio"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(
-        FactSeguridad.arma_medio.isnot(None)
-    )
-    
-    if categoria_delito:
-        query = query.filter(func.upper(FactSeguridad.categoria_delito) == categoria_delito.upper())
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if fecha_inicio:
-        query = query.filter(FactSeguridad.fecha_hecho >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(FactSeguridad.fecha_hecho <= fecha_fin)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
-    
-    results = query.group_by(
-        FactSeguridad.arma_medio
-    ).order_by(
-        func.sum(FactSeguridad.cantidad).desc()
-    ).all()
+    codigo_dane = await resolver_municipio(municipio)
+    
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, anio=anio, fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin, codigo_dane=codigo_dane,
+        )
+        results = motor.agrupar(("arma_medio",), mascara, orden="total")
+    else:
+        F = await fuente_seguridad("arma_medio", "cantidad", "categoria_delito", "fecha_hecho", "codigo_dane")
+        query = select(
+            F.arma_medio.label("arma_medio"),
+            func.sum(F.cantidad).label("total")
+        ).filter(
+            F.arma_medio.isnot(None)
+        )
+    
+        if categoria_delito:
+            query = query.filter(func.upper(F.categoria_delito) == categoria_delito.upper())
+        query = query.filter(*condiciones_fecha(F.fecha_hecho, anio, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
+    
+        query = query.group_by(
+            F.arma_medio
+        ).order_by(
+            func.sum(F.cantidad).desc()
+        )
+        results = (await db.execute(query)).all()
     
     total_general = sum(int(r.total) for r in results)
     
@@ -263,7 +388,7 @@ async def get_por_arma_medio(
 
 @router.get("/por-clase-sitio")
 async def get_por_clase_sitio(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     categoria_delito: Optional[str] = Query(None, description="Tipo de delito"),
     anio: Optional[int] = Query(None, description="Año"),
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicio"),
@@ -273,31 +398,36 @@ async def get_por_clase_sitio(
     """
     Obtiene la distribucion de eventos por clase de sitio.
     """
-    codigo_dane = resolver_municipio(db, municipio)
-    
-    query = db.query(
-        FactSeguridad.clase_sitio.label("clase_sitio"),
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(
-        FactSeguridad.clase_sitio.isnot(None)
-    )
-    
-    if categoria_delito:
-        query = query.filter(func.upper(FactSeguridad.categoria_delito) == categoria_delito.upper())
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if fecha_inicio:
-        query = query.filter(FactSeguridad.fecha_hecho >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(FactSeguridad.fecha_hecho <= fecha_fin)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
-    
-    results = query.group_by(
-        FactSeguridad.clase_sitio
-    ).order_by(
-        func.sum(FactSeguridad.cantidad).desc()
-    ).all()
+    codigo_dane = await resolver_municipio(municipio)
+    
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(
+            categoria_delito=categoria_delito, anio=anio, fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin, codigo_dane=codigo_dane,
+        )
+        results = motor.agrupar(("clase_sitio",), mascara, orden="total")
+    else:
+        F = await fuente_seguridad("clase_sitio", "cantidad", "categoria_delito", "fecha_hecho", "codigo_dane")
+        query = select(
+            F.clase_sitio.label("clase_sitio"),
+            func.sum(F.cantidad).label("total")
+        ).filter(
+            F.clase_sitio.isnot(None)
+        )
+    
+        if categoria_delito:
+            query = query.filter(func.upper(F.categoria_delito) == categoria_delito.upper())
+        query = query.filter(*condiciones_fecha(F.fecha_hecho, anio, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
+    
+        query = query.group_by(
+            F.clase_sitio
+        ).order_by(
+            func.sum(F.cantidad).desc()
+        )
+        results = (await db.execute(query)).all()
     
     total_general = sum(int(r.total) for r in results)
     
@@ -313,7 +443,7 @@ async def get_por_clase_sitio(
 
 @router.get("/genero-por-delito")
 async def get_genero_por_delito(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     anio: Optional[int] = Query(None, description="Año"),
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicio"),
     fecha_fin: Optional[date] = Query(None, description="Fecha fin"),
@@ -323,33 +453,35 @@ async def get_genero_por_delito(
     Obtiene la distribucion de genero por cada tipo de delito.
     Util para graficos de barras agrupadas.
     """
-    codigo_dane = resolver_municipio(db, municipio)
-    
-    query = db.query(
-        FactSeguridad.categoria_delito,
-        FactSeguridad.genero,
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(
-        FactSeguridad.categoria_delito.isnot(None),
-        FactSeguridad.genero.isnot(None)
-    )
-    
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if fecha_inicio:
-        query = query.filter(FactSeguridad.fecha_hecho >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(FactSeguridad.fecha_hecho <= fecha_fin)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
-    
-    results = query.group_by(
-        FactSeguridad.categoria_delito,
-        FactSeguridad.genero
-    ).order_by(
-        FactSeguridad.categoria_delito,
-        func.sum(FactSeguridad.cantidad).desc()
-    ).all()
+    codigo_dane = await resolver_municipio(municipio)
+    
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(anio=anio, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, codigo_dane=codigo_dane)
+        results = motor.agrupar(("categoria_delito", "genero"), mascara)
+    else:
+        F = await fuente_seguridad("categoria_delito", "genero", "cantidad", "fecha_hecho", "codigo_dane")
+        query = select(
+            F.categoria_delito,
+            F.genero,
+            func.sum(F.cantidad).label("total")
+        ).filter(
+            F.categoria_delito.isnot(None),
+            F.genero.isnot(None)
+        )
+    
+        query = query.filter(*condiciones_fecha(F.fecha_hecho, anio, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
+    
+        query = query.group_by(
+            F.categoria_delito,
+            F.genero
+        ).order_by(
+            F.categoria_delito,
+            func.sum(F.cantidad).desc()
+        )
+        results = (await db.execute(query)).all()
     
     delitos_dict = {}
     for r in results:
@@ -369,7 +501,7 @@ async def get_genero_por_delito(
 
 @router.get("/grupo-etario-por-delito")
 async def get_grupo_etario_por_delito(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_analitica),
     anio: Optional[int] = Query(None, description="Año"),
     fecha_inicio: Optional[date] = Query(None, description="Fecha inicio"),
     fecha_fin: Optional[date] = Query(None, description="Fecha fin"),
@@ -378,32 +510,34 @@ async def get_grupo_etario_por_delito(
     """
     Obtiene la distribucion de grupo etario por cada tipo de delito.
     """
-    codigo_dane = resolver_municipio(db, municipio)
-    
-    query = db.query(
-        FactSeguridad.categoria_delito,
-        FactSeguridad.grupo_etario,
-        func.sum(FactSeguridad.cantidad).label("total")
-    ).filter(
-        FactSeguridad.categoria_delito.isnot(None),
-        FactSeguridad.grupo_etario.isnot(None)
-    )
-    
-    if anio:
-        query = query.filter(extract("year", FactSeguridad.fecha_hecho) == anio)
-    if fecha_inicio:
-        query = query.filter(FactSeguridad.fecha_hecho >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(FactSeguridad.fecha_hecho <= fecha_fin)
-    if codigo_dane:
-        query = query.filter(FactSeguridad.codigo_dane == codigo_dane)
-    
-    results = query.group_by(
-        FactSeguridad.categoria_delito,
-        FactSeguridad.grupo_etario
-    ).order_by(
-        FactSeguridad.categoria_delito
-    ).all()
+    codigo_dane = await resolver_municipio(municipio)
+    
+    motor = await motor_columnar()
+    if motor:
+        mascara = motor.filtrar(anio=anio, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, codigo_dane=codigo_dane)
+        results = motor.agrupar(("categoria_delito", "grupo_etario"), mascara)
+    else:
+        F = await fuente_seguridad("categoria_delito", "grupo_etario", "cantidad", "fecha_hecho", "codigo_dane")
+        query = select(
+            F.categoria_delito,
+            F.grupo_etario,
+            func.sum(F.cantidad).label("total")
+        ).filter(
+            F.categoria_delito.isnot(None),
+            F.grupo_etario.isnot(None)
+        )
+    
+        query = query.filter(*condiciones_fecha(F.fecha_hecho, anio, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin))
+        if codigo_dane:
+            query = query.filter(F.codigo_dane == codigo_dane)
+    
+        query = query.group_by(
+            F.categoria_delito,
+            F.grupo_etario
+        ).order_by(
+            F.categoria_delito
+        )
+        results = (await db.execute(query)).all()
     
     delitos_dict = {}
     for r in results:
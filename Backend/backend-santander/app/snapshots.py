@@ -0,0 +1,266 @@
+"""
+Snapshots columnares de las tablas base (opcional, requiere el paquete `pyarrow`)
+- scripts/exportar_snapshots.py escribe cada tabla de TABLAS en Parquet (comprimido, para
+  DuckDB y análisis externos) y en Arrow IPC sin comprimir, en SNAPSHOTS_DIR/v{version}/
+  junto con manifiesto.json, donde version es version_datos al exportar
+- Al arrancar, la API abre con memory-map los .arrow de la versión vigente: las columnas
+  apuntan a las páginas del archivo, que el sistema operativo comparte entre los workers
+  en lugar de que cada uno tenga su propia copia
+- En el .arrow, las columnas categóricas de fact_seguridad se guardan con la codificación
+  del motor columnar (diccionario ordenado, índice 0 = NULL) para usarlas sin copiarlas
+"""
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from .config import settings
+from .cache import version_datos
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+MANIFIESTO = "manifiesto.json"
+
+
+class Tabla:
+    """Consulta de exportación, tipos Arrow de sus columnas y columnas codificadas en el .arrow"""
+
+    def __init__(self, consulta: str, columnas: dict, diccionario: tuple = (), opcional: bool = False):
+        self.consulta = text(consulta)
+        self.columnas = columnas
+        self.diccionario = diccionario
+        # Opcional: si la tabla no existe en la base no se exporta
+        self.opcional = opcional
+
+    @property
+    def esquema(self) -> "pa.Schema":
+        return pa.schema([(nombre, getattr(pa, tipo)()) for nombre, tipo in self.columnas.items()])
+
+
+_CATEGORICAS = (
+    "categoria_delito", "genero", "grupo_etario", "zona_hecho",
+    "arma_medio", "clase_sitio", "modalidad_especifica",
+)
+
+TABLAS = {
+    "fact_seguridad": Tabla(
+        f"""
+        SELECT id_evento, codigo_dane, fecha_hecho, {", ".join(_CATEGORICAS)},
+               cantidad, latitud, longitud
+        FROM fact_seguridad
+        ORDER BY id_evento
+        """,
+        columnas={
+            "id_evento": "int64", "codigo_dane": "int32", "fecha_hecho": "date32",
+            **{c: "string" for c in _CATEGORICAS},
+            "cantidad": "int64", "latitud": "float64", "longitud": "float64",
+        },
+        diccionario=("codigo_dane", *_CATEGORICAS),
+    ),
+    "fact_clima": Tabla(
+        "SELECT id, codigo_dane, fecha, precipitacion_mm FROM fact_clima ORDER BY id",
+        columnas={"id": "int32", "codigo_dane": "int32", "fecha": "date32", "precipitacion_mm": "float64"},
+    ),
+    "master_demografia": Tabla(
+        """
+        SELECT id, codigo_dane, anio, poblacion_total, poblacion_rural, poblacion_cabecera
+        FROM master_demografia
+        ORDER BY id
+        """,
+        columnas={
+            "id": "int32", "codigo_dane": "int32", "anio": "int32", "poblacion_total": "int64",
+            "poblacion_rural": "int64", "poblacion_cabecera": "int64",
+        },
+    ),
+    "master_municipios": Tabla(
+        """
+        SELECT codigo_dane, nombre_municipio, categoria_rural_urbana, ST_AsBinary(geom) AS geom_wkb
+        FROM master_municipios
+        ORDER BY codigo_dane
+        """,
+        columnas={
+            "codigo_dane": "int32", "nombre_municipio": "string",
+            "categoria_rural_urbana": "string", "geom_wkb": "binary",
+        },
+    ),
+    # Calendario (app/calendario.py): lo usan las consultas de temporal en el backend DuckDB
+    "dim_fecha": Tabla(
+        """
+        SELECT fecha, anio, mes, dia, trimestre, anio_iso, semana_iso, dia_semana,
+               es_fin_semana, es_festivo, nombre_festivo
+        FROM dim_fecha
+        ORDER BY fecha
+        """,
+        columnas={
+            "fecha": "date32", "anio": "int16", "mes": "int16", "dia": "int16", "trimestre": "int16",
+            "anio_iso": "int16", "semana_iso": "int16", "dia_semana": "int16",
+            "es_fin_semana": "bool_", "es_festivo": "bool_", "nombre_festivo": "string",
+        },
+        opcional=True,
+    ),
+}
+
+
+def disponible() -> bool:
+    return pa is not None
+
+
+def directorio_version(version: int) -> str:
+    return os.path.join(settings.SNAPSHOTS_DIR, f"v{version}")
+
+
+# ============================================
+# EXPORTACIÓN
+# ============================================
+
+def _leer(conn: Connection, tabla: Tabla, lote: int = 100_000) -> "pa.Table":
+    esquema = tabla.esquema
+    resultado = conn.execution_options(stream_results=True).execute(tabla.consulta)
+    lotes = []
+    for filas in resultado.partitions(lote):
+        columnas = list(zip(*filas))
+        lotes.append(pa.record_batch([
+            # bytea llega como memoryview
+            pa.array([bytes(v) if isinstance(v, memoryview) else v for v in valores], type=campo.type)
+            for campo, valores in zip(esquema, columnas)
+        ], schema=esquema))
+    return pa.Table.from_batches(lotes, schema=esquema).combine_chunks()
+
+
+def codificar(columna: "pa.ChunkedArray") -> "pa.DictionaryArray":
+    """Diccionario del motor columnar: valores ordenados con NULL en el índice 0"""
+    columna = columna.combine_chunks()
+    valores = sorted(v for v in pc.unique(columna).to_pylist() if v is not None)
+    diccionario = pa.array([None, *valores], type=columna.type)
+    posiciones = pc.index_in(columna, value_set=pa.array(valores, type=columna.type))
+    indices = pc.add(posiciones, 1).fill_null(0).cast(pa.int32())
+    return pa.DictionaryArray.from_arrays(indices, diccionario)
+
+
+def exportar(conn: Connection, version: int, destino: Optional[str] = None) -> dict:
+    """
+    Exporta TABLAS a destino (por defecto SNAPSHOTS_DIR/v{version}). Escribe en un
+    directorio temporal y lo renombra al final: un directorio de versión siempre está completo.
+    """
+    if not disponible():
+        raise RuntimeError("Paquete 'pyarrow' no instalado: pip install pyarrow")
+    destino = destino or directorio_version(version)
+    temporal = destino + ".tmp"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    manifiesto = {"version_datos": version, "creado_en": time.strftime("%Y-%m-%dT%H:%M:%S"), "tablas": {}}
+    for nombre, tabla in TABLAS.items():
+        if tabla.opcional and not inspect(conn).has_table(nombre):
+            logger.warning("Snapshot %s omitido: la tabla no existe", nombre)
+            continue
+        inicio = time.perf_counter()
+        datos = _leer(conn, tabla)
+        pq.write_table(datos, os.path.join(temporal, f"{nombre}.parquet"), compression="zstd")
+
+        for columna in tabla.diccionario:
+            indice = datos.schema.get_field_index(columna)
+            datos = datos.set_column(indice, columna, codificar(datos.column(columna)))
+        with ipc.new_file(os.path.join(temporal, f"{nombre}.arrow"), datos.schema) as escritor:
+            escritor.write_table(datos, max_chunksize=max(len(datos), 1))
+
+        manifiesto["tablas"][nombre] = {
+            "filas": len(datos),
+            "columnas": datos.column_names,
+            "segundos": round(time.perf_counter() - inicio, 2),
+        }
+        logger.info("Snapshot %s: %s filas", nombre, len(datos))
+
+    with open(os.path.join(temporal, MANIFIESTO), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporal, destino)
+    return manifiesto
+
+
+def versiones() -> list:
+    """Versiones exportadas en SNAPSHOTS_DIR (completas), de la más reciente a la más antigua"""
+    if not os.path.isdir(settings.SNAPSHOTS_DIR):
+        return []
+    encontradas = []
+    for nombre in os.listdir(settings.SNAPSHOTS_DIR):
+        ruta = os.path.join(settings.SNAPSHOTS_DIR, nombre)
+        if nombre.startswith("v") and nombre[1:].isdigit() and os.path.exists(os.path.join(ruta, MANIFIESTO)):
+            encontradas.append(int(nombre[1:]))
+    return sorted(encontradas, reverse=True)
+
+
+def podar(conservar: int) -> list:
+    """Elimina los snapshots más antiguos y deja las `conservar` versiones más recientes"""
+    eliminadas = versiones()[conservar:]
+    for version in eliminadas:
+        shutil.rmtree(directorio_version(version), ignore_errors=True)
+    return eliminadas
+
+
+# ============================================
+# CARGA CON MEMORY-MAP
+# ============================================
+
+_estado = {"version": None, "tablas": {}, "abierto_en": None}
+
+
+def abrir(version: int) -> bool:
+    """
+    Abre con memory-map los .arrow de `version` (sin leerlos: las páginas se cargan
+    al acceder). Retorna False si no hay snapshot de esa versión.
+    """
+    if not disponible() or not settings.SNAPSHOTS_HABILITADOS:
+        return False
+    if _estado["version"] == version:
+        return True
+    directorio = directorio_version(version)
+    if not os.path.exists(os.path.join(directorio, MANIFIESTO)):
+        return False
+
+    tablas = {}
+    for nombre in TABLAS:
+        ruta = os.path.join(directorio, f"{nombre}.arrow")
+        if os.path.exists(ruta):
+            tablas[nombre] = ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+    _estado.update(version=version, tablas=tablas, abierto_en=time.time())
+    logger.info("Snapshots v%s abiertos con memory-map: %s", version, ", ".join(tablas))
+    return True
+
+
+def tabla(nombre: str, version: int) -> Optional["pa.Table"]:
+    """Tabla del snapshot de `version`, o None si no existe (se consulta PostgreSQL)"""
+    if not abrir(version):
+        return None
+    return _estado["tablas"].get(nombre)
+
+
+async def abrir_vigentes() -> bool:
+    """Abre los snapshots de la versión actual de los datos (arranque de la API)"""
+    return abrir(await version_datos())
+
+
+def resumen_snapshots() -> dict:
+    """Estado de los snapshots para /metricas/snapshots"""
+    return {
+        "disponible": disponible(),
+        "habilitados": settings.SNAPSHOTS_HABILITADOS,
+        "directorio": settings.SNAPSHOTS_DIR,
+        "versiones": versiones(),
+        "version_abierta": _estado["version"],
+        "tablas": {
+            nombre: {"filas": datos.num_rows, "bytes_mapeados": datos.nbytes}
+            for nombre, datos in _estado["tablas"].items()
+        },
+    }
@@ -0,0 +1,61 @@
+"""
+Peticiones GET internas contra la propia aplicación ASGI
+- Pasan por todos los middlewares (incluido el cache de respuestas)
+- Cada una abre su propia sesión del pool (Depends(get_async_db)), por lo que
+  pueden ejecutarse en paralelo con asyncio.gather
+"""
+import json
+from urllib.parse import quote, urlencode
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+
+
+def buscar_ruta(app, path: str):
+    """APIRoute GET que atiende `path` (ruta completa, con API_PREFIX) o None"""
+    scope = {"type": "http", "path": path, "method": "GET"}
+    for ruta in app.routes:
+        if isinstance(ruta, APIRoute) and "GET" in ruta.methods:
+            coincidencia, _ = ruta.matches(scope)
+            if coincidencia == Match.FULL:
+                return ruta
+    return None
+
+
+def parametros_query(ruta: APIRoute) -> set:
+    """Nombres de los parámetros de query que acepta el endpoint"""
+    return {p.alias for p in ruta.dependant.query_params}
+
+
+async def get_interno(app, path: str, params: dict = None) -> tuple:
+    """
+    Ejecuta GET path?params dentro del proceso.
+    Retorna (status, cuerpo JSON decodificado o None, cabeceras).
+    """
+    query = urlencode([(k, v) for k, v in (params or {}).items() if v is not None and v != ""])
+    # spec_version 2.4: StreamingResponse no espera http.disconnect en receive()
+    # (este receive nunca se suspende y la espera bloquearía el event loop)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": quote(path).encode(),
+        "query_string": query.encode(), "root_path": "", "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    respuesta = {"status": 500, "headers": [], "partes": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            respuesta["status"] = mensaje["status"]
+            respuesta["headers"] = mensaje.get("headers", [])
+        elif mensaje["type"] == "http.response.body":
+            respuesta["partes"].append(mensaje.get("body", b""))
+
+    await app(scope, receive, send)
+    cuerpo = b"".join(respuesta["partes"])
+    try:
+        datos = json.loads(cuerpo) if cuerpo else None
+    except ValueError:
+        datos = None
+    return respuesta["status"], datos, respuesta["headers"]
@@ -1,49 +1,107 @@
 """
 Utilidades compartidas para los routers
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, extract, select
 from typing import Optional
+from datetime import date, timedelta
 from .models import MasterMunicipios
+from .municipios_indice import indice_municipios
 
 
-def resolver_municipio(db: Session, municipio: Optional[str]) -> Optional[int]:
+async def resolver_municipio(municipio: Optional[str]) -> Optional[int]:
     """
     Convierte nombre de municipio a codigo_dane.
-    Busqueda case-insensitive y con coincidencia parcial.
-    Retorna None si no se especifica municipio.
+    Busqueda insensible a tildes/mayusculas, exacta o por prefijo de un único municipio
+    (indice en memoria, ver app/municipios_indice.py).
+    Retorna None si no se especifica municipio; si no hay coincidencia responde 404
+    con las sugerencias, en lugar de consultar sin filtro.
     """
     if not municipio:
         return None
     
-    # Buscar coincidencia exacta (case-insensitive)
-    result = db.query(MasterMunicipios.codigo_dane).filter(
-        func.upper(MasterMunicipios.nombre_municipio) == municipio.upper()
-    ).first()
-    
-    if result:
-        return result.codigo_dane
-    
-    # Buscar coincidencia parcial (LIKE)
-    result = db.query(MasterMunicipios.codigo_dane).filter(
-        func.upper(MasterMunicipios.nombre_municipio).like(f"%{municipio.upper()}%")
-    ).first()
-    
-    if result:
-        return result.codigo_dane
-    
-    return None
+    indice = await indice_municipios()
+    codigo_dane = indice.resolver(municipio)
+    if codigo_dane is None:
+        raise HTTPException(status_code=404, detail=indice.no_encontrado(municipio))
+    return codigo_dane
+
+
+def rango_anio(anio: int, mes: Optional[int] = None) -> tuple:
+    """Límites [inicio, fin) del año, o del mes de ese año"""
+    if mes:
+        inicio = date(anio, mes, 1)
+        fin = date(anio + 1, 1, 1) if mes == 12 else date(anio, mes + 1, 1)
+        return inicio, fin
+    return date(anio, 1, 1), date(anio + 1, 1, 1)
+
+
+def condiciones_fecha(
+    columna,
+    anio: Optional[int] = None,
+    mes: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+) -> list:
+    """
+    Predicados sobre una columna de fecha como rangos semiabiertos
+    (columna >= inicio AND columna < fin), que pueden usar el índice,
+    en lugar de EXTRACT(YEAR/MONTH FROM columna) = valor.
+    fecha_fin es inclusiva, como en los parámetros de los endpoints.
+    """
+    condiciones = []
+    if anio:
+        inicio, fin = rango_anio(anio, mes)
+        condiciones += [columna >= inicio, columna < fin]
+    elif mes:
+        # Mes de cualquier año: no se puede expresar como un solo rango
+        condiciones.append(extract("month", columna) == mes)
+    if fecha_inicio:
+        condiciones.append(columna >= fecha_inicio)
+    if fecha_fin:
+        condiciones.append(columna < fecha_fin + timedelta(days=1))
+    return condiciones
 
 
-def get_municipios_lista(db: Session):
+def condiciones_eventos(
+    F,
+    categoria_delito: Optional[str] = None,
+    anio: Optional[int] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    codigo_dane: Optional[int] = None,
+    genero: Optional[str] = None,
+    grupo_etario: Optional[str] = None,
+) -> list:
+    """
+    Condiciones WHERE de los filtros de eventos (mapa de puntos y teselas).
+    F es el modelo consultado (FactSeguridad).
+    """
+    condiciones = []
+    if categoria_delito:
+        condiciones.append(func.upper(F.categoria_delito) == categoria_delito.upper())
+    condiciones += condiciones_fecha(F.fecha_hecho, anio, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+    if codigo_dane:
+        condiciones.append(F.codigo_dane == codigo_dane)
+    if genero:
+        condiciones.append(func.upper(F.genero) == genero.upper())
+    if grupo_etario:
+        condiciones.append(func.upper(F.grupo_etario) == grupo_etario.upper())
+    return condiciones
+
+
+async def get_municipios_lista(db: AsyncSession):
     """
     Retorna lista de municipios para selectores.
     """
-    results = db.query(
-        MasterMunicipios.codigo_dane,
-        MasterMunicipios.nombre_municipio,
-        MasterMunicipios.categoria_rural_urbana
-    ).order_by(MasterMunicipios.nombre_municipio).all()
+    results = (await db.execute(
+        select(
+            MasterMunicipios.codigo_dane,
+            MasterMunicipios.nombre_municipio,
+            MasterMunicipios.categoria_rural_urbana
+        ).order_by(MasterMunicipios.nombre_municipio)
+    )).all()
     
     return [
         {
@@ -53,3 +111,21 @@ def get_municipios_lista(db: Session):
         }
         for r in results
     ]
+
+
+# Forma de las series temporales: lista de objetos (por defecto) o {columna: [valores]}
+FORMATOS = ("filas", "columnar")
+
+
+def columnas(filas, campos: tuple, conversiones: Optional[dict] = None) -> dict:
+    """
+    Resultado de una consulta (filas como tuplas/Row en el orden de `campos`) como
+    {campo: [valores]}, transponiendo sin crear un dict por fila.
+    conversiones: {campo: función} aplicada a toda la columna (p. ej. int para Decimal).
+    """
+    conversiones = conversiones or {}
+    transpuestas = list(zip(*filas)) or [()] * len(campos)
+    return {
+        campo: list(map(conversiones[campo], valores)) if campo in conversiones else list(valores)
+        for campo, valores in zip(campos, transpuestas)
+    }
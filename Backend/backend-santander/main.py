@@ -2,19 +2,40 @@
 Atlas al Crimen - Santander API
 Backend para visualización de datos de seguridad y correlación climática
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
+from app.cache import CacheMiddleware
+from app.compresion import CompresionMiddleware
+from app.coalescencia import CoalescenciaMiddleware
+from app.respuestas import RespuestaJSON
 from app.database import engine, Base
+from app.snapshots import abrir_vigentes
+from app.motor_columnar import motor_columnar
 from app.routers import geografia_router, temporal_router, victimas_router, clima_router
 from app.routers.filtros import router as filtros_router
 from app.routers.chatbot import router as chatbot_router
 from app.routers.predicciones import router as predicciones_router
+from app.routers.metricas import router as metricas_router
+from app.routers.tiles import router as tiles_router
+from app.routers.dashboard import router as dashboard_router
+from app.routers.batch import router as batch_router
 
 # Crear tablas (solo si no existen)
 # Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Snapshots de la versión vigente con memory-map (compartidos entre workers por el SO)
+    await abrir_vigentes()
+    # Con MOTOR_CONSULTAS = "columnar" la carga del motor empieza en segundo plano
+    await motor_columnar()
+    yield
+
+
 app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
@@ -44,8 +65,21 @@ app = FastAPI(
     """,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
+    # orjson (app/respuestas.py); los routers usan RutaJSON para omitir jsonable_encoder
+    default_response_class=RespuestaJSON,
 )
 
+# Coalescencia de peticiones idénticas en vuelo: por dentro del cache, agrupa los misses simultáneos
+app.add_middleware(CoalescenciaMiddleware)
+
+# Cache de respuestas GET (rutas y TTL en settings.CACHE_RUTAS).
+# Se agrega antes de CORS para quedar por dentro: las respuestas cacheadas también reciben las cabeceras CORS
+app.add_middleware(CacheMiddleware)
+
+# Compresión brotli/gzip por fuera del cache: la variante comprimida también se cachea
+app.add_middleware(CompresionMiddleware)
+
 # Configurar CORS - Permitir cualquier origen
 app.add_middleware(
     CORSMiddleware,
@@ -64,6 +98,10 @@ app.include_router(clima_router, prefix=settings.API_PREFIX)
 app.include_router(filtros_router, prefix=settings.API_PREFIX)
 app.include_router(chatbot_router, prefix=settings.API_PREFIX)
 app.include_router(predicciones_router, prefix=settings.API_PREFIX)
+app.include_router(tiles_router, prefix=settings.API_PREFIX)
+app.include_router(dashboard_router, prefix=settings.API_PREFIX)
+app.include_router(batch_router, prefix=settings.API_PREFIX)
+app.include_router(metricas_router, prefix=settings.API_PREFIX)
 
 
 @app.get("/")
@@ -81,6 +119,10 @@ async def root():
             "filtros": f"{settings.API_PREFIX}/filtros",
             "chatbot": f"{settings.API_PREFIX}/chatbot",
             "predicciones": f"{settings.API_PREFIX}/predicciones",
+            "tiles": f"{settings.API_PREFIX}/tiles",
+            "dashboard": f"{settings.API_PREFIX}/dashboard",
+            "batch": f"{settings.API_PREFIX}/batch",
+            "metricas": f"{settings.API_PREFIX}/metricas",
         }
     }
 
@@ -0,0 +1 @@
+# Comandos de mantenimiento y benchmarks del backend
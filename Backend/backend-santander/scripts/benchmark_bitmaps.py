@@ -0,0 +1,95 @@
+"""
+Micro-benchmark del índice de bitmaps del motor columnar
+
+Carga el motor (app/motor_columnar.py) y mide MotorColumnar.filtrar con el índice de
+bitmaps (AND/OR de palabras uint64) y sin él (comparación de códigos por fila), para
+filtros de selectividad decreciente hasta el ejemplo del chatbot:
+categoría SEXUAL & género MASCULINO & BARRANCABERMEJA & 2023. Verifica que ambas
+máscaras sean iguales y muestra la memoria del índice por dimensión.
+
+Uso:
+    python -m scripts.benchmark_bitmaps --repeticiones 500
+"""
+import argparse
+import time
+import numpy as np
+from app.bitmaps import contar
+from app.motor_columnar import precargar_motor
+from app.municipios_indice import indice_municipios_sync
+
+
+def casos(codigo_dane: int) -> list:
+    return [
+        ("sin filtros", {}),
+        ("anio", {"anio": 2023}),
+        ("categoria", {"categoria_delito": "SEXUAL"}),
+        ("categoria & anio", {"categoria_delito": "SEXUAL", "anio": 2023}),
+        ("categoria & genero & anio", {"categoria_delito": "SEXUAL", "genero": "MASCULINO", "anio": 2023}),
+        ("municipio", {"codigo_dane": codigo_dane}),
+        ("categoria & genero & municipio & anio", {
+            "categoria_delito": "SEXUAL", "genero": "MASCULINO", "codigo_dane": codigo_dane, "anio": 2023,
+        }),
+        ("categorias IN & municipio & anio + mes", {
+            "categoria_delito": ["HURTO", "VIF"], "codigo_dane": codigo_dane, "anio": 2023, "mes": 6,
+        }),
+        ("valor inexistente", {"categoria_delito": "NO EXISTE", "anio": 2023}),
+    ]
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Microsegundos promedio por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark del índice de bitmaps")
+    parser.add_argument("--repeticiones", type=int, default=500)
+    parser.add_argument("--municipio", default="barrancabermeja")
+    args = parser.parse_args()
+
+    motor = precargar_motor()
+    indice = motor.bitmaps
+    if indice is None:
+        raise SystemExit("MOTOR_BITMAPS está desactivado")
+    codigo_dane = indice_municipios_sync().resolver(args.municipio)
+
+    print(f"Motor: {len(motor)} filas, {motor.bytes / 1e6:.1f} MB (bitmaps {indice.bytes / 1e6:.1f} MB)")
+    for dimension, datos in indice.resumen()["dimensiones"].items():
+        print(f"  {dimension:<22} {datos['valores']:>5} valores {datos['bytes'] / 1e3:>10.1f} KB")
+    if indice.omitidas:
+        print(f"  sin índice (más de MOTOR_BITMAP_MAX_VALORES valores): {', '.join(indice.omitidas)}")
+
+    print(f"\n{'filtro':<42} {'filas':>8} {'selectiv.':>10} {'comparación':>13} {'bitmaps':>10} {'mejora':>7}")
+    for nombre, filtros in casos(codigo_dane):
+        con_bitmaps = motor.filtrar(**filtros)
+        motor.bitmaps = None
+        sin_bitmaps = motor.filtrar(**filtros)
+        t_comparacion = medir(lambda: motor.filtrar(**filtros), args.repeticiones)
+        motor.bitmaps = indice
+        t_bitmaps = medir(lambda: motor.filtrar(**filtros), args.repeticiones)
+        assert np.array_equal(con_bitmaps, sin_bitmaps), nombre
+
+        filas = int(con_bitmaps.sum())
+        print(
+            f"{nombre:<42} {filas:>8} {filas / max(len(motor), 1):>10.2%} "
+            f"{t_comparacion:>10.0f} µs {t_bitmaps:>7.0f} µs {t_comparacion / t_bitmaps:>6.1f}x"
+        )
+
+    # Solo el AND de bitmaps, sin pasar a máscara booleana (p. ej. para contar filas)
+    condiciones = {
+        "categoria_delito": motor.dimensiones["categoria_delito"].codigos_de("SEXUAL"),
+        "genero": motor.dimensiones["genero"].codigos_de("MASCULINO"),
+        "codigo_dane": motor.dimensiones["codigo_dane"].codigos_de(codigo_dane),
+        "anio": [2023],
+    }
+    condiciones = {d: c for d, c in condiciones.items() if d in indice}
+    t_and = medir(lambda: indice.seleccionar(condiciones), args.repeticiones)
+    print(f"\nAND de {len(condiciones)} bitmaps (ejemplo del chatbot): {t_and:.1f} µs, "
+          f"{contar(indice.seleccionar(condiciones))} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark de compresión de las respuestas más pesadas (sin comprimir, gzip, brotli)
+
+Pide cada endpoint de ENDPOINTS a la app (en proceso) con Accept-Encoding: identity, gzip y br.
+La primera petición de cada codificación comprime y guarda la variante; las siguientes se
+sirven ya comprimidas desde el cache. Mide por codificación el tamaño enviado, el tiempo de
+la primera petición y el promedio de las siguientes, y verifica que el cuerpo descomprimido
+sea igual al de la respuesta sin comprimir.
+
+Uso:
+    python -m scripts.benchmark_compresion --repeticiones 20
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from app.config import settings
+from app.compresion import codificaciones, resumen_compresion
+from app.database import async_engine
+
+# Rutas relativas a API_PREFIX (con cache de respuestas)
+ENDPOINTS = [
+    "/geografia/delitos-por-municipio",
+    "/geografia/tasa-por-municipio",
+    "/clima/scatter-lluvia-delitos",
+    "/temporal/tendencia-semanal",
+    "/victimas/mapa-puntos?limit=20000",
+    "/predicciones/resumen",
+    "/filtros/resumen",
+]
+
+
+async def pedir(cliente, url: str, codificacion: str) -> tuple:
+    """(respuesta, ms, bytes enviados)"""
+    inicio = time.perf_counter()
+    respuesta = await cliente.get(url, headers={"Accept-Encoding": codificacion})
+    ms = (time.perf_counter() - inicio) * 1e3
+    assert respuesta.status_code == 200, (url, respuesta.status_code)
+    return respuesta, ms, int(respuesta.headers.get("content-length", len(respuesta.content)))
+
+
+async def benchmark(repeticiones: int):
+    from main import app
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://api") as cliente:
+        print(f"{'codificación':<14} {'KB':>9} {'ratio':>7} {'primera':>10} {'cacheada':>10}")
+        for ruta in ENDPOINTS:
+            print(ruta)
+            url = settings.API_PREFIX + ruta
+            base = None
+            for codificacion in ("identity", *reversed(codificaciones())):
+                respuesta, ms_primera, enviados = await pedir(cliente, url, codificacion)
+                if base is None:
+                    base = respuesta.content
+                # httpx descomprime el cuerpo según Content-Encoding
+                assert respuesta.content == base, (ruta, codificacion)
+                inicio = time.perf_counter()
+                for _ in range(repeticiones):
+                    await pedir(cliente, url, codificacion)
+                ms_cacheada = (time.perf_counter() - inicio) / repeticiones * 1e3
+                print(
+                    f"  {codificacion:<12} {enviados / 1e3:>9.1f} {enviados / len(base):>7.3f} "
+                    f"{ms_primera:>7.2f} ms {ms_cacheada:>7.2f} ms"
+                )
+    resumen = resumen_compresion()
+    print(
+        f"\nbytes ahorrados: {resumen['bytes_ahorrados'] / 1e6:.2f} MB de {resumen['bytes_originales'] / 1e6:.2f} MB, "
+        f"{resumen['compresiones']} compresiones, {resumen['desde_cache']} desde cache"
+    )
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de compresión gzip/brotli de las respuestas")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args.repeticiones))
+
+
+if __name__ == "__main__":
+    main()
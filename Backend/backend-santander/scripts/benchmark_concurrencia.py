@@ -0,0 +1,156 @@
+"""
+Benchmark de latencia bajo concurrencia
+
+Simula N clientes concurrentes (por defecto 50) que repiten el abanico de peticiones
+que hace el dashboard con Promise.all y reporta p50/p95/p99 por endpoint.
+
+Uso (con la API corriendo):
+    python -m scripts.benchmark_concurrencia --url http://localhost:8000 --clientes 50 --etiqueta despues
+
+Para comparar antes/después se ejecuta contra cada versión del backend con una etiqueta
+distinta y se guardan los resultados con --salida.
+
+Mientras corre el abanico, una sonda pide /health cada --intervalo-sonda segundos: su latencia
+mide cuánto espera una petición trivial detrás de las consultas en curso (si el event loop
+está bloqueado por un driver síncrono, /health espera a que termine la consulta).
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Abanico de peticiones del DashboardPage / GeografiaPage
+ENDPOINTS = [
+    "/api/v1/geografia/tasa-por-municipio?anio=2024",
+    "/api/v1/geografia/delitos-por-municipio?anio=2024",
+    "/api/v1/temporal/linea-anual",
+    "/api/v1/temporal/por-dia-semana?anio=2024",
+    "/api/v1/temporal/por-zona?anio=2024",
+    "/api/v1/victimas/por-genero?anio=2024",
+    "/api/v1/filtros/resumen",
+]
+
+
+def percentil(valores: list, p: float) -> float:
+    """Percentil por interpolación lineal"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+
+def medir(url: str, timeout: float) -> tuple:
+    """Ejecuta una petición GET y retorna (ms, status)"""
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except Exception:
+        status = 0
+    return (time.perf_counter() - inicio) * 1000, status
+
+
+def sondear(url: str, intervalo: float, timeout: float, detener: threading.Event) -> list:
+    """Latencias (ms) de GET url cada `intervalo` segundos hasta que se active `detener`"""
+    latencias = []
+    while not detener.is_set():
+        ms, status = medir(url, timeout)
+        if status == 200:
+            latencias.append(ms)
+        detener.wait(intervalo)
+    return latencias
+
+
+def ejecutar(base_url: str, clientes: int, rondas: int, timeout: float, intervalo_sonda: float = 0.1) -> dict:
+    """Cada cliente recorre el abanico de endpoints `rondas` veces"""
+    tareas = [base_url.rstrip("/") + e for _ in range(rondas) for e in ENDPOINTS] * clientes
+    latencias = {e: [] for e in ENDPOINTS}
+    errores = 0
+
+    detener = threading.Event()
+    sonda = []
+    hilo_sonda = threading.Thread(
+        target=lambda: sonda.extend(sondear(base_url.rstrip("/") + "/health", intervalo_sonda, timeout, detener))
+    )
+    inicio = time.perf_counter()
+    hilo_sonda.start()
+    with ThreadPoolExecutor(max_workers=clientes) as pool:
+        resultados = list(pool.map(lambda u: medir(u, timeout), tareas))
+    duracion = time.perf_counter() - inicio
+    detener.set()
+    hilo_sonda.join()
+
+    for url, (ms, status) in zip(tareas, resultados):
+        if status != 200:
+            errores += 1
+            continue
+        latencias[url[len(base_url.rstrip("/")):]].append(ms)
+
+    todas = [ms for valores in latencias.values() for ms in valores]
+    return {
+        "clientes": clientes,
+        "peticiones": len(tareas),
+        "errores": errores,
+        "duracion_s": round(duracion, 2),
+        "throughput_rps": round(len(tareas) / duracion, 1) if duracion > 0 else 0,
+        "global": {
+            "p50_ms": round(percentil(todas, 50), 1),
+            "p95_ms": round(percentil(todas, 95), 1),
+            "p99_ms": round(percentil(todas, 99), 1),
+        },
+        "sonda_health": {
+            "peticiones": len(sonda),
+            "p50_ms": round(percentil(sonda, 50), 1),
+            "p95_ms": round(percentil(sonda, 95), 1),
+            "max_ms": round(max(sonda), 1) if sonda else 0,
+        },
+        "endpoints": {
+            e: {
+                "p50_ms": round(percentil(v, 50), 1),
+                "p95_ms": round(percentil(v, 95), 1),
+                "media_ms": round(statistics.mean(v), 1) if v else 0,
+            }
+            for e, v in latencias.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latencia con clientes concurrentes")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base de la API")
+    parser.add_argument("--clientes", type=int, default=50, help="Clientes concurrentes")
+    parser.add_argument("--rondas", type=int, default=3, help="Repeticiones del abanico por cliente")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout por petición (s)")
+    parser.add_argument("--intervalo-sonda", type=float, default=0.1, help="Segundos entre peticiones a /health")
+    parser.add_argument("--etiqueta", default="", help="Etiqueta de la corrida (ej: antes, despues)")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    resultado = ejecutar(args.url, args.clientes, args.rondas, args.timeout, args.intervalo_sonda)
+    resultado["etiqueta"] = args.etiqueta
+
+    print(f"[{args.etiqueta or 'benchmark'}] {resultado['peticiones']} peticiones, "
+          f"{resultado['clientes']} clientes, {resultado['errores']} errores, "
+          f"{resultado['throughput_rps']} req/s")
+    print(f"  global: p50={resultado['global']['p50_ms']}ms  p95={resultado['global']['p95_ms']}ms  "
+          f"p99={resultado['global']['p99_ms']}ms")
+    sonda = resultado["sonda_health"]
+    print(f"  sonda /health ({sonda['peticiones']}): p50={sonda['p50_ms']}ms  p95={sonda['p95_ms']}ms  "
+          f"max={sonda['max_ms']}ms")
+    for endpoint, stats in resultado["endpoints"].items():
+        print(f"  {endpoint:<55} p50={stats['p50_ms']:>8}ms  p95={stats['p95_ms']:>8}ms")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
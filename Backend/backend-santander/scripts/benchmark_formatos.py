@@ -0,0 +1,107 @@
+"""
+Benchmark de las extracciones grandes en JSON, Arrow IPC y MessagePack
+
+Pide cada endpoint de ENDPOINTS a la app (en proceso, sin cache de respuestas) con
+Accept: application/json, application/vnd.apache.arrow.stream y application/msgpack,
+y mide por petición el tiempo de la API, el tamaño del cuerpo y el tiempo de decodificarlo
+en el cliente (json.loads, pyarrow.ipc, msgpack.unpackb). Verifica que la tabla binaria
+tenga las mismas filas que la respuesta JSON.
+
+Uso:
+    python -m scripts.benchmark_formatos --repeticiones 5
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from app.config import settings
+from app.database import async_engine
+from app.negociacion import MEDIO_ARROW, MEDIO_MSGPACK, disponibles
+
+try:
+    import pyarrow.ipc as ipc
+except ImportError:
+    ipc = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# (ruta relativa a API_PREFIX, filas de la respuesta JSON)
+ENDPOINTS = [
+    ("/victimas/mapa-puntos?limit=20000", lambda d: d["features"]),
+    ("/victimas/mapa-puntos?limit=20000&anio=2023&categoria_delito=HURTO", lambda d: d["features"]),
+    ("/victimas/mapa-puntos?agregacion=hex&zoom=10", None),
+    ("/clima/scatter-lluvia-delitos", lambda d: d),
+    ("/clima/scatter-lluvia-delitos?anio=2020&codigo_dane=68001", lambda d: d),
+    ("/predicciones/resumen", lambda d: d["predicciones"]),
+    ("/predicciones/resumen?anio=2026", lambda d: d["predicciones"]),
+]
+
+
+def decodificar(medio: str, cuerpo: bytes) -> tuple:
+    """(contenido decodificado, filas)"""
+    if medio == MEDIO_ARROW:
+        tabla = ipc.open_stream(cuerpo).read_all()
+        return tabla, tabla.num_rows
+    if medio == MEDIO_MSGPACK:
+        datos = msgpack.unpackb(cuerpo)
+        return datos, len(next(iter(datos["datos"].values()), []))
+    return json.loads(cuerpo), None
+
+
+async def medir(cliente, url: str, medio: str, repeticiones: int) -> tuple:
+    """(respuesta, ms promedio de la API, ms promedio de decodificación)"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        respuesta = await cliente.get(url, headers={"Accept": medio})
+    ms_api = (time.perf_counter() - inicio) / repeticiones * 1e3
+    assert respuesta.status_code == 200, (url, respuesta.status_code, respuesta.text[:200])
+    assert respuesta.headers["content-type"].startswith(medio), (url, respuesta.headers["content-type"])
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        decodificar(medio, respuesta.content)
+    ms_decodificar = (time.perf_counter() - inicio) / repeticiones * 1e3
+    return respuesta, ms_api, ms_decodificar
+
+
+async def benchmark(repeticiones: int):
+    from main import app
+
+    medios = ["application/json", *disponibles()]
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://api") as cliente:
+        print(f"{'formato':<38} {'KB':>9} {'API':>10} {'decodif.':>10} {'total':>10}")
+        for ruta, filas_json in ENDPOINTS:
+            print(ruta)
+            url = settings.API_PREFIX + ruta
+            base = None
+            for medio in medios:
+                respuesta, ms_api, ms_decodificar = await medir(cliente, url, medio, repeticiones)
+                contenido, filas = decodificar(medio, respuesta.content)
+                if base is None:
+                    base = ms_api + ms_decodificar
+                    esperadas = len(filas_json(contenido)) if filas_json else None
+                elif esperadas is not None:
+                    assert filas == esperadas, (ruta, medio, filas, esperadas)
+                total = ms_api + ms_decodificar
+                print(
+                    f"  {medio:<36} {len(respuesta.content) / 1e3:>9.1f} {ms_api:>7.1f} ms "
+                    f"{ms_decodificar:>7.1f} ms {total:>7.1f} ms  {base / total:>5.1f}x"
+                )
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de JSON vs Arrow IPC vs MessagePack")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    settings.CACHE_HABILITADO = False
+    asyncio.run(benchmark(args.repeticiones))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark de serialización de los mapas coropléticos de geografía
+
+Para cada nivel de geometría (app/geometrias.py) arma el FeatureCollection de
+/geografia/delitos-por-municipio de tres formas y mide el tiempo de serialización por petición:
+- json.loads + jsonable_encoder: la geometría se decodifica por fila y FastAPI la vuelve a codificar
+- texto concatenado: GeoJSON cacheado como str, una sola cadena al final
+- bytes en streaming: partes_feature_collection (lo que sirve la API), con el tiempo hasta la primera parte
+Verifica que las tres respuestas sean el mismo JSON.
+
+Uso:
+    python -m scripts.benchmark_geojson --repeticiones 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from app.database import async_engine
+from app.geometrias import NIVELES, geometrias_municipios, partes_feature_collection
+
+
+def con_json_loads(propiedades: list, geometrias: dict, **extra) -> bytes:
+    features = []
+    for props in propiedades:
+        geom = geometrias.get(props["codigo_dane"])
+        features.append({
+            "type": "Feature",
+            "properties": props,
+            "geometry": json.loads(geom) if geom else None,
+        })
+    contenido = jsonable_encoder({"type": "FeatureCollection", "features": features, **extra})
+    # Igual que JSONResponse.render
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def con_texto(propiedades: list, geometrias: dict, **extra) -> bytes:
+    features = []
+    for props in propiedades:
+        geom = geometrias.get(props["codigo_dane"], "null")
+        props_json = json.dumps(props, ensure_ascii=False, separators=(",", ":"))
+        features.append(f'{{"type":"Feature","properties":{props_json},"geometry":{geom}}}')
+    miembros = "".join(
+        f',"{k}":{json.dumps(v, ensure_ascii=False, separators=(",", ":"))}' for k, v in extra.items()
+    )
+    return f'{{"type":"FeatureCollection","features":[{",".join(features)}]{miembros}}}'.encode()
+
+
+def con_streaming(propiedades: list, geometrias: dict, **extra) -> bytes:
+    return b"".join(partes_feature_collection(propiedades, geometrias, **extra))
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Milisegundos promedio por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e3
+
+
+async def cargar() -> tuple:
+    async with async_engine.connect() as conn:
+        filas = (await conn.execute(text("""
+            SELECT m.codigo_dane, m.nombre_municipio, m.categoria_rural_urbana,
+                   COALESCE(SUM(f.cantidad), 0) AS total_delitos
+            FROM master_municipios m
+            LEFT JOIN fact_seguridad f ON f.codigo_dane = m.codigo_dane
+            GROUP BY m.codigo_dane, m.nombre_municipio, m.categoria_rural_urbana
+        """))).all()
+    propiedades = [
+        {
+            "codigo_dane": r.codigo_dane,
+            "nombre_municipio": r.nombre_municipio,
+            "categoria_rural_urbana": r.categoria_rural_urbana,
+            "total_delitos": int(r.total_delitos),
+        }
+        for r in filas
+    ]
+    niveles = {nivel: await geometrias_municipios(nivel) for nivel in NIVELES}
+    await async_engine.dispose()
+    return propiedades, niveles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización del GeoJSON coroplético")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    propiedades, niveles = asyncio.run(cargar())
+    print(f"{len(propiedades)} municipios\n")
+    print(f"{'tolerancia':>10} {'MB':>7} {'json.loads':>12} {'texto':>10} {'streaming':>11} "
+          f"{'1ª parte':>10} {'mejora':>7}")
+    for nivel, geometrias in niveles.items():
+        como_texto = {codigo: geom.decode() for codigo, geom in geometrias.items()}
+        esperado = json.loads(con_json_loads(propiedades, como_texto, tolerancia=nivel))
+        assert json.loads(con_texto(propiedades, como_texto, tolerancia=nivel)) == esperado, nivel
+        cuerpo = con_streaming(propiedades, geometrias, tolerancia=nivel)
+        assert json.loads(cuerpo) == esperado, nivel
+
+        t_loads = medir(lambda: con_json_loads(propiedades, como_texto, tolerancia=nivel), args.repeticiones)
+        t_texto = medir(lambda: con_texto(propiedades, como_texto, tolerancia=nivel), args.repeticiones)
+        t_stream = medir(lambda: con_streaming(propiedades, geometrias, tolerancia=nivel), args.repeticiones)
+        t_primera = medir(
+            lambda: next(partes_feature_collection(propiedades, geometrias, tolerancia=nivel)), args.repeticiones
+        )
+        print(
+            f"{nivel:>10} {len(cuerpo) / 1e6:>7.2f} {t_loads:>9.1f} ms {t_texto:>7.1f} ms "
+            f"{t_stream:>8.1f} ms {t_primera:>7.2f} ms {t_loads / t_stream:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
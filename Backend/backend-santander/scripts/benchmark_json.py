@@ -0,0 +1,111 @@
+"""
+Benchmark de serialización JSON de las respuestas más pesadas
+
+Obtiene el contenido que retorna cada endpoint de ENDPOINTS (dicts/lists con date, Decimal...)
+y mide por petición:
+- jsonable_encoder + JSONResponse: la ruta por defecto de FastAPI (json.dumps)
+- jsonable_encoder + RespuestaJSON: solo cambia el serializador a orjson
+- RespuestaJSON directo: lo que hace RutaJSON (app/respuestas.py), sin jsonable_encoder
+Verifica que las tres respuestas sean el mismo JSON.
+
+Uso:
+    python -m scripts.benchmark_json --repeticiones 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import parse_qsl
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.respuestas import RespuestaJSON
+from app.subpeticiones import buscar_ruta
+
+# Rutas relativas a API_PREFIX
+ENDPOINTS = [
+    "/clima/scatter-lluvia-delitos",
+    "/clima/linea-tiempo-superpuesta?agrupacion=diaria",
+    "/temporal/tendencia-semanal",
+    "/temporal/linea-mensual",
+    "/victimas/mapa-puntos?limit=20000",
+    "/victimas/mapa-puntos?agregacion=hex&zoom=10",
+    "/predicciones/resumen",
+    "/filtros/resumen",
+]
+
+
+async def contenido(app, ruta: str):
+    """Valor que retorna el endpoint (antes de serializarlo), con los parámetros de la query"""
+    path, _, query = (settings.API_PREFIX + ruta).partition("?")
+    api_ruta = buscar_ruta(app, path)
+    params = dict(parse_qsl(query))
+    argumentos = {}
+    for campo in api_ruta.dependant.query_params:
+        valor = params.get(campo.alias, campo.field_info.default)
+        if isinstance(valor, str) and campo.field_info.annotation is not None:
+            tipo = next((t for t in getattr(campo.field_info.annotation, "__args__", (campo.field_info.annotation,))
+                         if t in (int, float)), None)
+            valor = tipo(valor) if tipo else valor
+        argumentos[campo.name] = valor
+    if api_ruta.dependant.request_param_name:
+        # Sin Accept: respuesta JSON (ver app/negociacion.py)
+        argumentos[api_ruta.dependant.request_param_name] = Request({"type": "http", "headers": []})
+    async with AsyncSessionLocal() as db:
+        if any(d.name == "db" for d in api_ruta.dependant.dependencies):
+            argumentos["db"] = db
+        return await api_ruta.endpoint(**argumentos)
+
+
+def por_defecto(valor) -> bytes:
+    return JSONResponse(jsonable_encoder(valor)).body
+
+
+def orjson_con_encoder(valor) -> bytes:
+    return RespuestaJSON(jsonable_encoder(valor)).body
+
+
+def orjson_directo(valor) -> bytes:
+    return RespuestaJSON(valor).body
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Milisegundos promedio por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e3
+
+
+async def cargar() -> list:
+    from main import app
+
+    contenidos = [(ruta, await contenido(app, ruta)) for ruta in ENDPOINTS]
+    await async_engine.dispose()
+    return contenidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización JSON de las respuestas")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'KB':>8} {'json.dumps':>11} {'orjson+enc':>11} {'orjson':>9} {'mejora':>7}  consulta")
+    for ruta, valor in asyncio.run(cargar()):
+        cuerpo = por_defecto(valor)
+        assert json.loads(orjson_con_encoder(valor)) == json.loads(cuerpo), ruta
+        assert json.loads(orjson_directo(valor)) == json.loads(cuerpo), ruta
+
+        t_defecto = medir(lambda: por_defecto(valor), args.repeticiones)
+        t_encoder = medir(lambda: orjson_con_encoder(valor), args.repeticiones)
+        t_directo = medir(lambda: orjson_directo(valor), args.repeticiones)
+        print(
+            f"{len(cuerpo) / 1e3:>8.1f} {t_defecto:>8.2f} ms {t_encoder:>8.2f} ms {t_directo:>6.2f} ms "
+            f"{t_defecto / t_directo:>6.1f}x  {ruta}"
+        )
+
+
+if __name__ == "__main__":
+    main()
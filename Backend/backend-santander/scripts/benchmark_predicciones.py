@@ -0,0 +1,90 @@
+"""
+Micro-benchmark del costo por petición de las predicciones
+
+Compara la carga anterior (csv.DictReader del archivo completo en cada petición)
+con el almacén columnar (stat() del archivo + arreglos ya cargados), incluyendo
+el filtrado de /predicciones/resumen. No requiere base de datos ni la API corriendo.
+
+Uso:
+    python -m scripts.benchmark_predicciones --repeticiones 200
+"""
+import argparse
+import csv
+import time
+import numpy as np
+from app.almacen_predicciones import PREDICCIONES_CSV, obtener_almacen
+
+
+def cargar_predicciones_csv() -> dict:
+    """Implementación anterior de predicciones.cargar_predicciones (referencia)"""
+    predicciones = {}
+    with open(PREDICCIONES_CSV, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            codigo_dane = int(row["codigo_dane_5d"])
+            predicciones.setdefault(codigo_dane, []).append({
+                "anio": int(row["anio"]),
+                "mes": int(row["mes"]),
+                "total_delitos": round(float(row["pred_total_delitos"]), 2),
+                "es_prediccion": True
+            })
+    return predicciones
+
+
+def resumen_antes(anio, mes) -> list:
+    resumen = []
+    for codigo_dane, preds in cargar_predicciones_csv().items():
+        for pred in preds:
+            if anio and pred["anio"] != anio:
+                continue
+            if mes and pred["mes"] != mes:
+                continue
+            resumen.append((codigo_dane, pred["anio"], pred["mes"], pred["total_delitos"]))
+    resumen.sort(key=lambda x: x[3], reverse=True)
+    return resumen
+
+
+def resumen_despues(anio, mes) -> list:
+    almacen = obtener_almacen()
+    filas = almacen.filtrar(anio, mes)
+    filas = filas[np.argsort(-almacen.total_delitos[filas], kind="stable")]
+    return list(zip(
+        almacen.codigo_dane[filas].tolist(),
+        almacen.anio[filas].tolist(),
+        almacen.mes[filas].tolist(),
+        almacen.total_delitos[filas].tolist(),
+    ))
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Microsegundos promedio por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark del almacén de predicciones")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--anio", type=int, default=None)
+    parser.add_argument("--mes", type=int, default=3)
+    args = parser.parse_args()
+
+    obtener_almacen()  # carga inicial
+    assert resumen_antes(args.anio, args.mes) == resumen_despues(args.anio, args.mes)
+
+    casos = [
+        ("carga por petición", cargar_predicciones_csv, obtener_almacen),
+        ("/resumen (filtro + orden)", lambda: resumen_antes(args.anio, args.mes),
+         lambda: resumen_despues(args.anio, args.mes)),
+    ]
+    print(f"{len(obtener_almacen())} predicciones, {args.repeticiones} repeticiones")
+    for nombre, antes, despues in casos:
+        us_antes = medir(antes, args.repeticiones)
+        us_despues = medir(despues, args.repeticiones)
+        print(f"  {nombre:<28} antes={us_antes:>10.1f}us  despues={us_despues:>8.1f}us  "
+              f"x{us_antes / us_despues:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Comando de mantenimiento: crea o completa la dimensión calendario dim_fecha
+
+Uso:
+    python -m scripts.construir_calendario                                # rango de fact_seguridad (+1 año)
+    python -m scripts.construir_calendario --desde 2003-01-01 --hasta 2030-12-31
+
+scripts/refrescar_cubo también la completa en cada carga. Mientras dim_fecha no
+cubra todas las fechas de fact_seguridad la API agrupa con EXTRACT.
+"""
+import argparse
+import time
+from datetime import date
+
+from app.database import engine
+from app.calendario import construir_dim_fecha
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crea/completa la dimensión calendario dim_fecha")
+    parser.add_argument("--desde", type=date.fromisoformat, default=None, help="Primer día (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None, help="Último día (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    with engine.begin() as conn:
+        resultado = construir_dim_fecha(conn, args.desde, args.hasta)
+        conn.exec_driver_sql("ANALYZE dim_fecha")
+
+    resultado["duracion_s"] = round(time.perf_counter() - inicio, 2)
+    print(resultado)
+
+
+if __name__ == "__main__":
+    main()
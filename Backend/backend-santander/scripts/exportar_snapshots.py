@@ -0,0 +1,37 @@
+"""
+Comando de mantenimiento: exporta snapshots Parquet/Arrow de las tablas base
+
+Escribe fact_seguridad, fact_clima, master_demografia y master_municipios (geometría
+en WKB) en SNAPSHOTS_DIR/v{version_datos}/ y elimina las versiones anteriores a las
+SNAPSHOTS_CONSERVAR más recientes. Requiere el paquete `pyarrow`.
+
+Uso (después de incrementar_version_datos, al final de cada proceso de carga):
+    python -m scripts.exportar_snapshots
+    python -m scripts.exportar_snapshots --conservar 3
+
+Los workers de la API abren el snapshot al arrancar y el motor columnar lo usa
+cuando su versión coincide con version_datos.
+"""
+import argparse
+from app.config import settings
+from app.database import engine
+from app.cache import version_datos_sync
+from app.snapshots import exportar, podar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta snapshots Parquet/Arrow de las tablas base")
+    parser.add_argument("--conservar", type=int, default=settings.SNAPSHOTS_CONSERVAR,
+                        help="Versiones de snapshot que se conservan")
+    args = parser.parse_args()
+
+    version = version_datos_sync()
+    with engine.connect() as conn:
+        manifiesto = exportar(conn, version)
+    for nombre, datos in manifiesto["tablas"].items():
+        print(f"{nombre:<20} {datos['filas']:>10} filas {datos['segundos']:>7.2f}s")
+    print({"version_datos": version, "eliminadas": podar(args.conservar)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Comando de mantenimiento: incrementa version_datos para invalidar el cache de respuestas
+
+Uso (al final de cada proceso de carga):
+    python -m scripts.incrementar_version_datos
+
+Los workers de la API detectan la nueva versión en máximo CACHE_VERSION_SEGUNDOS.
+"""
+from app.database import engine
+from app.cache import incrementar_version_datos
+
+
+def main():
+    with engine.begin() as conn:
+        version = incrementar_version_datos(conn)
+    print({"version_datos": version})
+
+
+if __name__ == "__main__":
+    main()
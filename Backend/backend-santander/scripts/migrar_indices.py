@@ -0,0 +1,144 @@
+"""
+Comando de mantenimiento: crea los índices de app/indices.py y verifica los planes
+
+Uso:
+    python -m scripts.migrar_indices                     # crea los faltantes y verifica
+    python -m scripts.migrar_indices --listar            # solo muestra el SQL
+    python -m scripts.migrar_indices --solo-verificar    # no crea índices
+    python -m scripts.migrar_indices --forzar-indices    # verifica con enable_seqscan = off
+
+La verificación ejecuta en proceso cada endpoint de ENDPOINTS (sin cache de
+respuestas), captura las consultas SQL que emite y corre EXPLAIN sobre cada una.
+Termina con código 1 si alguna lee fact_seguridad, fact_clima o el cubo con Seq Scan
+(en tablas particionadas, solo si además lee todas las particiones).
+
+Con pocos datos (desarrollo) el planificador puede preferir Seq Scan aunque exista
+un índice aplicable; --forzar-indices comprueba entonces que haya un índice utilizable.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from urllib.parse import parse_qsl
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import engine, async_engine
+from app.indices import INDICES, aplicar_indices, sql_indice, recorridos_secuenciales
+from app.particiones import TABLAS_PARTICIONADAS, anios_particionados
+from app.subpeticiones import get_interno
+
+# Consultas filtradas de los widgets del dashboard (ruta relativa a API_PREFIX)
+ENDPOINTS = [
+    "/temporal/linea-mensual?anio=2024&codigo_dane=68001&categoria_delito=HURTO",
+    "/temporal/por-dia-semana?anio=2024&codigo_dane=68001",
+    "/temporal/tendencia-semanal?anio=2024&categoria_delito=HURTO&codigo_dane=68001",
+    "/temporal/por-modalidad?anio=2024&codigo_dane=68001",
+    "/temporal/por-zona?anio=2024&codigo_dane=68001&categoria_delito=VIF",
+    "/victimas/por-genero?anio=2024&municipio=bucaramanga",
+    "/victimas/por-grupo-etario?anio=2024&categoria_delito=hurto",
+    "/victimas/por-arma-medio?anio=2024&categoria_delito=hurto",
+    "/victimas/mapa-puntos?anio=2024&municipio=bucaramanga&categoria_delito=hurto",
+    "/victimas/mapa-puntos?anio=2024&categoria_delito=hurto&agregacion=hex&zoom=10",
+    "/geografia/delitos-por-municipio?anio=2024&categoria_delito=HURTO",
+    "/clima/scatter-lluvia-delitos?anio=2024&codigo_dane=68001",
+    "/clima/correlacion?anio=2024&codigo_dane=68001",
+    "/predicciones/comparativa/bucaramanga",
+]
+
+
+async def llamar(app, ruta: str) -> int:
+    """GET en proceso contra la app ASGI; retorna el status"""
+    path, _, query = (settings.API_PREFIX + ruta).partition("?")
+    status, _, _ = await get_interno(app, path, dict(parse_qsl(query)))
+    return status
+
+
+async def planes_endpoints(rutas, forzar_indices: bool = False):
+    """
+    Llama cada ruta sin cache de respuestas y genera (ruta, status, [(statement, parametros, plan)])
+    con el plan de EXPLAIN (FORMAT JSON) de cada consulta SQL que emitió.
+    """
+    from main import app
+
+    settings.CACHE_HABILITADO = False
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("EXPLAIN", "SET ")):
+            capturadas.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capturar)
+    try:
+        for ruta in rutas:
+            capturadas.clear()
+            status = await llamar(app, ruta)
+            consultas = list(dict.fromkeys((s, tuple(p or ())) for s, p in capturadas))
+
+            planes = []
+            async with async_engine.connect() as conn:
+                if forzar_indices:
+                    await conn.exec_driver_sql("SET enable_seqscan = off")
+                for statement, parametros in consultas:
+                    plan = (await conn.exec_driver_sql(
+                        "EXPLAIN (FORMAT JSON) " + statement, parametros
+                    )).scalar()
+                    planes.append((statement, parametros, plan))
+                await conn.rollback()
+            yield ruta, status, planes
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capturar)
+        await async_engine.dispose()
+
+
+async def verificar(forzar_indices: bool) -> bool:
+    with engine.connect() as conn:
+        particiones = {t: len(anios_particionados(conn, t)) for t in TABLAS_PARTICIONADAS}
+    ok = True
+    async for ruta, status, planes in planes_endpoints(ENDPOINTS, forzar_indices):
+        problemas = []
+        for statement, _, plan in planes:
+            tablas = recorridos_secuenciales(plan, particiones)
+            if tablas:
+                problemas.append((", ".join(sorted(set(tablas))), " ".join(statement.split())[:160]))
+
+        if status != 200:
+            ok = False
+            print(f"ERROR   {ruta} (HTTP {status})")
+        elif problemas:
+            ok = False
+            print(f"SEQ     {ruta}")
+            for tablas, sql in problemas:
+                print(f"        Seq Scan en {tablas}: {sql}")
+        else:
+            print(f"OK      {ruta} ({len(planes)} consultas)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crea los índices de app/indices.py y verifica los planes")
+    parser.add_argument("--listar", action="store_true", help="Mostrar el SQL sin ejecutarlo")
+    parser.add_argument("--solo-verificar", action="store_true", help="No crear índices")
+    parser.add_argument("--forzar-indices", action="store_true",
+                        help="Verificar con enable_seqscan = off (útil con pocos datos)")
+    args = parser.parse_args()
+
+    if args.listar:
+        for nombre, tabla, definicion, uso in INDICES:
+            print(f"-- {uso}\n{sql_indice(nombre, tabla, definicion)};")
+        return
+
+    if not args.solo_verificar:
+        inicio = time.perf_counter()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for r in aplicar_indices(conn):
+                print(f"{r['tabla'] + '.' + r['indice']:<55} {r['estado']}")
+        print(f"Índices aplicados en {time.perf_counter() - inicio:.1f}s\n")
+
+    if not asyncio.run(verificar(args.forzar_indices)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Paridad del backend DuckDB contra PostgreSQL
+
+Ejecuta cada endpoint de ENDPOINTS con MOTOR_CONSULTAS = "postgres" y luego "duckdb"
+(sin cache de respuestas), compara las respuestas y muestra el tiempo de cada backend.
+Requiere un snapshot de la versión vigente (python -m scripts.exportar_snapshots).
+Termina con código 1 si alguna difiere.
+
+Los empates en ORDER BY total DESC no tienen un orden definido: si las respuestas solo
+difieren en el orden de filas empatadas se reportan como "OK (empates)".
+
+Uso:
+    python -m scripts.paridad_duckdb
+    python -m scripts.paridad_duckdb --repeticiones 5
+"""
+import argparse
+import asyncio
+import sys
+from urllib.parse import parse_qsl
+
+from app.config import settings
+from app.database import async_engine
+from app.motor_duckdb import sesion_duckdb
+from app.subpeticiones import get_interno
+from scripts.paridad_motor_columnar import comparar, medir_async
+
+# Rutas relativas a API_PREFIX
+ENDPOINTS = [
+    "/temporal/linea-mensual",
+    "/temporal/linea-mensual?anio=2024&codigo_dane=68001&categoria_delito=HURTO",
+    "/temporal/linea-mensual?anio=2023&format=columnar",
+    "/temporal/linea-anual?categoria_delito=VIF",
+    "/temporal/por-dia-semana?anio=2023",
+    "/temporal/tendencia-semanal?anio=2021&codigo_dane=68001",
+    "/temporal/comparativa-anual?codigo_dane=68081",
+    "/temporal/por-modalidad?anio=2024",
+    "/temporal/por-zona?categoria_delito=SEXUAL",
+    "/temporal/anios-disponibles",
+    "/victimas/por-genero",
+    "/victimas/por-genero?anio=2023&categoria_delito=sexual&municipio=barrancabermeja",
+    "/victimas/por-grupo-etario?fecha_inicio=2022-03-01&fecha_fin=2022-06-30",
+    "/victimas/por-arma-medio?anio=2024&categoria_delito=hurto",
+    "/victimas/por-clase-sitio?municipio=bucaramanga",
+    "/victimas/genero-por-delito?anio=2024",
+    "/victimas/grupo-etario-por-delito?municipio=floridablanca",
+    # Sin ORDER BY: el límite debe superar los puntos para que el conjunto sea determinista
+    "/victimas/mapa-puntos?anio=2024&categoria_delito=HURTO&municipio=giron&limit=5000",
+    "/victimas/mapa-puntos?anio=2023&agregacion=hex&zoom=10",
+    "/victimas/mapa-puntos?agregacion=grilla&zoom=8&bbox=-74.5,6.0,-72.5,8.0",
+    "/clima/scatter-lluvia-delitos?anio=2012&codigo_dane=68001",
+    "/clima/barras-categorias-lluvia?anio=2008",
+    "/clima/linea-tiempo-superpuesta",
+    "/clima/linea-tiempo-superpuesta?agrupacion=semanal&anio=2010",
+    "/clima/linea-tiempo-superpuesta?agrupacion=diaria&anio=2024&codigo_dane=68081",
+    "/clima/linea-tiempo-superpuesta?agrupacion=semanal&format=columnar",
+    "/clima/correlacion?categoria_delito=VIF",
+    "/clima/resumen-precipitacion?anio=2021",
+    "/filtros/municipios",
+    "/filtros/categorias-delito",
+    "/filtros/generos",
+    "/filtros/grupos-etarios",
+    "/filtros/zonas",
+    "/filtros/armas-medios",
+    "/filtros/modalidades",
+    "/filtros/anios",
+    "/filtros/rango-fechas",
+    "/filtros/resumen",
+]
+
+
+async def paridad(repeticiones: int) -> bool:
+    from main import app
+
+    if await sesion_duckdb() is None:
+        raise SystemExit("No hay snapshot de la versión vigente: python -m scripts.exportar_snapshots")
+
+    ok = True
+    for ruta in ENDPOINTS:
+        path, _, query = (settings.API_PREFIX + ruta).partition("?")
+        params = dict(parse_qsl(query))
+        resultados = {}
+        for motor in ("postgres", "duckdb"):
+            settings.MOTOR_CONSULTAS = motor
+            resultados[motor] = await medir_async(lambda: get_interno(app, path, params), repeticiones)
+
+        (status_pg, datos_pg, _), ms_pg = resultados["postgres"]
+        (status_duck, datos_duck, _), ms_duck = resultados["duckdb"]
+        estado = comparar((status_pg, datos_pg), (status_duck, datos_duck))
+        ok &= estado != "DIFIERE"
+        print(f"{estado:<13} {ms_pg:8.1f} ms {ms_duck:8.1f} ms  {ruta}")
+    await async_engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el backend DuckDB con PostgreSQL")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Ejecuciones por consulta para medir")
+    args = parser.parse_args()
+
+    settings.CACHE_HABILITADO = False
+    print(f"{'estado':<13} {'postgres':>11} {'duckdb':>11}  consulta")
+    if not asyncio.run(paridad(args.repeticiones)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Paridad del motor columnar contra PostgreSQL
+
+Carga el motor (app/motor_columnar.py) y ejecuta cada endpoint de ENDPOINTS y cada
+consulta de CONSULTAS_CHATBOT con MOTOR_CONSULTAS = "postgres" y luego "columnar"
+(sin cache de respuestas), compara las respuestas y muestra el tiempo de cada motor.
+Termina con código 1 si alguna difiere.
+
+Los empates en ORDER BY total DESC no tienen un orden definido en PostgreSQL: si las
+respuestas solo difieren en el orden de filas empatadas se reportan como "OK (empates)".
+
+Uso:
+    python -m scripts.paridad_motor_columnar
+    python -m scripts.paridad_motor_columnar --repeticiones 5
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import parse_qsl
+
+from app.config import settings
+from app.database import SessionLocal, async_engine
+from app.motor_columnar import precargar_motor
+from app.subpeticiones import get_interno
+from app.routers.chatbot import (
+    obtener_distribucion_genero, obtener_distribucion_grupo_etario, obtener_distribucion_zona,
+    obtener_perfil_victima, comparar_categorias, comparar_municipios, obtener_estadisticas_generales,
+)
+
+# Rutas relativas a API_PREFIX
+ENDPOINTS = [
+    "/temporal/linea-mensual",
+    "/temporal/linea-mensual?anio=2024&codigo_dane=68001&categoria_delito=HURTO",
+    "/temporal/linea-mensual?categoria_delito=hurto",
+    "/temporal/linea-mensual?anio=2023&format=columnar",
+    "/temporal/linea-anual?categoria_delito=VIF",
+    "/temporal/por-dia-semana?anio=2023",
+    "/temporal/tendencia-semanal?anio=2021&codigo_dane=68001",
+    "/temporal/comparativa-anual?codigo_dane=68081",
+    "/temporal/por-modalidad?anio=2024",
+    "/temporal/por-zona?categoria_delito=SEXUAL",
+    "/temporal/anios-disponibles",
+    "/victimas/por-genero",
+    "/victimas/por-genero?anio=2023&categoria_delito=sexual&municipio=barrancabermeja",
+    "/victimas/por-grupo-etario?fecha_inicio=2022-03-01&fecha_fin=2022-06-30",
+    "/victimas/por-arma-medio?anio=2024&categoria_delito=hurto",
+    "/victimas/por-clase-sitio?municipio=bucaramanga",
+    "/victimas/genero-por-delito?anio=2024",
+    "/victimas/grupo-etario-por-delito?municipio=floridablanca",
+    "/dashboard/bundle",
+    "/dashboard/bundle?anio=2024&categoria_delito=HURTO&codigo_dane=68001&widgets="
+    "temporal/linea-mensual,temporal/por-modalidad,victimas/por-arma-medio,victimas/grupo-etario-por-delito",
+]
+
+CONSULTAS_CHATBOT = [
+    ("distribucion_genero", obtener_distribucion_genero, {"municipio": "bucaramanga", "anio": 2024}),
+    ("distribucion_grupo_etario", obtener_distribucion_grupo_etario, {"categoria": "sexual", "genero": "femenino"}),
+    ("distribucion_zona", obtener_distribucion_zona, {"anio": 2023, "categoria": "HURTO"}),
+    ("perfil_victima", obtener_perfil_victima, {"municipio": "barrancabermeja", "categoria": "SEXUAL"}),
+    ("comparar_categorias", comparar_categorias, {"categorias": ["HURTO", "vif"], "anio": 2024}),
+    ("comparar_municipios", comparar_municipios, {"municipios": ["bucaramanga", "giron"], "anio": 2022}),
+    ("estadisticas_generales", obtener_estadisticas_generales, {}),
+]
+
+
+def canonico(valor):
+    """Listas ordenadas por su contenido: iguala respuestas que solo difieren en empates"""
+    if isinstance(valor, (list, tuple)):
+        return sorted((canonico(v) for v in valor), key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    if isinstance(valor, dict):
+        return {k: canonico(v) for k, v in valor.items()}
+    return valor
+
+
+def comparar(a, b) -> str:
+    if a == b:
+        return "OK"
+    if canonico(a) == canonico(b):
+        return "OK (empates)"
+    return "DIFIERE"
+
+
+def medir(funcion, repeticiones: int):
+    """(resultado, milisegundos promedio)"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+async def medir_async(funcion, repeticiones: int):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = await funcion()
+    return resultado, (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+async def paridad_endpoints(repeticiones: int) -> bool:
+    from main import app
+
+    ok = True
+    for ruta in ENDPOINTS:
+        path, _, query = (settings.API_PREFIX + ruta).partition("?")
+        params = dict(parse_qsl(query))
+        resultados = {}
+        for motor in ("postgres", "columnar"):
+            settings.MOTOR_CONSULTAS = motor
+            resultados[motor] = await medir_async(lambda: get_interno(app, path, params), repeticiones)
+
+        (status_pg, datos_pg, _), ms_pg = resultados["postgres"]
+        (status_col, datos_col, _), ms_col = resultados["columnar"]
+        estado = comparar((status_pg, datos_pg), (status_col, datos_col))
+        ok &= estado != "DIFIERE"
+        print(f"{estado:<13} {ms_pg:8.1f} ms {ms_col:8.1f} ms  {ruta}")
+    await async_engine.dispose()
+    return ok
+
+
+def paridad_chatbot(repeticiones: int) -> bool:
+    ok = True
+    with SessionLocal() as db:
+        for nombre, funcion, argumentos in CONSULTAS_CHATBOT:
+            resultados = {}
+            for motor in ("postgres", "columnar"):
+                settings.MOTOR_CONSULTAS = motor
+                resultados[motor] = medir(lambda: funcion(db, **argumentos), repeticiones)
+            estado = comparar(resultados["postgres"][0], resultados["columnar"][0])
+            ok &= estado != "DIFIERE"
+            print(f"{estado:<13} {resultados['postgres'][1]:8.1f} ms {resultados['columnar'][1]:8.1f} ms  chatbot.{nombre}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el motor columnar con PostgreSQL")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Ejecuciones por consulta para medir")
+    args = parser.parse_args()
+
+    settings.CACHE_HABILITADO = False
+    inicio = time.perf_counter()
+    motor = precargar_motor()
+    print(f"Motor cargado: {len(motor)} filas, {motor.bytes / 1e6:.1f} MB en {time.perf_counter() - inicio:.1f}s\n")
+    print(f"{'estado':<13} {'postgres':>11} {'columnar':>11}  consulta")
+
+    ok = asyncio.run(paridad_endpoints(args.repeticiones))
+    ok &= paridad_chatbot(args.repeticiones)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Comando de mantenimiento: particiona por año fact_seguridad y fact_clima
+
+Uso:
+    python -m scripts.particionar_tablas                    # migra las tablas sin particionar y verifica
+    python -m scripts.particionar_tablas --hasta 2030       # además crea las particiones hasta 2030
+    python -m scripts.particionar_tablas --desde 2010 --hasta 2012 --solo-particiones
+                                                            # antes de una carga de 2010 a 2012
+    python -m scripts.particionar_tablas --solo-verificar   # no modifica la base de datos
+
+La migración de cada tabla corre en una transacción (copia de filas incluida): durante
+la copia se permiten lecturas y las escrituras esperan. Las tablas ya particionadas sin
+partición DEFAULT (migradas antes) la reciben, y su PRIMARY KEY (id, fecha) pasa a UNIQUE
+para admitir fechas NULL.
+
+Antes de insertar, los procesos de carga crean las particiones de los años del lote con
+app.particiones.preparar_carga (o --solo-particiones con --desde/--hasta). Si no lo hacen,
+las filas de años sin partición quedan en DEFAULT y se mueven al crear la partición.
+
+La verificación llama a los endpoints con `anio` de scripts/migrar_indices.py y termina
+con código 1 si alguna consulta filtrada por fecha lee particiones de otros años (sin
+partition pruning). Las verificaciones periódicas sin filtro (MAX(id_evento), cobertura
+de dim_fecha) se omiten.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+from app.database import engine
+from app.particiones import TABLAS_PARTICIONADAS, particionar_tabla, asegurar_particiones, particiones_leidas
+from scripts.migrar_indices import ENDPOINTS, planes_endpoints
+
+
+async def verificar() -> bool:
+    rutas = [r for r in ENDPOINTS if "anio" in parse_qs(urlsplit(r).query)]
+    ok = True
+    async for ruta, status, planes in planes_endpoints(rutas):
+        anio = int(parse_qs(urlsplit(ruta).query)["anio"][0])
+        leidas = {}
+        for _, parametros, plan in planes:
+            if not any(isinstance(p, date) for p in parametros):
+                continue
+            for tabla, anios in particiones_leidas(plan).items():
+                leidas.setdefault(tabla, set()).update(anios)
+        fuera = {t: sorted(a - {anio}, key=str) for t, a in leidas.items() if a - {anio}}
+
+        if status != 200:
+            ok = False
+            print(f"ERROR   {ruta} (HTTP {status})")
+        elif fuera:
+            ok = False
+            print(f"SIN PODA {ruta}: {fuera}")
+        else:
+            detalle = ", ".join(f"{t}_{anio}" for t in sorted(leidas)) or "sin tablas particionadas"
+            print(f"OK      {ruta} ({detalle})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Particiona por año fact_seguridad y fact_clima")
+    parser.add_argument("--desde", type=int, default=None, help="Crear particiones desde este año")
+    parser.add_argument("--hasta", type=int, default=None, help="Crear particiones hasta este año")
+    parser.add_argument("--solo-verificar", action="store_true", help="No modificar la base de datos")
+    parser.add_argument(
+        "--solo-particiones", action="store_true",
+        help="Solo crear las particiones de --desde/--hasta (paso previo a una carga), sin migrar ni verificar",
+    )
+    args = parser.parse_args()
+
+    if args.solo_particiones:
+        with engine.begin() as conn:
+            for tabla in TABLAS_PARTICIONADAS:
+                print({"tabla": tabla, "creadas": asegurar_particiones(conn, tabla, args.desde, args.hasta)})
+        return
+
+    if not args.solo_verificar:
+        for tabla in TABLAS_PARTICIONADAS:
+            inicio = time.perf_counter()
+            with engine.begin() as conn:
+                resultado = particionar_tabla(conn, tabla)
+                if args.desde or args.hasta:
+                    resultado["creadas"] = asegurar_particiones(conn, tabla, args.desde, args.hasta)
+            resultado["duracion_s"] = round(time.perf_counter() - inicio, 2)
+            print(resultado)
+        print()
+
+    if not asyncio.run(verificar()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
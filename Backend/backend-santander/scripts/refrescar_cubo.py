@@ -0,0 +1,47 @@
+"""
+Comando de mantenimiento: construye o refresca el cubo diario agg_seguridad_diaria
+
+Uso:
+    python -m scripts.refrescar_cubo             # incremental (días con eventos nuevos)
+    python -m scripts.refrescar_cubo --completo  # reconstrucción total (tras borrados/updates)
+
+Ejecutar después de cada carga de fact_seguridad. Mientras el cubo no esté al día
+(marca de agua < MAX(id_evento)) la API sigue consultando fact_seguridad.
+También completa la dimensión calendario dim_fecha hasta el año siguiente al último evento
+y, si las tablas de hechos están particionadas, crea las particiones del año siguiente
+(las de los años de cada carga las crea el proceso de carga antes de insertar, con
+app.particiones.preparar_carga).
+"""
+import argparse
+import time
+
+from app.database import engine
+from app.cubo import crear_tablas_cubo, construir_cubo, refrescar_cubo
+from app.calendario import construir_dim_fecha
+from app.particiones import TABLAS_PARTICIONADAS, asegurar_particiones
+from app.cache import incrementar_version_datos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye/refresca el cubo agg_seguridad_diaria")
+    parser.add_argument("--completo", action="store_true", help="Reconstruir el cubo desde cero")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    with engine.begin() as conn:
+        crear_tablas_cubo(conn)
+        resultado = construir_cubo(conn) if args.completo else refrescar_cubo(conn)
+        conn.exec_driver_sql("ANALYZE agg_seguridad_diaria")
+        resultado["calendario"] = construir_dim_fecha(conn)
+        resultado["particiones_creadas"] = [
+            p for tabla in TABLAS_PARTICIONADAS for p in asegurar_particiones(conn, tabla)
+        ]
+        if resultado.get("dias_recalculados", 1):
+            resultado["version_datos"] = incrementar_version_datos(conn)
+
+    resultado["duracion_s"] = round(time.perf_counter() - inicio, 2)
+    print(resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Datos de ejemplo compartidos por las pruebas: filas de fact_seguridad en memoria y
+snapshots Parquet (app/snapshots.py) escritos en un directorio temporal para DuckDB
+"""
+import asyncio
+import json
+import os
+import random
+from datetime import date, timedelta
+import pytest
+from app.config import settings
+from app import cubo
+
+CATEGORIAS = ("HURTO", "VIF", "LESIONES", "SEXUAL")
+MUNICIPIOS = (68001, 68276, 68307)
+GENEROS = ("MASCULINO", "FEMENINO", None)
+GRUPOS = ("MENORES", "ADOLESCENTES", "ADULTOS", None)
+ZONAS = ("URBANA", "RURAL")
+ARMAS = ("ARMA BLANCA", "CONTUNDENTES", "SIN EMPLEO DE ARMAS")
+SITIOS = ("VIA PUBLICA", "CASA", "COMERCIO")
+MODALIDADES = ("ATRACO", "RAPONAZO", None)
+
+# Del 25/12/2022 al 05/01/2025: cruza los cambios de año de la semana ISO
+DESDE = date(2022, 12, 25)
+HASTA = date(2025, 1, 5)
+
+
+def filas_seguridad(n: int = 600, semilla: int = 7) -> list:
+    """Filas de fact_seguridad (dicts con las columnas del snapshot) deterministas"""
+    azar = random.Random(semilla)
+    dias = (HASTA - DESDE).days
+    filas = []
+    for i in range(1, n + 1):
+        filas.append({
+            "id_evento": i,
+            "codigo_dane": azar.choice(MUNICIPIOS),
+            "fecha_hecho": DESDE + timedelta(days=azar.randint(0, dias)),
+            "categoria_delito": azar.choice(CATEGORIAS),
+            "genero": azar.choice(GENEROS),
+            "grupo_etario": azar.choice(GRUPOS),
+            "zona_hecho": azar.choice(ZONAS),
+            "arma_medio": azar.choice(ARMAS),
+            "clase_sitio": azar.choice(SITIOS),
+            "modalidad_especifica": azar.choice(MODALIDADES),
+            "cantidad": azar.randint(1, 3),
+            "latitud": 7.0 + azar.random(),
+            "longitud": -73.5 + azar.random(),
+        })
+    # Bordes de año y de semana ISO
+    for i, fecha in enumerate((DESDE, date(2023, 1, 1), date(2024, 12, 30), HASTA), start=n + 1):
+        filas.append({**filas[0], "id_evento": i, "fecha_hecho": fecha})
+    return filas
+
+
+def ejecutar(corrutina):
+    """Ejecuta una corrutina (endpoints async) sin plugin de pytest"""
+    return asyncio.run(corrutina)
+
+
+@pytest.fixture
+def sin_cubo(monkeypatch):
+    """fuente_seguridad() retorna fact_seguridad sin consultar PostgreSQL"""
+    monkeypatch.setattr(settings, "CUBO_HABILITADO", False)
+
+
+@pytest.fixture
+def con_cubo(monkeypatch):
+    """fuente_seguridad() retorna agg_seguridad_diaria sin consultar PostgreSQL"""
+    monkeypatch.setattr(settings, "CUBO_HABILITADO", True)
+    monkeypatch.setattr(settings, "CUBO_VERIFICACION_SEGUNDOS", 10 ** 9)
+    monkeypatch.setitem(cubo._estado, "disponible", True)
+    monkeypatch.setitem(cubo._estado, "verificado_en", 10 ** 9)
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    """
+    Escribe snapshots Parquet en tmp_path (SNAPSHOTS_DIR) y retorna
+    escribir(version, filas, calendario=(desde, hasta) o None)
+    """
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    from app.calendario import filas_calendario
+    from app.snapshots import TABLAS, MANIFIESTO, directorio_version
+
+    monkeypatch.setattr(settings, "SNAPSHOTS_DIR", str(tmp_path))
+
+    def escribir(version: int, filas: list, calendario: tuple = (DESDE, HASTA)) -> str:
+        directorio = directorio_version(version)
+        os.makedirs(directorio)
+        tablas = {"fact_seguridad": filas}
+        if calendario:
+            tablas["dim_fecha"] = filas_calendario(*calendario)
+        for nombre, datos in tablas.items():
+            tabla = pa.Table.from_pylist(datos, schema=TABLAS[nombre].esquema)
+            pq.write_table(tabla, os.path.join(directorio, f"{nombre}.parquet"))
+        with open(os.path.join(directorio, MANIFIESTO), "w", encoding="utf-8") as f:
+            json.dump({"version_datos": version, "tablas": {n: {"filas": len(d)} for n, d in tablas.items()}}, f)
+        return directorio
+
+    return escribir
+
+
+@pytest.fixture
+def base_duckdb(snapshots, monkeypatch):
+    """Retorna abrir(version, filas, calendario) -> BaseDuckDB sobre un snapshot de ejemplo"""
+    pytest.importorskip("duckdb")
+    from app import motor_duckdb
+
+    monkeypatch.setattr(motor_duckdb, "_zona_horaria", lambda: "UTC")
+
+    def abrir(version: int = 1, filas: list = None, calendario: tuple = (DESDE, HASTA)):
+        snapshots(version, filas if filas is not None else filas_seguridad(), calendario)
+        return motor_duckdb.BaseDuckDB(version)
+
+    return abrir
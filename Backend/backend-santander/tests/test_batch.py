@@ -0,0 +1,58 @@
+"""
+Pruebas de POST /batch (app/routers/batch.py) sobre una app mínima: las entradas cuya
+respuesta no es JSON se marcan como error en vez de devolver un 200 sin datos
+"""
+import httpx
+from fastapi import APIRouter, FastAPI, Response
+from app.config import settings
+from app.routers import batch
+from .conftest import ejecutar
+
+rutas = APIRouter(prefix="/prueba")
+
+
+@rutas.get("/json")
+async def get_json(n: int = 1):
+    return {"n": n}
+
+
+@rutas.get("/binaria")
+async def get_binaria():
+    return Response(content=b"\x1a\x02\x00\xff", media_type="application/vnd.mapbox-vector-tile")
+
+
+def _post(entradas: list) -> httpx.Response:
+    app = FastAPI()
+    app.include_router(rutas, prefix=settings.API_PREFIX)
+    app.include_router(batch.router, prefix=settings.API_PREFIX)
+
+    async def pedir():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://api") as cliente:
+            return await cliente.post(f"{settings.API_PREFIX}/batch", json=entradas)
+
+    return ejecutar(pedir())
+
+
+def test_respuesta_no_json_es_error():
+    respuesta = _post([
+        {"id": "a", "route": "prueba/json", "params": {"n": 3}},
+        {"id": "b", "route": "prueba/binaria"},
+        {"id": "c", "route": "prueba/no-existe"},
+    ])
+    assert respuesta.status_code == 200
+    resultados = respuesta.json()["resultados"]
+    assert resultados["a"] == {"status": 200, "datos": {"n": 3}}
+    assert resultados["b"]["status"] == 400
+    assert "datos" not in resultados["b"] and "JSON" in resultados["b"]["error"]
+    assert resultados["c"]["status"] == 404
+
+
+def test_entradas_equivalentes_una_vez():
+    respuesta = _post([
+        {"id": "a", "route": "prueba/json?n=2"},
+        {"id": "b", "route": "prueba/json", "params": {"n": 2}},
+    ])
+    cuerpo = respuesta.json()
+    assert cuerpo["ejecutadas"] == 1
+    assert cuerpo["resultados"]["a"] == cuerpo["resultados"]["b"] == {"status": 200, "datos": {"n": 2}}
@@ -0,0 +1,148 @@
+"""
+Pruebas del bundle del dashboard (app/routers/dashboard.py): los widgets calculados con
+un único GROUP BY GROUPING SETS deben coincidir con sus endpoints GET individuales.
+Se ejecutan sobre un snapshot de ejemplo en DuckDB, que soporta GROUPING SETS y GROUPING()
+"""
+import inspect
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.params import Param
+from app.config import settings
+from app.municipios_indice import IndiceMunicipios
+from app.motor_duckdb import SesionDuckDB
+from app.routers import dashboard, filtros, temporal, victimas
+from .conftest import ejecutar, filas_seguridad
+
+pytest.importorskip("duckdb")
+
+MUNICIPIOS = [(68001, "BUCARAMANGA"), (68276, "FLORIDABLANCA"), (68307, "GIRÓN")]
+
+# Widgets con endpoint GET propio (estadisticas y filtros/resumen no tienen uno equivalente)
+WIDGETS = [w for w in dashboard.WIDGETS_AGREGADOS if w.startswith(("temporal/", "victimas/"))]
+
+
+def _endpoint(widget: str):
+    modulo, _, ruta = widget.partition("/")
+    router = {"temporal": temporal.router, "victimas": victimas.router}[modulo]
+    return next(r.endpoint for r in router.routes if r.path == f"{router.prefix}/{ruta}")
+
+
+def _llamar(endpoint, sesion, **params):
+    """Llama al endpoint con los valores por defecto de sus Query y la sesión dada"""
+    argumentos = {}
+    for nombre, parametro in inspect.signature(endpoint).parameters.items():
+        if nombre == "db":
+            argumentos[nombre] = sesion
+        elif nombre in params:
+            argumentos[nombre] = params[nombre]
+        elif isinstance(parametro.default, Param):
+            argumentos[nombre] = parametro.default.default
+    return ejecutar(endpoint(**argumentos))
+
+
+class _SesionFija:
+    """Reemplaza AsyncSessionLocal: todos los recorridos del bundle usan la sesión DuckDB"""
+
+    def __init__(self, sesion):
+        self.sesion = sesion
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self.sesion
+
+    async def __aexit__(self, *args):
+        return False
+
+
+@pytest.fixture
+def sesion(base_duckdb, sin_cubo, monkeypatch):
+    sesion = SesionDuckDB(base_duckdb())
+    monkeypatch.setattr(dashboard, "AsyncSessionLocal", _SesionFija(sesion))
+
+    async def indice():
+        return IndiceMunicipios(MUNICIPIOS)
+
+    # resolver_municipio de los endpoints de víctimas sin consultar master_municipios
+    monkeypatch.setattr("app.utils.indice_municipios", indice)
+    monkeypatch.setattr(dashboard, "indice_municipios", indice)
+    return sesion
+
+
+@pytest.mark.parametrize("filtros", [
+    {},
+    {"anio": 2024},
+    {"categoria_delito": "HURTO"},
+    {"anio": 2023, "categoria_delito": "VIF", "codigo_dane": 68001},
+])
+def test_bundle_igual_a_endpoints(sesion, filtros):
+    bundle = ejecutar(dashboard.get_bundle(
+        None, widgets=",".join(WIDGETS), anio=filtros.get("anio"),
+        categoria_delito=filtros.get("categoria_delito"), codigo_dane=filtros.get("codigo_dane"), municipio=None,
+    ))
+    assert list(bundle["widgets"]) == WIDGETS
+
+    nombres = dict(MUNICIPIOS)
+    for widget in WIDGETS:
+        # Cada widget recibe solo los filtros que acepta su endpoint
+        alcance = dashboard.WIDGETS_AGREGADOS[widget][1]
+        params = {}
+        if "anio" in alcance:
+            params["anio"] = filtros.get("anio")
+        if "categoria" in alcance:
+            params["categoria_delito"] = filtros.get("categoria_delito")
+        if "municipio" in alcance and filtros.get("codigo_dane"):
+            params["codigo_dane"] = filtros["codigo_dane"]
+            params["municipio"] = nombres[filtros["codigo_dane"]]
+        esperado = _llamar(_endpoint(widget), sesion, **params)
+        assert bundle["widgets"][widget] == esperado, widget
+
+
+def test_un_recorrido_por_alcance(sesion):
+    """linea-anual ignora anio: con anio se hacen dos recorridos y cada fila llega a su widget"""
+    widgets = ["temporal/linea-anual", "temporal/por-dia-semana", "victimas/genero-por-delito"]
+    bundle = ejecutar(dashboard.get_bundle(
+        None, widgets=",".join(widgets), anio=2024, categoria_delito="HURTO", codigo_dane=None, municipio=None,
+    ))
+    anios = {f["anio"] for f in bundle["widgets"]["temporal/linea-anual"]}
+    assert {2023, 2024, 2025} <= anios
+    categorias = {f["categoria_delito"] for f in bundle["widgets"]["victimas/genero-por-delito"]}
+    assert len(categorias) > 1
+
+
+def test_widget_interno_no_json(monkeypatch):
+    app = FastAPI()
+    app.include_router(temporal.router, prefix=settings.API_PREFIX)
+
+    async def get_interno(app, path, params):
+        return 200, None, []
+
+    monkeypatch.setattr(dashboard, "get_interno", get_interno)
+    request = Request({"type": "http", "app": app, "headers": []})
+    with pytest.raises(HTTPException) as error:
+        ejecutar(dashboard._widget_interno(request, "temporal/anios-disponibles", {}))
+    assert error.value.status_code == 400
+    assert error.value.detail.startswith("temporal/anios-disponibles:")
+
+
+def test_resumen_filtros(sesion, monkeypatch):
+    """GET /filtros/resumen sale del mismo GROUPING SETS que el widget del bundle"""
+    async def nombres_municipios(db):
+        return [n for _, n in MUNICIPIOS]
+
+    monkeypatch.setattr(filtros, "nombres_municipios", nombres_municipios)
+    resumen = ejecutar(filtros.get_resumen_filtros(db=sesion))
+    filas = filas_seguridad()
+    distintos = lambda campo: sorted({f[campo] for f in filas if f[campo] is not None})
+    assert resumen == {
+        "municipios": ["BUCARAMANGA", "FLORIDABLANCA", "GIRÓN"],
+        "categorias_delito": distintos("categoria_delito"),
+        "generos": distintos("genero"),
+        "grupos_etarios": distintos("grupo_etario"),
+        "anios": sorted({f["fecha_hecho"].year for f in filas}, reverse=True),
+        "rango_fechas": {
+            "minima": min(f["fecha_hecho"] for f in filas).isoformat(),
+            "maxima": max(f["fecha_hecho"] for f in filas).isoformat(),
+        },
+    }
@@ -0,0 +1,107 @@
+"""
+Pruebas de los rangos de fecha (app/utils.py) y de los festivos de dim_fecha (app/calendario.py)
+"""
+import operator
+from datetime import date
+import pytest
+from sqlalchemy import Date, column
+from sqlalchemy.dialects import postgresql
+from app.calendario import domingo_pascua, festivos_colombia, filas_calendario
+from app.utils import condiciones_fecha, rango_anio
+
+FECHA = column("fecha_hecho", Date)
+
+
+def _rangos(condiciones) -> list:
+    """[(operador, valor)] de condiciones columna <op> valor"""
+    return [(c.operator, c.right.value) for c in condiciones]
+
+
+# ============================================
+# RANGOS SEMIABIERTOS
+# ============================================
+
+def test_rango_anio():
+    assert rango_anio(2024) == (date(2024, 1, 1), date(2025, 1, 1))
+    assert rango_anio(2024, 2) == (date(2024, 2, 1), date(2024, 3, 1))
+    assert rango_anio(2024, 12) == (date(2024, 12, 1), date(2025, 1, 1))
+
+
+def test_condiciones_anio_semiabierto():
+    assert _rangos(condiciones_fecha(FECHA, 2024)) == [
+        (operator.ge, date(2024, 1, 1)),
+        (operator.lt, date(2025, 1, 1)),
+    ]
+
+
+def test_condiciones_anio_y_mes():
+    assert _rangos(condiciones_fecha(FECHA, 2023, mes=12)) == [
+        (operator.ge, date(2023, 12, 1)),
+        (operator.lt, date(2024, 1, 1)),
+    ]
+
+
+def test_fecha_fin_inclusiva():
+    assert _rangos(condiciones_fecha(FECHA, fecha_inicio=date(2024, 2, 1), fecha_fin=date(2024, 2, 29))) == [
+        (operator.ge, date(2024, 2, 1)),
+        (operator.lt, date(2024, 3, 1)),
+    ]
+
+
+def test_mes_sin_anio_usa_extract():
+    (condicion,) = condiciones_fecha(FECHA, mes=3)
+    sql = str(condicion.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert sql == "EXTRACT(month FROM fecha_hecho) = 3"
+
+
+def test_sin_filtros():
+    assert condiciones_fecha(FECHA) == []
+
+
+# ============================================
+# FESTIVOS
+# ============================================
+
+@pytest.mark.parametrize("anio, pascua", [
+    (1818, date(1818, 3, 22)),
+    (2000, date(2000, 4, 23)),
+    (2019, date(2019, 4, 21)),
+    (2024, date(2024, 3, 31)),
+    (2025, date(2025, 4, 20)),
+    (2038, date(2038, 4, 25)),
+])
+def test_domingo_pascua(anio, pascua):
+    assert domingo_pascua(anio) == pascua
+
+
+def test_festivos_2024():
+    assert sorted(festivos_colombia(2024)) == [
+        date(2024, 1, 1), date(2024, 1, 8), date(2024, 3, 25), date(2024, 3, 28),
+        date(2024, 3, 29), date(2024, 5, 1), date(2024, 5, 13), date(2024, 6, 3),
+        date(2024, 6, 10), date(2024, 7, 1), date(2024, 7, 20), date(2024, 8, 7),
+        date(2024, 8, 19), date(2024, 10, 14), date(2024, 11, 4), date(2024, 11, 11),
+        date(2024, 12, 8), date(2024, 12, 25),
+    ]
+
+
+def test_festivos_2025_trasladados_y_coincidentes():
+    festivos = festivos_colombia(2025)
+    assert len(festivos) == 17
+    # Reyes cae en lunes y no se traslada; Cartagena (martes 11) pasa al lunes 17
+    assert festivos[date(2025, 1, 6)] == "Reyes Magos"
+    assert festivos[date(2025, 11, 17)] == "Independencia de Cartagena"
+    # San Pedro (domingo 29) se traslada al mismo lunes que el Sagrado Corazón
+    assert festivos[date(2025, 6, 30)] == "San Pedro y San Pablo / Sagrado Corazón"
+    assert festivos[date(2025, 4, 18)] == "Viernes Santo"
+
+
+def test_filas_calendario_semana_iso_y_festivo():
+    filas = {f["fecha"]: f for f in filas_calendario(date(2024, 12, 29), date(2025, 1, 6))}
+    assert len(filas) == 9
+    # 30/12/2024 es lunes de la semana ISO 1 de 2025
+    lunes = filas[date(2024, 12, 30)]
+    assert (lunes["anio"], lunes["anio_iso"], lunes["semana_iso"], lunes["dia_semana"]) == (2024, 2025, 1, 1)
+    domingo = filas[date(2024, 12, 29)]
+    assert domingo["dia_semana"] == 0 and domingo["es_fin_semana"]
+    assert filas[date(2025, 1, 1)]["es_festivo"] and filas[date(2025, 1, 1)]["nombre_festivo"] == "Año Nuevo"
+    assert not filas[date(2025, 1, 2)]["es_festivo"]
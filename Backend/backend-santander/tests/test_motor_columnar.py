@@ -0,0 +1,190 @@
+"""
+Pruebas del motor columnar (app/motor_columnar.py): filtrar/agrupar deben dar lo mismo
+que las consultas SQL de los routers sobre fact_seguridad. La referencia se calcula en
+Python con la semántica de PostgreSQL: EXTRACT(dow) con 0 = domingo, EXTRACT(week) como
+semana ISO, UPPER(col) = UPPER(valor) y GROUP BY sin las claves NULL
+"""
+from collections import Counter
+from datetime import date
+import pytest
+from app.config import settings
+from app import motor_columnar
+from app.motor_columnar import MotorColumnar, DIMENSIONES_CATEGORICAS
+from .conftest import filas_seguridad
+
+
+@pytest.fixture(params=[True, False], ids=["bitmaps", "sin_bitmaps"])
+def datos(request, monkeypatch):
+    """(motor, filas): el motor con y sin índice de bitmaps"""
+    monkeypatch.setattr(settings, "MOTOR_BITMAPS", request.param)
+    filas = filas_seguridad()
+    # Una fila sin fecha: no entra en ningún grupo de calendario
+    filas.append({**filas[0], "id_evento": len(filas) + 1, "fecha_hecho": None})
+    columnas = ("codigo_dane", "fecha_hecho", *DIMENSIONES_CATEGORICAS, "cantidad")
+    motor = MotorColumnar.desde_filas([tuple(f[c] for c in columnas) for f in filas])
+    return motor, filas
+
+
+def _clave(fila: dict, dimension: str):
+    fecha = fila["fecha_hecho"]
+    if dimension == "anio":
+        return fecha and fecha.year
+    if dimension == "mes":
+        return fecha and fecha.month
+    if dimension == "dia_semana":
+        return fecha and fecha.isoweekday() % 7
+    if dimension == "semana":
+        return fecha and fecha.isocalendar()[1]
+    if dimension == "fecha":
+        return fecha
+    return fila[dimension]
+
+
+def _referencia(filas: list, dimensiones: tuple) -> dict:
+    """SELECT dims, SUM(cantidad) ... WHERE dims IS NOT NULL GROUP BY dims"""
+    totales = Counter()
+    for fila in filas:
+        claves = tuple(_clave(fila, d) for d in dimensiones)
+        if None not in claves:
+            totales[claves] += fila["cantidad"]
+    return dict(totales)
+
+
+def _agrupado(motor, dimensiones: tuple, mascara=None) -> dict:
+    return {tuple(getattr(f, d) for d in dimensiones): f.total for f in motor.agrupar(dimensiones, mascara)}
+
+
+@pytest.mark.parametrize("dimensiones", [
+    ("anio",), ("anio", "mes"), ("dia_semana",), ("anio", "semana"), ("fecha",),
+    ("categoria_delito", "genero"), ("codigo_dane", "grupo_etario"), ("modalidad_especifica",),
+])
+def test_agrupar_igual_a_sql(datos, dimensiones):
+    motor, filas = datos
+    assert _agrupado(motor, dimensiones) == _referencia(filas, dimensiones)
+
+
+def test_semana_iso_y_dia_semana(datos):
+    motor, filas = datos
+    # 2023-01-01 (domingo) es la semana 52 de 2022; 2024-12-30 (lunes), la semana 1 de 2025
+    semanas = _agrupado(motor, ("fecha", "semana"))
+    assert (date(2023, 1, 1), 52) in semanas
+    assert (date(2024, 12, 30), 1) in semanas
+    dias = _agrupado(motor, ("fecha", "dia_semana"))
+    assert (date(2023, 1, 1), 0) in dias
+    assert (date(2024, 12, 30), 1) in dias
+    assert {d for d, in _agrupado(motor, ("dia_semana",))} == set(range(7))
+
+
+@pytest.mark.parametrize("filtros", [
+    {"categoria_delito": "hurto"},
+    {"categoria_delito": ["Vif", "SEXUAL"]},
+    {"anio": 2024, "mes": 2},
+    {"fecha_inicio": date(2023, 12, 31), "fecha_fin": date(2024, 1, 7)},
+    {"codigo_dane": [68001, 68307], "genero": "femenino", "zona_hecho": "Rural"},
+    {"anio": 2023, "grupo_etario": "ADULTOS"},
+])
+def test_filtrar_igual_a_sql(datos, filtros):
+    motor, filas = datos
+
+    def cumple(fila: dict) -> bool:
+        fecha = fila["fecha_hecho"]
+        for campo, valor in filtros.items():
+            if campo == "anio" and not (fecha and fecha.year == valor):
+                return False
+            if campo == "mes" and not (fecha and fecha.month == valor):
+                return False
+            if campo == "fecha_inicio" and not (fecha and fecha >= valor):
+                return False
+            if campo == "fecha_fin" and not (fecha and fecha <= valor):
+                return False
+            if campo == "codigo_dane" and fila[campo] not in valor:
+                return False
+            if campo in ("categoria_delito", "genero", "grupo_etario", "zona_hecho"):
+                valores = {v.upper() for v in (valor if isinstance(valor, list) else [valor])}
+                if fila[campo] is None or fila[campo].upper() not in valores:
+                    return False
+        return True
+
+    mascara = motor.filtrar(**filtros)
+    esperadas = [cumple(f) for f in filas]
+    assert mascara.tolist() == esperadas
+    seleccion = [f for f, c in zip(filas, esperadas) if c]
+    assert _agrupado(motor, ("anio", "categoria_delito"), mascara) == _referencia(seleccion, ("anio", "categoria_delito"))
+
+
+def test_mayusculas_opcionales(datos):
+    motor, _ = datos
+    assert motor.filtrar(categoria_delito="hurto").any()
+    assert not motor.filtrar(categoria_delito="hurto", ignorar_mayusculas=False).any()
+
+
+def test_mascara_vacia(datos):
+    motor, _ = datos
+    mascara = motor.filtrar(categoria_delito="NO EXISTE")
+    assert not mascara.any()
+    assert motor.agrupar(("anio", "mes"), mascara) == []
+    assert motor.agrupar_columnas(("anio",), mascara) == {"anio": [], "total": [], "eventos": []}
+    # Sin dimensiones: una fila en 0, como SUM() sin filas con GROUP BY ()
+    total, = motor.agrupar((), mascara)
+    assert (total.total, total.eventos) == (0, 0)
+    assert motor.rango_fechas(mascara) == (None, None)
+
+
+def test_orden_por_total(datos):
+    motor, filas = datos
+    agrupadas = motor.agrupar(("clase_sitio",), orden="total")
+    assert [f.total for f in agrupadas] == sorted(_referencia(filas, ("clase_sitio",)).values(), reverse=True)
+
+
+# ============================================
+# CARGA CON ESPERA TRAS UN FALLO
+# ============================================
+
+class _Hilos:
+    """Reemplaza threading.Thread: registra las cargas solicitadas sin ejecutarlas"""
+
+    def __init__(self):
+        self.iniciados = []
+
+    def __call__(self, target, args, **kwargs):
+        self.iniciados.append(args)
+        return self
+
+    def start(self):
+        pass
+
+
+@pytest.fixture
+def carga(monkeypatch):
+    monkeypatch.setattr(motor_columnar, "_estado", {
+        "motor": None, "cargando": None, "error": None, "fallo": None, "duracion_s": None, "origen": None,
+    })
+    hilos = _Hilos()
+    monkeypatch.setattr(motor_columnar.threading, "Thread", hilos)
+
+    def tabla_rota(nombre, version):
+        raise OSError("snapshot roto")
+
+    monkeypatch.setattr(motor_columnar.snapshots, "tabla", tabla_rota)
+    return hilos
+
+
+def test_sin_recarga_tras_fallo(carga, monkeypatch):
+    monkeypatch.setattr(settings, "MOTOR_REINTENTO_SEGUNDOS", 60)
+    motor_columnar._cargar(5)
+    assert motor_columnar._estado["error"] == "snapshot roto"
+    assert motor_columnar._estado["cargando"] is None
+
+    assert motor_columnar._vigente(5) is None
+    assert motor_columnar._vigente(5) is None
+    assert carga.iniciados == []
+    # Una versión nueva de los datos se carga sin esperar
+    assert motor_columnar._vigente(6) is None
+    assert carga.iniciados == [(6,)]
+
+
+def test_reintento_pasada_la_espera(carga, monkeypatch):
+    monkeypatch.setattr(settings, "MOTOR_REINTENTO_SEGUNDOS", 0)
+    motor_columnar._cargar(5)
+    motor_columnar._vigente(5)
+    assert carga.iniciados == [(5,)]
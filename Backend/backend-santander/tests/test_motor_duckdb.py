@@ -0,0 +1,159 @@
+"""
+Pruebas del backend DuckDB (app/motor_duckdb.py) sobre snapshots Parquet de ejemplo
+"""
+import os
+from collections import Counter
+from datetime import date
+import pytest
+from sqlalchemy import func, select
+from app.models import AggSeguridadDiaria, FactSeguridad
+from app.config import settings
+from app import motor_duckdb
+from app.motor_duckdb import SesionDuckDB, compilar
+from app.routers import temporal
+from .conftest import DESDE, HASTA, ejecutar, filas_seguridad
+
+pytest.importorskip("duckdb")
+
+
+def _por_dia_semana(filas, **filtros):
+    totales = Counter()
+    for f in filas:
+        if all(f[k] == v for k, v in filtros.items()):
+            totales[f["fecha_hecho"].isoweekday() % 7] += f["cantidad"]
+    return totales
+
+
+def _por_semana(filas):
+    totales = Counter()
+    for f in filas:
+        # EXTRACT(year) es el año calendario y EXTRACT(week) la semana ISO
+        totales[(f["fecha_hecho"].year, f["fecha_hecho"].isocalendar()[1])] += f["cantidad"]
+    return totales
+
+
+# ============================================
+# COMPILACIÓN
+# ============================================
+
+def test_compilar_valores_en_linea():
+    sql = compilar(select(FactSeguridad.id_evento).filter(
+        FactSeguridad.categoria_delito == "O'HURTO", FactSeguridad.fecha_hecho >= date(2024, 1, 1)
+    ))
+    assert "'O''HURTO'" in sql
+    assert "'2024-01-01'" in sql
+    assert "%(" not in sql and "$1" not in sql
+
+
+def test_compilar_date_trunc_como_timestamptz():
+    sql = compilar(select(func.date_trunc("month", FactSeguridad.fecha_hecho)))
+    assert sql.startswith("SELECT CAST(date_trunc('month', fact_seguridad.fecha_hecho) AS TIMESTAMPTZ)")
+
+
+# ============================================
+# BASE Y SESIÓN
+# ============================================
+
+def test_tablas_creadas_con_calendario(base_duckdb):
+    base = base_duckdb()
+    assert base.tablas == {"fact_seguridad", "dim_fecha", "agg_seguridad_diaria"}
+    assert base.calendario
+    assert SesionDuckDB(base).calendario
+
+
+def test_snapshot_sin_calendario(base_duckdb):
+    base = base_duckdb(calendario=None)
+    assert base.tablas == {"fact_seguridad", "agg_seguridad_diaria"}
+    assert not base.calendario
+
+
+def test_calendario_que_no_cubre_los_hechos(base_duckdb):
+    base = base_duckdb(calendario=(date(2023, 1, 1), HASTA))
+    assert "dim_fecha" in base.tablas
+    assert not base.calendario
+
+
+def test_resultado(base_duckdb):
+    sesion = SesionDuckDB(base_duckdb())
+    filas = filas_seguridad()
+    total = ejecutar(sesion.execute(select(func.sum(FactSeguridad.cantidad))))
+    assert total.scalar() == sum(f["cantidad"] for f in filas)
+
+    resultado = ejecutar(sesion.execute(
+        select(FactSeguridad.id_evento, FactSeguridad.fecha_hecho).order_by(FactSeguridad.id_evento).limit(2)
+    ))
+    primera = resultado.first()
+    assert (primera.id_evento, primera.fecha_hecho) == (1, filas[0]["fecha_hecho"])
+    assert len(resultado.all()) == 2
+
+    vacio = ejecutar(sesion.execute(select(FactSeguridad.id_evento).filter(FactSeguridad.id_evento < 0)))
+    assert vacio.all() == [] and vacio.first() is None and vacio.scalar() is None
+
+
+def test_cubo_materializado(base_duckdb):
+    sesion = SesionDuckDB(base_duckdb())
+    filas = filas_seguridad()
+    fila = ejecutar(sesion.execute(
+        select(func.sum(AggSeguridadDiaria.cantidad).label("total"), func.sum(AggSeguridadDiaria.eventos).label("eventos"))
+    )).first()
+    assert (fila.total, fila.eventos) == (sum(f["cantidad"] for f in filas), len(filas))
+
+
+# ============================================
+# CALENDARIO SEGÚN LA SESIÓN
+# ============================================
+
+@pytest.mark.parametrize("calendario", [(DESDE, HASTA), None])
+@pytest.mark.parametrize("cubo", ["sin_cubo", "con_cubo"])
+def test_por_dia_semana(base_duckdb, request, calendario, cubo):
+    request.getfixturevalue(cubo)
+    sesion = SesionDuckDB(base_duckdb(calendario=calendario))
+    filas = filas_seguridad()
+
+    resultado = ejecutar(temporal.get_por_dia_semana(db=sesion, categoria_delito=None, anio=None, codigo_dane=None))
+    assert {r["dia_num"]: r["total"] for r in resultado} == _por_dia_semana(filas)
+    assert [r["dia"] for r in resultado][:2] == ["LUNES", "MARTES"]
+
+    resultado = ejecutar(temporal.get_por_dia_semana(db=sesion, categoria_delito="HURTO", anio=None, codigo_dane=68001))
+    esperado = _por_dia_semana(filas, categoria_delito="HURTO", codigo_dane=68001)
+    assert {r["dia_num"]: r["total"] for r in resultado} == esperado
+
+
+@pytest.mark.parametrize("calendario", [(DESDE, HASTA), None])
+def test_tendencia_semanal(base_duckdb, sin_cubo, calendario):
+    sesion = SesionDuckDB(base_duckdb(calendario=calendario))
+    resultado = ejecutar(temporal.get_tendencia_semanal(db=sesion, categoria_delito=None, anio=None, codigo_dane=None))
+    assert {(r["anio"], r["semana"]): r["total"] for r in resultado} == _por_semana(filas_seguridad())
+    # Como EXTRACT en PostgreSQL: el 30/12/2024 (semana ISO 1 de 2025) suma en 2024-W01
+    semana_1 = next(r for r in resultado if r["periodo"] == "2024-W01")
+    assert semana_1["total"] == sum(
+        f["cantidad"] for f in filas_seguridad()
+        if f["fecha_hecho"].year == 2024 and f["fecha_hecho"].isocalendar()[1] == 1
+    )
+
+
+def test_sin_reapertura_tras_fallo(snapshots, monkeypatch):
+    """Un snapshot sin fact_seguridad falla al crear el cubo: no se reintenta en cada petición"""
+    monkeypatch.setattr(motor_duckdb, "_zona_horaria", lambda: "UTC")
+    monkeypatch.setattr(motor_duckdb, "_estado", {"base": None, "error": None, "fallo": None})
+    monkeypatch.setattr(settings, "MOTOR_REINTENTO_SEGUNDOS", 60)
+    aperturas = []
+
+    class BaseContada(motor_duckdb.BaseDuckDB):
+        def __init__(self, version):
+            aperturas.append(version)
+            super().__init__(version)
+
+    monkeypatch.setattr(motor_duckdb, "BaseDuckDB", BaseContada)
+    for version in (1, 2):
+        os.remove(os.path.join(snapshots(version, filas_seguridad(50)), "fact_seguridad.parquet"))
+
+    assert motor_duckdb._base(1) is None
+    assert motor_duckdb._base(1) is None
+    assert aperturas == [1]
+    assert motor_duckdb._estado["error"]
+    # Otra versión se abre sin esperar; pasada la espera se reintenta la misma
+    assert motor_duckdb._base(2) is None
+    monkeypatch.setattr(settings, "MOTOR_REINTENTO_SEGUNDOS", 0)
+    assert motor_duckdb._base(2) is None
+    assert aperturas == [1, 2, 2]
@@ -0,0 +1,91 @@
+"""
+Pruebas del índice de municipios (app/municipios_indice.py)
+"""
+import pytest
+from app.municipios_indice import IndiceMunicipios, normalizar
+
+FILAS = [
+    (68001, "BUCARAMANGA"),
+    (68276, "FLORIDABLANCA"),
+    (68307, "GIRÓN"),
+    (68547, "PIEDECUESTA"),
+    (68679, "SAN GIL"),
+    (68689, "SAN VICENTE DE CHUCURÍ"),
+    (68669, "SAN ANDRÉS"),
+    (68755, "SOCORRO"),
+    (68081, "BARRANCABERMEJA"),
+    (68432, "MÁLAGA"),
+]
+
+
+@pytest.fixture(scope="module")
+def indice():
+    return IndiceMunicipios(FILAS)
+
+
+def test_normalizar_quita_tildes_mayusculas_y_espacios():
+    assert normalizar("  girón ") == "GIRON"
+    assert normalizar("San  Vicente de Chucurí") == "SAN VICENTE DE CHUCURI"
+
+
+@pytest.mark.parametrize("texto", ["Girón", "giron", "GIRON", " girón "])
+def test_exacto_sin_tildes_ni_mayusculas(indice, texto):
+    assert indice.resolver(texto) == 68307
+
+
+def test_exacto_con_tilde_en_el_texto(indice):
+    assert indice.resolver("Málaga") == 68432
+    assert indice.resolver("malaga") == 68432
+
+
+def test_prefijo_unico(indice):
+    assert indice.resolver("floridab") == 68276
+    assert indice.resolver("piede") == 68547
+    assert indice.resolver("san vic") == 68689
+
+
+def test_prefijo_ambiguo_no_resuelve(indice):
+    # SAN GIL, SAN VICENTE DE CHUCURÍ y SAN ANDRÉS
+    assert indice.resolver("san") is None
+    assert {c["codigo_dane"] for c in indice.candidatos("san")} >= {68679, 68689, 68669}
+
+
+def test_exacto_gana_sobre_prefijo():
+    indice = IndiceMunicipios([(1, "SAN GIL"), (2, "SAN GILBERTO")])
+    assert indice.resolver("san gil") == 1
+
+
+def test_error_de_escritura_no_resuelve_en_filtros(indice):
+    assert indice.resolver("bucaramnga") is None
+    assert indice.resolver("bucaramnga", aproximado=True) == 68001
+
+
+def test_contiene_solo_resuelve_aproximado(indice):
+    assert indice.resolver("bermeja") is None
+    assert indice.resolver("bermeja", aproximado=True) == 68081
+
+
+def test_desconocido_no_resuelve(indice):
+    assert indice.resolver("medellin") is None
+    assert indice.resolver("medellin", aproximado=True) is None
+    assert indice.resolver("") is None
+    assert indice.resolver(None) is None
+
+
+def test_similitud_baja_no_resuelve_aproximado(indice):
+    # Comparte trigramas con SOCORRO pero por debajo de PUNTAJE_APROXIMADO
+    assert indice.resolver("socotá", aproximado=True) is None
+
+
+def test_no_encontrado_sugiere_candidatos(indice):
+    detalle = indice.no_encontrado("bucaramnga")
+    assert detalle.startswith("Municipio 'bucaramnga' no encontrado")
+    assert "BUCARAMANGA" in detalle
+    assert indice.no_encontrado("zzzz") == "Municipio 'zzzz' no encontrado"
+
+
+def test_candidatos_ordenados_por_puntaje(indice):
+    candidatos = indice.candidatos("giron")
+    assert candidatos[0] == {"codigo_dane": 68307, "nombre_municipio": "GIRÓN", "puntaje": 1.0}
+    puntajes = [c["puntaje"] for c in candidatos]
+    assert puntajes == sorted(puntajes, reverse=True)
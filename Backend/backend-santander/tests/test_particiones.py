@@ -0,0 +1,44 @@
+"""
+Pruebas de app/particiones.py que no requieren PostgreSQL: nombres de particiones,
+lectura de planes de EXPLAIN y rango de años del paso previo a una carga
+"""
+from datetime import date
+from app import particiones
+from app.particiones import nombre_defecto, particiones_leidas, preparar_carga, tabla_base
+
+
+def test_tabla_base():
+    assert tabla_base("fact_seguridad_2024") == "fact_seguridad"
+    assert tabla_base("fact_seguridad_default") == "fact_seguridad"
+    assert tabla_base("fact_clima") == "fact_clima"
+    assert tabla_base("dim_fecha") == "dim_fecha"
+    assert tabla_base("otra_tabla_2024") == "otra_tabla_2024"
+    assert nombre_defecto("fact_clima") == "fact_clima_default"
+
+
+def test_particiones_leidas():
+    plan = [{"Plan": {"Node Type": "Aggregate", "Plans": [{
+        "Node Type": "Append",
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "fact_seguridad_2024"},
+            {"Node Type": "Seq Scan", "Relation Name": "fact_seguridad_default"},
+            {"Node Type": "Index Scan", "Relation Name": "fact_clima_2023"},
+            {"Node Type": "Seq Scan", "Relation Name": "master_municipios"},
+        ],
+    }]}}]
+    assert particiones_leidas(plan) == {"fact_seguridad": {2024, "default"}, "fact_clima": {2023}}
+
+
+def test_preparar_carga(monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(
+        particiones, "asegurar_particiones",
+        lambda conn, tabla, desde, hasta: llamadas.append((tabla, desde, hasta)) or [],
+    )
+    fechas = [date(2012, 3, 1), None, date(2009, 12, 31), date(2010, 6, 6)]
+    preparar_carga(None, "fact_seguridad", iter(fechas))
+    assert llamadas == [("fact_seguridad", 2009, 2012)]
+
+    # Un lote sin fechas no crea particiones: sus filas van a DEFAULT
+    assert preparar_carga(None, "fact_seguridad", [None, None]) == []
+    assert len(llamadas) == 1
@@ -73,6 +73,9 @@ export function HeatMap({
     );
   }
 
+  // Respuestas agregadas (agregacion=grilla|hex): la intensidad es el total de la celda
+  const maxTotal = Math.max(1, ...data.features.map(f => f.properties?.total || 0));
+
   // Convert GeoJSON to heatmap points [lat, lng, intensity]
   const heatPoints = data.features
     .filter(
@@ -84,7 +87,7 @@ export function HeatMap({
     .map(f => [
       f.geometry.coordinates[1], // lat
       f.geometry.coordinates[0], // lng
-      0.5 // intensity
+      f.properties?.total !== undefined ? f.properties.total / maxTotal : 0.5 // intensity
     ]);
 
   return (
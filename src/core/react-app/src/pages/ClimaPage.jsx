@@ -17,7 +17,7 @@ import { Badge } from "@/components/ui/badge";
 import { ScatterPlot, BarChartComponent, TimeSeriesChart } from "@/components/charts";
 import { LoadingOverlay } from "@/components/ui/spinner";
 import { formatNumber } from "@/lib/utils";
-import { climaService, filtrosService } from "@/services/endpoints";
+import { dashboardService, filtrosService } from "@/services/endpoints";
 import { CloudRain, TrendingDown, TrendingUp, Minus, BarChart3 } from "lucide-react";
 
 function CorrelationCard({ correlation }) {
@@ -131,13 +131,22 @@ export default function ClimaPage() {
           categoria_delito: selectedCategory,
         };
 
-        const [scatter, barras, linea, corr, resumen] = await Promise.all([
-          climaService.getScatterLluviaDelitos(params),
-          climaService.getBarrasCategoriasLluvia(params),
-          climaService.getLineaTiempoSuperpuesta({ ...params, agrupacion: "mensual" }),
-          climaService.getCorrelacion(params),
-          climaService.getResumenPrecipitacion({ anio: parseInt(selectedYear) }),
-        ]);
+        const lineaWidget = "clima/linea-tiempo-superpuesta?agrupacion=mensual";
+        const { widgets } = await dashboardService.getBundle(
+          [
+            "clima/scatter-lluvia-delitos",
+            "clima/barras-categorias-lluvia",
+            lineaWidget,
+            "clima/correlacion",
+            "clima/resumen-precipitacion",
+          ],
+          params
+        );
+        const scatter = widgets["clima/scatter-lluvia-delitos"];
+        const barras = widgets["clima/barras-categorias-lluvia"];
+        const linea = widgets[lineaWidget];
+        const corr = widgets["clima/correlacion"];
+        const resumen = widgets["clima/resumen-precipitacion"];
 
         setScatterData(scatter || []);
         setBarrasData(barras || []);
@@ -17,12 +17,7 @@ import {
 import { TimeSeriesChart, BarChartComponent, DonutChart } from "@/components/charts";
 import { LoadingOverlay } from "@/components/ui/spinner";
 import { formatNumber } from "@/lib/utils";
-import {
-  filtrosService,
-  temporalService,
-  victimasService,
-  chatbotService,
-} from "@/services/endpoints";
+import { dashboardService } from "@/services/endpoints";
 import {
   TrendingUp,
   TrendingDown,
@@ -67,10 +62,12 @@ export default function DashboardPage() {
     const loadInitialData = async () => {
       try {
         setLoading(true);
-        const [filtersRes, statsRes] = await Promise.all([
-          filtrosService.getResumen(),
-          chatbotService.getEstadisticas(),
+        const { widgets } = await dashboardService.getBundle([
+          "filtros/resumen",
+          "estadisticas",
         ]);
+        const filtersRes = widgets["filtros/resumen"];
+        const statsRes = widgets["estadisticas"];
         setFilters(filtersRes);
         setStats(statsRes);
         
@@ -94,12 +91,20 @@ export default function DashboardPage() {
 
       try {
         const year = parseInt(selectedYear);
-        const [yearlyRes, weekdayRes, genderRes, zoneRes] = await Promise.all([
-          temporalService.getLineaAnual(),
-          temporalService.getPorDiaSemana({ anio: year }),
-          victimasService.getPorGenero({ anio: year }),
-          temporalService.getPorZona({ anio: year }),
-        ]);
+        // linea-anual ignora el año: el backend aplica a cada widget sus filtros
+        const { widgets } = await dashboardService.getBundle(
+          [
+            "temporal/linea-anual",
+            "temporal/por-dia-semana",
+            "victimas/por-genero",
+            "temporal/por-zona",
+          ],
+          { anio: year }
+        );
+        const yearlyRes = widgets["temporal/linea-anual"];
+        const weekdayRes = widgets["temporal/por-dia-semana"];
+        const genderRes = widgets["victimas/por-genero"];
+        const zoneRes = widgets["temporal/por-zona"];
         
         setYearlyData(yearlyRes || []);
         setWeekdayData(weekdayRes || []);
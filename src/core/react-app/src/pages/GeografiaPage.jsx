@@ -56,6 +56,8 @@ export default function GeografiaPage() {
         setMapLoading(true);
         const params = {
           anio: parseInt(selectedYear),
+          // Geometría simplificada acorde al zoom inicial del ChoroplethMap
+          zoom: 8,
         };
         if (selectedCategory) {
           params.categoria_delito = selectedCategory;
@@ -17,7 +17,7 @@ import { Badge } from "@/components/ui/badge";
 import { TimeSeriesChart, BarChartComponent } from "@/components/charts";
 import { LoadingOverlay } from "@/components/ui/spinner";
 import { formatNumber } from "@/lib/utils";
-import { prediccionesService, filtrosService } from "@/services/endpoints";
+import { batchService, filtrosService } from "@/services/endpoints";
 import {
   TrendingUp,
   TrendingDown,
@@ -124,12 +124,15 @@ export default function PrediccionesPage() {
           ? { categoria_delito: selectedCategory }
           : {};
 
-        const [serie, comp, alerts, sum] = await Promise.all([
-          prediccionesService.getMunicipio(selectedMunicipio, params),
-          prediccionesService.getComparativa(selectedMunicipio),
-          prediccionesService.getAlertas({ umbral_aumento: 10 }),
-          prediccionesService.getResumen({ anio: 2025 }),
+        const { resultados } = await batchService.ejecutar([
+          { id: "serie", route: `predicciones/municipio/${selectedMunicipio}`, params },
+          { id: "comparativa", route: `predicciones/comparativa/${selectedMunicipio}` },
+          { id: "alertas", route: "predicciones/alertas", params: { umbral_aumento: 10 } },
+          { id: "resumen", route: "predicciones/resumen", params: { anio: 2025 } },
         ]);
+        const [serie, comp, alerts, sum] = ["serie", "comparativa", "alertas", "resumen"].map(
+          (id) => resultados[id]?.datos
+        );
 
         // Transform serie data for chart
         const chartData = (serie?.datos || []).map((item) => ({
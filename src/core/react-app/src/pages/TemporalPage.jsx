@@ -16,7 +16,7 @@ import {
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { TimeSeriesChart, BarChartComponent } from "@/components/charts";
 import { LoadingOverlay } from "@/components/ui/spinner";
-import { temporalService, filtrosService } from "@/services/endpoints";
+import { dashboardService, filtrosService } from "@/services/endpoints";
 import { Clock, TrendingUp, Calendar } from "lucide-react";
 
 export default function TemporalPage() {
@@ -65,15 +65,22 @@ export default function TemporalPage() {
           params.categoria_delito = selectedCategory;
         }
 
-        const [monthly, yearly, weekday, weekly, modalidad] = await Promise.all([
-          temporalService.getLineaMensual(params),
-          temporalService.getLineaAnual(
-            selectedCategory ? { categoria_delito: selectedCategory } : {}
-          ),
-          temporalService.getPorDiaSemana(params),
-          temporalService.getTendenciaSemanal(params),
-          temporalService.getPorModalidad(params),
-        ]);
+        // linea-anual ignora el año: el backend aplica a cada widget sus filtros
+        const { widgets } = await dashboardService.getBundle(
+          [
+            "temporal/linea-mensual",
+            "temporal/linea-anual",
+            "temporal/por-dia-semana",
+            "temporal/tendencia-semanal",
+            "temporal/por-modalidad",
+          ],
+          params
+        );
+        const monthly = widgets["temporal/linea-mensual"];
+        const yearly = widgets["temporal/linea-anual"];
+        const weekday = widgets["temporal/por-dia-semana"];
+        const weekly = widgets["temporal/tendencia-semanal"];
+        const modalidad = widgets["temporal/por-modalidad"];
 
         setMonthlyData(monthly || []);
         setYearlyData(yearly || []);
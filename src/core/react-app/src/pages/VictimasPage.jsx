@@ -16,7 +16,7 @@ import {
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { DonutChart, BarChartComponent, HeatMap } from "@/components/charts";
 import { LoadingOverlay } from "@/components/ui/spinner";
-import { victimasService, filtrosService } from "@/services/endpoints";
+import { victimasService, filtrosService, dashboardService } from "@/services/endpoints";
 import { Users, UserCircle, MapPin, Shield, Flame } from "lucide-react";
 
 export default function VictimasPage() {
@@ -66,13 +66,22 @@ export default function VictimasPage() {
           params.categoria_delito = selectedCategory;
         }
 
-        const [gender, age, weapon, site, genderDelito] = await Promise.all([
-          victimasService.getPorGenero(params),
-          victimasService.getPorGrupoEtario(params),
-          victimasService.getPorArmaMedio(params),
-          victimasService.getPorClaseSitio(params),
-          victimasService.getGeneroPorDelito({ anio: parseInt(selectedYear) }),
-        ]);
+        // genero-por-delito ignora la categoría: el backend aplica a cada widget sus filtros
+        const { widgets } = await dashboardService.getBundle(
+          [
+            "victimas/por-genero",
+            "victimas/por-grupo-etario",
+            "victimas/por-arma-medio",
+            "victimas/por-clase-sitio",
+            "victimas/genero-por-delito",
+          ],
+          params
+        );
+        const gender = widgets["victimas/por-genero"];
+        const age = widgets["victimas/por-grupo-etario"];
+        const weapon = widgets["victimas/por-arma-medio"];
+        const site = widgets["victimas/por-clase-sitio"];
+        const genderDelito = widgets["victimas/genero-por-delito"];
 
         setGenderData(gender || []);
         setAgeData(age || []);
@@ -98,7 +107,9 @@ export default function VictimasPage() {
         setPointsLoading(true);
         const params = {
           anio: parseInt(selectedYear),
-          limit: 2000, // Limit points for performance
+          // Celdas hexagonales agregadas en el servidor (zoom inicial del PointsMap)
+          agregacion: "hex",
+          zoom: 9,
         };
         if (selectedCategory) {
           params.categoria_delito = selectedCategory;
@@ -167,6 +167,23 @@ export const chatbotService = {
   },
 };
 
+export const dashboardService = {
+  // Varios widgets en una sola petición: { filtros, widgets: { [widget]: datos } }
+  getBundle: (widgets = [], params = {}) => {
+    return api.get("/dashboard/bundle", {
+      params: widgets.length ? { ...params, widgets: widgets.join(",") } : params,
+    });
+  },
+};
+
+export const batchService = {
+  // Varias consultas GET en una petición: entradas [{ id, route, params }]
+  // -> { resultados: { [id]: { status, datos | error } } }
+  ejecutar: (entradas = []) => {
+    return api.post("/batch", entradas);
+  },
+};
+
 export const prediccionesService = {
   // Serie temporal de municipio con predicciones
   getMunicipio: (municipio, params = {}) => {
@@ -188,3 +205,14 @@ export const prediccionesService = {
     return api.get("/predicciones/alertas", { params });
   },
 };
+
+export const tilesService = {
+  // Plantilla XYZ de teselas vectoriales (MVT) para capas de mapa: "puntos" o "municipios"
+  getUrlPlantilla: (capa, params = {}) => {
+    const query = new URLSearchParams(
+      Object.entries(params).filter(([, v]) => v !== undefined && v !== null && v !== "")
+    ).toString();
+    const base = `${api.defaults.baseURL}/tiles/${capa}/{z}/{x}/{y}.pbf`;
+    return query ? `${base}?${query}` : base;
+  },
+};